@@ -0,0 +1,275 @@
+"""
+Browser Process
+Gestione dei processi Chrome/chromedriver: watchdog con scadenza per profilo,
+terminazione forzata dell'albero di processi di un driver bloccato e riciclo
+dei driver per numero di pagine o memoria (RSS)
+"""
+
+import os
+import time
+import signal
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+try:
+    import psutil
+except ImportError:  # Facoltativo: senza psutil si legge /proc (Linux)
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+KILL_SIGNAL = getattr(signal, "SIGKILL", signal.SIGTERM)
+
+
+def _proc_children_map() -> Dict[int, List[int]]:
+    """ppid → figli, letto da /proc/<pid>/stat"""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+            # Il nome del comando può contenere spazi: i campi seguono l'ultima ')'
+            ppid = int(stat.rsplit(")", 1)[1].split()[1])
+            children.setdefault(ppid, []).append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return children
+
+
+def process_tree(pid: int) -> List[int]:
+    """pid e tutti i suoi discendenti (prima i discendenti, poi il processo radice)"""
+    if psutil is not None:
+        try:
+            parent = psutil.Process(pid)
+            return [child.pid for child in parent.children(recursive=True)] + [pid]
+        except psutil.Error:
+            return [pid]
+
+    if not os.path.isdir("/proc"):
+        return [pid]
+    children = _proc_children_map()
+    tree, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        tree.append(current)
+        stack.extend(children.get(current, []))
+    return tree[1:][::-1] + [pid]
+
+
+def driver_pid(driver) -> int:
+    """pid del processo chromedriver del driver (0 se non disponibile)"""
+    try:
+        return driver.service.process.pid
+    except AttributeError:
+        return 0
+
+
+def _process_rss_bytes(pid: int) -> int:
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return 0
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+def driver_rss_mb(driver) -> float:
+    """
+    RSS complessivo (MB) di chromedriver e dei processi Chrome figli.
+    Somma per processo: le pagine condivise sono contate più volte, è una stima per eccesso.
+    """
+    pid = driver_pid(driver)
+    if not pid:
+        return 0.0
+    return sum(_process_rss_bytes(target) for target in process_tree(pid)) / (1024 * 1024)
+
+
+def kill_driver(driver) -> int:
+    """
+    Termina con SIGKILL chromedriver e tutti i processi Chrome figli.
+    Le chiamate WebDriver bloccate nel thread del worker falliscono subito.
+    Restituisce il numero di processi terminati.
+    """
+    pid = driver_pid(driver)
+    if not pid:
+        return 0
+    killed = 0
+    for target in process_tree(pid):
+        try:
+            os.kill(target, KILL_SIGNAL)
+            killed += 1
+        except (ProcessLookupError, PermissionError):
+            continue
+    try:
+        # Raccoglie lo zombie di chromedriver (processo figlio di Python)
+        driver.service.process.wait(timeout=5)
+    except Exception:
+        pass
+    return killed
+
+
+class DeadlineWatchdog:
+    """
+    Budget di tempo reale per un profilo: alla scadenza chiama on_expire
+    (tipicamente kill_driver) da un thread timer separato.
+
+        with DeadlineWatchdog(90, lambda: kill_driver(driver)) as watchdog:
+            ...
+        if watchdog.expired: ...
+    """
+
+    def __init__(self, seconds: float, on_expire: Callable[[], None], label: str = ""):
+        self.seconds = seconds
+        self.on_expire = on_expire
+        self.label = label
+        self.expired = False
+        self._timer = None
+
+    def _expire(self):
+        self.expired = True
+        logger.warning(f"⏰ Scadenza di {self.seconds:.0f}s superata per {self.label}: terminazione del browser")
+        try:
+            self.on_expire()
+        except Exception as e:
+            logger.error(f"❌ Errore terminazione browser per {self.label}: {e}")
+
+    def start(self):
+        if self.seconds and self.seconds > 0:
+            self._timer = threading.Timer(self.seconds, self._expire)
+            self._timer.daemon = True
+            self._timer.start()
+        return self
+
+    def cancel(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cancel()
+
+
+class DriverRecycler:
+    """
+    Decide quando riavviare il driver di un worker: dopo max_pages pagine profilo
+    o quando l'RSS di Chrome supera max_rss_mb (misurato solo con track_memory).
+    Registra gli eventi di riciclo (anche quelli per scadenza) per il report finale.
+    """
+
+    def __init__(self, max_pages: int = 0, max_rss_mb: float = 0, track_memory: bool = False):
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.track_memory = track_memory
+        self.events = []
+        self.peak_rss_mb = 0.0
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def check(self, driver) -> Optional[str]:
+        """Conta una pagina per il driver e restituisce il motivo del riciclo ("pages"/"memory") o None"""
+        if driver is None:
+            return None
+        with self._lock:
+            pages = self._pages.get(id(driver), 0) + 1
+            self._pages[id(driver)] = pages
+
+        rss_mb = driver_rss_mb(driver) if self.track_memory else 0.0
+        if rss_mb:
+            with self._lock:
+                self.peak_rss_mb = max(self.peak_rss_mb, rss_mb)
+
+        if self.max_rss_mb and rss_mb >= self.max_rss_mb:
+            return "memory"
+        if self.max_pages and pages >= self.max_pages:
+            return "pages"
+        return None
+
+    def record(self, driver, reason: str, label: str = ""):
+        """Registra il riciclo di un driver e ne azzera il contatore"""
+        rss_mb = driver_rss_mb(driver) if self.track_memory and reason != "deadline" else 0.0
+        with self._lock:
+            pages = self._pages.pop(id(driver), 0)
+            self.events.append({
+                "reason": reason,
+                "label": label,
+                "pages": pages,
+                "rss_mb": round(rss_mb, 1),
+                "timestamp": time.time(),
+                "thread": threading.current_thread().name,
+            })
+        logger.info(f"♻️ Riciclo driver ({reason}) dopo {label}: {pages} pagine"
+                    + (f", {rss_mb:.0f} MB" if rss_mb else ""))
+
+    def get_summary(self) -> Dict:
+        with self._lock:
+            by_reason = {}
+            for event in self.events:
+                by_reason[event["reason"]] = by_reason.get(event["reason"], 0) + 1
+            return {
+                "recycles": len(self.events),
+                "by_reason": by_reason,
+                "peak_rss_mb": round(self.peak_rss_mb, 1),
+                "events": list(self.events),
+            }
+
+
+class WorkerDriversMixin:
+    """
+    Un driver Chrome per thread: ogni worker ha il proprio browser e self.driver
+    restituisce quello del thread corrente. I driver creati vengono registrati
+    per poterli chiudere a fine esecuzione.
+    """
+
+    def _init_worker_drivers(self):
+        self._local = threading.local()
+        self._drivers = []
+        self._drivers_lock = threading.Lock()
+
+    @property
+    def driver(self):
+        """Driver Chrome del thread corrente"""
+        return getattr(self._local, "driver", None)
+
+    @driver.setter
+    def driver(self, driver):
+        self._local.driver = driver
+
+    def _register_driver(self, driver):
+        with self._drivers_lock:
+            self._drivers.append(driver)
+
+    def _forget_driver(self, driver):
+        with self._drivers_lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+
+    def close_worker_drivers(self):
+        """Chiude i Chrome dei worker (il driver del thread corrente resta aperto)"""
+        current = self.driver
+        with self._drivers_lock:
+            drivers = [driver for driver in self._drivers if driver is not current]
+            self._drivers = [current] if current in self._drivers else []
+        for driver in drivers:
+            recycle_driver(driver)
+
+
+def recycle_driver(driver):
+    """Chiude un driver in modo ordinato, con terminazione forzata se quit() fallisce"""
+    try:
+        driver.quit()
+    except Exception as e:
+        logger.warning(f"⚠️ Chiusura driver fallita, terminazione forzata: {e}")
+        kill_driver(driver)
@@ -0,0 +1,275 @@
+"""
+Clearance Session
+Sessione Cloudflare condivisa tra i worker: i cookie di clearance ottenuti da un
+browser vengono salvati con la loro scadenza, iniettati negli altri driver e usati
+dal percorso HTTP veloce (requests) per le pagine che non richiedono JavaScript
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+import requests
+
+from config import STATE_CONFIG, PERFORMANCE_CONFIG, get_state_path
+from state_file import update_json
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://it.vestiairecollective.com"
+# Pagina leggera dello stesso dominio, necessaria prima di add_cookie
+COOKIE_URL = f"{BASE_URL}/robots.txt"
+CHALLENGE_TITLES = ("Ci siamo quasi", "Just a moment")
+CLEARANCE_COOKIE = "cf_clearance"
+
+
+def is_challenge_page(title: str) -> bool:
+    """True se il titolo è quello della pagina di verifica Cloudflare"""
+    return any(marker in (title or "") for marker in CHALLENGE_TITLES)
+
+
+def wait_for_challenge(driver, label: str = "", max_wait: int = 30) -> bool:
+    """
+    Attende che il browser superi la verifica Cloudflare (massimo max_wait secondi).
+    True se la pagina non è (più) una verifica.
+    """
+    try:
+        page_title = driver.title
+        if not is_challenge_page(page_title):
+            return True
+        logger.info(f"      🔍 Pagina di verifica Cloudflare rilevata: {page_title}")
+
+        wait_time = 0
+        while wait_time < max_wait:
+            current_title = driver.title
+            current_url = driver.current_url
+
+            # Se il titolo cambia o l'URL cambia, la verifica è completata
+            if current_title != page_title and "vestiairecollective.com" in current_url:
+                logger.info(f"      ✅ Verifica Cloudflare completata: {current_title}")
+                time.sleep(3)  # Aspetta che la pagina si carichi completamente
+                return True
+
+            # Se vediamo "Verifica riuscita", aspettiamo un po' di più
+            if "Verifica riuscita" in driver.page_source:
+                logger.info(f"      ⏳ Verifica in corso...")
+                time.sleep(5)
+                wait_time += 5
+                continue
+
+            time.sleep(2)
+            wait_time += 2
+
+        logger.warning(f"      ⚠️ Timeout verifica Cloudflare dopo {max_wait} secondi ({label})")
+        return False
+
+    except Exception as e:
+        logger.warning(f"      ⚠️ Errore gestione Cloudflare: {e}")
+        return False
+
+
+class ClearanceStore:
+    """
+    Cookie di clearance Cloudflare e user agent con cui sono stati ottenuti
+    (la clearance vale solo per lo stesso user agent), persistiti in state/.
+
+    Un solo worker alla volta attende la verifica nel browser: gli altri, appena
+    la clearance è disponibile, ricevono i cookie invece di ripetere l'attesa.
+    """
+
+    def __init__(self, path: str = None, margin: int = None, default_ttl: int = None):
+        self.path = path or get_state_path("clearance_file")
+        self.margin = STATE_CONFIG["clearance_margin"] if margin is None else margin
+        self.default_ttl = STATE_CONFIG["clearance_default_ttl"] if default_ttl is None else default_ttl
+        self._lock = threading.Lock()
+        self._solve_lock = threading.Lock()
+        self._injected = set()
+        self._sessions = threading.local()
+        self._version = 0
+        # Senza clearance il percorso HTTP viene provato finché non risulta bloccato
+        self._http_blocked = False
+        self.stats = {"challenges_solved": 0, "challenges_skipped": 0, "injections": 0,
+                      "http_fetches": 0, "http_hits": 0}
+        self.entry: Dict = self._load()
+
+    def _load(self) -> Dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ Clearance Cloudflare non leggibile, riparto da zero: {e}")
+            return {}
+
+    def save(self):
+        """Scrive la clearance su disco (in modo atomico: la leggono anche gli altri worker)"""
+        try:
+            with self._lock:
+                entry = dict(self.entry)
+            update_json(self.path, lambda disk: entry)
+        except Exception as e:
+            logger.warning(f"⚠️ Impossibile salvare la clearance Cloudflare: {e}")
+
+    def is_valid(self, user_agent: str = None) -> bool:
+        """Clearance presente, non in scadenza e (se indicato) ottenuta con lo stesso user agent"""
+        with self._lock:
+            if not self.entry.get("cookies"):
+                return False
+            if user_agent and self.entry.get("user_agent") != user_agent:
+                return False
+            return time.time() < self.entry.get("expires_at", 0) - self.margin
+
+    def expires_in(self) -> float:
+        """Secondi alla scadenza della clearance (0 se assente o scaduta)"""
+        with self._lock:
+            return max(0.0, self.entry.get("expires_at", 0) - time.time())
+
+    def update_from_driver(self, driver):
+        """Salva i cookie del browser che ha appena superato la verifica"""
+        cookies = driver.get_cookies()
+        user_agent = driver.execute_script("return navigator.userAgent")
+        now = time.time()
+        clearance = next((cookie for cookie in cookies if cookie.get("name") == CLEARANCE_COOKIE), None)
+        expires_at = clearance.get("expiry") if clearance and clearance.get("expiry") else now + self.default_ttl
+        with self._lock:
+            self.entry = {
+                "cookies": cookies,
+                "user_agent": user_agent,
+                "obtained_at": now,
+                "expires_at": expires_at,
+                "has_clearance_cookie": clearance is not None,
+            }
+            self._injected = {id(driver)}
+            self._version += 1
+            self._http_blocked = False
+        logger.info(f"🛡️ Clearance Cloudflare salvata ({len(cookies)} cookie, scade tra {(expires_at - now) / 60:.0f} min)")
+
+    def inject(self, driver, force: bool = False) -> bool:
+        """Inietta i cookie di clearance nel driver (una volta per driver, salvo force)"""
+        if id(driver) in self._injected and not force:
+            return True
+        try:
+            user_agent = driver.execute_script("return navigator.userAgent")
+            if not self.is_valid(user_agent):
+                return False
+            with self._lock:
+                cookies = list(self.entry.get("cookies", []))
+            if not driver.current_url.startswith(BASE_URL):
+                driver.get(COOKIE_URL)
+            for cookie in cookies:
+                driver.add_cookie(self._driver_cookie(cookie))
+            with self._lock:
+                self._injected.add(id(driver))
+                self.stats["injections"] += 1
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Iniezione clearance Cloudflare fallita: {e}")
+            return False
+
+    @staticmethod
+    def _driver_cookie(cookie: Dict) -> Dict:
+        # add_cookie accetta solo questi campi (sameSite solo con valori validi)
+        allowed = {"name", "value", "path", "domain", "secure", "httpOnly", "expiry"}
+        result = {key: value for key, value in cookie.items() if key in allowed}
+        if cookie.get("sameSite") in ("Strict", "Lax", "None"):
+            result["sameSite"] = cookie["sameSite"]
+        return result
+
+    def pass_challenge(self, driver, label: str = "", wait: Callable = None) -> bool:
+        """
+        Supera la verifica Cloudflare della pagina corrente: se un altro worker ha già
+        la clearance la si inietta e si ricarica, altrimenti si attende nel browser
+        (un worker alla volta) e si salva la clearance ottenuta
+        """
+        if not is_challenge_page(driver.title):
+            return True
+        wait = wait or (lambda: wait_for_challenge(driver, label))
+
+        with self._solve_lock:
+            if self.is_valid() and self.inject(driver, force=True):
+                driver.refresh()
+                if not is_challenge_page(driver.title):
+                    with self._lock:
+                        self.stats["challenges_skipped"] += 1
+                    logger.info(f"      🛡️ Clearance condivisa riutilizzata per {label}")
+                    return True
+
+            if not wait():
+                return False
+            self.update_from_driver(driver)
+            with self._lock:
+                self.stats["challenges_solved"] += 1
+        self.save()
+        return True
+
+    def http_session(self) -> requests.Session:
+        """Sessione requests con cookie e user agent della clearance"""
+        session = requests.Session()
+        with self._lock:
+            entry = dict(self.entry)
+        if entry.get("user_agent"):
+            session.headers["User-Agent"] = entry["user_agent"]
+        session.headers["Accept-Language"] = "it-IT,it;q=0.9,en;q=0.8"
+        for cookie in entry.get("cookies", []):
+            session.cookies.set(cookie["name"], cookie["value"],
+                                domain=cookie.get("domain", ""), path=cookie.get("path", "/"))
+        return session
+
+    def _thread_session(self) -> requests.Session:
+        # Una sessione per thread (connessioni keep-alive), ricreata quando cambia la clearance
+        with self._lock:
+            version = self._version
+        if getattr(self._sessions, "version", None) != version:
+            self._sessions.session = self.http_session()
+            self._sessions.version = version
+        return self._sessions.session
+
+    def fetch_html(self, url: str, session: requests.Session = None) -> Optional[str]:
+        """
+        Percorso HTTP veloce: HTML della pagina senza browser, o None se la risposta
+        non è valida (errore, verifica Cloudflare). Senza clearance valida la richiesta
+        viene tentata solo finché il sito non la blocca.
+        """
+        valid = self.is_valid()
+        with self._lock:
+            if not valid and self._http_blocked:
+                return None
+            self.stats["http_fetches"] += 1
+        try:
+            session = session or self._thread_session()
+            response = session.get(url, timeout=PERFORMANCE_CONFIG.get("request_timeout", 30))
+            if response.status_code != 200 or any(marker in response.text[:5000] for marker in CHALLENGE_TITLES):
+                logger.info(f"  ↪️ Percorso HTTP non disponibile ({response.status_code}) per {url}")
+                if not valid:
+                    with self._lock:
+                        self._http_blocked = True
+                return None
+            with self._lock:
+                self.stats["http_hits"] += 1
+            return response.text
+        except requests.RequestException as e:
+            logger.info(f"  ↪️ Percorso HTTP fallito per {url}: {e}")
+            return None
+
+    def get_summary(self) -> Dict:
+        with self._lock:
+            summary = dict(self.stats)
+        summary["expires_in"] = round(self.expires_in())
+        return summary
+
+
+_shared_store = None
+_shared_lock = threading.Lock()
+
+
+def get_clearance_store() -> ClearanceStore:
+    """Store di clearance condiviso da tutti gli scraper del processo"""
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = ClearanceStore()
+        return _shared_store
@@ -18,7 +18,7 @@ GOOGLE_SHEETS_CONFIG = {
     ]
 }
 
-# Configurazione profili Vestiaire
+# Configurazione profili Vestiaire (usata solo se manca il registro PROFILE_REGISTRY['file'])
 VESTIAIRE_PROFILES = {
     "Rediscover": "2039815",
     "Volodymyr": "5924329", 
@@ -36,6 +36,20 @@ VESTIAIRE_PROFILES = {
     "Designer Odissey": "11069916"
 }
 
+# Registro dei profili (profile_registry.py): CSV, JSON o SQLite con colonne
+# name, profile_id, priority, frequency_hours, shard_key, enabled
+PROFILE_REGISTRY = {
+    "file": "profiles.csv",         # relativo alla root del progetto (env PROFILE_REGISTRY_FILE)
+    "default_priority": 0,          # priorità più alta = profilo elaborato prima
+    "default_frequency_hours": 24,  # intervallo di scraping desiderato
+}
+
+# Esecuzioni divise in shard (shard_runs.py): --shard i/N e merge-shards
+SHARD_CONFIG = {
+    "directory": "shards",          # file parziali degli shard, relativa alla root del progetto
+    "retention_days": 7,            # file parziali più vecchi eliminati
+}
+
 # Configurazione performance e tempi
 PERFORMANCE_CONFIG = {
     # Tempi di attesa (in secondi)
@@ -63,7 +77,14 @@ PERFORMANCE_CONFIG = {
     "retry_config": {
         "max_retries": 3,           # Numero massimo di tentativi per profilo
         "retry_delay": 2,           # Attesa tra i tentativi
-        "timeout_retry": True       # Ritenta su timeout
+        "timeout_retry": True,      # Ritenta su timeout
+        "profile_deadline": 120     # Budget massimo per profilo (s): oltre, Chrome viene terminato e il profilo riaccodato
+    },
+    
+    # Riciclo del driver Chrome di ogni worker
+    "driver_recycling": {
+        "max_pages": 25,            # Pagine profilo per driver prima del riavvio (0 = mai)
+        "max_rss_mb": 1500          # Soglia RSS di Chrome in MB (misurata con track_memory_usage in src/debug_config.py)
     }
 }
 
@@ -73,6 +94,9 @@ LOGGING_CONFIG = {
     "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
     "performance_logging": True,    # Abilita logging dettagliato delle performance
     "save_performance_logs": True,  # Salva logs delle performance su file
+    "trace_webdriver_commands": True,  # Conta e cronometra i round trip WebDriver per profilo
+    "trace_sheets_api": True,       # Traccia chiamate, byte, latenza e retry delle Google Sheets API
+    "collect_page_timing": True,    # Legge Navigation/Resource Timing dal browser per ogni profilo
     "log_file": "vestiaire_performance.log"
 }
 
@@ -90,6 +114,8 @@ OPTIMIZATION_CONFIG = {
     "cache_driver": True,           # Cache del driver Chrome tra esecuzioni
     "smart_wait": True,             # Attesa intelligente basata sul caricamento
     "adaptive_delays": True,        # Adatta i tempi di attesa in base alle performance
+    "parse_workers": None,          # Processi per il parsing degli snapshot (None = tutti i core, 0 = in linea)
+    "http_fast_path": True,         # Pagine profilo via HTTP (requests + clearance condivisa) prima del browser
 }
 
 def get_config_summary() -> Dict:
@@ -149,6 +175,58 @@ DEBUG_CONFIG = {
     "debug_first_profile_only": False
 }
 
+# File di stato persistenti tra le esecuzioni (percorsi relativi alla root del progetto)
+STATE_CONFIG = {
+    "state_dir": "state",           # Relativa alla root del progetto (env VESTIAIRE_STATE_DIR)
+    "navigation_memo_file": "navigation_memo.json",  # Strategia di navigazione vincente per profilo
+    "navigation_max_failures": 3,   # Fallimenti consecutivi dopo cui una strategia viene saltata
+    "navigation_reprobe_hours": 72, # Dopo quante ore dall'ultimo fallimento una strategia saltata viene riprovata
+    "selector_stats_file": "selector_stats.json",    # Hit/miss dei selettori XPath
+    "selector_window": 20,          # Osservazioni senza hit dopo cui un selettore passa alla riscoperta lenta
+    "selector_sample_every": 10,    # Riscoperta campionata: i declassati si provano comunque ogni N ricerche del gruppo
+    "profile_durations_file": "profile_durations.json",  # Durata tipica per profilo (ordine LPT della coda)
+    "duration_smoothing": 0.3,      # Peso dell'ultima esecuzione nella media mobile delle durate
+    "clearance_file": "clearance.json",  # Cookie di clearance Cloudflare condivisi tra worker ed esecuzioni
+    "clearance_margin": 300,        # Secondi prima della scadenza in cui la clearance non viene più usata
+    "clearance_default_ttl": 1800,  # Durata assunta se il cookie cf_clearance non ha scadenza
+    "profile_health_file": "profile_health.json",  # Circuit breaker e ultimi valori letti per profilo
+    "breaker_failure_threshold": 3, # Fallimenti consecutivi (esecuzioni) dopo cui un profilo va in quarantena
+    "breaker_probe_hours": 10,      # Intervallo iniziale tra le sonde di un profilo in quarantena
+    "breaker_max_probe_hours": 168, # Intervallo massimo tra le sonde (raddoppia a ogni sonda fallita)
+    "breaker_max_probes": 3,        # Profili in quarantena sondati per esecuzione
+    "work_queue_file": "work_queue.sqlite",  # Coda durevole worker/coordinator (env WORK_QUEUE_DB; solo disco locale, WAL)
+    "queue_visibility_timeout": 600,  # Secondi di lease: se il worker non lo rinnova il profilo torna in coda
+    "queue_max_attempts": 3,        # Lease per profilo prima di considerarlo fallito
+    "queue_batch_size": 5,          # Profili presi in lease insieme (un solo avvio del driver per batch)
+    "queue_poll_seconds": 5,        # Attesa tra i controlli di worker inattivi e coordinator
+    "queue_retention_days": 7,      # Esecuzioni conservate nella coda
+    "schedule_file": "scrape_schedule.json",  # Ultimo scraping per profilo e richieste delle ultime 24h (monitor)
+}
+
+# Scheduler per frequenza di cambiamento (scrape_scheduler.py) usato dalla modalità monitor
+SCHEDULER_CONFIG = {
+    "daily_budget": 0,              # Scraping di profili al giorno (0 = 2 per profilo abilitato, come il cron)
+    "min_interval_hours": 2,        # Intervallo minimo anche per i profili più attivi
+    "max_interval_hours": 24,       # Intervallo massimo: il foglio mensile ha una colonna al giorno
+    "history_runs": 60,             # Esecuzioni dell'archivio di debug usate per stimare il ritmo di cambiamento
+    "min_observations": 3,          # Sotto questa soglia si usa frequency_hours del registro
+    "rate_floor": 0.05,             # Cambiamenti/ora minimi: anche i profili fermi ricevono una quota
+    "max_profiles_per_cycle": 10,   # Profili scrapati in un ciclo del monitor
+    "min_sleep_seconds": 60,        # Attesa minima e massima tra due cicli del monitor
+    "max_sleep_seconds": 900,
+    "sheet_flush_cycles": 4,        # Il monitor scrive nel foglio i risultati accumulati ogni N cicli
+    "sheet_refresh_times": ["11:30", "23:30"],  # Formattazione e Overview solo dopo questi orari (come il cron)
+}
+
+def get_state_path(key: str) -> str:
+    """
+    Percorso assoluto di un file di stato definito in STATE_CONFIG. La directory è
+    state/ nella root del progetto, o quella indicata da VESTIAIRE_STATE_DIR (es. nei test)
+    """
+    state_dir = os.environ.get("VESTIAIRE_STATE_DIR") or STATE_CONFIG["state_dir"]
+    state_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), state_dir)
+    return os.path.join(state_dir, STATE_CONFIG[key])
+
 def print_config_info():
     """Stampa informazioni sulla configurazione attuale"""
     summary = get_config_summary()
@@ -0,0 +1,186 @@
+"""
+Debug Store
+Archivio append-only dei dati di debug dello scraping: un file JSONL compresso per mese
+(un membro gzip per esecuzione) e un indice per esecuzione e profilo, con retention.
+Sostituisce i file scraping_debug_*.json scritti ad ogni esecuzione.
+"""
+
+import os
+import sys
+import gzip
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+# Configurazione di debug da src/, importata come in src/main.py (un solo modulo debug_config)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from debug_config import DEBUG_STORE
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+INDEX_FILE = "index.jsonl"
+PARTITION_PREFIX = "debug_"
+PARTITION_SUFFIX = ".jsonl.gz"
+
+
+def partition_name(timestamp: datetime) -> str:
+    """Partizione mensile di un'esecuzione (debug_YYYY-MM.jsonl.gz)"""
+    return f"{PARTITION_PREFIX}{timestamp.strftime('%Y-%m')}{PARTITION_SUFFIX}"
+
+
+def _partition_month(filename: str) -> str:
+    return filename[len(PARTITION_PREFIX):-len(PARTITION_SUFFIX)]
+
+
+class DebugStore:
+    """
+    Ogni esecuzione viene aggiunta alla partizione del mese come membro gzip a sé
+    (una riga JSON per profilo): il file resta un gzip valido leggibile per intero,
+    e l'indice registra offset e lunghezza del membro per rileggere una sola esecuzione.
+
+    L'indice (index.jsonl, non compresso) contiene anche i valori riassuntivi di ogni
+    profilo (index_fields), così lo storico di un profilo non richiede di decomprimere nulla.
+    Le partizioni più vecchie di retention_months, o oltre max_total_mb, vengono eliminate.
+    """
+
+    def __init__(self, directory: str = None, retention_months: int = None, max_bytes: int = None,
+                 compress_level: int = None, index_fields: Iterable[str] = None):
+        self.directory = directory or os.path.join(PROJECT_ROOT, DEBUG_STORE["directory"])
+        self.retention_months = retention_months or DEBUG_STORE["retention_months"]
+        self.max_bytes = max_bytes or DEBUG_STORE["max_total_mb"] * 1024 * 1024
+        self.compress_level = compress_level or DEBUG_STORE["compress_level"]
+        self.index_fields = tuple(index_fields or DEBUG_STORE["index_fields"])
+        self._lock = threading.Lock()
+        self._index: Optional[List[Dict]] = None
+
+    # --- scrittura ---
+
+    def append_run(self, results: List[Dict], timestamp: datetime = None, meta: Dict = None) -> Optional[str]:
+        """
+        Aggiunge i risultati di un'esecuzione alla partizione del mese e all'indice.
+        Restituisce l'identificativo dell'esecuzione (timestamp ISO) o None in caso di errore.
+        """
+        timestamp = timestamp or datetime.now()
+        run_id = timestamp.isoformat(timespec="seconds")
+        try:
+            lines = []
+            profiles = {}
+            for result in results:
+                name = result.get("name", "Unknown")
+                lines.append(json.dumps(dict(result, run=run_id), ensure_ascii=False, default=str))
+                profiles[name] = {field: result.get(field) for field in self.index_fields if field in result}
+            data = gzip.compress(("\n".join(lines) + "\n").encode("utf-8"), compresslevel=self.compress_level)
+
+            with self._lock:
+                index = self._load_index()
+                os.makedirs(self.directory, exist_ok=True)
+                partition = partition_name(timestamp)
+                with open(os.path.join(self.directory, partition), "ab") as f:
+                    offset = f.tell()
+                    f.write(data)
+                entry = dict(meta or {}, run=run_id, partition=partition, offset=offset,
+                             length=len(data), profiles=profiles)
+                # L'indice viene scritto dopo i dati: un'esecuzione interrotta resta solo nella partizione
+                with open(os.path.join(self.directory, INDEX_FILE), "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                index.append(entry)
+                removed = self._apply_retention(timestamp)
+
+            logger.info(f"📝 Dati di debug aggiunti a {partition} ({len(results)} profili, {len(data) / 1024:.1f} KB)")
+            if removed:
+                logger.info(f"🧹 Partizioni di debug eliminate: {', '.join(removed)}")
+            return run_id
+        except Exception as e:
+            logger.error(f"❌ Errore nel salvataggio debug: {e}")
+            return None
+
+    def _apply_retention(self, now: datetime) -> List[str]:
+        """Elimina le partizioni oltre retention_months o oltre max_bytes (mai quella corrente)"""
+        current = partition_name(now)
+        cutoff_index = now.year * 12 + now.month - self.retention_months
+        partitions = sorted(name for name in os.listdir(self.directory)
+                            if name.startswith(PARTITION_PREFIX) and name.endswith(PARTITION_SUFFIX))
+        sizes = {name: os.path.getsize(os.path.join(self.directory, name)) for name in partitions}
+        total = sum(sizes.values())
+
+        removed = []
+        for name in partitions:
+            if name == current:
+                break
+            year, month = (int(part) for part in _partition_month(name).split("-"))
+            if year * 12 + month > cutoff_index and total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= sizes[name]
+            removed.append(name)
+
+        if removed:
+            self._index = [entry for entry in self._load_index() if entry["partition"] not in removed]
+            index_path = os.path.join(self.directory, INDEX_FILE)
+            with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+                for entry in self._index:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            os.replace(index_path + ".tmp", index_path)
+        return removed
+
+    # --- lettura ---
+
+    def _load_index(self) -> List[Dict]:
+        if self._index is None:
+            self._index = []
+            path = os.path.join(self.directory, INDEX_FILE)
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            self._index.append(json.loads(line))
+                        except ValueError:
+                            continue
+        return self._index
+
+    def runs(self, profile: str = None, last_n: int = None) -> List[Dict]:
+        """Voci dell'indice (dalla più vecchia), eventualmente solo quelle con il profilo"""
+        with self._lock:
+            entries = [entry for entry in self._load_index()
+                       if profile is None or profile in entry["profiles"]]
+        return entries[-last_n:] if last_n else entries
+
+    def profile_history(self, profile: str, last_n: int = None) -> List[Dict]:
+        """
+        Valori riassuntivi (index_fields) di un profilo nelle ultime last_n esecuzioni,
+        letti dal solo indice: [{"run": ..., "articles": ..., "sales": ...}, ...]
+        """
+        return [dict(entry["profiles"][profile], run=entry["run"])
+                for entry in self.runs(profile, last_n)]
+
+    def read_run(self, entry: Dict) -> List[Dict]:
+        """Record completi di un'esecuzione: decomprime solo il suo membro gzip"""
+        with open(os.path.join(self.directory, entry["partition"]), "rb") as f:
+            f.seek(entry["offset"])
+            data = f.read(entry["length"])
+        return [json.loads(line) for line in gzip.decompress(data).decode("utf-8").splitlines() if line]
+
+    def profile_records(self, profile: str, last_n: int = None) -> List[Dict]:
+        """Record completi di un profilo nelle ultime last_n esecuzioni"""
+        records = []
+        for entry in self.runs(profile, last_n):
+            try:
+                records.extend(record for record in self.read_run(entry) if record.get("name") == profile)
+            except Exception as e:
+                logger.warning(f"⚠️ Esecuzione {entry['run']} non leggibile: {e}")
+        return records
+
+    def get_summary(self) -> Dict:
+        with self._lock:
+            entries = self._load_index()
+            partitions = sorted({entry["partition"] for entry in entries})
+            return {
+                "directory": self.directory,
+                "runs": len(entries),
+                "partitions": partitions,
+                "bytes": sum(os.path.getsize(os.path.join(self.directory, name)) for name in partitions
+                             if os.path.exists(os.path.join(self.directory, name))),
+            }
@@ -0,0 +1,395 @@
+"""
+Durable Queue
+Coda di lavoro persistente in SQLite condivisa da più processi worker sulla stessa
+macchina: i profili vengono presi in lease con timeout di visibilità, i lease dei worker
+caduti scadono e il profilo torna in coda. Il database usa il journal WAL, che richiede
+memoria condivisa tra i processi: non va messo su un filesystem di rete (NFS, SMB).
+Il coordinator accoda l'esecuzione, attende il completamento e aggiorna Google Sheets.
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import subprocess
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from config import STATE_CONFIG, get_state_path
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    run_date TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    run_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    profile_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    estimate REAL NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    updated_at REAL,
+    PRIMARY KEY (run_id, name)
+);
+CREATE INDEX IF NOT EXISTS tasks_by_status ON tasks (kind, status, lease_expires);
+"""
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class DurableWorkQueue:
+    """
+    Stato di ogni profilo di un'esecuzione: pending -> leased -> done/failed.
+
+    lease() assegna i prossimi profili (esecuzioni più vecchie prima, poi durata storica
+    decrescente) con scadenza now + visibility_timeout; heartbeat() la prolunga mentre il
+    worker lavora. Un lease scaduto riporta il profilo in pending (failed dopo max_attempts).
+    Ogni operazione apre la propria connessione in una transazione IMMEDIATE, così più
+    processi locali possono usare lo stesso file.
+    """
+
+    def __init__(self, path: str = None, visibility_timeout: float = None, max_attempts: int = None):
+        self.path = path or os.environ.get("WORK_QUEUE_DB") or get_state_path("work_queue_file")
+        self.visibility_timeout = visibility_timeout or STATE_CONFIG["queue_visibility_timeout"]
+        self.max_attempts = max_attempts or STATE_CONFIG["queue_max_attempts"]
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        connection = self._connect()
+        try:
+            connection.executescript(_SCHEMA)
+        finally:
+            connection.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        finally:
+            connection.close()
+
+    # --- coordinator ---
+
+    def enqueue_run(self, kind: str, profiles: Dict[str, str], estimates: Dict[str, float] = None,
+                    run_date: datetime = None) -> str:
+        """Accoda tutti i profili di un'esecuzione e ne restituisce l'identificativo"""
+        estimates = estimates or {}
+        run_date = run_date or datetime.now()
+        run_id = f"{kind}-{run_date.strftime('%Y%m%d_%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute("INSERT INTO runs VALUES (?, ?, ?, ?, 'running')",
+                               (run_id, kind, run_date.isoformat(timespec="seconds"), now))
+            connection.executemany(
+                "INSERT INTO tasks (run_id, name, profile_id, kind, seq, estimate, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, name, profile_id, kind, seq, estimates.get(name, 0.0), now)
+                 for seq, (name, profile_id) in enumerate(profiles.items())])
+            self._purge(connection, now)
+        logger.info(f"📥 Esecuzione {run_id} accodata: {len(profiles)} profili")
+        return run_id
+
+    def _purge(self, connection: sqlite3.Connection, now: float):
+        """Elimina le esecuzioni più vecchie di queue_retention_days"""
+        cutoff = now - STATE_CONFIG["queue_retention_days"] * 86400
+        old = [row["run_id"] for row in connection.execute("SELECT run_id FROM runs WHERE created_at < ?", (cutoff,))]
+        for run_id in old:
+            connection.execute("DELETE FROM tasks WHERE run_id = ?", (run_id,))
+            connection.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+
+    def cancel_run(self, run_id: str):
+        """Chiude l'esecuzione: i profili ancora in coda non vengono più assegnati"""
+        with self._transaction() as connection:
+            connection.execute("UPDATE runs SET status = 'cancelled' WHERE run_id = ?", (run_id,))
+            connection.execute("UPDATE tasks SET status = ?, updated_at = ? WHERE run_id = ? AND status = ?",
+                               (CANCELLED, time.time(), run_id, PENDING))
+
+    def finish_run(self, run_id: str):
+        with self._transaction() as connection:
+            connection.execute("UPDATE runs SET status = 'finished' WHERE run_id = ?", (run_id,))
+
+    def run_status(self, run_id: str) -> Dict[str, int]:
+        """Numero di profili per stato (pending, leased, done, failed, cancelled)"""
+        connection = self._connect()
+        try:
+            counts = {status: 0 for status in (PENDING, LEASED, DONE, FAILED, CANCELLED)}
+            for row in connection.execute("SELECT status, COUNT(*) AS n FROM tasks WHERE run_id = ? GROUP BY status",
+                                          (run_id,)):
+                counts[row["status"]] = row["n"]
+            return counts
+        finally:
+            connection.close()
+
+    def run_info(self, run_id: str) -> Optional[Dict]:
+        connection = self._connect()
+        try:
+            row = connection.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            return dict(row) if row else None
+        finally:
+            connection.close()
+
+    def results(self, run_id: str) -> List[Dict]:
+        """Risultati dei profili completati, nell'ordine di accodamento"""
+        connection = self._connect()
+        try:
+            return [json.loads(row["result"]) for row in connection.execute(
+                "SELECT result FROM tasks WHERE run_id = ? AND result IS NOT NULL ORDER BY seq", (run_id,))]
+        finally:
+            connection.close()
+
+    def wait(self, run_id: str, timeout: float = None, poll: float = None) -> bool:
+        """Attende che nessun profilo sia pending o in lease. True se completata entro timeout"""
+        poll = poll or STATE_CONFIG["queue_poll_seconds"]
+        deadline = time.time() + timeout if timeout else None
+        last_logged = None
+        while True:
+            # Il controllo dei lease scaduti avviene anche senza worker attivi
+            self._expire_leases_for_run(run_id)
+            counts = self.run_status(run_id)
+            if counts[PENDING] == 0 and counts[LEASED] == 0:
+                return True
+            if counts != last_logged:
+                logger.info(f"⏳ {run_id}: {counts[DONE]} completati, {counts[LEASED]} in corso, "
+                            f"{counts[PENDING]} in coda, {counts[FAILED]} falliti")
+                last_logged = counts
+            if deadline and time.time() > deadline:
+                return False
+            time.sleep(poll)
+
+    def _expire_leases_for_run(self, run_id: str):
+        with self._transaction() as connection:
+            kind = connection.execute("SELECT kind FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if kind:
+                self._expire_leases(connection, kind["kind"], time.time())
+
+    # --- worker ---
+
+    def _expire_leases(self, connection: sqlite3.Connection, kind: str, now: float) -> int:
+        """Lease scaduti (worker caduto o bloccato): il profilo torna in coda o fallisce"""
+        requeued = connection.execute(
+            "UPDATE tasks SET status = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE kind = ? AND status = ? AND lease_expires < ? AND attempts < ?",
+            (PENDING, now, kind, LEASED, now, self.max_attempts)).rowcount
+        expired = connection.execute(
+            "UPDATE tasks SET status = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ?, "
+            "error = 'Lease scaduto dopo ' || attempts || ' tentativi' "
+            "WHERE kind = ? AND status = ? AND lease_expires < ?",
+            (FAILED, now, kind, LEASED, now)).rowcount
+        if requeued or expired:
+            logger.warning(f"⌛ Lease scaduti: {requeued} profili riaccodati, {expired} falliti")
+        return requeued
+
+    def lease(self, worker_id: str, kind: str, limit: int = 1) -> List[Dict]:
+        """Prende in lease fino a limit profili in coda: [{run_id, name, profile_id, attempts}]"""
+        now = time.time()
+        with self._transaction() as connection:
+            self._expire_leases(connection, kind, now)
+            rows = connection.execute(
+                "SELECT t.run_id, t.name, t.profile_id, t.attempts, r.run_date FROM tasks t "
+                "JOIN runs r ON r.run_id = t.run_id "
+                "WHERE t.kind = ? AND t.status = ? AND r.status = 'running' "
+                "ORDER BY r.created_at, t.estimate DESC, t.seq LIMIT ?",
+                (kind, PENDING, limit)).fetchall()
+            for row in rows:
+                connection.execute(
+                    "UPDATE tasks SET status = ?, lease_owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                    "updated_at = ? WHERE run_id = ? AND name = ?",
+                    (LEASED, worker_id, now + self.visibility_timeout, now, row["run_id"], row["name"]))
+        return [dict(row, attempts=row["attempts"] + 1) for row in rows]
+
+    def heartbeat(self, worker_id: str) -> int:
+        """Prolunga i lease del worker; restituisce quanti sono ancora suoi"""
+        with self._transaction() as connection:
+            return connection.execute(
+                "UPDATE tasks SET lease_expires = ? WHERE lease_owner = ? AND status = ?",
+                (time.time() + self.visibility_timeout, worker_id, LEASED)).rowcount
+
+    def complete(self, task: Dict, worker_id: str, result: Dict) -> bool:
+        """Salva il risultato; False se il lease era scaduto ed è passato a un altro worker"""
+        with self._transaction() as connection:
+            updated = connection.execute(
+                "UPDATE tasks SET status = ?, result = ?, error = NULL, lease_owner = NULL, lease_expires = NULL, "
+                "updated_at = ? WHERE run_id = ? AND name = ? AND status = ? AND lease_owner = ?",
+                (DONE, json.dumps(result, ensure_ascii=False, default=str), time.time(),
+                 task["run_id"], task["name"], LEASED, worker_id)).rowcount
+        if not updated:
+            logger.warning(f"⚠️ Lease di {task['name']} perso da {worker_id}: risultato ignorato")
+        return bool(updated)
+
+    def fail(self, task: Dict, worker_id: str, error: str, retry: bool = True) -> bool:
+        """Fallimento del worker sul profilo; riaccodato se restano tentativi. True se riaccodato"""
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT attempts FROM tasks WHERE run_id = ? AND name = ? AND status = ? AND lease_owner = ?",
+                (task["run_id"], task["name"], LEASED, worker_id)).fetchone()
+            if row is None:
+                return False
+            requeued = retry and row["attempts"] < self.max_attempts
+            connection.execute(
+                "UPDATE tasks SET status = ?, error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE run_id = ? AND name = ?",
+                (PENDING if requeued else FAILED, error, time.time(), task["run_id"], task["name"]))
+        return requeued
+
+    def has_work(self, kind: str) -> bool:
+        """True se ci sono profili in coda o in lease per il tipo di esecuzione"""
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                "SELECT COUNT(*) AS n FROM tasks t JOIN runs r ON r.run_id = t.run_id "
+                "WHERE t.kind = ? AND t.status IN (?, ?) AND r.status = 'running'",
+                (kind, PENDING, LEASED)).fetchone()
+            return row["n"] > 0
+        finally:
+            connection.close()
+
+
+class LeaseKeeper:
+    """Thread che rinnova i lease del worker ogni visibility_timeout / 3 mentre lavora"""
+
+    def __init__(self, queue: DurableWorkQueue, worker_id: str):
+        self.queue = queue
+        self.worker_id = worker_id
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lease-keeper", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.queue.visibility_timeout / 3):
+            try:
+                self.queue.heartbeat(self.worker_id)
+            except Exception as e:
+                logger.warning(f"⚠️ Rinnovo lease fallito per {self.worker_id}: {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_worker(queue: DurableWorkQueue, kind: str, process_batch: Callable[[Dict[str, str]], List[Dict]],
+               worker_id: str = None, batch_size: int = None, idle_exit: bool = False,
+               stop: threading.Event = None) -> Dict:
+    """
+    Ciclo del worker: prende in lease batch_size profili, li elabora con process_batch
+    (nome -> id profilo, restituisce i risultati come dict con "name") e li completa.
+    Un profilo senza risultato torna in coda. Con idle_exit termina quando non resta
+    lavoro per il tipo di esecuzione, altrimenti attende nuove esecuzioni finché stop non è impostato.
+    """
+    worker_id = worker_id or default_worker_id()
+    batch_size = batch_size or STATE_CONFIG["queue_batch_size"]
+    stop = stop or threading.Event()
+    stats = {"batches": 0, "completed": 0, "requeued": 0, "failed": 0, "lost": 0}
+    logger.info(f"👷 Worker {worker_id} avviato (coda {kind}, {queue.path})")
+
+    while not stop.is_set():
+        tasks = queue.lease(worker_id, kind, batch_size)
+        if not tasks:
+            if idle_exit and not queue.has_work(kind):
+                break
+            stop.wait(STATE_CONFIG["queue_poll_seconds"])
+            continue
+
+        profiles = {task["name"]: task["profile_id"] for task in tasks}
+        logger.info(f"👷 {worker_id}: lease di {len(tasks)} profili ({', '.join(profiles)})")
+        with LeaseKeeper(queue, worker_id):
+            try:
+                results = process_batch(profiles) or []
+            except Exception as e:
+                logger.error(f"❌ Worker {worker_id}: errore sul batch: {e}")
+                results = []
+        stats["batches"] += 1
+
+        by_name = {result.get("name"): result for result in results}
+        for task in tasks:
+            result = by_name.get(task["name"])
+            if result is not None:
+                stats["completed" if queue.complete(task, worker_id, result) else "lost"] += 1
+            elif queue.fail(task, worker_id, "Nessun risultato dal worker"):
+                stats["requeued"] += 1
+            else:
+                stats["failed"] += 1
+
+    logger.info(f"👷 Worker {worker_id} terminato: {stats}")
+    return stats
+
+
+def coordinate(queue: DurableWorkQueue, kind: str, profiles: Dict[str, str], estimates: Dict[str, float] = None,
+               timeout: float = None, allow_partial: bool = False,
+               on_enqueued: Callable[[str], None] = None) -> Optional[Dict]:
+    """
+    Accoda l'esecuzione e attende che i worker la completino (on_enqueued, se indicato,
+    viene chiamato con il run_id subito dopo l'accodamento, es. per avviare worker locali). Restituisce
+    {run_id, run_date, results, status} o None se scade il timeout (senza allow_partial):
+    in quel caso i profili ancora in coda vengono annullati.
+    """
+    run_date = datetime.now()
+    run_id = queue.enqueue_run(kind, profiles, estimates, run_date)
+    if on_enqueued:
+        on_enqueued(run_id)
+    completed = queue.wait(run_id, timeout)
+    if not completed:
+        queue.cancel_run(run_id)
+        logger.error(f"❌ {run_id}: non completata entro {timeout:.0f}s")
+    status = queue.run_status(run_id)
+    if status[FAILED]:
+        logger.warning(f"⚠️ {run_id}: {status[FAILED]} profili falliti")
+    if not completed and not allow_partial:
+        return None
+    queue.finish_run(run_id)
+    return {"run_id": run_id, "run_date": run_date, "results": queue.results(run_id), "status": status}
+
+
+def spawn_local_workers(command: List[str], count: int) -> List[subprocess.Popen]:
+    """Avvia count processi worker locali (command es. [python, main.py, worker, --idle-exit])"""
+    processes = [subprocess.Popen(command) for _ in range(count)]
+    logger.info(f"👷 Avviati {count} worker locali")
+    return processes
+
+
+def stop_local_workers(processes: List[subprocess.Popen], timeout: float = 60):
+    """Attende i worker locali (escono da soli senza lavoro), poi li termina"""
+    for process in processes:
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            process.terminate()
+            process.wait()
@@ -0,0 +1,240 @@
+"""
+Failure Artifacts
+Scrittura in background degli artefatti di debug dei profili falliti (screenshot e HTML):
+HTML compresso, screenshot ridimensionati, directory a rotazione con limite di spazio
+e manifest JSONL. I thread dello scraper consegnano i byte e proseguono senza I/O su disco.
+"""
+
+import os
+import sys
+import io
+import gzip
+import json
+import time
+import queue
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # Facoltativo: senza Pillow gli screenshot restano PNG a piena risoluzione
+    Image = None
+
+# Configurazione di debug da src/, importata come in src/main.py (un solo modulo debug_config)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from debug_config import FAILURE_ARTIFACTS
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_FILE = "manifest.jsonl"
+
+
+def _safe_name(profile_name: str) -> str:
+    return "".join(char if char.isalnum() or char in "-_" else "_" for char in profile_name)
+
+
+def downsize_screenshot(png: bytes, max_width: int, quality: int = 70) -> Tuple[bytes, str]:
+    """Screenshot ridotto a max_width pixel e convertito in JPEG; (bytes, estensione)"""
+    if Image is None:
+        return png, "png"
+    try:
+        image = Image.open(io.BytesIO(png))
+        if image.width > max_width:
+            image.thumbnail((max_width, max_width * image.height // image.width))
+        output = io.BytesIO()
+        image.convert("RGB").save(output, format="JPEG", quality=quality, optimize=True)
+        return output.getvalue(), "jpg"
+    except Exception as e:
+        logger.debug(f"Ridimensionamento screenshot non riuscito: {e}")
+        return png, "png"
+
+
+class FailureArtifacts:
+    """
+    Coda limitata + thread di scrittura. save_screenshot/save_html non toccano il disco:
+    se la coda è piena l'artefatto viene scartato invece di bloccare il worker.
+
+    Ogni file scritto è indicizzato in manifest.jsonl (profilo, tipo, byte, timestamp);
+    oltre max_total_mb o max_files vengono eliminati i file più vecchi.
+    """
+
+    def __init__(self, directory: str = None, max_bytes: int = None, max_files: int = None,
+                 max_width: int = None, queue_size: int = None):
+        self.directory = directory or os.path.join(PROJECT_ROOT, FAILURE_ARTIFACTS["directory"])
+        self.max_bytes = max_bytes or FAILURE_ARTIFACTS["max_total_mb"] * 1024 * 1024
+        self.max_files = max_files or FAILURE_ARTIFACTS["max_files"]
+        self.max_width = max_width or FAILURE_ARTIFACTS["screenshot_max_width"]
+        self._queue = queue.Queue(maxsize=queue_size or FAILURE_ARTIFACTS["queue_size"])
+        self._thread = None
+        self._lock = threading.Lock()
+        self._entries: Optional[List[Dict]] = None
+        self.stats = {"queued": 0, "written": 0, "dropped": 0, "rotated": 0,
+                      "bytes_written": 0, "bytes_original": 0}
+
+    # --- lato scraper (non bloccante) ---
+
+    def save_screenshot(self, driver, profile_name: str, kind: str = "screenshot") -> Optional[str]:
+        """Cattura lo screenshot (un round trip WebDriver) e lo affida al thread di scrittura"""
+        try:
+            return self._submit(profile_name, kind, "screenshot", driver.get_screenshot_as_png())
+        except Exception as e:
+            logger.warning(f"  ⚠️ Screenshot non catturato per {profile_name}: {e}")
+            return None
+
+    def save_html(self, profile_name: str, html: str, kind: str = "html") -> Optional[str]:
+        """Affida l'HTML della pagina al thread di scrittura (compresso in gzip)"""
+        return self._submit(profile_name, kind, "html", html.encode("utf-8"))
+
+    def save_snapshot(self, snapshot, kind: str = "snapshot") -> Optional[str]:
+        """
+        Affida uno snapshot (PageSnapshot) al thread di scrittura come JSON compresso:
+        è l'input della diagnostica offline (page_diagnostics.py)
+        """
+        payload = json.dumps(snapshot.to_dict(), ensure_ascii=False).encode("utf-8")
+        return self._submit(snapshot.profile_name, kind, "snapshot", payload)
+
+    def save_page(self, driver, profile_name: str, kind: str = "page") -> List[str]:
+        """Screenshot e HTML della pagina corrente"""
+        names = [self.save_screenshot(driver, profile_name, kind)]
+        try:
+            names.append(self.save_html(profile_name, driver.page_source, kind))
+        except Exception as e:
+            logger.warning(f"  ⚠️ HTML non catturato per {profile_name}: {e}")
+        return [name for name in names if name]
+
+    def _submit(self, profile_name: str, kind: str, media: str, payload: bytes) -> Optional[str]:
+        stem = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{_safe_name(profile_name)}_{kind}"
+        item = {"stem": stem, "profile": profile_name, "kind": kind, "media": media,
+                "payload": payload, "timestamp": time.time()}
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self.stats["dropped"] += 1
+            logger.warning(f"  ⚠️ Coda artefatti piena: {kind} di {profile_name} scartato")
+            return None
+        with self._lock:
+            self.stats["queued"] += 1
+        logger.info(f"  📸 Artefatto {kind} di {profile_name} in scrittura: {stem}")
+        return stem
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="artifact-writer", daemon=True)
+                self._thread.start()
+
+    # --- thread di scrittura ---
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                self._write(item)
+            except Exception as e:
+                logger.warning(f"⚠️ Scrittura artefatto {item.get('stem')} fallita: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _encode(self, item: Dict) -> Tuple[bytes, str]:
+        if item["media"] == "html":
+            return gzip.compress(item["payload"], compresslevel=FAILURE_ARTIFACTS["html_compress_level"]), "html.gz"
+        if item["media"] == "snapshot":
+            return gzip.compress(item["payload"], compresslevel=FAILURE_ARTIFACTS["html_compress_level"]), "snapshot.json.gz"
+        return downsize_screenshot(item["payload"], self.max_width)
+
+    def _write(self, item: Dict):
+        data, extension = self._encode(item)
+        os.makedirs(self.directory, exist_ok=True)
+        filename = f"{item['stem']}.{extension}"
+        path = os.path.join(self.directory, filename)
+        # Scrittura atomica: un file parziale non finisce mai nel manifest
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+
+        entry = {
+            "file": filename,
+            "profile": item["profile"],
+            "kind": item["kind"],
+            "bytes": len(data),
+            "original_bytes": len(item["payload"]),
+            "timestamp": datetime.fromtimestamp(item["timestamp"]).isoformat(timespec="seconds"),
+        }
+        entries = self._load_entries()
+        entries.append(entry)
+        with open(os.path.join(self.directory, MANIFEST_FILE), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        with self._lock:
+            self.stats["written"] += 1
+            self.stats["bytes_written"] += len(data)
+            self.stats["bytes_original"] += len(item["payload"])
+        self._rotate(entries)
+
+    def _load_entries(self) -> List[Dict]:
+        if self._entries is None:
+            self._entries = []
+            manifest = os.path.join(self.directory, MANIFEST_FILE)
+            if os.path.exists(manifest):
+                with open(manifest, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue
+                        if os.path.exists(os.path.join(self.directory, entry["file"])):
+                            self._entries.append(entry)
+        return self._entries
+
+    def _rotate(self, entries: List[Dict]):
+        """Elimina gli artefatti più vecchi oltre i limiti e riscrive il manifest"""
+        total = sum(entry["bytes"] for entry in entries)
+        removed = 0
+        while entries and (total > self.max_bytes or len(entries) > self.max_files):
+            oldest = entries.pop(0)
+            total -= oldest["bytes"]
+            removed += 1
+            try:
+                os.remove(os.path.join(self.directory, oldest["file"]))
+            except OSError:
+                pass
+        if not removed:
+            return
+        manifest = os.path.join(self.directory, MANIFEST_FILE)
+        with open(manifest + ".tmp", "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(manifest + ".tmp", manifest)
+        with self._lock:
+            self.stats["rotated"] += removed
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Attende la scrittura degli artefatti in coda (a fine esecuzione). True se completata"""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks:
+            if time.time() > deadline:
+                logger.warning(f"⚠️ Artefatti ancora in coda dopo {timeout:.0f}s")
+                return False
+            time.sleep(0.05)
+        return True
+
+    def get_summary(self) -> Dict:
+        with self._lock:
+            return dict(self.stats, directory=self.directory)
+
+
+_shared_artifacts = None
+_shared_lock = threading.Lock()
+
+
+def get_failure_artifacts() -> FailureArtifacts:
+    """Writer di artefatti condiviso da tutti gli scraper del processo"""
+    global _shared_artifacts
+    with _shared_lock:
+        if _shared_artifacts is None:
+            _shared_artifacts = FailureArtifacts()
+        return _shared_artifacts
@@ -0,0 +1,440 @@
+"""
+Fake Google Sheets Service
+Implementazione in memoria della superficie spreadsheets()/values()/batchUpdate
+usata dagli updater, per misurare numero di chiamate API e byte senza un foglio reale
+"""
+
+import json
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import httplib2
+    from googleapiclient.errors import HttpError
+except ImportError:  # pragma: no cover - dipendenze Google non installate
+    httplib2 = None
+
+    class HttpError(Exception):
+        """Fallback minimale se googleapiclient non è installato"""
+
+        def __init__(self, resp, content, uri=None):
+            self.resp = resp
+            self.content = content
+            self.uri = uri
+            super().__init__(content)
+
+# Costo in quota di ogni metodo: ogni richiesta conta 1 sulla quota per minuto
+# di lettura o di scrittura, indipendentemente da quante celle tocca
+QUOTA_BY_METHOD = {
+    "spreadsheets.get": "read",
+    "spreadsheets.batchUpdate": "write",
+    "values.get": "read",
+    "values.batchGet": "read",
+    "values.update": "write",
+    "values.batchUpdate": "write",
+    "values.append": "write",
+    "values.clear": "write",
+    "values.batchClear": "write",
+}
+
+_A1_CELL = re.compile(r"^([A-Za-z]*)(\d*)$")
+
+
+def column_letter_to_index(letters: str) -> int:
+    """Converte lettere colonna (A, B, ..., AA) in indice 0-based"""
+    index = 0
+    for char in letters.upper():
+        index = index * 26 + (ord(char) - ord('A') + 1)
+    return index - 1
+
+
+def column_index_to_letter(col_idx: int) -> str:
+    """Converte indice colonna 0-based in lettere (A, B, ..., AA)"""
+    result = ""
+    col_idx += 1
+    while col_idx > 0:
+        col_idx, remainder = divmod(col_idx - 1, 26)
+        result = chr(65 + remainder) + result
+    return result
+
+
+def parse_a1_range(a1_range: str) -> Tuple[str, int, int, Optional[int], Optional[int]]:
+    """
+    Scompone un range A1 in (foglio, riga_inizio, colonna_inizio, riga_fine, colonna_fine).
+    Indici 0-based, estremi finali esclusivi; None indica range aperto.
+    """
+    if "!" in a1_range:
+        sheet_name, cells = a1_range.rsplit("!", 1)
+    else:
+        sheet_name, cells = a1_range, ""
+    if len(sheet_name) >= 2 and sheet_name[0] == sheet_name[-1] == "'":
+        sheet_name = sheet_name[1:-1].replace("''", "'")
+
+    if not cells:
+        return sheet_name, 0, 0, None, None
+
+    start, _, end = cells.partition(":")
+    start_match = _A1_CELL.match(start)
+    end_match = _A1_CELL.match(end) if end else start_match
+    if not start_match or not end_match:
+        raise ValueError(f"Range non valido: {a1_range}")
+
+    start_col = column_letter_to_index(start_match.group(1)) if start_match.group(1) else 0
+    start_row = int(start_match.group(2)) - 1 if start_match.group(2) else 0
+
+    if end:
+        end_col = column_letter_to_index(end_match.group(1)) + 1 if end_match.group(1) else None
+        end_row = int(end_match.group(2)) if end_match.group(2) else None
+    else:
+        # Cella singola ("A1") o colonna singola ("A")
+        end_col = start_col + 1 if start_match.group(1) else None
+        end_row = start_row + 1 if start_match.group(2) else None
+    return sheet_name, start_row, start_col, end_row, end_col
+
+
+def _format_value(value):
+    """Simula il FORMATTED_VALUE restituito dall'API (tutto come stringa)"""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _payload_size(payload) -> int:
+    """Dimensione in byte del payload serializzato in JSON"""
+    if payload is None:
+        return 0
+    return len(json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def _http_error(status: int, message: str) -> HttpError:
+    """Costruisce un HttpError come quelli sollevati da googleapiclient"""
+    content = json.dumps({"error": {"code": status, "message": message}}).encode("utf-8")
+    if httplib2 is not None:
+        resp = httplib2.Response({"status": str(status)})
+    else:
+        resp = type("Resp", (), {"status": status, "reason": message})()
+    return HttpError(resp, content)
+
+
+class _FakeRequest:
+    """Richiesta differita: come in googleapiclient, nulla accade fino a execute()"""
+
+    def __init__(self, service, method: str, params: Dict, handler):
+        self._service = service
+        self._method = method
+        self._params = params
+        self._handler = handler
+
+    def execute(self, num_retries: int = 0):
+        return self._service._dispatch(self._method, self._params, self._handler)
+
+
+class _FakeValues:
+    """Superficie spreadsheets().values()"""
+
+    def __init__(self, service):
+        self._service = service
+
+    def get(self, spreadsheetId: str, range: str, **kwargs):
+        return _FakeRequest(self._service, "values.get",
+                            dict(kwargs, spreadsheetId=spreadsheetId, range=range),
+                            self._service._values_get)
+
+    def batchGet(self, spreadsheetId: str, ranges: List[str], **kwargs):
+        return _FakeRequest(self._service, "values.batchGet",
+                            dict(kwargs, spreadsheetId=spreadsheetId, ranges=list(ranges)),
+                            self._service._values_batch_get)
+
+    def update(self, spreadsheetId: str, range: str, body: Dict, **kwargs):
+        return _FakeRequest(self._service, "values.update",
+                            dict(kwargs, spreadsheetId=spreadsheetId, range=range, body=body),
+                            self._service._values_update)
+
+    def batchUpdate(self, spreadsheetId: str, body: Dict, **kwargs):
+        return _FakeRequest(self._service, "values.batchUpdate",
+                            dict(kwargs, spreadsheetId=spreadsheetId, body=body),
+                            self._service._values_batch_update)
+
+    def append(self, spreadsheetId: str, range: str, body: Dict, **kwargs):
+        return _FakeRequest(self._service, "values.append",
+                            dict(kwargs, spreadsheetId=spreadsheetId, range=range, body=body),
+                            self._service._values_append)
+
+    def clear(self, spreadsheetId: str, range: str, body: Dict = None, **kwargs):
+        return _FakeRequest(self._service, "values.clear",
+                            dict(kwargs, spreadsheetId=spreadsheetId, range=range, body=body or {}),
+                            self._service._values_clear)
+
+    def batchClear(self, spreadsheetId: str, body: Dict, **kwargs):
+        return _FakeRequest(self._service, "values.batchClear",
+                            dict(kwargs, spreadsheetId=spreadsheetId, body=body),
+                            self._service._values_batch_clear)
+
+
+class _FakeSpreadsheets:
+    """Superficie service.spreadsheets()"""
+
+    def __init__(self, service):
+        self._service = service
+
+    def values(self):
+        return _FakeValues(self._service)
+
+    def get(self, spreadsheetId: str, **kwargs):
+        return _FakeRequest(self._service, "spreadsheets.get",
+                            dict(kwargs, spreadsheetId=spreadsheetId),
+                            self._service._spreadsheet_get)
+
+    def batchUpdate(self, spreadsheetId: str, body: Dict, **kwargs):
+        return _FakeRequest(self._service, "spreadsheets.batchUpdate",
+                            dict(kwargs, spreadsheetId=spreadsheetId, body=body),
+                            self._service._spreadsheet_batch_update)
+
+
+class FakeSheetsService:
+    """
+    Servizio Google Sheets in memoria compatibile con build('sheets', 'v4').
+
+    Conserva la griglia di ogni tab, applica i range A1 e registra ogni chiamata
+    con dimensione del payload e costo in quota. Le formule sono salvate come testo.
+    """
+
+    def __init__(self, sheets: Dict[str, List[List]] = None, title: str = "Fake Spreadsheet"):
+        self.title = title
+        self.calls: List[Dict] = []
+        self._grids: Dict[str, List[List]] = {}
+        self._sheet_ids: Dict[str, int] = {}
+        self._next_sheet_id = 0
+        self._lock = threading.Lock()
+        for sheet_name, rows in (sheets or {}).items():
+            self.add_sheet(sheet_name, rows)
+
+    # --- API pubblica usata dagli updater ---
+
+    def spreadsheets(self):
+        return _FakeSpreadsheets(self)
+
+    # --- Helper per test e benchmark ---
+
+    def add_sheet(self, title: str, rows: List[List] = None) -> int:
+        """Crea una tab (senza registrare chiamate) e ne restituisce lo sheetId"""
+        if title not in self._grids:
+            self._grids[title] = []
+            self._sheet_ids[title] = self._next_sheet_id
+            self._next_sheet_id += 1
+        if rows:
+            self._write(title, 0, 0, rows)
+        return self._sheet_ids[title]
+
+    def sheet_values(self, title: str) -> List[List]:
+        """Restituisce la griglia grezza di una tab (valori non formattati)"""
+        return [list(row) for row in self._grids.get(title, [])]
+
+    def reset_calls(self):
+        """Azzera il registro delle chiamate (utile dopo il setup dei dati)"""
+        self.calls = []
+
+    def get_call_summary(self) -> Dict:
+        """Riassunto delle chiamate: conteggi, byte e quota consumata"""
+        summary = {
+            "total_calls": len(self.calls),
+            "request_bytes": sum(c["request_bytes"] for c in self.calls),
+            "response_bytes": sum(c["response_bytes"] for c in self.calls),
+            "read_requests": sum(1 for c in self.calls if c["quota"] == "read"),
+            "write_requests": sum(1 for c in self.calls if c["quota"] == "write"),
+            "by_method": {},
+        }
+        summary["total_bytes"] = summary["request_bytes"] + summary["response_bytes"]
+        for call in self.calls:
+            method_stats = summary["by_method"].setdefault(call["method"], {"calls": 0, "bytes": 0})
+            method_stats["calls"] += 1
+            method_stats["bytes"] += call["request_bytes"] + call["response_bytes"]
+        return summary
+
+    # --- Dispatch ---
+
+    def _dispatch(self, method: str, params: Dict, handler):
+        with self._lock:
+            record = {
+                "method": method,
+                "range": params.get("range") or params.get("ranges"),
+                "quota": QUOTA_BY_METHOD.get(method, "read"),
+                "request_bytes": _payload_size(params.get("body")),
+                "response_bytes": 0,
+                "error": None,
+            }
+            self.calls.append(record)
+            try:
+                response = handler(params)
+            except HttpError as e:
+                record["error"] = e.resp.status
+                raise
+            record["response_bytes"] = _payload_size(response)
+            return response
+
+    def _require_sheet(self, sheet_name: str):
+        if sheet_name not in self._grids:
+            raise _http_error(400, f"Unable to parse range: {sheet_name}")
+
+    # --- Operazioni sulla griglia ---
+
+    def _write(self, sheet_name: str, start_row: int, start_col: int, rows: List[List]) -> Tuple[int, int]:
+        grid = self._grids[sheet_name]
+        max_cols = 0
+        for r_offset, row in enumerate(rows):
+            target_row = start_row + r_offset
+            while len(grid) <= target_row:
+                grid.append([])
+            target = grid[target_row]
+            needed = start_col + len(row)
+            if len(target) < needed:
+                target.extend([""] * (needed - len(target)))
+            for c_offset, value in enumerate(row):
+                target[start_col + c_offset] = "" if value is None else value
+            max_cols = max(max_cols, len(row))
+        return len(rows), max_cols
+
+    def _read(self, sheet_name: str, start_row: int, start_col: int,
+              end_row: Optional[int], end_col: Optional[int]) -> List[List]:
+        grid = self._grids[sheet_name]
+        stop_row = len(grid) if end_row is None else min(end_row, len(grid))
+        values = []
+        for row in grid[start_row:stop_row]:
+            stop_col = len(row) if end_col is None else min(end_col, len(row))
+            cells = [_format_value(v) for v in row[start_col:stop_col]]
+            # Come l'API reale: celle vuote finali omesse
+            while cells and cells[-1] == "":
+                cells.pop()
+            values.append(cells)
+        # ...e righe vuote finali omesse
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def _clear(self, sheet_name: str, start_row: int, start_col: int,
+               end_row: Optional[int], end_col: Optional[int]):
+        grid = self._grids[sheet_name]
+        stop_row = len(grid) if end_row is None else min(end_row, len(grid))
+        for row in grid[start_row:stop_row]:
+            stop_col = len(row) if end_col is None else min(end_col, len(row))
+            for c in range(start_col, stop_col):
+                row[c] = ""
+
+    # --- Handler dei metodi ---
+
+    def _spreadsheet_get(self, params: Dict) -> Dict:
+        sheets = []
+        for index, (title, grid) in enumerate(self._grids.items()):
+            sheets.append({
+                "properties": {
+                    "sheetId": self._sheet_ids[title],
+                    "title": title,
+                    "index": index,
+                    "gridProperties": {
+                        "rowCount": max(len(grid), 1000),
+                        "columnCount": max((len(r) for r in grid), default=26),
+                    },
+                }
+            })
+        return {
+            "spreadsheetId": params["spreadsheetId"],
+            "properties": {"title": self.title},
+            "sheets": sheets,
+        }
+
+    def _spreadsheet_batch_update(self, params: Dict) -> Dict:
+        replies = []
+        for request in params["body"].get("requests", []):
+            if "addSheet" in request:
+                title = request["addSheet"].get("properties", {}).get("title")
+                if title in self._grids:
+                    raise _http_error(400, f"A sheet with the name \"{title}\" already exists.")
+                sheet_id = self.add_sheet(title)
+                replies.append({"addSheet": {"properties": {"sheetId": sheet_id, "title": title}}})
+            elif "deleteSheet" in request:
+                sheet_id = request["deleteSheet"].get("sheetId")
+                for title, sid in list(self._sheet_ids.items()):
+                    if sid == sheet_id:
+                        del self._grids[title]
+                        del self._sheet_ids[title]
+                replies.append({})
+            else:
+                # Formattazioni, merge, dimensioni: non alterano i valori
+                replies.append({})
+        return {"spreadsheetId": params["spreadsheetId"], "replies": replies}
+
+    def _values_get(self, params: Dict) -> Dict:
+        sheet_name, start_row, start_col, end_row, end_col = parse_a1_range(params["range"])
+        self._require_sheet(sheet_name)
+        response = {"range": params["range"], "majorDimension": "ROWS"}
+        values = self._read(sheet_name, start_row, start_col, end_row, end_col)
+        if values:
+            response["values"] = values
+        return response
+
+    def _values_batch_get(self, params: Dict) -> Dict:
+        value_ranges = [self._values_get({"range": a1_range}) for a1_range in params["ranges"]]
+        return {"spreadsheetId": params["spreadsheetId"], "valueRanges": value_ranges}
+
+    def _values_update(self, params: Dict) -> Dict:
+        sheet_name, start_row, start_col, _, _ = parse_a1_range(params["range"])
+        self._require_sheet(sheet_name)
+        values = params["body"].get("values", [])
+        rows, cols = self._write(sheet_name, start_row, start_col, values)
+        return {
+            "spreadsheetId": params["spreadsheetId"],
+            "updatedRange": params["range"],
+            "updatedRows": rows,
+            "updatedColumns": cols,
+            "updatedCells": sum(len(row) for row in values),
+        }
+
+    def _values_batch_update(self, params: Dict) -> Dict:
+        responses = []
+        for value_range in params["body"].get("data", []):
+            responses.append(self._values_update({
+                "spreadsheetId": params["spreadsheetId"],
+                "range": value_range["range"],
+                "body": value_range,
+            }))
+        return {
+            "spreadsheetId": params["spreadsheetId"],
+            "totalUpdatedCells": sum(r["updatedCells"] for r in responses),
+            "responses": responses,
+        }
+
+    def _values_append(self, params: Dict) -> Dict:
+        sheet_name, _, start_col, _, _ = parse_a1_range(params["range"])
+        self._require_sheet(sheet_name)
+        grid = self._grids[sheet_name]
+        # La tabella termina all'ultima riga con almeno una cella piena
+        next_row = len(grid)
+        while next_row > 0 and not any(str(v) != "" for v in grid[next_row - 1]):
+            next_row -= 1
+        values = params["body"].get("values", [])
+        rows, cols = self._write(sheet_name, next_row, start_col, values)
+        updated_range = f"{sheet_name}!{column_index_to_letter(start_col)}{next_row + 1}"
+        return {
+            "spreadsheetId": params["spreadsheetId"],
+            "tableRange": params["range"],
+            "updates": {
+                "updatedRange": updated_range,
+                "updatedRows": rows,
+                "updatedColumns": cols,
+                "updatedCells": sum(len(row) for row in values),
+            },
+        }
+
+    def _values_clear(self, params: Dict) -> Dict:
+        sheet_name, start_row, start_col, end_row, end_col = parse_a1_range(params["range"])
+        self._require_sheet(sheet_name)
+        self._clear(sheet_name, start_row, start_col, end_row, end_col)
+        return {"spreadsheetId": params["spreadsheetId"], "clearedRange": params["range"]}
+
+    def _values_batch_clear(self, params: Dict) -> Dict:
+        cleared = [self._values_clear({"spreadsheetId": params["spreadsheetId"], "range": r})["clearedRange"]
+                   for r in params["body"].get("ranges", [])]
+        return {"spreadsheetId": params["spreadsheetId"], "clearedRanges": cleared}
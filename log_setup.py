@@ -0,0 +1,138 @@
+"""
+Log Setup
+Logging non bloccante: i thread dell'applicazione accodano i record (QueueHandler) e un
+solo thread (QueueListener) li formatta e li scrive su console e su file JSON a rotazione.
+I messaggi ripetuti nei cicli interni sono campionati per chiave (extra=sampled("chiave")).
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict
+
+# Configurazione di debug da src/, importata come in src/main.py (un solo modulo debug_config)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from debug_config import LOG_CONFIG, get_log_level
+
+# Attributi standard di LogRecord: tutto il resto arriva da extra= e finisce nel JSON
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+
+
+def sampled(key: str) -> Dict:
+    """extra= per un messaggio di un ciclo interno, campionato per chiave"""
+    return {"log_key": key}
+
+
+class JsonFormatter(logging.Formatter):
+    """Un oggetto JSON per riga: timestamp, livello, logger, thread, messaggio e campi extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Limita i messaggi con log_key: per ogni chiave passano i primi burst record di una
+    finestra di window secondi, poi uno ogni every (con il numero di record scartati).
+    I record senza chiave e quelli WARNING o superiori passano sempre.
+    """
+
+    def __init__(self, burst: int = 5, every: int = 50, window: float = 60.0):
+        super().__init__()
+        self.burst = burst
+        self.every = max(1, every)
+        self.window = window
+        self._keys: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "log_key", None)
+        if key is None or record.levelno >= logging.WARNING:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            state = self._keys.get(key)
+            if state is None or now - state["start"] > self.window:
+                state = self._keys[key] = {"start": now, "count": 0, "suppressed": 0}
+            state["count"] += 1
+            if state["count"] <= self.burst or (state["count"] - self.burst) % self.every == 0:
+                if state["suppressed"]:
+                    record.suppressed = state["suppressed"]
+                    record.msg = f"{record.msg} (+{state['suppressed']} simili non registrati)"
+                    state["suppressed"] = 0
+                return True
+            state["suppressed"] += 1
+            return False
+
+
+def configure_logging(log_name: str, log_dir: str = "logs") -> logging.Logger:
+    """
+    Sostituisce gli handler del root logger con un QueueHandler (campionato) e avvia il
+    QueueListener che scrive su console (testo) e su log_dir/<log_name>.jsonl a rotazione
+    (max_log_size/backup_count di LOG_CONFIG). Il listener viene fermato all'uscita.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    handlers = []
+    if LOG_CONFIG.get("console_output", True):
+        console = logging.StreamHandler(sys.stdout)
+        console.setFormatter(logging.Formatter(LOG_CONFIG["log_format"]))
+        handlers.append(console)
+    if LOG_CONFIG.get("file_output", True):
+        os.makedirs(log_dir, exist_ok=True)
+        file_handler = RotatingFileHandler(
+            os.path.join(log_dir, f"{log_name}.jsonl"),
+            maxBytes=LOG_CONFIG["max_log_size"],
+            backupCount=LOG_CONFIG["backup_count"],
+            encoding="utf-8",
+        )
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    sampling = LOG_CONFIG.get("sampling", {})
+    queue_handler = QueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(SamplingFilter(**sampling))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(get_log_level())
+
+    _listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return root
+
+
+def stop_logging():
+    """Svuota la coda e ferma il thread di scrittura dei log"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
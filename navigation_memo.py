@@ -0,0 +1,110 @@
+"""
+Navigation Memo
+Memoria per profilo della strategia di navigazione (e URL) che ha funzionato
+"""
+
+import os
+import copy
+import json
+import time
+import threading
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config import STATE_CONFIG, get_state_path
+from state_file import update_json
+
+logger = logging.getLogger(__name__)
+
+
+class NavigationMemo:
+    """
+    Ricorda, per ogni profilo, quale strategia di navigazione e quale URL hanno
+    portato agli articoli venduti e quanto ci hanno messo. Alla prossima esecuzione
+    la strategia vincente viene provata per prima e quelle che falliscono di
+    continuo vengono saltate, finché non passano reprobe_hours dall'ultimo fallimento:
+    allora vengono riprovate una volta (il sito può essere cambiato di nuovo).
+    """
+
+    def __init__(self, path: str = None, max_failures: int = None, reprobe_hours: float = None):
+        self.path = path or get_state_path("navigation_memo_file")
+        self.max_failures = max_failures or STATE_CONFIG["navigation_max_failures"]
+        self.reprobe_hours = reprobe_hours or STATE_CONFIG["navigation_reprobe_hours"]
+        self._lock = threading.Lock()
+        self._dirty = set()
+        self.profiles: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ Memo navigazione non leggibile, riparto da zero: {e}")
+            return {}
+
+    def save(self):
+        """Scrive su disco il memo dei profili navigati, fondendolo con quello degli altri worker"""
+        with self._lock:
+            changed = {name: copy.deepcopy(self.profiles[name]) for name in self._dirty}
+            self._dirty.clear()
+
+        def merge(disk: Dict) -> Dict:
+            disk.update(changed)
+            return disk
+
+        try:
+            update_json(self.path, merge)
+        except Exception as e:
+            logger.warning(f"⚠️ Impossibile salvare il memo navigazione: {e}")
+
+    def _is_skipped(self, stats: Dict, now: float) -> bool:
+        """Fallita di continuo e ultimo fallimento più recente di reprobe_hours"""
+        return (stats.get("consecutive_failures", 0) >= self.max_failures
+                and now - stats.get("last_failed_at", 0) < self.reprobe_hours * 3600)
+
+    def order_strategies(self, profile_name: str, strategies: List[str], now: float = None) -> List[str]:
+        """Strategia vincente per prima, poi le altre nell'ordine dato, senza quelle fallite di continuo"""
+        now = now or time.time()
+        with self._lock:
+            memo = self.profiles.get(profile_name, {})
+            stats = memo.get("strategies", {})
+            winner = memo.get("winner", {}).get("strategy")
+
+        ordered = [winner] if winner in strategies else []
+        ordered += [name for name in strategies
+                    if name != winner and not self._is_skipped(stats.get(name, {}), now)]
+        # Se sono state escluse tutte, meglio riprovarle che non navigare affatto
+        return ordered or list(strategies)
+
+    def get_winning_url(self, profile_name: str, strategy: str) -> Optional[str]:
+        """URL che ha funzionato l'ultima volta per la strategia indicata"""
+        with self._lock:
+            winner = self.profiles.get(profile_name, {}).get("winner", {})
+        return winner.get("url") if winner.get("strategy") == strategy else None
+
+    def record(self, profile_name: str, strategy: str, success: bool, elapsed: float, url: str = None):
+        """Registra l'esito di un tentativo di navigazione"""
+        with self._lock:
+            memo = self.profiles.setdefault(profile_name, {"winner": {}, "strategies": {}})
+            self._dirty.add(profile_name)
+            stats = memo["strategies"].setdefault(strategy, {
+                "successes": 0, "failures": 0, "consecutive_failures": 0, "avg_time": 0.0
+            })
+            attempts = stats["successes"] + stats["failures"]
+            stats["avg_time"] = (stats["avg_time"] * attempts + elapsed) / (attempts + 1)
+            stats["last_time"] = elapsed
+            if success:
+                stats["successes"] += 1
+                stats["consecutive_failures"] = 0
+                stats["last_url"] = url
+                memo["winner"] = {"strategy": strategy, "url": url, "time": elapsed,
+                                  "updated": datetime.now().isoformat()}
+            else:
+                stats["failures"] += 1
+                stats["consecutive_failures"] += 1
+                stats["last_failed_at"] = time.time()
+                if memo["winner"].get("strategy") == strategy:
+                    memo["winner"] = {}
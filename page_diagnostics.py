@@ -0,0 +1,169 @@
+"""
+Page Diagnostics
+Analisi approfondita della struttura di una pagina (elementi con testo, con €, con numeri,
+"venduti", pattern di prezzo) eseguita offline sugli snapshot salvati, senza round trip
+WebDriver. In produzione gli scraper salvano solo lo snapshot e ne registrano il riferimento.
+"""
+
+import os
+import re
+import gzip
+import json
+import logging
+from typing import Dict, List, Optional
+
+from page_snapshot import PageSnapshot, INVISIBLE_TAGS
+from failure_artifacts import MANIFEST_FILE
+from pattern_bank import PRICE_RE
+
+logger = logging.getLogger(__name__)
+
+# Pattern cercati nel testo della pagina (come nel vecchio _debug_page_structure)
+TEXT_PATTERNS = [
+    r'(\d+)\s*€',
+    r'€\s*(\d+)',
+    r'(\d+)\s+venduti',
+    r'(\d+)\s+sold',
+    r'Venduto',
+    r'Sold',
+]
+
+_SOLD_WORDS = ("venduti", "sold")
+_SAMPLE_SIZE = 10
+
+
+def _own_text(element) -> str:
+    """Testo diretto dell'elemento (come text() negli XPath delle analisi live)"""
+    return " ".join("".join(element.xpath("text()")).split())
+
+
+def _describe(element) -> Dict:
+    return {
+        "text": " ".join(element.text_content().split())[:120],
+        "tag": element.tag,
+        "class": element.get("class", ""),
+    }
+
+
+def analyze_snapshot(snapshot: PageSnapshot) -> Dict:
+    """
+    Un solo passaggio sull'albero lxml: conteggi ed esempi degli elementi con €,
+    con cifre e con "venduti/sold", più i pattern di prezzo nel testo visibile
+    """
+    elements = [element for element in snapshot.tree.iter()
+                if isinstance(element.tag, str) and element.tag not in INVISIBLE_TAGS]
+    with_text, euro, numbers, sold = [], [], [], []
+    for element in elements:
+        text = _own_text(element)
+        if not text:
+            continue
+        with_text.append(element)
+        if "€" in text:
+            euro.append(element)
+        if any(char.isdigit() for char in text):
+            numbers.append(element)
+        if any(word in text for word in _SOLD_WORDS):
+            sold.append(element)
+
+    body_text = snapshot.text
+    if not body_text:
+        bodies = snapshot.xpath("//body")
+        body_text = bodies[0].text_content() if bodies else ""
+
+    price_variants = {}
+    for match in PRICE_RE.finditer(body_text):
+        price_variants.setdefault(match.lastgroup, []).append(match.group(match.lastgroup))
+    text_patterns = {}
+    for pattern in TEXT_PATTERNS:
+        matches = re.findall(pattern, body_text, re.IGNORECASE)
+        if matches:
+            text_patterns[pattern] = {"count": len(matches), "sample": matches[:5]}
+
+    return {
+        "profile": snapshot.profile_name,
+        "url": snapshot.url,
+        "title": snapshot.title,
+        "elements_with_text": len(with_text),
+        "euro_elements": len(euro),
+        "euro_sample": [_describe(element) for element in euro[:_SAMPLE_SIZE]],
+        "number_elements": len(numbers),
+        "sold_elements": len(sold),
+        "sold_sample": [_describe(element) for element in sold[:5]],
+        "body_text_length": len(body_text),
+        "price_patterns": {variant: {"count": len(matches), "sample": matches[:5]}
+                           for variant, matches in price_variants.items()},
+        "text_patterns": text_patterns,
+    }
+
+
+def format_diagnostics(report: Dict) -> List[str]:
+    """Righe leggibili del report di analyze_snapshot"""
+    lines = [
+        f"🔍 {report['profile']} - {report['title']} ({report['url']})",
+        f"   Elementi con testo: {report['elements_with_text']}, con €: {report['euro_elements']}, "
+        f"con numeri: {report['number_elements']}, venduti/sold: {report['sold_elements']}",
+        f"   Testo body: {report['body_text_length']} caratteri",
+    ]
+    for i, item in enumerate(report["euro_sample"]):
+        lines.append(f"   Elemento € {i + 1}: '{item['text']}' (tag: {item['tag']}, class: {item['class']})")
+    for i, item in enumerate(report["sold_sample"]):
+        lines.append(f"   Venduti {i + 1}: '{item['text']}' (tag: {item['tag']}, class: {item['class']})")
+    for variant, matches in report["price_patterns"].items():
+        lines.append(f"   Pattern prezzo '{variant}': {matches['count']} matches - {matches['sample']}")
+    for pattern, matches in report["text_patterns"].items():
+        lines.append(f"   Pattern '{pattern}': {matches['count']} matches - {matches['sample']}")
+    return lines
+
+
+def load_snapshot(path: str) -> PageSnapshot:
+    """Snapshot salvato dal writer degli artefatti (JSON compresso)"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return PageSnapshot.from_dict(json.load(f))
+
+
+def find_snapshot_artifacts(directory: str, profile: str = None, refs: List[str] = None,
+                            limit: int = None) -> List[str]:
+    """
+    Percorsi degli snapshot nel manifest degli artefatti (i più recenti per primi),
+    filtrati per profilo o per riferimento (stem restituito da save_snapshot)
+    """
+    manifest = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(manifest):
+        return []
+    paths = []
+    with open(manifest, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if not entry["file"].endswith(".snapshot.json.gz"):
+                continue
+            if profile and entry["profile"] != profile:
+                continue
+            if refs is not None and not any(entry["file"].startswith(ref) for ref in refs):
+                continue
+            path = os.path.join(directory, entry["file"])
+            if os.path.exists(path):
+                paths.append(path)
+    paths.reverse()
+    return paths[:limit] if limit else paths
+
+
+def diagnose_snapshots(directory: str, profile: str = None, refs: List[str] = None,
+                       limit: Optional[int] = None) -> List[Dict]:
+    """Analizza offline gli snapshot salvati e ne riporta i risultati nel log"""
+    reports = []
+    for path in find_snapshot_artifacts(directory, profile, refs, limit):
+        try:
+            report = analyze_snapshot(load_snapshot(path))
+        except Exception as e:
+            logger.warning(f"⚠️ Snapshot non analizzabile {os.path.basename(path)}: {e}")
+            continue
+        report["file"] = os.path.basename(path)
+        reports.append(report)
+        for line in format_diagnostics(report):
+            logger.info(line)
+    if not reports:
+        logger.info("ℹ️ Nessuno snapshot di diagnostica trovato")
+    return reports
@@ -0,0 +1,231 @@
+"""
+Page Snapshot
+Cattura unica del DOM di una pagina ed estrattori offline (lxml) per conteggi e prezzi
+"""
+
+import time
+import logging
+from typing import Dict, List
+
+from lxml import html as lxml_html
+
+from pattern_bank import NUMBER_RE, find_sold_count, find_json_sold_count
+from price_normalizer import normalize_prices, price_fragments, unique_valid_prices
+
+logger = logging.getLogger(__name__)
+
+# Un solo round trip WebDriver: HTML renderizzato, testo visibile e contenuto degli script
+SNAPSHOT_SCRIPT = """
+return {
+    url: window.location.href,
+    title: document.title,
+    html: document.documentElement.outerHTML,
+    text: document.body ? document.body.innerText : '',
+    scripts: Array.prototype.map.call(document.scripts, function (s) { return s.textContent || ''; })
+};
+"""
+
+# Conteggi vendite plausibili per un profilo (come negli estrattori live)
+MIN_SOLD_COUNT = 1
+MAX_SOLD_COUNT = 1000
+
+# Tab e filtri "venduti" (da _analyze_vestiaire_structure / _find_real_sold_count)
+SOLD_TAB_XPATHS = [
+    "//div[contains(@class, 'tab')]//span[contains(text(), 'venduti')]",
+    "//div[contains(@class, 'tab')]//span[contains(text(), 'sold')]",
+    "//button[contains(@class, 'tab')]//span[contains(text(), 'venduti')]",
+    "//button[contains(@class, 'tab')]//span[contains(text(), 'sold')]",
+    "//div[contains(@class, 'filter')]//span[contains(text(), 'venduti')]",
+    "//div[contains(@class, 'filter')]//span[contains(text(), 'sold')]",
+    "//button[contains(text(), 'venduti')]",
+    "//button[contains(text(), 'sold')]",
+    "//div[contains(text(), 'venduti')]",
+    "//div[contains(text(), 'sold')]",
+    "//span[contains(text(), 'venduti')]",
+    "//span[contains(text(), 'sold')]",
+    "//*[contains(text(), 'venduti')]",
+    "//*[contains(text(), 'sold')]",
+]
+
+# Contatori numerici del profilo
+SOLD_COUNTER_XPATHS = [
+    "//div[contains(@class, 'profile')]//span[contains(@class, 'count')]",
+    "//div[contains(@class, 'user')]//span[contains(@class, 'count')]",
+    "//div[contains(@class, 'stats')]//span[contains(@class, 'count')]",
+    "//div[contains(@class, 'metrics')]//span[contains(@class, 'count')]",
+    "//div[contains(@class, 'counter')]//span",
+    "//div[contains(@class, 'profile-stats')]//span",
+    "//div[contains(@class, 'user-stats')]//span",
+    "//*[contains(@class, 'count')]",
+]
+
+SOLD_META_XPATHS = [
+    "//meta[@name='sold-items']/@content",
+    "//meta[@name='items-sold']/@content",
+    "//meta[@property='sold-items']/@content",
+]
+
+# Prezzi finali (non barrati) nelle card prodotto
+FINAL_PRICE_XPATHS = [
+    "//div[contains(@class, 'product-card')]//span[contains(text(), '€') and not(ancestor::*[contains(@class, 'strike')])]",
+    "//div[contains(@class, 'item-card')]//span[contains(text(), '€') and not(ancestor::*[contains(@class, 'strike')])]",
+    "//div[contains(@class, 'article-card')]//span[contains(text(), '€') and not(ancestor::*[contains(@class, 'strike')])]",
+    "//span[contains(@class, 'final-price') and contains(text(), '€')]",
+    "//span[contains(@class, 'sale-price') and contains(text(), '€')]",
+    "//span[contains(@class, 'current-price') and contains(text(), '€')]",
+    "//div[contains(@class, 'price-container')]//span[contains(text(), '€') and not(ancestor::*[contains(@class, 'original')])]",
+    "//div[contains(@class, 'price-wrapper')]//span[contains(text(), '€') and not(ancestor::*[contains(@class, 'old')])]",
+    "//span[contains(text(), '€') and not(ancestor::*[contains(@class, 'strike')]) and not(ancestor::*[contains(@class, 'original')])]",
+    "//div[contains(text(), '€') and not(ancestor::*[contains(@class, 'strike')]) and not(ancestor::*[contains(@class, 'original')])]",
+]
+
+# Elementi mai visibili: Selenium ne restituirebbe testo vuoto
+INVISIBLE_TAGS = {"script", "style", "noscript", "template"}
+
+
+class PageSnapshot:
+    """HTML renderizzato, testo visibile e script di una pagina, catturati una sola volta"""
+
+    def __init__(self, url: str, html: str, text: str = "", scripts: List[str] = None,
+                 title: str = "", profile_name: str = "", captured_at: float = None):
+        self.url = url
+        self.html = html or ""
+        self.text = text or ""
+        self.scripts = scripts or []
+        self.title = title
+        self.profile_name = profile_name
+        self.captured_at = captured_at or time.time()
+        self._tree = None
+
+    @property
+    def tree(self):
+        """Albero lxml, costruito alla prima richiesta"""
+        if self._tree is None:
+            self._tree = lxml_html.fromstring(self.html or "<html></html>")
+        return self._tree
+
+    def xpath(self, expression: str) -> list:
+        try:
+            return self.tree.xpath(expression)
+        except Exception as e:
+            logger.debug(f"XPath non valido sullo snapshot '{expression}': {e}")
+            return []
+
+    def element_texts(self, expression: str) -> List[str]:
+        """Testo (come element.text di Selenium) degli elementi che soddisfano l'XPath"""
+        return [" ".join(element.text_content().split()) for element in self.xpath(expression)
+                if hasattr(element, "text_content") and element.tag not in INVISIBLE_TAGS]
+
+    @classmethod
+    def from_html(cls, url: str, html: str, profile_name: str = "") -> "PageSnapshot":
+        """Snapshot da HTML scaricato senza browser (percorso HTTP): titolo e script letti dall'albero"""
+        snapshot = cls(url=url, html=html, profile_name=profile_name)
+        snapshot.title = " ".join(snapshot.tree.findtext(".//title", default="").split())
+        snapshot.scripts = [script.text_content() for script in snapshot.xpath("//script")]
+        return snapshot
+
+    def to_dict(self) -> Dict:
+        return {
+            "url": self.url, "html": self.html, "text": self.text, "scripts": self.scripts,
+            "title": self.title, "profile_name": self.profile_name, "captured_at": self.captured_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "PageSnapshot":
+        return cls(**data)
+
+    def __getstate__(self):
+        # L'albero lxml non è serializzabile: viene ricostruito dove serve
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+
+def capture_snapshot(driver, profile_name: str = "") -> PageSnapshot:
+    """Cattura la pagina corrente con un solo execute_script (fallback su page_source)"""
+    try:
+        data = driver.execute_script(SNAPSHOT_SCRIPT) or {}
+        return PageSnapshot(
+            url=data.get("url", ""), html=data.get("html", ""), text=data.get("text", ""),
+            scripts=data.get("scripts") or [], title=data.get("title", ""), profile_name=profile_name,
+        )
+    except Exception as e:
+        logger.warning(f"  ⚠️ Snapshot via script fallito, uso page_source: {e}")
+        return PageSnapshot(url=driver.current_url, html=driver.page_source,
+                            title=driver.title, profile_name=profile_name)
+
+
+def _parse_count(value: str) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _valid_count(count: int) -> bool:
+    return MIN_SOLD_COUNT <= count <= MAX_SOLD_COUNT
+
+
+def extract_sold_count(snapshot: PageSnapshot) -> Dict:
+    """
+    Numero di articoli venduti, cercato nell'ordine degli estrattori live:
+    tab/toggle, contatori, dati JSON negli script, meta tag, testo visibile
+    """
+    for expression in SOLD_TAB_XPATHS:
+        for text in snapshot.element_texts(expression):
+            for number in NUMBER_RE.findall(text):
+                count = _parse_count(number)
+                if _valid_count(count):
+                    return {"count": count, "source": "tab", "match": text}
+
+    for expression in SOLD_COUNTER_XPATHS:
+        for text in snapshot.element_texts(expression):
+            if text.isdigit() and _valid_count(int(text)):
+                return {"count": int(text), "source": "counter", "match": text}
+
+    # Una sola scansione di tutti gli script
+    found = find_json_sold_count("\n".join(snapshot.scripts), MIN_SOLD_COUNT, MAX_SOLD_COUNT)
+    if found:
+        return {"count": found[0], "source": "json", "match": found[1]}
+
+    for expression in SOLD_META_XPATHS:
+        for content in snapshot.xpath(expression):
+            if str(content).isdigit() and _valid_count(int(content)):
+                return {"count": int(content), "source": "meta", "match": expression}
+
+    found = find_sold_count(snapshot.text or snapshot.html, MIN_SOLD_COUNT, MAX_SOLD_COUNT)
+    if found:
+        return {"count": found[0], "source": "text", "match": found[1]}
+
+    return {"count": 0, "source": None, "match": None}
+
+
+def extract_sale_prices(snapshot: PageSnapshot) -> List[float]:
+    """Prezzi finali unici (ordine di apparizione) dalle card, con fallback sul testo visibile"""
+    # Solo il primo importo di ogni card: gli altri sono prezzi barrati o sconti
+    card_texts = [text for expression in FINAL_PRICE_XPATHS for text in snapshot.element_texts(expression)]
+    unique_prices = unique_valid_prices(*normalize_prices(card_texts))
+
+    if not unique_prices:
+        unique_prices = unique_valid_prices(*normalize_prices(price_fragments(snapshot.text)))
+    return unique_prices
+
+
+def extract_profile_counts(snapshot: PageSnapshot) -> Dict:
+    """Articoli in vendita e vendite dagli span della pagina profilo ("N items for sale", "N sold")"""
+    counts = {"articles": 0, "sales": 0, "articles_found": False, "sales_found": False, "errors": []}
+    for text in snapshot.element_texts("//span"):
+        if text.endswith("items for sale") or text.endswith("item for sale"):
+            try:
+                counts["articles"] = int(text.split()[0].replace(',', '').replace('.', ''))
+                counts["articles_found"] = True
+            except Exception as e:
+                counts["errors"].append(f"articoli da '{text}': {e}")
+        if text.endswith("sold") and not text.endswith("items sold"):
+            try:
+                counts["sales"] = int(text.split()[0].replace(',', '').replace('.', ''))
+                counts["sales_found"] = True
+            except Exception as e:
+                counts["errors"].append(f"vendite da '{text}': {e}")
+    return counts
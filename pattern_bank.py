@@ -0,0 +1,119 @@
+"""
+Pattern Bank
+Espressioni regolari precompilate per prezzi e conteggi vendite.
+
+Ogni espressione è un'unica alternanza con gruppi nominati: una sola scansione
+del documento restituisce tutti i candidati, e il gruppo che ha fatto match
+(match.lastgroup) dice quale variante è stata trovata.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Importo: formato italiano "1.234,56", inglese "1,234.56", con spazi non separabili
+# come separatore delle migliaia, oppure cifre semplici "95" / "95,50".
+# Lo spazio normale è escluso: "42 120 €" sono taglia e prezzo, non 42.120 €
+_AMOUNT = r"\d{1,3}(?:[.,\u00a0\u202f]\d{3})+(?:[.,]\d{1,2})?|\d+(?:[.,]\d{1,2})?"
+_CURRENCY = r"€|EUR\b|euro\b"
+
+# Prezzo con valuta prima ("€ 95") o dopo ("1.234,56 €")
+PRICE_RE = re.compile(
+    rf"(?:{_CURRENCY})\s*(?P<before>{_AMOUNT})|(?P<after>{_AMOUNT})\s*(?:{_CURRENCY})",
+    re.IGNORECASE,
+)
+
+# Conteggio vendite nel testo, in ordine di affidabilità
+SOLD_TEXT_RE = re.compile(
+    r"\((?P<it_paren>\d+)\s+venduti\)"
+    r"|\((?P<en_paren>\d+)\s+sold\)"
+    r"|(?P<it_items>\d+)\s+articoli?\s+venduti"
+    r"|(?P<it_pieces>\d+)\s+pezzi?\s+venduti"
+    r"|(?P<en_items>\d+)\s+items?\s+sold"
+    r"|(?P<en_pieces>\d+)\s+pieces?\s+sold"
+    r"|venduti[:\s]*(?P<it_label>\d+)"
+    r"|sold[:\s]*(?P<en_label>\d+)",
+    re.IGNORECASE,
+)
+SOLD_TEXT_PRIORITY = ["it_items", "it_pieces", "en_items", "en_pieces",
+                      "it_label", "en_label", "it_paren", "en_paren"]
+
+# Conteggio vendite nei dati JSON degli script
+SOLD_JSON_RE = re.compile(
+    r'"(?P<key>sold|items_sold|total_sold|venduti|articoli_venduti)":\s*(?P<value>\d+)'
+)
+SOLD_JSON_PRIORITY = ["sold", "items_sold", "total_sold", "venduti", "articoli_venduti"]
+
+NUMBER_RE = re.compile(r"\d+")
+
+_THOUSANDS_ONLY_RE = re.compile(r"^\d{1,3}(?:[.,]\d{3})+$")
+_SPACES_RE = re.compile(r"[\s\u00a0\u202f]")
+
+
+def parse_amount(amount: str) -> Optional[float]:
+    """
+    Converte un importo testuale in float gestendo i formati italiano e inglese:
+    "1.234,56" → 1234.56, "1,234.56" → 1234.56, "95,50" → 95.5, "1.234" → 1234.0
+    """
+    if not amount:
+        return None
+    value = _SPACES_RE.sub("", amount)
+    if "," in value and "." in value:
+        # L'ultimo separatore è quello decimale
+        if value.rfind(",") > value.rfind("."):
+            value = value.replace(".", "").replace(",", ".")
+        else:
+            value = value.replace(",", "")
+    elif _THOUSANDS_ONLY_RE.match(value):
+        # Gruppi esatti di tre cifre: separatore delle migliaia ("1.234", "12,500")
+        value = value.replace(".", "").replace(",", "")
+    else:
+        value = value.replace(",", ".")
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def find_prices(text: str) -> List[float]:
+    """Tutti gli importi in euro del testo, nell'ordine di apparizione"""
+    prices = []
+    for match in PRICE_RE.finditer(text or ""):
+        price = parse_amount(match.group(match.lastgroup))
+        if price is not None:
+            prices.append(price)
+    return prices
+
+
+def extract_price(text: str) -> Optional[float]:
+    """Primo importo in euro del testo, o None"""
+    match = PRICE_RE.search(text or "")
+    return parse_amount(match.group(match.lastgroup)) if match else None
+
+
+def _best_candidate(candidates: Dict[str, int], priority: List[str]) -> Optional[Tuple[int, str]]:
+    for kind in priority:
+        if kind in candidates:
+            return candidates[kind], kind
+    return None
+
+
+def find_sold_count(text: str, min_count: int = 1, max_count: int = 1000) -> Optional[Tuple[int, str]]:
+    """(conteggio, variante) più affidabile tra quelli trovati nel testo entro l'intervallo"""
+    candidates = {}
+    for match in SOLD_TEXT_RE.finditer(text or ""):
+        kind = match.lastgroup
+        count = int(match.group(kind))
+        if kind not in candidates and min_count <= count <= max_count:
+            candidates[kind] = count
+    return _best_candidate(candidates, SOLD_TEXT_PRIORITY)
+
+
+def find_json_sold_count(text: str, min_count: int = 1, max_count: int = 1000) -> Optional[Tuple[int, str]]:
+    """(conteggio, chiave JSON) dai dati strutturati degli script"""
+    candidates = {}
+    for match in SOLD_JSON_RE.finditer(text or ""):
+        key = match.group("key")
+        count = int(match.group("value"))
+        if key not in candidates and min_count <= count <= max_count:
+            candidates[key] = count
+    return _best_candidate(candidates, SOLD_JSON_PRIORITY)
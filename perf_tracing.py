@@ -0,0 +1,462 @@
+"""
+Performance Tracing
+Strumentazione dei round trip WebDriver e delle chiamate Google Sheets API
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+from config import LOGGING_CONFIG, PERFORMANCE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_THIS_FILE = os.path.abspath(__file__)
+_PROJECT_ROOT = os.path.dirname(_THIS_FILE)
+_SELENIUM_MARKER = os.sep + "selenium" + os.sep
+_SITE_PACKAGES_MARKER = "site-packages"
+
+
+def find_caller(skip_markers: tuple = (_SELENIUM_MARKER,)) -> str:
+    """
+    Restituisce il nome della funzione più interna che ha originato la chiamata,
+    saltando questo modulo, le librerie indicate e le comprehension (<listcomp>, ...)
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        name = frame.f_code.co_name
+        if (os.path.abspath(filename) != _THIS_FILE
+                and not any(marker in filename for marker in skip_markers)
+                and not name.startswith("<")):
+            return name
+        frame = frame.f_back
+    return "unknown"
+
+
+def find_call_path() -> List[str]:
+    """Funzioni del progetto nello stack, dalla più interna alla più esterna"""
+    path = []
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        name = frame.f_code.co_name
+        if (filename != _THIS_FILE
+                and filename.startswith(_PROJECT_ROOT)
+                and _SITE_PACKAGES_MARKER not in filename
+                and not name.startswith("<")):
+            path.append(name)
+        frame = frame.f_back
+    return path
+
+
+class WebDriverTracer:
+    """
+    Conta e cronometra ogni comando WebDriver (find_elements, .text, get_attribute, ...).
+
+    Tutti i comandi, anche quelli dei WebElement, passano da driver.execute():
+    attach() lo sostituisce sull'istanza con una versione strumentata. Il profilo
+    corrente è per-thread, così funziona anche con lo scraping parallelo.
+    """
+
+    NO_PROFILE = "setup"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stats: Dict[str, Dict] = {}
+
+    def attach(self, driver):
+        """Strumenta un driver Selenium (idempotente)"""
+        if getattr(driver, "_perf_tracer", None) is self:
+            return driver
+        original_execute = driver.execute
+        tracer = self
+
+        def traced_execute(driver_command, params=None):
+            start = time.perf_counter()
+            try:
+                return original_execute(driver_command, params)
+            finally:
+                tracer._record(driver_command, time.perf_counter() - start)
+
+        driver.execute = traced_execute
+        driver._perf_tracer = self
+        return driver
+
+    def begin_profile(self, profile_name: str):
+        """Attribuisce i comandi successivi di questo thread al profilo indicato"""
+        self._local.profile = profile_name
+
+    def end_profile(self) -> Dict:
+        """Chiude il profilo corrente del thread e ne restituisce le statistiche"""
+        profile_name = getattr(self._local, "profile", None)
+        self._local.profile = None
+        if profile_name is None:
+            return {"commands": 0, "time": 0.0, "by_method": {}}
+        return self.get_profile_stats(profile_name)
+
+    def get_profile_stats(self, profile_name: str) -> Dict:
+        with self._lock:
+            stats = self.stats.get(profile_name, {"commands": 0, "time": 0.0, "by_method": {}})
+            return {
+                "commands": stats["commands"],
+                "time": stats["time"],
+                "by_method": {m: dict(v, by_command=dict(v["by_command"])) for m, v in stats["by_method"].items()},
+            }
+
+    def get_report(self) -> Dict[str, Dict]:
+        """Statistiche per tutti i profili, pronte per performance_stats"""
+        with self._lock:
+            profiles = list(self.stats.keys())
+        return {name: self.get_profile_stats(name) for name in profiles}
+
+    def _record(self, driver_command: str, elapsed: float):
+        profile_name = getattr(self._local, "profile", None) or self.NO_PROFILE
+        method = find_caller()
+        with self._lock:
+            profile_stats = self.stats.setdefault(profile_name, {"commands": 0, "time": 0.0, "by_method": {}})
+            profile_stats["commands"] += 1
+            profile_stats["time"] += elapsed
+            method_stats = profile_stats["by_method"].setdefault(
+                method, {"commands": 0, "time": 0.0, "by_command": {}})
+            method_stats["commands"] += 1
+            method_stats["time"] += elapsed
+            method_stats["by_command"][driver_command] = method_stats["by_command"].get(driver_command, 0) + 1
+
+
+def format_webdriver_report(report: Dict[str, Dict], top_methods: int = 3) -> List[str]:
+    """Righe di testo con round trip per profilo e metodi più costosi"""
+    lines = []
+    for profile_name, stats in sorted(report.items(), key=lambda item: -item[1]["commands"]):
+        lines.append(f"{profile_name:20} | {stats['commands']:5d} comandi | {stats['time']:6.2f}s")
+        methods = sorted(stats["by_method"].items(), key=lambda item: -item[1]["commands"])
+        for method, method_stats in methods[:top_methods]:
+            top_commands = sorted(method_stats["by_command"].items(), key=lambda item: -item[1])[:3]
+            commands_text = ", ".join(f"{cmd}={count}" for cmd, count in top_commands)
+            lines.append(f"{'':20}   ↳ {method}: {method_stats['commands']} comandi, "
+                         f"{method_stats['time']:.2f}s ({commands_text})")
+    return lines
+
+
+# Metodi Sheets API che consumano quota di scrittura (gli altri contano come lettura)
+SHEETS_WRITE_METHODS = {
+    "spreadsheets.batchUpdate", "values.update", "values.batchUpdate",
+    "values.append", "values.clear", "values.batchClear",
+}
+# Status HTTP per cui ha senso ritentare (rate limit e errori transitori)
+SHEETS_RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Solo i metodi idempotenti vengono ritentati: un 5xx dopo un values.append o un
+# spreadsheets.batchUpdate (addSheet, ...) già applicati duplicherebbe righe o tab
+SHEETS_IDEMPOTENT_METHODS = {
+    "spreadsheets.get", "values.get", "values.batchGet", "values.update", "values.batchUpdate",
+}
+# Singole chiamate conservate per il report JSON: i totali sono aggregati senza limite
+SHEETS_MAX_RECORDS = 2000
+
+
+def _json_size(payload) -> int:
+    if payload is None:
+        return 0
+    try:
+        return len(json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 0
+
+
+class _TracedRequest:
+    """Richiesta Sheets con execute() strumentato (retry opzionale su 429/5xx solo se idempotente)"""
+
+    def __init__(self, request, tracer, method: str, params: Dict):
+        self._request = request
+        self._tracer = tracer
+        self._method = method
+        self._params = params
+
+    def execute(self, *args, **kwargs):
+        return self._tracer._execute(self._request, self._method, self._params, args, kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._request, name)
+
+
+class _TracedResource:
+    """Proxy di service/spreadsheets()/values() che avvolge ogni richiesta"""
+
+    def __init__(self, resource, tracer, name: str):
+        self._resource = resource
+        self._tracer = tracer
+        self._name = name
+
+    def __getattr__(self, attr):
+        target = getattr(self._resource, attr)
+        if not callable(target):
+            return target
+
+        def wrapper(*args, **kwargs):
+            result = target(*args, **kwargs)
+            if hasattr(result, "execute"):
+                return _TracedRequest(result, self._tracer, f"{self._name}.{attr}", kwargs)
+            return _TracedResource(result, self._tracer, attr)
+
+        return wrapper
+
+
+class SheetsApiTracer:
+    """
+    Livello unico per le chiamate Google Sheets: registra metodo, range, byte
+    di richiesta/risposta, latenza e retry di ogni execute(), e la funzione che
+    l'ha originata, per capire chi consuma la quota.
+
+    I totali per metodo e funzione sono aggregati a ogni chiamata; delle singole
+    chiamate restano solo le ultime max_records (processi lunghi: monitor, worker).
+
+    Di default il tracer non ritenta nulla: il retry dei 429 resta ai chiamanti
+    (es. force_update_overview), che lo dimensionano sulla finestra della quota.
+    Con max_retries > 0 ritenta i soli metodi idempotenti con backoff esponenziale.
+    """
+
+    def __init__(self, max_retries: int = 0, retry_delay: float = 0, max_records: int = None):
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        self.records = deque(maxlen=max_records or SHEETS_MAX_RECORDS)
+        self._summary = self._empty_summary()
+
+    def wrap(self, service):
+        """Avvolge un servizio build('sheets', 'v4') (o compatibile) nel tracer"""
+        if service is None or isinstance(service, _TracedResource):
+            return service
+        if not LOGGING_CONFIG.get("trace_sheets_api", True):
+            return service
+        return _TracedResource(service, self, "service")
+
+    def reset(self):
+        with self._lock:
+            self.records.clear()
+            self._summary = self._empty_summary()
+
+    def _execute(self, request, method: str, params: Dict, args, kwargs):
+        call_path = find_call_path()
+        record = {
+            "method": method,
+            "range": params.get("range") or params.get("ranges"),
+            "quota": "write" if method in SHEETS_WRITE_METHODS else "read",
+            "caller": call_path[0] if call_path else "unknown",
+            "entry_point": call_path[-1] if call_path else "unknown",
+            "request_bytes": _json_size(params.get("body")),
+            "response_bytes": 0,
+            "latency": 0.0,
+            "retries": 0,
+            "status": "ok",
+        }
+        start = time.perf_counter()
+        try:
+            attempt = 0
+            while True:
+                try:
+                    response = request.execute(*args, **kwargs)
+                    record["response_bytes"] = _json_size(response)
+                    return response
+                except Exception as e:
+                    status = getattr(getattr(e, "resp", None), "status", None)
+                    try:
+                        status = int(status)
+                    except (TypeError, ValueError):
+                        status = None
+                    record["status"] = status or type(e).__name__
+                    if (status not in SHEETS_RETRY_STATUSES or method not in SHEETS_IDEMPOTENT_METHODS
+                            or attempt >= self.max_retries):
+                        raise
+                    delay = self.retry_delay * (2 ** attempt)
+                    attempt += 1
+                    record["retries"] = attempt
+                    logger.warning(f"⏳ Sheets API {method} ha restituito {status}, "
+                                   f"retry {attempt}/{self.max_retries} tra {delay:.0f}s")
+                    time.sleep(delay)
+        finally:
+            record["latency"] = time.perf_counter() - start
+            with self._lock:
+                self.records.append(record)
+                self._aggregate(record)
+
+    @staticmethod
+    def _bucket() -> Dict:
+        return {"calls": 0, "read": 0, "write": 0, "request_bytes": 0,
+                "response_bytes": 0, "latency": 0.0, "retries": 0, "errors": 0}
+
+    def _empty_summary(self) -> Dict:
+        return {"total": self._bucket(), "by_method": {}, "by_caller": {}, "by_entry_point": {}}
+
+    def _aggregate(self, record: Dict):
+        summary = self._summary
+        buckets = [
+            summary["total"],
+            summary["by_method"].setdefault(record["method"], self._bucket()),
+            summary["by_caller"].setdefault(record["caller"], self._bucket()),
+            summary["by_entry_point"].setdefault(record["entry_point"], self._bucket()),
+        ]
+        for bucket in buckets:
+            bucket["calls"] += 1
+            bucket[record["quota"]] += 1
+            bucket["request_bytes"] += record["request_bytes"]
+            bucket["response_bytes"] += record["response_bytes"]
+            bucket["latency"] += record["latency"]
+            bucket["retries"] += record["retries"]
+            bucket["errors"] += 0 if record["status"] == "ok" else 1
+
+    def get_summary(self) -> Dict:
+        """Aggregati per metodo e per funzione chiamante"""
+        with self._lock:
+            return copy.deepcopy(self._summary)
+
+    def format_summary(self) -> List[str]:
+        """Righe di testo del report quota per comando e per funzione"""
+        summary = self.get_summary()
+        total = summary["total"]
+        lines = [
+            f"Chiamate totali: {total['calls']} ({total['read']} letture, {total['write']} scritture), "
+            f"{total['request_bytes'] + total['response_bytes']} byte, {total['latency']:.2f}s, "
+            f"{total['retries']} retry, {total['errors']} errori"
+        ]
+        for title, key in (("Per comando", "by_method"), ("Per funzione", "by_caller"),
+                           ("Per entry point", "by_entry_point")):
+            lines.append(f"{title}:")
+            for name, bucket in sorted(summary[key].items(), key=lambda item: -item[1]["calls"]):
+                lines.append(f"  {name:35} {bucket['calls']:4d} chiamate | R {bucket['read']:3d} W {bucket['write']:3d} | "
+                             f"{bucket['request_bytes'] + bucket['response_bytes']:8d} byte | "
+                             f"{bucket['latency']:6.2f}s | retry {bucket['retries']}")
+        return lines
+
+    def log_summary(self):
+        """Stampa il report quota di fine esecuzione"""
+        if not self.records:
+            return
+        logger.info("📊 REPORT CHIAMATE GOOGLE SHEETS API")
+        for line in self.format_summary():
+            logger.info(f"   {line}")
+
+    def save_json(self, path: str) -> Optional[str]:
+        """Scrive riepilogo e singole chiamate in JSON"""
+        if not self.records:
+            return None
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with self._lock:
+                records = list(self.records)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"summary": self.get_summary(), "calls": records}, f, indent=2, ensure_ascii=False)
+            logger.info(f"📝 Report Sheets API salvato in {path}")
+            return path
+        except Exception as e:
+            logger.error(f"❌ Errore nel salvataggio report Sheets API: {e}")
+            return None
+
+
+# Tracer condiviso da tutti gli updater del processo
+SHEETS_API_TRACER = SheetsApiTracer()
+
+
+# Script eseguito nel browser: PerformanceNavigationTiming (Level 2) con fallback
+# su performance.timing, più conteggio e byte delle risorse caricate.
+# I tempi sono in millisecondi dall'inizio della navigazione. Le risorse cross-origin
+# senza Timing-Allow-Origin riportano 0 byte: il conteggio resta comunque affidabile.
+NAVIGATION_TIMING_SCRIPT = """
+var perf = window.performance;
+if (!perf) { return null; }
+var nav = perf.getEntriesByType ? perf.getEntriesByType('navigation')[0] : null;
+var t = {};
+if (nav) {
+    t = {
+        dns: nav.domainLookupEnd - nav.domainLookupStart,
+        connect: nav.connectEnd - nav.connectStart,
+        ttfb: nav.responseStart - nav.requestStart,
+        response: nav.responseEnd - nav.responseStart,
+        dom_interactive: nav.domInteractive,
+        dom_content_loaded: nav.domContentLoadedEventEnd,
+        load_event: nav.loadEventEnd,
+        document_bytes: nav.transferSize || 0,
+        source: 'navigation'
+    };
+} else if (perf.timing) {
+    var pt = perf.timing, start = pt.navigationStart;
+    t = {
+        dns: pt.domainLookupEnd - pt.domainLookupStart,
+        connect: pt.connectEnd - pt.connectStart,
+        ttfb: pt.responseStart - pt.requestStart,
+        response: pt.responseEnd - pt.responseStart,
+        dom_interactive: pt.domInteractive - start,
+        dom_content_loaded: pt.domContentLoadedEventEnd - start,
+        load_event: pt.loadEventEnd > 0 ? pt.loadEventEnd - start : 0,
+        document_bytes: 0,
+        source: 'timing'
+    };
+}
+var resources = perf.getEntriesByType ? perf.getEntriesByType('resource') : [];
+var byType = {}, bytes = 0;
+for (var i = 0; i < resources.length; i++) {
+    var r = resources[i];
+    byType[r.initiatorType] = (byType[r.initiatorType] || 0) + 1;
+    bytes += r.transferSize || 0;
+}
+t.resource_count = resources.length;
+t.resource_bytes = bytes;
+t.resources_by_type = byType;
+return t;
+"""
+
+
+def collect_page_timing(driver) -> Dict:
+    """
+    Legge dal browser i tempi reali della pagina corrente (secondi) e le risorse
+    caricate. Restituisce {} se il browser non espone la Navigation Timing API.
+    """
+    if not LOGGING_CONFIG.get("collect_page_timing", True):
+        return {}
+    try:
+        raw = driver.execute_script(NAVIGATION_TIMING_SCRIPT)
+    except Exception as e:
+        logger.debug(f"Navigation Timing non disponibile: {e}")
+        return {}
+    if not raw:
+        return {}
+
+    timing = {}
+    for key in ("dns", "connect", "ttfb", "response", "dom_interactive", "dom_content_loaded", "load_event"):
+        value = raw.get(key) or 0
+        timing[key] = round(max(float(value), 0.0) / 1000.0, 3)
+    timing["document_bytes"] = int(raw.get("document_bytes") or 0)
+    timing["resource_count"] = int(raw.get("resource_count") or 0)
+    timing["resource_bytes"] = int(raw.get("resource_bytes") or 0)
+    timing["resources_by_type"] = dict(raw.get("resources_by_type") or {})
+    timing["source"] = raw.get("source", "")
+    return timing
+
+
+def evaluate_page_timing(page_timing: Dict, total_time: float, thresholds: Dict = None) -> Dict:
+    """Confronta tempi del profilo e della pagina con PERFORMANCE_CONFIG["performance_thresholds"]"""
+    thresholds = thresholds or PERFORMANCE_CONFIG.get("performance_thresholds", {})
+    if total_time <= thresholds.get("excellent_profile_time", 8):
+        rating = "excellent"
+    elif total_time <= thresholds.get("good_profile_time", 12):
+        rating = "good"
+    else:
+        rating = "slow"
+
+    # Caricamento reale della pagina: load event se disponibile, altrimenti DOMContentLoaded
+    browser_load = page_timing.get("load_event") or page_timing.get("dom_content_loaded") or 0.0
+    slow_connection = browser_load > thresholds.get("slow_connection_threshold", 7)
+    # Quota del tempo profilo spesa davvero ad aspettare il browser
+    load_share = round(browser_load / total_time * 100, 1) if total_time > 0 and browser_load else None
+    return {
+        "rating": rating,
+        "browser_load_time": browser_load,
+        "slow_connection": slow_connection,
+        "load_share": load_share,
+    }
@@ -0,0 +1,89 @@
+"""
+Price Normalizer
+Normalizzazione in blocco di frammenti di testo con prezzi: un array NumPy di float
+e una maschera di validità, con filtro 10-10000 € vettoriale
+"""
+
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from pattern_bank import PRICE_RE
+
+# Prezzi di vendita plausibili in euro
+MIN_PRICE = 10
+MAX_PRICE = 10000
+
+_SPACE_CHARS = (" ", "\u00a0", "\u202f")
+
+
+def first_amounts(texts: Iterable[str]) -> np.ndarray:
+    """Primo importo in euro di ogni frammento come stringa ("" se assente)"""
+    amounts = []
+    for text in texts:
+        match = PRICE_RE.search(text or "")
+        amounts.append(match.group(match.lastgroup) if match else "")
+    return np.array(amounts, dtype=str)
+
+
+def price_fragments(text: str) -> List[str]:
+    """Divide un testo lungo (es. body della pagina) in un frammento per importo"""
+    return [match.group(0) for match in PRICE_RE.finditer(text or "")]
+
+
+def normalize_amounts(amounts: np.ndarray) -> np.ndarray:
+    """
+    Converte importi testuali in float con operazioni vettoriali sulle stringhe:
+    "1.234,56" → 1234.56, "1,234.56" → 1234.56, "306,50" → 306.5, "1.234" → 1234.0.
+    Gli importi vuoti o malformati diventano NaN.
+    """
+    amounts = np.asarray(amounts, dtype=str)
+    values = np.full(amounts.shape, np.nan)
+    if amounts.size == 0:
+        return values
+
+    for space in _SPACE_CHARS:
+        amounts = np.char.replace(amounts, space, "")
+
+    last_comma = np.char.rfind(amounts, ",")
+    last_dot = np.char.rfind(amounts, ".")
+    both = (last_comma >= 0) & (last_dot >= 0)
+    has_separator = (last_comma >= 0) | (last_dot >= 0)
+    # I decimali hanno al massimo due cifre: tre cifre dopo l'ultimo separatore sono migliaia
+    tail_length = np.char.str_len(amounts) - np.maximum(last_comma, last_dot) - 1
+
+    no_dots = np.char.replace(amounts, ".", "")
+    no_commas = np.char.replace(amounts, ",", "")
+    normalized = np.select(
+        [both & (last_comma > last_dot), both, has_separator & (tail_length == 3)],
+        [np.char.replace(no_dots, ",", "."), no_commas, np.char.replace(no_dots, ",", "")],
+        default=np.char.replace(amounts, ",", "."),
+    )
+
+    # Solo cifre con al più un punto decimale: i frammenti malformati (es. "1,234,56")
+    # diventano NaN invece di far fallire la conversione dell'intero array
+    valid = np.char.isdigit(np.char.replace(normalized, ".", "", count=1))
+    values[valid] = normalized[valid].astype(float)
+    return values
+
+
+def normalize_prices(texts: Iterable[str], min_price: float = MIN_PRICE,
+                     max_price: float = MAX_PRICE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Prezzi di una lista di frammenti (uno per frammento, il primo importo in euro).
+
+    Returns:
+        (prezzi, maschera): array float (NaN dove non c'è un importo) e maschera
+        booleana dei prezzi presenti e compresi tra min_price e max_price
+    """
+    values = normalize_amounts(first_amounts(texts))
+    with np.errstate(invalid="ignore"):
+        mask = (values >= min_price) & (values <= max_price)
+    return values, mask
+
+
+def unique_valid_prices(values: np.ndarray, mask: np.ndarray) -> List[float]:
+    """Prezzi validi senza duplicati, nell'ordine di apparizione"""
+    valid = values[mask]
+    _, first_index = np.unique(valid, return_index=True)
+    return valid[np.sort(first_index)].tolist()
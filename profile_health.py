@@ -0,0 +1,200 @@
+"""
+Profile Health
+Circuit breaker per profilo: dopo K fallimenti consecutivi (pagina di errore,
+"Nessun dato trovato") il profilo va in quarantena, esce dal percorso principale e
+viene solo sondato a intervalli crescenti. I fallimenti dell'infrastruttura (avvio del
+driver, verifica Cloudflare, crash del browser) non dipendono dal profilo e non contano.
+"""
+
+import os
+import json
+import time
+import threading
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from config import STATE_CONFIG, get_state_path
+from state_file import update_json
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+
+# Frammenti (minuscoli) degli errori di infrastruttura: Chrome mancante o chromedriver
+# incompatibile, verifica Cloudflare, browser caduto o non raggiungibile
+INFRASTRUCTURE_ERRORS = (
+    "errore avvio driver",
+    "'nonetype' object has no attribute 'split'",
+    "session not created",
+    "cannot find chrome",
+    "chrome failed to start",
+    "unable to obtain driver",
+    "devtoolsactiveport",
+    "verifica cloudflare",
+    "invalid session id",
+    "chrome not reachable",
+    "tab crashed",
+    "disconnected",
+    "max retries exceeded",
+    "connection refused",
+)
+
+
+def is_infrastructure_error(error: str) -> bool:
+    """True se l'errore dipende dall'ambiente (browser, driver, Cloudflare) e non dal profilo"""
+    error = (error or "").lower()
+    return any(fragment in error for fragment in INFRASTRUCTURE_ERRORS)
+
+
+class ProfileCircuitBreaker:
+    """
+    Stato di salute di ogni profilo, separato per scraper ("daily", "revenue") e
+    persistito tra le esecuzioni.
+
+    - closed: il profilo viene scrapato normalmente
+    - open (quarantena): escluso dalla coda principale; quando la sonda è dovuta
+      viene provato una volta a fine esecuzione, senza screenshot né debug.
+      Ogni sonda fallita raddoppia l'intervallo (fino a max_probe_hours).
+
+    Conserva anche gli ultimi valori letti con successo, riportati nel foglio
+    (con indicazione di dato non aggiornato) finché il profilo non torna a funzionare.
+    """
+
+    def __init__(self, path: str = None, threshold: int = None, probe_hours: float = None,
+                 max_probe_hours: float = None, max_probes: int = None):
+        self.path = path or get_state_path("profile_health_file")
+        self.threshold = threshold or STATE_CONFIG["breaker_failure_threshold"]
+        self.probe_hours = probe_hours or STATE_CONFIG["breaker_probe_hours"]
+        self.max_probe_hours = max_probe_hours or STATE_CONFIG["breaker_max_probe_hours"]
+        self.max_probes = STATE_CONFIG["breaker_max_probes"] if max_probes is None else max_probes
+        self._lock = threading.Lock()
+        self.events: List[Dict] = []
+        # Profili modificati da questo processo dall'ultimo salvataggio
+        self._dirty = set()
+        self.scopes: Dict[str, Dict[str, Dict]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Dict]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ Stato di salute dei profili non leggibile, riparto da zero: {e}")
+            return {}
+
+    def save(self):
+        """Scrive su disco i profili modificati, senza perdere quelli aggiornati da altri worker"""
+        with self._lock:
+            changed = {key: dict(self.scopes[key[0]][key[1]]) for key in self._dirty}
+            self._dirty.clear()
+
+        def merge(disk: Dict) -> Dict:
+            for (scope, profile_name), entry in changed.items():
+                disk.setdefault(scope, {})[profile_name] = entry
+            return disk
+
+        try:
+            update_json(self.path, merge)
+        except Exception as e:
+            logger.warning(f"⚠️ Impossibile salvare lo stato di salute dei profili: {e}")
+
+    def _entry(self, scope: str, profile_name: str) -> Dict:
+        return self.scopes.setdefault(scope, {}).setdefault(profile_name, {
+            "state": CLOSED,
+            "failures": 0,
+            "probes": 0,
+            "last_error": None,
+            "next_probe_at": 0,
+            "last_good": None,
+        })
+
+    def _log_event(self, scope: str, profile_name: str, event: str, detail: str = ""):
+        self.events.append({"scope": scope, "profile": profile_name, "event": event,
+                            "detail": detail, "timestamp": time.time()})
+
+    def record_success(self, scope: str, profile_name: str, values: Dict = None):
+        """Profilo letto correttamente: azzera i fallimenti e memorizza gli ultimi valori"""
+        with self._lock:
+            entry = self._entry(scope, profile_name)
+            self._dirty.add((scope, profile_name))
+            recovered = entry["state"] == OPEN
+            entry.update(state=CLOSED, failures=0, probes=0, last_error=None, next_probe_at=0)
+            if values is not None:
+                entry["last_good"] = dict(values, timestamp=datetime.now().isoformat(timespec="seconds"))
+            if recovered:
+                self._log_event(scope, profile_name, "recovered")
+        if recovered:
+            logger.info(f"✅ {profile_name}: uscito dalla quarantena")
+
+    def record_failure(self, scope: str, profile_name: str, error: str):
+        """Fallimento definitivo del profilo in questa esecuzione (dopo i tentativi)"""
+        if is_infrastructure_error(error):
+            with self._lock:
+                self._log_event(scope, profile_name, "infrastructure", error)
+            logger.warning(f"🔧 {profile_name}: errore di infrastruttura non conteggiato ({error})")
+            return
+        with self._lock:
+            entry = self._entry(scope, profile_name)
+            self._dirty.add((scope, profile_name))
+            entry["failures"] += 1
+            entry["last_error"] = error
+            if entry["state"] == OPEN:
+                # Sonda fallita: intervallo raddoppiato
+                entry["probes"] += 1
+            elif entry["failures"] >= self.threshold:
+                entry["state"] = OPEN
+                self._log_event(scope, profile_name, "quarantined", error)
+            else:
+                return
+            hours = min(self.probe_hours * 2 ** entry["probes"], self.max_probe_hours)
+            entry["next_probe_at"] = time.time() + hours * 3600
+            failures = entry["failures"]
+        logger.warning(f"🚧 {profile_name}: in quarantena dopo {failures} fallimenti consecutivi "
+                       f"({error}), prossima sonda tra {hours:.0f}h")
+
+    def partition(self, scope: str, profiles: Dict[str, str]) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, str]]:
+        """
+        Divide i profili in (attivi, da sondare, sospesi): gli attivi vanno nella coda
+        principale, al massimo max_probes profili in quarantena vengono sondati
+        """
+        active, probes, skipped = {}, {}, {}
+        now = time.time()
+        with self._lock:
+            states = self.scopes.get(scope, {})
+            for name, profile_id in profiles.items():
+                entry = states.get(name)
+                if entry is None or entry["state"] != OPEN:
+                    active[name] = profile_id
+                elif entry["next_probe_at"] <= now and len(probes) < self.max_probes:
+                    probes[name] = profile_id
+                else:
+                    skipped[name] = profile_id
+        if probes or skipped:
+            logger.info(f"🚧 Profili in quarantena: {len(probes) + len(skipped)} "
+                        f"({len(probes)} da sondare: {', '.join(probes) or 'nessuno'})")
+        return active, probes, skipped
+
+    def needs_diagnostics(self, scope: str, profile_name: str) -> bool:
+        """Screenshot e debug della pagina solo al primo fallimento, non ad ogni ripetizione"""
+        with self._lock:
+            entry = self.scopes.get(scope, {}).get(profile_name)
+            return entry is None or entry["failures"] == 0
+
+    def last_good(self, scope: str, profile_name: str) -> Optional[Dict]:
+        """Ultimi valori letti con successo (con timestamp) o None"""
+        with self._lock:
+            entry = self.scopes.get(scope, {}).get(profile_name)
+            return dict(entry["last_good"]) if entry and entry.get("last_good") else None
+
+    def get_summary(self, scope: str) -> Dict:
+        with self._lock:
+            states = self.scopes.get(scope, {})
+            return {
+                "quarantined": sorted(name for name, entry in states.items() if entry["state"] == OPEN),
+                "failing": sorted(name for name, entry in states.items()
+                                  if entry["state"] == CLOSED and entry["failures"]),
+                "events": [event for event in self.events if event["scope"] == scope],
+            }
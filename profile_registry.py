@@ -0,0 +1,199 @@
+"""
+Profile Registry
+Registro dei profili monitorati caricato da file (CSV, JSON o SQLite) con priorità,
+frequenza di scraping, chiave di shard e flag di abilitazione. Senza file si usa
+VESTIAIRE_PROFILES di config.py con i valori di default.
+"""
+
+import os
+import csv
+import json
+import sqlite3
+import logging
+from typing import Dict, List, Optional
+
+from config import VESTIAIRE_PROFILES, PROFILE_REGISTRY
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+COLUMNS = ("name", "profile_id", "priority", "frequency_hours", "shard_key", "enabled")
+_TRUE_VALUES = ("1", "true", "yes", "si", "sì", "y")
+
+
+def _as_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    if value is None or value == "":
+        return True
+    return str(value).strip().lower() in _TRUE_VALUES
+
+
+class ProfileEntry:
+    """Un profilo del registro"""
+
+    __slots__ = COLUMNS
+
+    def __init__(self, name: str, profile_id: str, priority: int = None, frequency_hours: float = None,
+                 shard_key: str = None, enabled: bool = True):
+        self.name = name
+        self.profile_id = str(profile_id)
+        self.priority = int(priority) if priority not in (None, "") else PROFILE_REGISTRY["default_priority"]
+        self.frequency_hours = float(frequency_hours if frequency_hours not in (None, "")
+                                     else PROFILE_REGISTRY["default_frequency_hours"])
+        self.shard_key = shard_key or name
+        self.enabled = _as_bool(enabled)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ProfileEntry":
+        return cls(**{key: data.get(key) for key in COLUMNS if key in data})
+
+    def to_dict(self) -> Dict:
+        return {key: getattr(self, key) for key in COLUMNS}
+
+    @property
+    def url(self) -> str:
+        return f"https://it.vestiairecollective.com/profile/{self.profile_id}/"
+
+    def __repr__(self) -> str:
+        return f"ProfileEntry({self.name!r}, {self.profile_id!r}, priority={self.priority})"
+
+
+class ProfileRegistry:
+    """
+    Profili in ordine di priorità decrescente (a parità, nell'ordine del file).
+    profiles() restituisce il dict nome -> id usato da scraper e updater.
+    """
+
+    def __init__(self, entries: List[ProfileEntry], source: str = "config"):
+        self.source = source
+        self.entries = sorted(entries, key=lambda entry: -entry.priority)
+        self._by_name = {entry.name: entry for entry in self.entries}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._by_name
+
+    def get(self, name: str) -> Optional[ProfileEntry]:
+        return self._by_name.get(name)
+
+    def enabled(self) -> List[ProfileEntry]:
+        return [entry for entry in self.entries if entry.enabled]
+
+    def profiles(self, enabled_only: bool = True) -> Dict[str, str]:
+        """Dict nome -> id profilo (solo abilitati, salvo enabled_only=False)"""
+        return {entry.name: entry.profile_id for entry in self.entries
+                if entry.enabled or not enabled_only}
+
+    def names(self, enabled_only: bool = True) -> List[str]:
+        return list(self.profiles(enabled_only))
+
+    # --- caricamento e salvataggio ---
+
+    @classmethod
+    def from_config(cls) -> "ProfileRegistry":
+        return cls([ProfileEntry(name, profile_id) for name, profile_id in VESTIAIRE_PROFILES.items()])
+
+    @classmethod
+    def load(cls, path: str) -> "ProfileRegistry":
+        """Registro da .csv, .json o .sqlite/.db (tabella profiles)"""
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".csv":
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                rows = [row for row in csv.DictReader(f) if row.get("name")]
+        elif extension == ".json":
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # Lista di oggetti o dict nome -> id / nome -> attributi
+            if isinstance(data, dict):
+                data = [dict(value, name=name) if isinstance(value, dict) else {"name": name, "profile_id": value}
+                        for name, value in data.items()]
+            rows = data
+        elif extension in (".sqlite", ".db"):
+            connection = sqlite3.connect(path)
+            try:
+                connection.row_factory = sqlite3.Row
+                rows = [dict(row) for row in connection.execute("SELECT * FROM profiles ORDER BY rowid")]
+            finally:
+                connection.close()
+        else:
+            raise ValueError(f"Formato del registro profili non supportato: {path}")
+        return cls([ProfileEntry.from_dict(row) for row in rows], source=path)
+
+    def save(self, path: str):
+        """Scrive il registro nel formato indicato dall'estensione"""
+        extension = os.path.splitext(path)[1].lower()
+        rows = [entry.to_dict() for entry in self.entries]
+        if extension == ".csv":
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=COLUMNS)
+                writer.writeheader()
+                writer.writerows(dict(row, enabled=str(row["enabled"]).lower()) for row in rows)
+        elif extension == ".json":
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(rows, f, indent=2, ensure_ascii=False)
+        elif extension in (".sqlite", ".db"):
+            connection = sqlite3.connect(path)
+            try:
+                with connection:
+                    connection.execute("DROP TABLE IF EXISTS profiles")
+                    connection.execute("CREATE TABLE profiles (name TEXT PRIMARY KEY, profile_id TEXT NOT NULL, "
+                                       "priority INTEGER, frequency_hours REAL, shard_key TEXT, enabled INTEGER)")
+                    connection.executemany("INSERT INTO profiles VALUES (?, ?, ?, ?, ?, ?)",
+                                           [tuple(row[key] for key in COLUMNS) for row in rows])
+            finally:
+                connection.close()
+        else:
+            raise ValueError(f"Formato del registro profili non supportato: {path}")
+
+    def get_summary(self) -> Dict:
+        enabled = self.enabled()
+        return {
+            "source": self.source,
+            "profiles": len(self.entries),
+            "enabled": len(enabled),
+            "disabled": len(self.entries) - len(enabled),
+        }
+
+
+def get_registry_path() -> str:
+    """File del registro (env PROFILE_REGISTRY_FILE o PROFILE_REGISTRY['file'], relativo alla root)"""
+    path = os.environ.get("PROFILE_REGISTRY_FILE") or PROFILE_REGISTRY["file"]
+    return path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
+
+
+def load_registry(path: str = None) -> ProfileRegistry:
+    """Registro dei profili; se il file manca o non è leggibile, VESTIAIRE_PROFILES di config.py"""
+    path = path or get_registry_path()
+    if not os.path.exists(path):
+        return ProfileRegistry.from_config()
+    try:
+        return ProfileRegistry.load(path)
+    except Exception as e:
+        logger.error(f"❌ Registro profili {path} non leggibile, uso VESTIAIRE_PROFILES: {e}")
+        return ProfileRegistry.from_config()
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python profile_registry.py                -> riepilogo del registro
+    # python profile_registry.py list           -> anche l'elenco dei profili
+    # python profile_registry.py export <file>  -> converte il registro in CSV/JSON/SQLite
+    registry = load_registry()
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "export" and len(sys.argv) > 2:
+        registry.save(sys.argv[2])
+        print(f"Registro esportato in {sys.argv[2]} ({len(registry)} profili)")
+    else:
+        summary = registry.get_summary()
+        print(f"Registro profili: {summary['source']}")
+        print(f"Profili configurati: {summary['profiles']} ({summary['enabled']} abilitati, "
+              f"{summary['disabled']} disabilitati)")
+        if command == "list":
+            for entry in registry.entries:
+                status = "" if entry.enabled else " [disabilitato]"
+                print(f"  {entry.name} ({entry.profile_id}) priorità {entry.priority}, "
+                      f"ogni {entry.frequency_hours:g}h{status}")
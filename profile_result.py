@@ -0,0 +1,107 @@
+"""
+Profile Result
+Risultato compatto di un profilo: attributi in __slots__ e prezzi in un buffer array('d')
+"""
+
+from array import array
+from typing import Dict, Iterable, Optional
+
+
+class ProfileResult:
+    """
+    Risultato revenue di un profilo.
+
+    I prezzi stanno in un array('d') (8 byte per prezzo, nessun oggetto float) e
+    vengono troncati sul posto; to_dict()/from_dict() convertono dal/al formato dict
+    usato finora. L'accesso in stile dict (result['success'], result.get(...)) resta
+    disponibile per il codice esistente.
+    """
+
+    __slots__ = ("name", "profile_id", "success", "error", "sold_items_count", "prices", "performance")
+
+    FIELDS = ("name", "profile_id", "success", "error", "sold_items_count",
+              "total_revenue", "sold_items_prices", "performance")
+
+    def __init__(self, name: str, profile_id: str, success: bool = False, error: Optional[str] = None,
+                 sold_items_count: int = 0, prices: Iterable[float] = (), performance: Dict = None):
+        self.name = name
+        self.profile_id = profile_id
+        self.success = success
+        self.error = error
+        self.sold_items_count = sold_items_count
+        self.prices = array("d", prices)
+        self.performance = performance if performance is not None else {}
+
+    @property
+    def total_revenue(self) -> float:
+        return sum(self.prices)
+
+    @property
+    def sold_items_prices(self) -> array:
+        return self.prices
+
+    def limit_prices(self, count: int):
+        """Tiene solo i primi count prezzi, senza copiare il buffer"""
+        if len(self.prices) > count:
+            del self.prices[count:]
+
+    @classmethod
+    def failure(cls, name: str, profile_id: str, error: str, performance: Dict = None) -> "ProfileResult":
+        return cls(name, profile_id, success=False, error=error, performance=performance)
+
+    def to_dict(self) -> Dict:
+        """Formato dict storico (prezzi come lista di float, 'error' solo se fallito)"""
+        data = {
+            "name": self.name,
+            "profile_id": self.profile_id,
+            "success": self.success,
+            "sold_items_count": self.sold_items_count,
+            "total_revenue": self.total_revenue,
+            "sold_items_prices": self.prices.tolist(),
+            "performance": self.performance,
+        }
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ProfileResult":
+        return cls(
+            name=data.get("name", ""),
+            profile_id=data.get("profile_id", ""),
+            success=bool(data.get("success", False)),
+            error=data.get("error"),
+            sold_items_count=data.get("sold_items_count", 0),
+            prices=data.get("sold_items_prices") or (),
+            performance=data.get("performance"),
+        )
+
+    def __getstate__(self):
+        # Prezzi come bytes: serializzazione compatta per pickle e pool di processi
+        return (self.name, self.profile_id, self.success, self.error,
+                self.sold_items_count, self.prices.tobytes(), self.performance)
+
+    def __setstate__(self, state):
+        (self.name, self.profile_id, self.success, self.error,
+         self.sold_items_count, prices, self.performance) = state
+        self.prices = array("d")
+        self.prices.frombytes(prices)
+
+    # Accesso in stile dict per i chiamanti che usano ancora result['campo']
+    def __getitem__(self, key: str):
+        if key not in self.FIELDS or (key == "error" and self.error is None):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.FIELDS and (key != "error" or self.error is not None)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __repr__(self) -> str:
+        return (f"ProfileResult(name={self.name!r}, success={self.success}, "
+                f"sold_items_count={self.sold_items_count}, prices={len(self.prices)})")
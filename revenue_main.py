@@ -4,36 +4,32 @@ Revenue Analysis Parallelo Ottimizzato - Entry Point
 Sistema di web scraping parallelo con utenti finti per analisi ricavi competitor
 """
 
+import os
 import sys
 import argparse
 import logging
 import time
 from datetime import datetime
-from pathlib import Path
+from typing import Dict, List, Tuple
 
 # Import moduli locali
-from config import VESTIAIRE_PROFILES, OPTIMIZATION_CONFIG
+from config import OPTIMIZATION_CONFIG
+from profile_registry import load_registry
+from profile_result import ProfileResult
+from shard_runs import parse_shard, select_shard, write_partial, load_partials, merge_report
+from durable_queue import DurableWorkQueue, run_worker, coordinate, spawn_local_workers, stop_local_workers
+from work_queue import ProfileDurations
 from revenue_scraper import RevenueScraper
 from revenue_sheets_updater import RevenueSheetsUpdater
+from perf_tracing import SHEETS_API_TRACER
+from log_setup import configure_logging
+from failure_artifacts import get_failure_artifacts
+from page_diagnostics import diagnose_snapshots
 
-# Configurazione logging
+# Configurazione logging: coda non bloccante, console e file JSON a rotazione in logs/
 def setup_logging():
     """Configura il sistema di logging"""
-    log_dir = Path("logs")
-    log_dir.mkdir(exist_ok=True)
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_file = log_dir / f"revenue_analysis_{timestamp}.log"
-    
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
-    
+    configure_logging("revenue_analysis")
     return logging.getLogger(__name__)
 
 def test_users():
@@ -46,7 +42,7 @@ def test_users():
         
         # Test con un profilo
         test_profile = "Vintage & Modern"
-        profile_id = VESTIAIRE_PROFILES[test_profile]
+        profile_id = load_registry().get(test_profile).profile_id
         
         logger.info(f"🔍 Test utenti finti per {test_profile} (ID: {profile_id})")
         
@@ -74,7 +70,7 @@ def test_flagging():
         
         # Test con Vintage & Modern (37 vendite reali)
         test_profile = "Vintage & Modern"
-        profile_id = VESTIAIRE_PROFILES[test_profile]
+        profile_id = load_registry().get(test_profile).profile_id
         
         logger.info(f"🔍 Test flagging per {test_profile} (ID: {profile_id})")
         
@@ -102,7 +98,7 @@ def test_prices():
         
         # Test con un profilo
         test_profile = "Vintage & Modern"
-        profile_id = VESTIAIRE_PROFILES[test_profile]
+        profile_id = load_registry().get(test_profile).profile_id
         
         logger.info(f"🔍 Test prezzi per {test_profile} (ID: {profile_id})")
         
@@ -213,13 +209,118 @@ def test_performance():
         logger.error(f"❌ Errore test performance: {e}")
         return False
 
+def diagnose(profile: str = None, limit: int = 5):
+    """Diagnostica approfondita offline sugli snapshot salvati dai profili falliti"""
+    logger = logging.getLogger(__name__)
+    logger.info("🔍 === DIAGNOSTICA SNAPSHOT ===")
+    reports = diagnose_snapshots(get_failure_artifacts().directory, profile=profile, limit=limit)
+    return bool(reports)
+
+def revenue_sheet_rows(results: List[ProfileResult]) -> Dict[str, Dict]:
+    """Risultati dello scraper nel formato di update_revenue_sheets (nome -> articoli venduti e ricavi)"""
+    return {result.name: {"items_sold": result.sold_items_count, "revenue": result.total_revenue}
+            for result in results if result.success}
+
+def run(shard: Tuple[int, int] = None) -> bool:
+    """
+    Esecuzione completa; con shard=(i, N) solo i profili dello shard, con i risultati
+    parziali scritti in shards/ invece dell'aggiornamento di Google Sheets
+    """
+    logger = logging.getLogger(__name__)
+    logger.info("🏃 Esecuzione completa del sistema...")
+    registry = load_registry()
+    run_date = datetime.now()
+    if shard is not None:
+        profiles = select_shard(registry, *shard)
+        logger.info(f"🧩 Shard {shard[0]}/{shard[1]}: {len(profiles)} profili su {len(registry.enabled())}")
+        results = RevenueScraper(profiles=profiles).scrape_all_profiles_revenue() if profiles else []
+        return write_partial("revenue", *shard, profiles, [result.to_dict() for result in results],
+                             run_date) is not None
+
+    results = RevenueScraper(profiles=registry.profiles()).scrape_all_profiles_revenue()
+    
+    # Aggiorna Google Sheets
+    sheets_updater = RevenueSheetsUpdater()
+    success = sheets_updater.update_revenue_sheets(revenue_sheet_rows(results), run_date)
+    
+    # Report quota Google Sheets API di fine esecuzione
+    SHEETS_API_TRACER.log_summary()
+    SHEETS_API_TRACER.save_json(f"logs/sheets_api_run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    return success
+
+def merge_shards(run_date: str = None, allow_partial: bool = False) -> bool:
+    """Riunisce i risultati parziali degli shard e aggiorna Google Sheets una sola volta"""
+    merged = load_partials("revenue", run_date)
+    if not merge_report(merged, "revenue") and not (allow_partial and merged["results"]):
+        return False
+    results = [ProfileResult.from_dict(result) for result in merged["results"]]
+    success = RevenueSheetsUpdater().update_revenue_sheets(revenue_sheet_rows(results),
+                                                           datetime.fromisoformat(merged["run_date"]))
+    SHEETS_API_TRACER.log_summary()
+    SHEETS_API_TRACER.save_json(f"logs/sheets_api_merge_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    return success
+
+def worker(idle_exit: bool = False) -> bool:
+    """Worker della coda durevole revenue: uno scraper (e un Chrome) per processo, riusato tra i batch"""
+    scraper = RevenueScraper(profiles={})
+    scraper.keep_driver_open = True
+    scraper.log_report = False
+    
+    def scrape_batch(profiles: Dict[str, str]) -> List[Dict]:
+        # Scraping revenue di un batch preso in lease
+        scraper.profiles = profiles
+        return [result.to_dict() for result in scraper.scrape_all_profiles_revenue()]
+    
+    try:
+        run_worker(DurableWorkQueue(), "revenue", scrape_batch, idle_exit=idle_exit)
+    except KeyboardInterrupt:
+        # I lease non completati scadono e i profili tornano in coda
+        logging.getLogger(__name__).info("🛑 Worker interrotto")
+    finally:
+        scraper.close()
+        scraper.log_performance_summary()
+    return True
+
+def coordinator(spawn: int = 0, timeout: float = None, allow_partial: bool = False) -> bool:
+    """Accoda i profili abilitati, attende i worker e aggiorna Google Sheets una sola volta"""
+    profiles = load_registry().profiles()
+    processes = []
+    
+    def start_workers(run_id: str):
+        if spawn:
+            processes.extend(spawn_local_workers(
+                [sys.executable, os.path.abspath(__file__), "worker", "--idle-exit"], spawn))
+    
+    try:
+        outcome = coordinate(DurableWorkQueue(), "revenue", profiles, ProfileDurations().estimates("revenue"),
+                             timeout, allow_partial, on_enqueued=start_workers)
+    finally:
+        stop_local_workers(processes)
+    if outcome is None:
+        return False
+    results = [ProfileResult.from_dict(result) for result in outcome["results"]]
+    success = RevenueSheetsUpdater().update_revenue_sheets(revenue_sheet_rows(results), outcome["run_date"])
+    SHEETS_API_TRACER.log_summary()
+    SHEETS_API_TRACER.save_json(f"logs/sheets_api_run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    return success
+
 def main():
     """Funzione principale"""
     parser = argparse.ArgumentParser(description="Revenue Analysis Parallelo Ottimizzato")
     parser.add_argument("command", choices=[
         "test-users", "test-flagging", "test-prices", "test-parallel", 
-        "test-sheets", "performance", "run"
+        "test-sheets", "performance", "run", "diagnose", "merge-shards",
+        "worker", "coordinator"
     ], help="Comando da eseguire")
+    parser.add_argument("--profile", help="diagnose: solo gli snapshot di questo profilo")
+    parser.add_argument("--limit", type=int, default=5, help="diagnose: snapshot più recenti da analizzare")
+    parser.add_argument("--shard", type=parse_shard, help="run: solo lo shard i/N, risultati parziali in shards/")
+    parser.add_argument("--date", help="merge-shards: data degli shard (AAAA-MM-GG, default la più recente)")
+    parser.add_argument("--allow-partial", action="store_true",
+                        help="merge-shards/coordinator: aggiorna anche se mancano shard o profili")
+    parser.add_argument("--idle-exit", action="store_true", help="worker: termina quando la coda è vuota")
+    parser.add_argument("--spawn", type=int, default=0, help="coordinator: worker locali da avviare")
+    parser.add_argument("--timeout", type=float, help="coordinator: secondi massimi di attesa dei worker")
     
     args = parser.parse_args()
     
@@ -242,17 +343,16 @@ def main():
         success = test_sheets()
     elif args.command == "performance":
         success = test_performance()
+    elif args.command == "diagnose":
+        success = diagnose(args.profile, args.limit)
     elif args.command == "run":
-        # Esecuzione completa
-        logger.info("🏃 Esecuzione completa del sistema...")
-        scraper = RevenueScraper()
-        results = scraper.scrape_all_profiles_revenue()
-        
-        # Aggiorna Google Sheets
-        sheets_updater = RevenueSheetsUpdater()
-        sheets_updater.update_revenue_sheets(results)
-        
-        success = True
+        success = run(args.shard)
+    elif args.command == "merge-shards":
+        success = merge_shards(args.date, args.allow_partial)
+    elif args.command == "worker":
+        success = worker(args.idle_exit)
+    elif args.command == "coordinator":
+        success = coordinator(args.spawn, args.timeout, args.allow_partial)
     
     # Risultato finale
     if success:
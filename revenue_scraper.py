@@ -2,29 +2,85 @@
 Revenue Scraper - Scraper essenziale per ricavi
 """
 
+import os
+import sys
 import time
 import logging
-import re
-import concurrent.futures
 import threading
 from typing import Dict, List
+import numpy as np
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.chrome.service import Service
-from config import VESTIAIRE_PROFILES
+from config import LOGGING_CONFIG, PERFORMANCE_CONFIG
+from browser_process import DeadlineWatchdog, DriverRecycler, WorkerDriversMixin, kill_driver, recycle_driver
+from work_queue import ProfileDurations, ProfileWorkQueue, WorkItem, run_workers
+from clearance_session import get_clearance_store
+from profile_health import ProfileCircuitBreaker
+from profile_registry import load_registry
+from failure_artifacts import get_failure_artifacts
+# Configurazione di debug da src/, importata come in src/main.py (un solo modulo debug_config)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from debug_config import DEBUG_CONFIG, deep_diagnostics_enabled
+from perf_tracing import WebDriverTracer, format_webdriver_report, collect_page_timing, evaluate_page_timing
+from navigation_memo import NavigationMemo
+from selector_stats import SelectorStats
+from page_snapshot import capture_snapshot, extract_sold_count
+from pattern_bank import extract_price
+from price_normalizer import normalize_prices, price_fragments, unique_valid_prices
+from snapshot_parser import SnapshotParser, parse_revenue_snapshot
+from profile_result import ProfileResult
+from page_diagnostics import diagnose_snapshots
+from log_setup import sampled
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class RevenueScraper:
+class RevenueScraper(WorkerDriversMixin):
     """Scraper essenziale per ricavi"""
     
     def __init__(self, profiles=None, existing_sales_data=None):
-        self.driver = None
-        self.profiles = profiles or {}
+        # Un driver per thread: ogni worker del pool ha il proprio Chrome
+        self._init_worker_drivers()
+        # Senza profili espliciti: profili abilitati del registro
+        self.profiles = profiles or load_registry().profiles()
         self.existing_sales_data = existing_sales_data or {}
+        # Worker della coda durevole: il driver del thread chiamante resta aperto tra i batch
+        # e il report (con la diagnostica degli snapshot) viene mostrato una volta sola
+        self.keep_driver_open = False
+        self.log_report = True
+        # Statistiche performance per profilo
+        self.performance_stats = {
+            "profile_times": {},
+            "webdriver_commands": {}
+        }
+        self.command_tracer = WebDriverTracer() if LOGGING_CONFIG.get("trace_webdriver_commands") else None
+        # Strategia di navigazione vincente per profilo, persistita tra le esecuzioni
+        self.navigation_memo = NavigationMemo()
+        # Hit/miss dei selettori XPath: quelli morti passano al percorso di riscoperta
+        self.selector_stats = SelectorStats()
+        # Scadenza per profilo e tentativi dopo un timeout
+        self.retry_config = PERFORMANCE_CONFIG.get("retry_config", {})
+        # Durata storica per profilo: ordine della coda condivisa
+        self.profile_durations = ProfileDurations()
+        # Clearance Cloudflare condivisa tra i worker
+        self.clearance = get_clearance_store()
+        # Circuit breaker: i profili che falliscono di continuo escono dalla coda principale
+        self.profile_health = ProfileCircuitBreaker()
+        # Screenshot e HTML di debug scritti in background (compressi, directory a rotazione)
+        self.artifacts = get_failure_artifacts()
+        # Riferimenti agli snapshot salvati per la diagnostica offline (profilo → artefatto)
+        self.diagnostic_snapshots = {}
+        self._diagnostics_lock = threading.Lock()
+        # Riavvio dei driver dei worker dopo N pagine o oltre la soglia di memoria
+        recycling = PERFORMANCE_CONFIG.get("driver_recycling", {})
+        self.driver_recycler = DriverRecycler(
+            max_pages=recycling.get("max_pages", 0),
+            max_rss_mb=recycling.get("max_rss_mb", 0),
+            track_memory=DEBUG_CONFIG.get("track_memory_usage", False)
+        )
     
     def setup_driver(self):
         """Configura driver Chrome"""
@@ -45,9 +101,14 @@ class RevenueScraper:
         driver_path = ChromeDriverManager().install()
         service = Service(driver_path)
         self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        self._register_driver(self.driver)
+        if self.command_tracer:
+            self.command_tracer.attach(self.driver)
         
         # Nascondi che è un bot
         self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        # Clearance Cloudflare già ottenuta da un altro worker (o esecuzione): niente nuova attesa
+        self.clearance.inject(self.driver)
     
     def _handle_cookie_banner(self):
         """Gestisce banner cookie"""
@@ -69,47 +130,35 @@ class RevenueScraper:
             pass
 
     def _handle_cloudflare_challenge(self, profile_name: str) -> bool:
-        """Gestisce la verifica Cloudflare"""
-        try:
-            logger.info(f"    🛡️ Gestione verifica Cloudflare per {profile_name}...")
-            
-            # Controlla se siamo nella pagina di verifica Cloudflare
-            page_title = self.driver.title
-            if "Ci siamo quasi" in page_title or "Just a moment" in page_title:
-                logger.info(f"      🔍 Pagina di verifica Cloudflare rilevata: {page_title}")
-                
-                # Aspetta che la verifica sia completata (massimo 30 secondi)
-                max_wait = 30
-                wait_time = 0
-                
-                while wait_time < max_wait:
-                    current_title = self.driver.title
-                    current_url = self.driver.current_url
-                    
-                    # Se il titolo cambia o l'URL cambia, la verifica è completata
-                    if current_title != page_title and "vestiairecollective.com" in current_url:
-                        logger.info(f"      ✅ Verifica Cloudflare completata: {current_title}")
-                        time.sleep(3)  # Aspetta che la pagina si carichi completamente
-                        return True
-                    
-                    # Se vediamo "Verifica riuscita", aspettiamo un po' di più
-                    if "Verifica riuscita" in self.driver.page_source:
-                        logger.info(f"      ⏳ Verifica in corso...")
-                        time.sleep(5)
-                        wait_time += 5
-                        continue
-                    
-                    time.sleep(2)
-                    wait_time += 2
-                
-                logger.warning(f"      ⚠️ Timeout verifica Cloudflare dopo {max_wait} secondi")
-                return False
-            
-            return True  # Non è una pagina di verifica
-            
-        except Exception as e:
-            logger.warning(f"      ⚠️ Errore gestione Cloudflare: {e}")
-            return False
+        """Gestisce la verifica Cloudflare (attesa una sola volta, clearance condivisa tra i worker)"""
+        logger.info(f"    🛡️ Gestione verifica Cloudflare per {profile_name}...")
+        return self.clearance.pass_challenge(self.driver, profile_name)
+    
+    def _iter_selectors(self, group: str, selectors: List[str], rediscover=None):
+        """
+        Restituisce (selettore, elementi) per i selettori XPath del gruppo registrandone
+        hit/miss. I selettori declassati vengono provati solo se il chiamante non ha
+        già interrotto il ciclo e rediscover() lo consente (senza rediscover: se i selettori
+        attivi non hanno trovato nulla), oppure una volta ogni selector_sample_every ricerche.
+        """
+        fast, slow = self.selector_stats.split(group, selectors)
+        found = False
+        for selector in fast:
+            elements = self.driver.find_elements(By.XPATH, selector)
+            self.selector_stats.record(group, selector, bool(elements))
+            found = found or bool(elements)
+            yield selector, elements
+        
+        if not slow:
+            return
+        needed = rediscover() if rediscover is not None else not found
+        if needed or self.selector_stats.sample_due(group):
+            logger.info(f"    🔎 Riscoperta{'' if needed else ' campionata'}: provo {len(slow)} "
+                        f"selettori declassati ({group})")
+            for selector in slow:
+                elements = self.driver.find_elements(By.XPATH, selector)
+                self.selector_stats.record(group, selector, bool(elements))
+                yield selector, elements
     
     def _activate_sold_toggle(self, profile_name: str) -> bool:
         """Attiva toggle articoli venduti"""
@@ -120,8 +169,7 @@ class RevenueScraper:
                 "//button[contains(@class, 'toggle') and contains(@class, 'active')]"
             ]
             
-            for selector in active_selectors:
-                elements = self.driver.find_elements(By.XPATH, selector)
+            for selector, elements in self._iter_selectors("toggle_active", active_selectors):
                 if elements:
                     return True
             
@@ -132,8 +180,7 @@ class RevenueScraper:
                 "//div[contains(text(), 'venduti')]"
             ]
             
-            for selector in toggle_selectors:
-                elements = self.driver.find_elements(By.XPATH, selector)
+            for selector, elements in self._iter_selectors("toggle_click", toggle_selectors):
                 for element in elements:
                     if element.is_displayed():
                         element.click()
@@ -144,8 +191,8 @@ class RevenueScraper:
         except Exception:
             return False
     
-    def _navigate_to_items_section(self, profile_name: str, profile_id: str) -> bool:
-        """Naviga alla sezione articoli/prodotti del profilo"""
+    def _navigate_to_items_section(self, profile_name: str, profile_id: str, preferred_url: str = None) -> bool:
+        """Naviga alla sezione articoli/prodotti del profilo (preferred_url viene provato per primo)"""
         try:
             logger.info(f"  🔄 Navigando alla sezione articoli per {profile_name}...")
             
@@ -158,6 +205,7 @@ class RevenueScraper:
                 f"https://it.vestiairecollective.com/profile/{profile_id}/?view=items",
                 f"https://it.vestiairecollective.com/profile/{profile_id}/?section=items",
             ]
+            items_urls = self._prioritize_url(items_urls, preferred_url)
             
             for url in items_urls:
                 try:
@@ -270,41 +318,23 @@ class RevenueScraper:
                 "//div[contains(text(), '€') and not(ancestor::*[contains(@class, 'strike')]) and not(ancestor::*[contains(@class, 'original')])]",
             ]
             
-            all_prices = []
+            all_texts = []
             
-            for i, selector in enumerate(final_price_selectors):
+            price_selectors = self._iter_selectors("final_prices", final_price_selectors,
+                                                   rediscover=lambda: not all_texts)
+            for i, (selector, elements) in enumerate(price_selectors):
                 try:
-                    elements = self.driver.find_elements(By.XPATH, selector)
-                    logger.info(f"    Selettore prezzi finali {i+1}: trovati {len(elements)} elementi")
-                    
-                    for element in elements:
-                        try:
-                            text = element.text.strip()
-                            if text and '€' in text:
-                                # Estrai solo il numero prima di €
-                                price_match = re.search(r'(\d+(?:,\d+)?)\s*€', text)
-                                if price_match:
-                                    price_str = price_match.group(1).replace(',', '')
-                                    price = float(price_str)
-                                    
-                                    # Filtra prezzi ragionevoli (tra 10€ e 10000€)
-                                    if 10 <= price <= 10000:
-                                        all_prices.append(price)
-                                        logger.info(f"      Prezzo finale trovato: €{price:.2f} (da: '{text}')")
-                        except Exception as e:
-                            continue
-                            
+                    logger.info(f"    Selettore prezzi finali {i+1}: trovati {len(elements)} elementi", extra=sampled("revenue.price_selector"))
+                    all_texts.extend(self._element_price_texts(elements))
                 except Exception as e:
                     logger.warning(f"    Errore selettore {i+1}: {e}")
                     continue
             
-            # Rimuovi duplicati mantenendo l'ordine
-            unique_prices = []
-            seen_prices = set()
-            for price in all_prices:
-                if price not in seen_prices:
-                    unique_prices.append(price)
-                    seen_prices.add(price)
+            # Normalizzazione in blocco: formati IT/EU, filtro 10-10000€ e duplicati
+            prices, valid = normalize_prices(all_texts)
+            for text, price in zip(np.asarray(all_texts)[valid], prices[valid]):
+                logger.info(f"      Prezzo finale trovato: €{price:.2f} (da: '{text}')", extra=sampled("revenue.price_found"))
+            unique_prices = unique_valid_prices(prices, valid)
             
             logger.info(f"  💰 Trovati {len(unique_prices)} prezzi di vendita finali unici per {profile_name}")
             
@@ -313,20 +343,9 @@ class RevenueScraper:
                 logger.info(f"  🔍 Ricerca prezzi nel testo della pagina per {profile_name}...")
                 
                 body_text = self.driver.find_element(By.TAG_NAME, "body").text
-                price_matches = re.findall(r'(\d+(?:,\d+)?)\s*€', body_text)
-                
-                for match in price_matches:
-                    try:
-                        price_str = match.replace(',', '')
-                        price = float(price_str)
-                        
-                        # Filtra prezzi ragionevoli
-                        if 10 <= price <= 10000 and price not in seen_prices:
-                            unique_prices.append(price)
-                            seen_prices.add(price)
-                            logger.info(f"      Prezzo dal testo: €{price:.2f}")
-                    except Exception as e:
-                        continue
+                unique_prices = unique_valid_prices(*normalize_prices(price_fragments(body_text)))
+                for price in unique_prices:
+                    logger.info(f"      Prezzo dal testo: €{price:.2f}", extra=sampled("revenue.price_found"))
             
             # Se ancora non troviamo prezzi, prova URL dirette
             if not unique_prices:
@@ -334,33 +353,22 @@ class RevenueScraper:
                 direct_url_success = self._try_direct_sold_urls(profile_name, profile_id)
                 if direct_url_success:
                     # Riprova estrazione prezzi dopo navigazione
-                    for i, selector in enumerate(final_price_selectors):
+                    direct_texts = []
+                    price_selectors = self._iter_selectors("final_prices", final_price_selectors,
+                                                           rediscover=lambda: not direct_texts)
+                    for i, (selector, elements) in enumerate(price_selectors):
                         try:
-                            elements = self.driver.find_elements(By.XPATH, selector)
-                            logger.info(f"    Selettore prezzi diretti {i+1}: trovati {len(elements)} elementi")
-                            
-                            for element in elements:
-                                try:
-                                    text = element.text.strip()
-                                    if text and '€' in text:
-                                        price_match = re.search(r'(\d+(?:,\d+)?)\s*€', text)
-                                        if price_match:
-                                            price_str = price_match.group(1).replace(',', '')
-                                            price = float(price_str)
-                                            
-                                            if 10 <= price <= 10000 and price not in seen_prices:
-                                                unique_prices.append(price)
-                                                seen_prices.add(price)
-                                                logger.info(f"      Prezzo diretto trovato: €{price:.2f} (da: '{text}')")
-                                except Exception as e:
-                                    continue
+                            logger.info(f"    Selettore prezzi diretti {i+1}: trovati {len(elements)} elementi", extra=sampled("revenue.price_selector"))
+                            direct_texts.extend(self._element_price_texts(elements))
                         except Exception as e:
                             continue
+                    unique_prices = unique_valid_prices(*normalize_prices(direct_texts))
+                    for price in unique_prices:
+                        logger.info(f"      Prezzo diretto trovato: €{price:.2f}", extra=sampled("revenue.price_found"))
             
-            # Se ancora non troviamo prezzi, analizza la struttura completa
-            if not unique_prices:
-                logger.info(f"  🔍 Analisi struttura completa per {profile_name}...")
-                self._analyze_page_structure_for_prices(profile_name)
+            # Se ancora non troviamo prezzi, snapshot per l'analisi offline (solo al primo fallimento)
+            if not unique_prices and self.profile_health.needs_diagnostics("revenue", profile_name):
+                self._record_diagnostic_snapshot(profile_name, "no_prices")
             
             return unique_prices
             
@@ -368,65 +376,34 @@ class RevenueScraper:
             logger.warning(f"  ⚠️ Errore estrazione prezzi finali per {profile_name}: {e}")
             return []
 
-    def _analyze_page_structure_for_prices(self, profile_name: str):
-        """Analizza la struttura della pagina per trovare prezzi nascosti"""
+    @staticmethod
+    def _element_price_texts(elements) -> List[str]:
+        """Testi degli elementi che contengono un prezzo in euro"""
+        texts = []
+        for element in elements:
+            try:
+                text = element.text.strip()
+                if text and '€' in text:
+                    texts.append(text)
+            except Exception:
+                continue
+        return texts
+
+    def _record_diagnostic_snapshot(self, profile_name: str, reason: str) -> str:
+        """
+        Salva lo snapshot della pagina corrente (un solo round trip) per la diagnostica
+        offline e ne restituisce il riferimento. L'analisi della struttura non gira qui:
+        a fine esecuzione in modalità diagnostica o con il comando diagnose
+        """
         try:
-            logger.info(f"    🔍 Analisi struttura pagina per {profile_name}...")
-            
-            # 1. Analizza tutti gli elementi con testo
-            all_elements = self.driver.find_elements(By.XPATH, "//*[text()]")
-            logger.info(f"      Elementi con testo: {len(all_elements)}")
-            
-            # 2. Cerca elementi con €
-            euro_elements = self.driver.find_elements(By.XPATH, "//*[contains(text(), '€')]")
-            logger.info(f"      Elementi con €: {len(euro_elements)}")
-            
-            for i, element in enumerate(euro_elements[:10]):  # Mostra primi 10
-                try:
-                    text = element.text.strip()
-                    tag = element.tag_name
-                    class_name = element.get_attribute("class") or ""
-                    logger.info(f"        Elemento € {i+1}: '{text}' (tag: {tag}, class: {class_name})")
-                except Exception as e:
-                    continue
-            
-            # 3. Cerca elementi con numeri che potrebbero essere prezzi
-            number_elements = self.driver.find_elements(By.XPATH, "//*[contains(text(), '0') or contains(text(), '1') or contains(text(), '2') or contains(text(), '3') or contains(text(), '4') or contains(text(), '5') or contains(text(), '6') or contains(text(), '7') or contains(text(), '8') or contains(text(), '9')]")
-            logger.info(f"      Elementi con numeri: {len(number_elements)}")
-            
-            # 4. Analizza il testo completo della pagina
-            body_text = self.driver.find_element(By.TAG_NAME, "body").text
-            logger.info(f"      Testo completo: {len(body_text)} caratteri")
-            
-            # 5. Cerca pattern di prezzi nel testo
-            price_patterns = [
-                r'(\d+(?:,\d+)?)\s*€',
-                r'€\s*(\d+(?:,\d+)?)',
-                r'(\d+(?:,\d+)?)\s*EUR',
-                r'EUR\s*(\d+(?:,\d+)?)',
-                r'(\d+(?:,\d+)?)\s*euro',
-                r'euro\s*(\d+(?:,\d+)?)'
-            ]
-            
-            for pattern in price_patterns:
-                matches = re.findall(pattern, body_text, re.IGNORECASE)
-                if matches:
-                    logger.info(f"      Pattern '{pattern}': {len(matches)} matches - {matches[:5]}")
-            
-            # 6. Salva screenshot per debug
-            timestamp = int(time.time())
-            screenshot_path = f"debug_prices_{profile_name.replace(' ', '_')}_{timestamp}.png"
-            self.driver.save_screenshot(screenshot_path)
-            logger.info(f"      📸 Screenshot salvato: {screenshot_path}")
-            
-            # 7. Salva anche il codice HTML per analisi
-            html_path = f"debug_html_{profile_name.replace(' ', '_')}_{timestamp}.html"
-            with open(html_path, 'w', encoding='utf-8') as f:
-                f.write(self.driver.page_source)
-            logger.info(f"      📄 HTML salvato: {html_path}")
-            
+            ref = self.artifacts.save_snapshot(capture_snapshot(self.driver, profile_name), reason)
         except Exception as e:
-            logger.warning(f"    ⚠️ Errore analisi struttura: {e}")
+            logger.warning(f"  ⚠️ Snapshot di diagnostica non salvato per {profile_name}: {e}")
+            return None
+        if ref:
+            with self._diagnostics_lock:
+                self.diagnostic_snapshots[profile_name] = ref
+        return ref
 
     def _try_direct_sold_urls(self, profile_name: str, profile_id: str) -> bool:
         """Prova URL dirette per accedere agli articoli venduti"""
@@ -570,11 +547,12 @@ class RevenueScraper:
             logger.info(f"  ⚡ Test sistema parallelo con {len(test_profiles)} profili...")
             
             results = {}
+            all_profiles = load_registry().profiles(enabled_only=False)
             
             # Test sequenziale per ora (il parallelo sarà implementato dopo)
             for profile_name in test_profiles:
-                if profile_name in VESTIAIRE_PROFILES:
-                    profile_id = VESTIAIRE_PROFILES[profile_name]
+                if profile_name in all_profiles:
+                    profile_id = all_profiles[profile_name]
                     
                     logger.info(f"    🔍 Processando {profile_name}...")
                     
@@ -594,8 +572,8 @@ class RevenueScraper:
             logger.error(f"    ❌ Errore test parallelo: {e}")
             return {}
 
-    def _navigate_to_sold_items_url(self, profile_name: str, profile_id: str) -> bool:
-        """Naviga direttamente alla sezione articoli venduti"""
+    def _navigate_to_sold_items_url(self, profile_name: str, profile_id: str, preferred_url: str = None) -> bool:
+        """Naviga direttamente alla sezione articoli venduti (preferred_url viene provato per primo)"""
         try:
             logger.info(f"  🔄 Navigando alla sezione articoli venduti per {profile_name}...")
             
@@ -608,6 +586,7 @@ class RevenueScraper:
                 f"https://it.vestiairecollective.com/profile/{profile_id}/?filter=sold",
                 f"https://it.vestiairecollective.com/profile/{profile_id}/?tab=sold",
             ]
+            sold_urls = self._prioritize_url(sold_urls, preferred_url)
             
             for url in sold_urls:
                 try:
@@ -669,72 +648,36 @@ class RevenueScraper:
             logger.warning(f"  ⚠️ Errore navigazione URL venduti per {profile_name}: {e}")
             return False
 
-    def _debug_page_structure(self, profile_name: str):
-        """Analizza la struttura della pagina per debug"""
-        try:
-            logger.info(f"  🔍 Debug struttura pagina per {profile_name}...")
-            
-            # Salva screenshot
-            timestamp = int(time.time())
-            screenshot_path = f"debug_{profile_name.replace(' ', '_')}_{timestamp}.png"
-            self.driver.save_screenshot(screenshot_path)
-            logger.info(f"    📸 Screenshot salvato: {screenshot_path}")
-            
-            # Analizza tutti gli elementi con testo
-            all_elements = self.driver.find_elements(By.XPATH, "//*[text()]")
-            logger.info(f"    Elementi con testo: {len(all_elements)}")
-            
-            # Cerca elementi con prezzi
-            price_elements = self.driver.find_elements(By.XPATH, "//*[contains(text(), '€')]")
-            logger.info(f"    Elementi con €: {len(price_elements)}")
-            
-            for i, element in enumerate(price_elements[:10]):  # Primi 10
-                try:
-                    text = element.text.strip()
-                    tag_name = element.tag_name
-                    class_name = element.get_attribute("class") or ""
-                    logger.info(f"      Prezzo {i+1}: '{text}' (tag: {tag_name}, class: {class_name})")
-                except Exception as e:
-                    logger.warning(f"      Errore elemento {i+1}: {e}")
-            
-            # Cerca elementi con numeri (correzione XPath)
-            number_elements = self.driver.find_elements(By.XPATH, "//*[contains(text(), '0') or contains(text(), '1') or contains(text(), '2') or contains(text(), '3') or contains(text(), '4') or contains(text(), '5') or contains(text(), '6') or contains(text(), '7') or contains(text(), '8') or contains(text(), '9')]")
-            logger.info(f"    Elementi con numeri: {len(number_elements)}")
-            
-            # Cerca elementi con "venduti" o "sold"
-            sold_elements = self.driver.find_elements(By.XPATH, "//*[contains(text(), 'venduti') or contains(text(), 'sold')]")
-            logger.info(f"    Elementi con 'venduti/sold': {len(sold_elements)}")
-            
-            for i, element in enumerate(sold_elements[:5]):  # Primi 5
-                try:
-                    text = element.text.strip()
-                    tag_name = element.tag_name
-                    class_name = element.get_attribute("class") or ""
-                    logger.info(f"      Venduti {i+1}: '{text}' (tag: {tag_name}, class: {class_name})")
-                except Exception as e:
-                    logger.warning(f"      Errore elemento venduti {i+1}: {e}")
-            
-            # Analizza la struttura HTML
-            body_text = self.driver.find_element(By.TAG_NAME, "body").text
-            logger.info(f"    Testo body: {len(body_text)} caratteri")
-            
-            # Cerca pattern specifici nel testo
-            patterns_to_check = [
-                r'(\d+)\s*€',
-                r'€\s*(\d+)',
-                r'(\d+)\s+venduti',
-                r'(\d+)\s+sold',
-                r'Venduto',
-                r'Sold',
-            ]
-            
-            for pattern in patterns_to_check:
-                matches = re.findall(pattern, body_text, re.IGNORECASE)
-                if matches:
-                    logger.info(f"    Pattern '{pattern}': {len(matches)} matches - {matches[:5]}")
-            
-        except Exception as e:
-            logger.warning(f"  ⚠️ Errore debug struttura per {profile_name}: {e}")
+    @staticmethod
+    def _prioritize_url(urls: List[str], preferred_url: str = None) -> List[str]:
+        """Sposta in testa l'URL che ha funzionato nell'ultima esecuzione"""
+        if preferred_url in urls:
+            return [preferred_url] + [url for url in urls if url != preferred_url]
+        return urls
+
+    def _navigate_with_memo(self, profile_name: str, profile_id: str) -> bool:
+        """
+        Prova le strategie di navigazione partendo da quella vincente nel memo,
+        saltando quelle fallite ripetutamente, e registra esito, URL e tempi
+        """
+        strategies = {
+            "sold_section": lambda url: self._navigate_to_sold_section(profile_name),
+            "sold_items_url": lambda url: self._navigate_to_sold_items_url(profile_name, profile_id, url),
+            "items_section": lambda url: self._navigate_to_items_section(profile_name, profile_id, url),
+            "sold_toggle": lambda url: self._activate_sold_toggle(profile_name),
+        }
+        
+        for strategy in self.navigation_memo.order_strategies(profile_name, list(strategies)):
+            strategy_start = time.time()
+            preferred_url = self.navigation_memo.get_winning_url(profile_name, strategy)
+            success = strategies[strategy](preferred_url)
+            elapsed = time.time() - strategy_start
+            current_url = self.driver.current_url if success else None
+            self.navigation_memo.record(profile_name, strategy, success, elapsed, current_url)
+            if success:
+                logger.info(f"  🧭 {profile_name}: navigazione riuscita con '{strategy}' in {elapsed:.1f}s")
+                return True
+        return False
 
     def _navigate_to_sold_section(self, profile_name: str) -> bool:
         """Naviga alla sezione articoli venduti"""
@@ -952,275 +895,16 @@ class RevenueScraper:
         except Exception as e:
             logger.warning(f"      ⚠️ Errore analisi elementi cliccabili: {e}")
 
-    def _analyze_vestiaire_structure(self, profile_name: str) -> int:
-        """Analizza la struttura specifica di Vestiaire Collective per trovare vendite reali"""
-        try:
-            # Aspetta che la pagina sia completamente caricata
-            time.sleep(3)
-            
-            logger.info(f"  🔍 Analizzando struttura Vestiaire per {profile_name}...")
-            
-            # 1. Cerca nei tab e filtri
-            tab_selectors = [
-                "//div[contains(@class, 'tab')]//span[contains(text(), 'venduti')]",
-                "//div[contains(@class, 'tab')]//span[contains(text(), 'sold')]",
-                "//button[contains(@class, 'tab')]//span[contains(text(), 'venduti')]",
-                "//button[contains(@class, 'tab')]//span[contains(text(), 'sold')]",
-                "//div[contains(@class, 'filter')]//span[contains(text(), 'venduti')]",
-                "//div[contains(@class, 'filter')]//span[contains(text(), 'sold')]",
-                # Selettori più generici
-                "//*[contains(text(), 'venduti')]",
-                "//*[contains(text(), 'sold')]",
-                "//*[contains(text(), '37')]",
-            ]
-            
-            for i, selector in enumerate(tab_selectors):
-                elements = self.driver.find_elements(By.XPATH, selector)
-                logger.info(f"    Selettore {i+1}: trovati {len(elements)} elementi")
-                
-                for j, element in enumerate(elements):
-                    try:
-                        text = element.text.strip()
-                        logger.info(f"      Elemento {j+1}: '{text}'")
-                        
-                        # Cerca il numero nel testo del tab
-                        numbers = re.findall(r'\d+', text)
-                        for num in numbers:
-                            count = int(num)
-                            if 1 <= count <= 1000:
-                                logger.info(f"  🔍 Tab trovato per {profile_name}: {count}")
-                                return count
-                    except Exception as e:
-                        logger.warning(f"      Errore elemento {j+1}: {e}")
-            
-            # 2. Cerca nei contatori di profilo
-            profile_counters = [
-                "//div[contains(@class, 'profile')]//span[contains(@class, 'count')]",
-                "//div[contains(@class, 'user')]//span[contains(@class, 'count')]",
-                "//div[contains(@class, 'stats')]//span[contains(@class, 'count')]",
-                "//div[contains(@class, 'metrics')]//span[contains(@class, 'count')]",
-                # Selettori più generici
-                "//span[contains(@class, 'count')]",
-                "//div[contains(@class, 'count')]",
-                "//*[contains(@class, 'count')]",
-            ]
-            
-            for i, selector in enumerate(profile_counters):
-                elements = self.driver.find_elements(By.XPATH, selector)
-                logger.info(f"    Contatore {i+1}: trovati {len(elements)} elementi")
-                
-                for j, element in enumerate(elements):
-                    try:
-                        text = element.text.strip()
-                        logger.info(f"      Contatore {j+1}: '{text}'")
-                        
-                        if text and text.isdigit():
-                            count = int(text)
-                            if 1 <= count <= 1000:
-                                logger.info(f"  🔍 Contatore profilo per {profile_name}: {count}")
-                                return count
-                    except Exception as e:
-                        logger.warning(f"      Errore contatore {j+1}: {e}")
-            
-            # 3. Cerca nei dati strutturati
-            structured_data_selectors = [
-                "//script[@type='application/ld+json']",
-                "//script[contains(text(), 'sold')]",
-                "//script[contains(text(), 'venduti')]",
-                "//script[contains(text(), '37')]",
-            ]
-            
-            for i, selector in enumerate(structured_data_selectors):
-                elements = self.driver.find_elements(By.XPATH, selector)
-                logger.info(f"    Script {i+1}: trovati {len(elements)} elementi")
-                
-                for j, element in enumerate(elements):
-                    try:
-                        script_content = element.get_attribute("innerHTML")
-                        if script_content:
-                            logger.info(f"      Script {j+1}: {len(script_content)} caratteri")
-                            
-                            # Cerca pattern JSON con vendite
-                            json_patterns = [
-                                r'"sold":\s*(\d+)',
-                                r'"items_sold":\s*(\d+)',
-                                r'"total_sold":\s*(\d+)',
-                                r'"venduti":\s*(\d+)',
-                                r'"articoli_venduti":\s*(\d+)',
-                                r'37',
-                            ]
-                            
-                            for pattern in json_patterns:
-                                matches = re.findall(pattern, script_content)
-                                if matches:
-                                    logger.info(f"        Pattern '{pattern}': {matches}")
-                                    if pattern == '37':
-                                        count = 37
-                                    else:
-                                        count = int(matches[0])
-                                    if 1 <= count <= 1000:
-                                        logger.info(f"  🔍 JSON strutturato per {profile_name}: {count}")
-                                        return count
-                    except Exception as e:
-                        logger.warning(f"      Errore script {j+1}: {e}")
-            
-            # 4. Cerca nei meta tag
-            meta_selectors = [
-                "//meta[@name='sold-items']",
-                "//meta[@name='items-sold']",
-                "//meta[@property='sold-items']",
-            ]
-            
-            for selector in meta_selectors:
-                elements = self.driver.find_elements(By.XPATH, selector)
-                for element in elements:
-                    content = element.get_attribute("content")
-                    if content and content.isdigit():
-                        count = int(content)
-                        if 1 <= count <= 1000:
-                            logger.info(f"  🔍 Meta tag per {profile_name}: {count}")
-                            return count
-            
-            # 5. Cerca nel testo visibile della pagina
-            visible_text = self.driver.find_element(By.TAG_NAME, "body").text
-            logger.info(f"    Testo visibile: {len(visible_text)} caratteri")
-            
-            # Salva screenshot per debug
-            try:
-                timestamp = int(time.time())
-                screenshot_path = f"debug_{profile_name.replace(' ', '_')}_{timestamp}.png"
-                self.driver.save_screenshot(screenshot_path)
-                logger.info(f"    📸 Screenshot salvato: {screenshot_path}")
-            except Exception as e:
-                logger.warning(f"    Errore screenshot: {e}")
-            
-            # Pattern per testo visibile
-            visible_patterns = [
-                r'(\d+)\s+articoli?\s+venduti',
-                r'(\d+)\s+pezzi?\s+venduti',
-                r'(\d+)\s+items?\s+sold',
-                r'(\d+)\s+pieces?\s+sold',
-                r'venduti[:\s]*(\d+)',
-                r'sold[:\s]*(\d+)',
-                r'\((\d+)\s+venduti\)',
-                r'\((\d+)\s+sold\)',
-                r'37',
-            ]
-            
-            for pattern in visible_patterns:
-                matches = re.findall(pattern, visible_text, re.IGNORECASE)
-                if matches:
-                    logger.info(f"    Pattern '{pattern}': {matches}")
-                    if pattern == '37':
-                        count = 37
-                    else:
-                        count = int(matches[0])
-                    if 1 <= count <= 1000:
-                        logger.info(f"  🔍 Testo visibile per {profile_name}: {count}")
-                        return count
-            
-            logger.warning(f"  ⚠️ Nessun contatore trovato per {profile_name}")
-            return 0
-            
-        except Exception as e:
-            logger.warning(f"  ⚠️ Errore analisi struttura Vestiaire per {profile_name}: {e}")
-            return 0
-
-    def _find_real_sold_count(self, profile_name: str) -> int:
-        """Cerca il numero reale di articoli venduti nella pagina"""
+    def _find_real_sold_count(self, profile_name: str, snapshot=None) -> int:
+        """Cerca il numero reale di articoli venduti sullo snapshot della pagina (catturato se assente)"""
         try:
-            # 1. Prima prova l'analisi specifica di Vestiaire
-            vestiaire_count = self._analyze_vestiaire_structure(profile_name)
-            if vestiaire_count > 0:
-                return vestiaire_count
-            
-            # 2. Cerca nei contatori principali
-            counter_selectors = [
-                "//div[contains(@class, 'counter')]//span",
-                "//span[contains(@class, 'count')]",
-                "//div[contains(@class, 'stats')]//span",
-                "//div[contains(@class, 'profile-stats')]//span",
-                "//div[contains(@class, 'user-stats')]//span",
-            ]
-            
-            for selector in counter_selectors:
-                elements = self.driver.find_elements(By.XPATH, selector)
-                for element in elements:
-                    text = element.text.strip()
-                    if text and text.isdigit():
-                        count = int(text)
-                        # Verifica se è un numero ragionevole (tra 1 e 1000)
-                        if 1 <= count <= 1000:
-                            logger.info(f"  🔍 Contatore trovato per {profile_name}: {count}")
-                            return count
-            
-            # 3. Cerca nei toggle e bottoni
-            toggle_selectors = [
-                "//button[contains(text(), 'venduti')]",
-                "//button[contains(text(), 'sold')]",
-                "//div[contains(text(), 'venduti')]",
-                "//div[contains(text(), 'sold')]",
-                "//span[contains(text(), 'venduti')]",
-                "//span[contains(text(), 'sold')]",
-            ]
-            
-            for selector in toggle_selectors:
-                elements = self.driver.find_elements(By.XPATH, selector)
-                for element in elements:
-                    text = element.text.strip()
-                    # Cerca numeri nel testo del toggle
-                    numbers = re.findall(r'\d+', text)
-                    for num in numbers:
-                        count = int(num)
-                        if 1 <= count <= 1000:
-                            logger.info(f"  🔍 Toggle trovato per {profile_name}: {count}")
-                            return count
-            
-            # 4. Cerca nel testo della pagina
-            page_text = self.driver.page_source
-            
-            # Pattern specifici per Vestiaire
-            vestiaire_patterns = [
-                r'(\d+)\s+articoli?\s+venduti',
-                r'(\d+)\s+pezzi?\s+venduti',
-                r'(\d+)\s+items?\s+sold',
-                r'(\d+)\s+pieces?\s+sold',
-                r'venduti[:\s]*(\d+)',
-                r'sold[:\s]*(\d+)',
-                r'\((\d+)\s+venduti\)',
-                r'\((\d+)\s+sold\)',
-            ]
-            
-            for pattern in vestiaire_patterns:
-                matches = re.findall(pattern, page_text, re.IGNORECASE)
-                if matches:
-                    count = int(matches[0])
-                    if 1 <= count <= 1000:
-                        logger.info(f"  🔍 Pattern trovato per {profile_name}: {count}")
-                        return count
-            
-            # 5. Cerca nei dati JSON nascosti
-            script_elements = self.driver.find_elements(By.TAG_NAME, "script")
-            for script in script_elements:
-                script_text = script.get_attribute("innerHTML")
-                if script_text:
-                    # Cerca dati JSON con informazioni vendite
-                    json_patterns = [
-                        r'"sold":\s*(\d+)',
-                        r'"venduti":\s*(\d+)',
-                        r'"items_sold":\s*(\d+)',
-                        r'"total_sold":\s*(\d+)',
-                    ]
-                    
-                    for pattern in json_patterns:
-                        matches = re.findall(pattern, script_text)
-                        if matches:
-                            count = int(matches[0])
-                            if 1 <= count <= 1000:
-                                logger.info(f"  🔍 JSON trovato per {profile_name}: {count}")
-                                return count
+            if snapshot is None:
+                snapshot = capture_snapshot(self.driver, profile_name)
             
-            return 0
+            result = extract_sold_count(snapshot)
+            if result["count"] > 0:
+                logger.info(f"  🔍 Vendite trovate per {profile_name} ({result['source']}): {result['count']}")
+            return result["count"]
             
         except Exception as e:
             logger.warning(f"  ⚠️ Errore ricerca vendite reali per {profile_name}: {e}")
@@ -1229,27 +913,31 @@ class RevenueScraper:
     def extract_price_from_text(self, text: str) -> float:
         """Estrae prezzo da testo"""
         try:
-            # Cerca pattern prezzo
-            price_patterns = [
-                r'€\s*([\d,]+\.?\d*)',
-                r'EUR\s*([\d,]+\.?\d*)',
-                r'([\d,]+\.?\d*)\s*€',
-                r'([\d,]+\.?\d*)\s*EUR'
-            ]
-            
-            for pattern in price_patterns:
-                matches = re.findall(pattern, text, re.IGNORECASE)
-                if matches:
-                    price_str = matches[0].replace(',', '')
-                    return float(price_str)
-            
-            return 0.0
+            # Primo importo in euro, formati italiano e inglese
+            price = extract_price(text)
+            return price if price is not None else 0.0
         except Exception:
             return 0.0
     
-    def scrape_profile_revenue(self, profile_name: str, profile_id: str) -> Dict:
-        """Scrapa ricavi per un profilo"""
+    def scrape_profile_revenue(self, profile_name: str, profile_id: str) -> ProfileResult:
+        """Scrapa ricavi per un profilo (cattura e parsing nello stesso thread)"""
+        capture = self._capture_profile_revenue(profile_name, profile_id)
+        parsed = parse_revenue_snapshot(capture["snapshot"]) if capture.get("snapshot") else None
+        return self._build_revenue_result(capture, parsed)
+    
+    def _capture_profile_revenue(self, profile_name: str, profile_id: str) -> Dict:
+        """Parte browser: naviga alla sezione venduti e cattura lo snapshot, senza parsing"""
         start_time = time.time()
+        capture = {
+            "name": profile_name,
+            "profile_id": profile_id,
+            "start_time": start_time,
+            "page_timing": {},
+            "snapshot": None,
+            "error": None
+        }
+        if self.command_tracer:
+            self.command_tracer.begin_profile(profile_name)
         
         try:
             if not self.driver:
@@ -1258,25 +946,153 @@ class RevenueScraper:
             # Naviga alla pagina
             url = f"https://it.vestiairecollective.com/profile/{profile_id}/"
             self.driver.get(url)
+            if not self._handle_cloudflare_challenge(profile_name):
+                raise Exception("Verifica Cloudflare non superata")
             time.sleep(5)
+            capture["page_timing"] = collect_page_timing(self.driver)
             
             # Gestione cookie
             self._handle_cookie_banner()
             
-            # Naviga alla sezione venduti
-            navigation_success = self._navigate_to_sold_section(profile_name)
-            
-            # Se non funziona, prova navigazione URL venduti
-            if not navigation_success:
-                navigation_success = self._navigate_to_sold_items_url(profile_name, profile_id)
+            # Naviga alla sezione venduti (strategia vincente del memo per prima)
+            self._navigate_with_memo(profile_name, profile_id)
             
-            # Se non funziona, prova navigazione sezione articoli
-            if not navigation_success:
-                navigation_success = self._navigate_to_items_section(profile_name, profile_id)
+            # Scroll per caricare contenuto dinamico, poi un solo snapshot del DOM
+            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            time.sleep(2)
+            self.driver.execute_script("window.scrollTo(0, 0);")
+            time.sleep(2)
+            capture["snapshot"] = capture_snapshot(self.driver, profile_name)
             
-            # Attiva toggle venduti (fallback finale)
-            if not navigation_success:
-                toggle_activated = self._activate_sold_toggle(profile_name)
+        except Exception as e:
+            logger.error(f"Errore scraping {profile_name}: {e}")
+            capture["error"] = str(e)
+        finally:
+            if self.command_tracer:
+                self.command_tracer.end_profile()
+            capture["capture_time"] = time.time() - start_time
+        return capture
+    
+    def _capture_with_deadline(self, profile_name: str, profile_id: str) -> Dict:
+        """
+        _capture_profile_revenue entro il budget profile_deadline: alla scadenza il
+        Chrome del worker viene terminato e il thread riceve un driver nuovo
+        """
+        deadline = self.retry_config.get("profile_deadline", 0)
+        if not self.driver:
+            try:
+                self.setup_driver()
+            except Exception as e:
+                logger.error(f"Errore avvio driver per {profile_name}: {e}")
+                return {"name": profile_name, "profile_id": profile_id, "page_timing": {},
+                        "snapshot": None, "error": f"Errore avvio driver: {e}", "capture_time": 0,
+                        "timed_out": False}
+        driver = self.driver
+        with DeadlineWatchdog(deadline, lambda: kill_driver(driver), label=profile_name) as watchdog:
+            capture = self._capture_profile_revenue(profile_name, profile_id)
+        
+        capture["timed_out"] = watchdog.expired
+        if watchdog.expired:
+            capture["snapshot"] = None
+            capture["error"] = f"Scadenza di {deadline}s superata"
+            self._replace_driver(driver, "deadline", profile_name)
+        else:
+            reason = self.driver_recycler.check(driver)
+            if reason:
+                self._replace_driver(driver, reason, profile_name)
+        return capture
+    
+    def _replace_driver(self, driver, reason: str, profile_name: str):
+        """Chiude (o ha già terminato) il driver del worker e ne avvia uno nuovo"""
+        self.driver_recycler.record(driver, reason, profile_name)
+        self._forget_driver(driver)
+        self.driver = None
+        if reason != "deadline":
+            recycle_driver(driver)
+        logger.info(f"🔄 Avvio driver Chrome sostitutivo dopo {profile_name}...")
+        try:
+            self.setup_driver()
+        except Exception as e:
+            logger.error(f"Errore avvio driver sostitutivo: {e}")
+    
+    def _open_profile_page(self, profile_name: str, profile_id: str) -> bool:
+        """Apre la pagina del profilo per il fallback live dei prezzi; False se non disponibile"""
+        try:
+            if not self.driver:
+                self.setup_driver()
+            self.driver.get(f"https://it.vestiairecollective.com/profile/{profile_id}/")
+            if not self._handle_cloudflare_challenge(profile_name):
+                raise Exception("Verifica Cloudflare non superata")
+            time.sleep(3)
+            self._handle_cookie_banner()
+            return True
+        except Exception as e:
+            logger.warning(f"  ⚠️ Apertura profilo {profile_id} fallita: {e}")
+            return False
+    
+    def _live_price_fallback(self, profile_name: str, profile_id: str) -> List[float]:
+        """
+        Prezzi letti dal browser per uno snapshot senza prezzi. Gira nel thread principale
+        dopo i worker, quindi con la stessa scadenza profile_deadline e lo stesso riciclo
+        dei driver: una pagina bloccata non ferma l'esecuzione
+        """
+        deadline = self.retry_config.get("profile_deadline", 0)
+        if not self.driver:
+            try:
+                self.setup_driver()
+            except Exception as e:
+                logger.warning(f"  ⚠️ Fallback prezzi per {profile_name} non disponibile: {e}")
+                return []
+        driver = self.driver
+        prices = []
+        with DeadlineWatchdog(deadline, lambda: kill_driver(driver), label=f"{profile_name} (prezzi)") as watchdog:
+            # Il driver di questo thread non è sulla pagina del profilo catturato
+            if self._open_profile_page(profile_name, profile_id):
+                prices = self._extract_final_sale_prices(profile_name, profile_id)
+        
+        reason = "deadline" if watchdog.expired else self.driver_recycler.check(driver)
+        if reason:
+            # Nessun driver sostitutivo: il prossimo fallback (se serve) ne avvia uno
+            self.driver_recycler.record(driver, reason, profile_name)
+            self._forget_driver(driver)
+            self.driver = None
+            if reason != "deadline":
+                recycle_driver(driver)
+        if watchdog.expired:
+            logger.warning(f"  ⌛ Fallback prezzi per {profile_name} oltre {deadline}s: interrotto")
+            return []
+        return prices
+    
+    def close(self):
+        """Chiude il driver Chrome del thread corrente (usato dal fallback live dei prezzi)"""
+        driver = self.driver
+        if driver:
+            self._forget_driver(driver)
+            self.driver = None
+            recycle_driver(driver)
+    
+    def _capture_work_item(self, item: WorkItem, worker_id: str):
+        """Cattura di un profilo della coda: (cattura, fallita, ritentabile)"""
+        if item.attempts > 1:
+            time.sleep(self.retry_config.get("retry_delay", 2))
+        capture = self._capture_with_deadline(item.name, item.profile_id)
+        failed = bool(capture.get("error"))
+        if not failed:
+            self.profile_durations.record("revenue", item.name, capture.get("capture_time", 0.0))
+        retryable = not capture.get("timed_out") or self.retry_config.get("timeout_retry", True)
+        return capture, failed, retryable
+    
+    def _build_revenue_result(self, capture: Dict, parsed: Dict = None) -> ProfileResult:
+        """Combina cattura e parsing nel risultato del profilo (fallback live se mancano i prezzi)"""
+        profile_name = capture["name"]
+        profile_id = capture["profile_id"]
+        elapsed = capture.get("capture_time", 0.0) + (parsed or {}).get("parse_time", 0.0)
+        
+        try:
+            if capture.get("error"):
+                raise Exception(capture["error"])
+            if parsed is None:
+                raise Exception("Parsing dello snapshot non disponibile")
             
             # Cerca numero vendite reali
             real_sold_count = 0
@@ -1284,104 +1100,219 @@ class RevenueScraper:
                 real_sold_count = self.existing_sales_data[profile_name].get('sales', 0)
                 logger.info(f"  📊 Dati esistenti per {profile_name}: {real_sold_count} vendite")
             else:
-                # Usa il nuovo algoritmo di ricerca
-                real_sold_count = self._find_real_sold_count(profile_name)
-                
+                real_sold_count = parsed["sold_count"]
                 if real_sold_count > 0:
-                    logger.info(f"  ✅ Vendite reali trovate per {profile_name}: {real_sold_count}")
+                    logger.info(f"  ✅ Vendite reali trovate per {profile_name} ({parsed['sold_source']}): {real_sold_count}")
                 else:
                     logger.warning(f"  ⚠️ Vendite reali non trovate per {profile_name}, uso stima")
             
-            # Estrai prezzi di vendita finali
-            sold_items_prices = self._extract_final_sale_prices(profile_name)
-            
-            # Debug della struttura della pagina se non troviamo prezzi
-            if len(sold_items_prices) == 0:
-                self._debug_page_structure(profile_name)
-            
-            # Calcola ricavi
-            total_revenue = sum(sold_items_prices)
+            # Prezzi dallo snapshot; il percorso live (con navigazioni alternative)
+            # resta solo come fallback e richiede di nuovo il browser
+            result = ProfileResult(profile_name, profile_id, success=True, prices=parsed["prices"])
+            if result.prices:
+                logger.info(f"  💰 Trovati {len(result.prices)} prezzi di vendita finali unici per {profile_name}")
+            else:
+                fallback_start = time.time()
+                if self.command_tracer:
+                    self.command_tracer.begin_profile(profile_name)
+                try:
+                    result.prices.extend(self._live_price_fallback(profile_name, profile_id))
+                finally:
+                    if self.command_tracer:
+                        self.command_tracer.end_profile()
+                    elapsed += time.time() - fallback_start
             
             # Se non abbiamo numero reale, usa prezzi estratti
             if real_sold_count == 0:
-                real_sold_count = len(sold_items_prices)
+                real_sold_count = len(result.prices)
                 logger.warning(f"  ⚠️ Usando {real_sold_count} prezzi estratti come stima per {profile_name}")
             else:
-                logger.info(f"  📊 Vendite reali: {real_sold_count}, Prezzi estratti: {len(sold_items_prices)}")
+                logger.info(f"  📊 Vendite reali: {real_sold_count}, Prezzi estratti: {len(result.prices)}")
                 
                 # Se abbiamo più prezzi che vendite, prendi solo i primi N
-                if len(sold_items_prices) > real_sold_count:
-                    sold_items_prices = sold_items_prices[:real_sold_count]
-                    total_revenue = sum(sold_items_prices)
+                if len(result.prices) > real_sold_count:
+                    result.limit_prices(real_sold_count)
                     logger.info(f"  🔧 Limitato a {real_sold_count} prezzi per {profile_name}")
-                elif len(sold_items_prices) < real_sold_count:
-                    logger.warning(f"  ⚠️ Meno prezzi ({len(sold_items_prices)}) che vendite ({real_sold_count}) per {profile_name}")
+                elif len(result.prices) < real_sold_count:
+                    logger.warning(f"  ⚠️ Meno prezzi ({len(result.prices)}) che vendite ({real_sold_count}) per {profile_name}")
             
-            total_time = time.time() - start_time
+            self._record_profile_performance(profile_name, elapsed, capture["page_timing"])
             
-            return {
-                "name": profile_name,
-                "profile_id": profile_id,
-                "success": True,
-                "sold_items_count": real_sold_count,
-                "total_revenue": total_revenue,
-                "sold_items_prices": sold_items_prices,
-                "performance": {"total_time": total_time}
-            }
+            result.sold_items_count = real_sold_count
+            result.performance = {"total_time": elapsed}
+            if profile_name in self.diagnostic_snapshots:
+                result.performance["snapshot_ref"] = self.diagnostic_snapshots[profile_name]
+            return result
             
         except Exception as e:
-            logger.error(f"Errore scraping {profile_name}: {e}")
-            return {
-                "name": profile_name,
-                "profile_id": profile_id,
-                "success": False,
-                "error": str(e),
-                "sold_items_count": 0,
-                "total_revenue": 0.0,
-                "sold_items_prices": [],
-                "performance": {"total_time": time.time() - start_time}
-            }
+            if not capture.get("error"):
+                logger.error(f"Errore scraping {profile_name}: {e}")
+            self._record_profile_performance(profile_name, elapsed, capture["page_timing"])
+            return ProfileResult.failure(profile_name, profile_id, str(e), {"total_time": elapsed})
+    
+    def _record_profile_performance(self, profile_name: str, total_time: float, page_timing: Dict = None):
+        """Salva tempo, tempi reali della pagina e round trip WebDriver del profilo in performance_stats"""
+        command_stats = {"commands": 0, "time": 0.0}
+        if self.command_tracer:
+            command_stats = self.command_tracer.get_profile_stats(profile_name)
+        page_timing = page_timing or {}
+        timing_check = evaluate_page_timing(page_timing, total_time)
+        if timing_check["slow_connection"]:
+            logger.warning(f"  🐌 {profile_name}: caricamento browser lento ({timing_check['browser_load_time']:.2f}s)")
+        self.performance_stats["profile_times"][profile_name] = {
+            "total_time": total_time,
+            "webdriver_commands": command_stats["commands"],
+            "webdriver_time": command_stats["time"],
+            "page_timing": page_timing,
+            "rating": timing_check["rating"],
+            "slow_connection": timing_check["slow_connection"]
+        }
+    
+    def _log_webdriver_summary(self):
+        """Riporta i round trip WebDriver per profilo e metodo"""
+        if not self.command_tracer:
+            return
+        self.performance_stats["webdriver_commands"] = self.command_tracer.get_report()
+        logger.info("🔁 Round trip WebDriver per profilo:")
+        for line in format_webdriver_report(self.performance_stats["webdriver_commands"]):
+            logger.info(f"  {line}")
     
-    def scrape_all_profiles_revenue(self) -> List[Dict]:
-        """Scrapa tutti i profili"""
+    def _log_driver_recycling(self):
+        """Riporta i riavvii dei driver (pagine, memoria, scadenza) e il picco di RSS"""
+        summary = self.driver_recycler.get_summary()
+        self.performance_stats["driver_recycling"] = summary
+        if summary["recycles"] or summary["peak_rss_mb"]:
+            reasons = ", ".join(f"{reason}: {count}" for reason, count in summary["by_reason"].items()) or "nessuno"
+            logger.info(f"♻️ Riavvii driver: {summary['recycles']} ({reasons}), picco RSS Chrome {summary['peak_rss_mb']:.0f} MB")
+    
+    def _log_clearance(self):
+        """Riporta verifiche Cloudflare superate/evitate e scadenza della clearance"""
+        summary = self.clearance.get_summary()
+        self.performance_stats["clearance"] = summary
+        if summary["challenges_solved"] or summary["challenges_skipped"] or summary["injections"]:
+            logger.info(f"🛡️ Cloudflare: {summary['challenges_solved']} verifiche superate, "
+                        f"{summary['challenges_skipped']} evitate, {summary['injections']} iniezioni, "
+                        f"clearance valida per {summary['expires_in'] / 60:.0f} min")
+    
+    def _run_deep_diagnostics(self):
+        """In modalità diagnostica analizza offline gli snapshot salvati in questa esecuzione"""
+        if not self.diagnostic_snapshots:
+            return
+        if not deep_diagnostics_enabled():
+            logger.info(f"🔍 Snapshot di diagnostica salvati: {len(self.diagnostic_snapshots)} "
+                        f"(analisi con: python revenue_main.py diagnose)")
+            return
+        logger.info("🔍 Diagnostica approfondita degli snapshot di questa esecuzione...")
+        diagnose_snapshots(self.artifacts.directory, refs=list(self.diagnostic_snapshots.values()))
+    
+    def _save_selector_stats(self):
+        """Persiste le statistiche dei selettori e riporta quelli declassati"""
+        self.selector_stats.save()
+        for group, counts in self.selector_stats.get_summary().items():
+            if counts["demoted"]:
+                logger.info(f"  🎯 Selettori {group}: {counts['active']} attivi, {counts['demoted']} declassati")
+    
+    def scrape_all_profiles_revenue(self) -> List[ProfileResult]:
+        """
+        Scrapa tutti i profili: i worker browser catturano gli snapshot e passano
+        subito al profilo successivo, il parsing avviene nel pool di processi
+        """
         logger.info("Avvio scraping ricavi...")
         
-        try:
-            from config import OPTIMIZATION_CONFIG
-            max_workers = OPTIMIZATION_CONFIG.get("max_parallel_workers", 3)
-            
-            # Scraping parallelo
-            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = {
-                    executor.submit(self.scrape_profile_revenue, name, id): (name, id)
-                    for name, id in self.profiles.items()
-                }
+        # Profili in quarantena fuori dalla coda principale: solo quelli con la sonda
+        # dovuta vengono provati, una volta e a fine esecuzione
+        active, probes, skipped = self.profile_health.partition("revenue", self.profiles)
+        
+        with SnapshotParser() as parser:
+            captures = []
+            try:
+                from config import OPTIMIZATION_CONFIG
+                max_workers = OPTIMIZATION_CONFIG.get("max_parallel_workers", 3)
                 
-                results = []
-                for future in concurrent.futures.as_completed(futures):
-                    try:
-                        result = future.result()
-                        results.append(result)
-                    except Exception as e:
-                        name, id = futures[future]
-                        results.append({
-                            "name": name,
-                            "profile_id": id,
-                            "success": False,
-                            "error": str(e),
-                            "sold_items_count": 0,
-                            "total_revenue": 0.0,
-                            "sold_items_prices": [],
-                            "performance": {"total_time": 0}
-                        })
-            
-            return results
-            
+                # Coda condivisa: ogni worker (con il proprio Chrome) preleva il prossimo
+                # profilo appena libero; i profili più lenti partono per primi e quelli
+                # falliti passano a un altro worker
+                queue = ProfileWorkQueue(active, self.profile_durations.estimates("revenue"),
+                                         max_attempts=self.retry_config.get("max_retries", 3) + 1)
+                logger.info(f"📋 Ordine coda (LPT): {', '.join(queue.order())}")
+                
+                def on_capture(item: WorkItem, capture: Dict):
+                    if capture is None:
+                        capture = {"name": item.name, "profile_id": item.profile_id, "page_timing": {},
+                                   "snapshot": None, "error": "Cattura non riuscita", "capture_time": 0}
+                    captures.append(self._submit_parse(parser, capture))
+                
+                run_workers(queue, max_workers, self._capture_work_item, on_capture)
+                if queue.stats["requeued"]:
+                    logger.info(f"🔁 Profili riaccodati: {queue.stats['requeued']}")
+                
+                if probes:
+                    logger.info(f"🩺 Sonda dei profili in quarantena: {', '.join(probes)}")
+                    run_workers(ProfileWorkQueue(probes, max_attempts=1), 1, self._capture_work_item, on_capture)
+                
+            except Exception as e:
+                logger.error(f"Errore scraping parallelo: {e}")
+                # Fallback sequenziale sui profili non ancora catturati
+                done = {capture["name"] for capture, _ in captures}
+                for name, id in {**active, **probes}.items():
+                    if name not in done:
+                        captures.append(self._submit_parse(parser, self._capture_with_deadline(name, id)))
+            finally:
+                self.close_worker_drivers()
+            
+            # Ordine dei profili configurati, indipendente dall'ordine della coda
+            order = {name: i for i, name in enumerate(self.profiles)}
+            captures.sort(key=lambda entry: order.get(entry[0]["name"], len(order)))
+            try:
+                results = [self._build_revenue_result(capture, self._parse_result(capture, future))
+                           for capture, future in captures]
+            finally:
+                # Il fallback live dei prezzi apre un Chrome nel thread principale
+                # (o riusa quello dell'unico worker): va chiuso a fine esecuzione
+                if not self.keep_driver_open:
+                    self.close()
+        
+        for result in results:
+            if result.success:
+                self.profile_health.record_success("revenue", result.name, {
+                    "sold_items_count": result.sold_items_count, "total_revenue": result.total_revenue})
+            else:
+                self.profile_health.record_failure("revenue", result.name, result.error or "Scraping non riuscito")
+        # I profili sospesi restano fuori dal foglio ricavi, come quelli falliti
+        results.extend(ProfileResult.failure(name, profile_id, "Profilo in quarantena")
+                       for name, profile_id in skipped.items())
+        results.sort(key=lambda result: order.get(result.name, len(order)))
+        self.performance_stats["profile_health"] = self.profile_health.get_summary("revenue")
+        
+        self.navigation_memo.save()
+        self.profile_durations.save()
+        self.profile_health.save()
+        self.artifacts.flush()
+        self.performance_stats["failure_artifacts"] = self.artifacts.get_summary()
+        self._save_selector_stats()
+        if self.log_report:
+            self.log_performance_summary()
+        return results
+    
+    def log_performance_summary(self):
+        """Round trip WebDriver, riavvii driver, Cloudflare e diagnostica degli snapshot salvati"""
+        self._log_webdriver_summary()
+        self._log_driver_recycling()
+        self._log_clearance()
+        self._run_deep_diagnostics()
+    
+    @staticmethod
+    def _submit_parse(parser: SnapshotParser, capture: Dict):
+        """Accoda il parsing dello snapshot catturato (se presente)"""
+        future = parser.submit("revenue", capture["snapshot"]) if capture.get("snapshot") else None
+        return capture, future
+    
+    @staticmethod
+    def _parse_result(capture: Dict, future) -> Dict:
+        if future is None:
+            return None
+        try:
+            return future.result()
         except Exception as e:
-            logger.error(f"Errore scraping parallelo: {e}")
-            # Fallback sequenziale
-            results = []
-            for name, id in self.profiles.items():
-                result = self.scrape_profile_revenue(name, id)
-                results.append(result)
-            return results 
\ No newline at end of file
+            logger.error(f"Errore parsing snapshot {capture['name']}: {e}")
+            return None
@@ -20,6 +20,8 @@ except ImportError as e:
     logging.error(f"❌ Dipendenze Google API mancanti: {e}")
     logging.error("   Installa: pip install google-api-python-client google-auth google-auth-oauthlib")
 
+from perf_tracing import SHEETS_API_TRACER
+
 # Configurazione
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
 SPREADSHEET_ID = os.getenv('GOOGLE_SHEETS_SPREADSHEET_ID', 'your-spreadsheet-id-here')
@@ -29,11 +31,12 @@ logger = logging.getLogger(__name__)
 class RevenueSheetsUpdater:
     """Gestore aggiornamento Google Sheets per Revenue Analysis"""
     
-    def __init__(self):
+    def __init__(self, service=None):
         """Inizializza il gestore Google Sheets"""
-        self.service = None
+        self.service = SHEETS_API_TRACER.wrap(service)
         self.spreadsheet_id = SPREADSHEET_ID
-        self._authenticate()
+        if service is None:
+            self._authenticate()
     
     def _authenticate(self):
         """Autenticazione Google Sheets API"""
@@ -78,7 +81,7 @@ class RevenueSheetsUpdater:
                         return
             
             # Costruisci il servizio
-            self.service = build('sheets', 'v4', credentials=creds)
+            self.service = SHEETS_API_TRACER.wrap(build('sheets', 'v4', credentials=creds))
             logger.info("✅ Autenticazione Google Sheets riuscita")
             
         except Exception as e:
@@ -288,8 +291,11 @@ class RevenueSheetsUpdater:
         except Exception as e:
             logger.warning(f"⚠️ Errore formattazione colori: {e}")
     
-    def update_revenue_sheets(self, results: Dict) -> bool:
-        """Aggiorna Google Sheets con i risultati del revenue analysis"""
+    def update_revenue_sheets(self, results: Dict, run_date: datetime = None) -> bool:
+        """
+        Aggiorna Google Sheets con i risultati del revenue analysis
+        (nome profilo -> {'items_sold', 'revenue'}), alla data run_date (default: oggi)
+        """
         try:
             if not self.service:
                 logger.error("❌ Servizio Google Sheets non disponibile")
@@ -298,7 +304,8 @@ class RevenueSheetsUpdater:
             logger.info("📊 Aggiornamento Google Sheets...")
             
             # Determina il mese corrente
-            current_month = datetime.now().strftime("%Y-%m")
+            run_date = run_date or datetime.now()
+            current_month = run_date.strftime("%Y-%m")
             sheet_name = f"Revenue_{current_month}"
             
             # Controlla se la tab esiste, altrimenti creala
@@ -313,7 +320,7 @@ class RevenueSheetsUpdater:
                     return False
             
             # Prepara i dati per l'inserimento
-            today = datetime.now().strftime("%Y-%m-%d")
+            today = run_date.strftime("%Y-%m-%d")
             data_to_insert = []
             
             total_revenue = 0
@@ -13,8 +13,9 @@ import calendar
 from google.oauth2.service_account import Credentials
 from googleapiclient.discovery import build
 
-from config import VESTIAIRE_PROFILES as PROFILES
+from profile_registry import load_registry
 from revenue_scraper import RevenueScraper
+from perf_tracing import SHEETS_API_TRACER
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -46,11 +47,11 @@ def load_credentials() -> Dict:
 class RevenueSheetsUpdater:
     """Aggiornamento Google Sheets per ricavi"""
     
-    def __init__(self, credentials_json: str = None):
+    def __init__(self, credentials_json: str = None, service=None):
         self.spreadsheet_id = "1sWmvdbEgzLCyaNk5XRDHOFTA5KY1RGeMBIqouXvPJ34"
-        self.service = None
+        self.service = SHEETS_API_TRACER.wrap(service)
         
-        if credentials_json:
+        if credentials_json and service is None:
             self.setup_service(credentials_json)
     
     def setup_service(self, credentials_json: str):
@@ -63,7 +64,7 @@ class RevenueSheetsUpdater:
             
             scopes = ['https://www.googleapis.com/auth/spreadsheets']
             credentials = Credentials.from_service_account_info(credentials_dict, scopes=scopes)
-            self.service = build('sheets', 'v4', credentials=credentials)
+            self.service = SHEETS_API_TRACER.wrap(build('sheets', 'v4', credentials=credentials))
             
         except Exception as e:
             logger.error(f"Errore Google Sheets: {e}")
@@ -256,7 +257,7 @@ def main():
             pass
         
         # Inizializza scraper
-        scraper = RevenueScraper(profiles=PROFILES, existing_sales_data=existing_sales_data)
+        scraper = RevenueScraper(profiles=load_registry().profiles(), existing_sales_data=existing_sales_data)
         
         # Esegui scraping
         results = scraper.scrape_all_profiles_revenue()
@@ -282,6 +283,11 @@ def main():
         
     except Exception as e:
         logger.error(f"Errore sistema revenue: {e}")
+    finally:
+        # Report quota Google Sheets API di fine esecuzione
+        SHEETS_API_TRACER.log_summary()
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        SHEETS_API_TRACER.save_json(f'logs/sheets_api_revenue_{timestamp}.json')
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,206 @@
+"""
+Scrape Scheduler
+Pianificazione dello scraping per ritmo di cambiamento: dallo storico dell'archivio di
+debug (variazioni di vendite e stock tra esecuzioni) stima quanto cambia ogni profilo
+e distribuisce un budget giornaliero di richieste, più spesso sui profili attivi e meno
+su quelli fermi. Usato dalla modalità monitor al posto delle due esecuzioni fisse del cron.
+"""
+
+import os
+import json
+import math
+import time
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from config import SCHEDULER_CONFIG, get_state_path
+
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 86400
+
+
+def change_rate(history: List[Dict], min_observations: int = None) -> Optional[float]:
+    """
+    Cambiamenti all'ora di un profilo (|diff vendite| + |diff stock| tra esecuzioni
+    consecutive, diviso per le ore coperte). None se le osservazioni riuscite sono poche.
+    """
+    min_observations = min_observations or SCHEDULER_CONFIG["min_observations"]
+    points = []
+    for entry in history:
+        if entry.get("success") is False or entry.get("articles") is None or entry.get("sales") is None:
+            continue
+        try:
+            points.append((datetime.fromisoformat(entry["run"]), float(entry["articles"]), float(entry["sales"])))
+        except (KeyError, TypeError, ValueError):
+            continue
+    if len(points) < min_observations:
+        return None
+
+    points.sort()
+    hours = (points[-1][0] - points[0][0]).total_seconds() / 3600
+    if hours <= 0:
+        return None
+    changes = sum(abs(current[1] - previous[1]) + abs(current[2] - previous[2])
+                  for previous, current in zip(points, points[1:]))
+    return changes / hours
+
+
+def load_change_rates(registry, store=None, last_n: int = None) -> Dict[str, float]:
+    """Ritmo di cambiamento dei profili abilitati con storico sufficiente nell'archivio di debug"""
+    from debug_store import DebugStore
+
+    store = store or DebugStore()
+    last_n = last_n or SCHEDULER_CONFIG["history_runs"]
+    rates = {}
+    for entry in registry.enabled():
+        try:
+            rate = change_rate(store.profile_history(entry.name, last_n))
+        except Exception as e:
+            logger.warning(f"⚠️ Storico di {entry.name} non leggibile: {e}")
+            continue
+        if rate is not None:
+            rates[entry.name] = rate
+    return rates
+
+
+def plan_intervals(registry, rates: Dict[str, float], daily_budget: int) -> Dict[str, float]:
+    """
+    Intervallo di scraping (ore) per profilo abilitato. I profili senza storico usano
+    frequency_hours del registro; il resto del budget va agli altri in proporzione a
+    sqrt(ritmo) x (1 + priorità): la radice evita che i profili più attivi assorbano tutto.
+    """
+    low, high = SCHEDULER_CONFIG["min_interval_hours"], SCHEDULER_CONFIG["max_interval_hours"]
+    intervals = {}
+    weights = {}
+    for entry in registry.enabled():
+        if entry.name in rates:
+            weights[entry.name] = (math.sqrt(rates[entry.name] + SCHEDULER_CONFIG["rate_floor"])
+                                   * (1 + max(entry.priority, 0)))
+        else:
+            intervals[entry.name] = min(max(entry.frequency_hours, low), high)
+
+    remaining = max(daily_budget - sum(24 / hours for hours in intervals.values()), 0)
+    total_weight = sum(weights.values())
+    for name, weight in weights.items():
+        per_day = remaining * weight / total_weight if total_weight else 0
+        intervals[name] = min(max(24 / per_day, low), high) if per_day else high
+    return intervals
+
+
+class ScrapeScheduler:
+    """
+    Decide quali profili scrapare ora: quelli il cui intervallo è trascorso, i più in
+    ritardo (rispetto al proprio intervallo) e a parità i più prioritari per primi, senza
+    superare il budget di richieste delle ultime 24 ore.
+    """
+
+    def __init__(self, registry, rates: Dict[str, float] = None, path: str = None, daily_budget: int = None):
+        self.registry = registry
+        self.rates = rates or {}
+        self.path = path or get_state_path("schedule_file")
+        self.daily_budget = daily_budget or SCHEDULER_CONFIG["daily_budget"] or 2 * len(registry.enabled())
+        self.intervals = plan_intervals(registry, self.rates, self.daily_budget)
+        state = self._load()
+        self.last_scraped: Dict[str, float] = state.get("last_scraped", {})
+        self.requests: List[float] = state.get("requests", [])
+        # Ultimo aggiornamento completo del foglio (formattazione e Overview) del monitor
+        self.sheet_refreshed_at: float = state.get("sheet_refreshed_at", 0)
+
+    def _load(self) -> Dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ Stato dello scheduler non leggibile, riparto da zero: {e}")
+            return {}
+
+    def save(self):
+        """Scrive ultimo scraping per profilo, richieste delle ultime 24 ore e ultimo aggiornamento completo"""
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({"last_scraped": self.last_scraped, "requests": self.requests,
+                           "sheet_refreshed_at": self.sheet_refreshed_at}, f, indent=2)
+            os.replace(self.path + ".tmp", self.path)
+        except Exception as e:
+            logger.warning(f"⚠️ Impossibile salvare lo stato dello scheduler: {e}")
+
+    def remaining_budget(self, now: float = None) -> int:
+        now = now or time.time()
+        self.requests = [when for when in self.requests if now - when < DAY_SECONDS]
+        return max(self.daily_budget - len(self.requests), 0)
+
+    def due(self, now: float = None, limit: int = None) -> List[str]:
+        """Profili da scrapare ora, i più in ritardo per primi (mai scrapati: subito)"""
+        now = now or time.time()
+        candidates = []
+        for entry in self.registry.enabled():
+            interval = self.intervals[entry.name] * 3600
+            last = self.last_scraped.get(entry.name)
+            lateness = float("inf") if last is None else (now - last) / interval
+            if lateness >= 1:
+                candidates.append((-lateness, -entry.priority, entry.name))
+        candidates.sort()
+        allowed = self.remaining_budget(now)
+        if limit:
+            allowed = min(allowed, limit)
+        if len(candidates) > allowed:
+            logger.info(f"💰 Budget: {len(candidates)} profili dovuti, {allowed} scrapati ora")
+        return [name for _, _, name in candidates[:allowed]]
+
+    def record(self, names: List[str], now: float = None):
+        """Registra lo scraping dei profili (una richiesta ciascuno)"""
+        now = now or time.time()
+        for name in names:
+            self.last_scraped[name] = now
+            self.requests.append(now)
+
+    def next_due_in(self, now: float = None) -> float:
+        """Secondi al prossimo profilo dovuto (o alla prossima richiesta di budget libera)"""
+        now = now or time.time()
+        waits = [max(self.last_scraped[entry.name] + self.intervals[entry.name] * 3600 - now, 0)
+                 if entry.name in self.last_scraped else 0
+                 for entry in self.registry.enabled()]
+        wait = min(waits) if waits else SCHEDULER_CONFIG["max_sleep_seconds"]
+        if not self.remaining_budget(now) and self.requests:
+            wait = max(wait, min(self.requests) + DAY_SECONDS - now)
+        return wait
+
+    def refresh_due(self, now: float = None) -> bool:
+        """True se dall'ultimo aggiornamento completo del foglio è passato uno degli orari di sheet_refresh_times"""
+        current = datetime.fromtimestamp(now or time.time())
+        slots = []
+        for text in SCHEDULER_CONFIG["sheet_refresh_times"]:
+            hour, minute = map(int, text.split(":"))
+            slot = current.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            slots.append(slot if slot <= current else slot - timedelta(days=1))
+        return max(slots).timestamp() > self.sheet_refreshed_at
+
+    def get_summary(self) -> Dict:
+        intervals = sorted(self.intervals.items(), key=lambda item: item[1])
+        return {
+            "profiles": len(self.intervals),
+            "with_history": len(self.rates),
+            "daily_budget": self.daily_budget,
+            "planned_per_day": round(sum(24 / hours for hours in self.intervals.values()), 1),
+            "fastest": intervals[:3],
+            "slowest": intervals[-3:],
+        }
+
+
+if __name__ == "__main__":
+    # python scrape_scheduler.py -> intervallo pianificato e ritmo di cambiamento per profilo
+    from profile_registry import load_registry
+
+    registry = load_registry()
+    scheduler = ScrapeScheduler(registry, load_change_rates(registry))
+    summary = scheduler.get_summary()
+    print(f"Budget giornaliero: {summary['daily_budget']} scraping, pianificati {summary['planned_per_day']}")
+    for name, hours in sorted(scheduler.intervals.items(), key=lambda item: item[1]):
+        rate = scheduler.rates.get(name)
+        rate_text = f"{rate:.2f} cambiamenti/ora" if rate is not None else "senza storico"
+        print(f"  {name}: ogni {hours:.1f}h ({rate_text})")
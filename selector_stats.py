@@ -0,0 +1,116 @@
+"""
+Selector Stats
+Statistiche hit/miss dei selettori XPath persistite tra le esecuzioni
+"""
+
+import os
+import json
+import threading
+import logging
+from typing import Dict, List, Tuple
+
+from config import STATE_CONFIG, get_state_path
+from state_file import update_json
+
+logger = logging.getLogger(__name__)
+
+
+class SelectorStats:
+    """
+    Conta per ogni gruppo di selettori quante volte ciascuno ha trovato elementi.
+    I selettori senza hit nelle ultime `window` osservazioni vengono declassati:
+    si provano solo quando quelli attivi non bastano (percorso di riscoperta) o a
+    campione ogni `sample_every` ricerche del gruppo, e tornano attivi appena trovano
+    di nuovo qualcosa.
+    """
+
+    def __init__(self, path: str = None, window: int = None, sample_every: int = None):
+        self.path = path or get_state_path("selector_stats_file")
+        self.window = window or STATE_CONFIG["selector_window"]
+        self.sample_every = sample_every or STATE_CONFIG["selector_sample_every"]
+        self._lock = threading.Lock()
+        # Ricerche per gruppo in cui i declassati non servivano (campionamento, solo in memoria)
+        self._skipped: Dict[str, int] = {}
+        # Osservazioni di questo processo non ancora salvate: (gruppo, selettore) -> [1/0, ...]
+        self._pending: Dict[Tuple[str, str], List[int]] = {}
+        self.groups: Dict[str, Dict[str, Dict]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Dict]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ Statistiche selettori non leggibili, riparto da zero: {e}")
+            return {}
+
+    def save(self):
+        """
+        Somma le osservazioni di questo processo alle statistiche su disco (che possono
+        contenere quelle di altri worker) e riparte dal risultato
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        def merge(disk: Dict) -> Dict:
+            for (group, selector), observations in pending.items():
+                self._apply(disk, group, selector, observations)
+            return disk
+
+        try:
+            merged = update_json(self.path, merge)
+        except Exception as e:
+            logger.warning(f"⚠️ Impossibile salvare le statistiche selettori: {e}")
+            with self._lock:
+                for key, observations in pending.items():
+                    self._pending[key] = observations + self._pending.get(key, [])
+            return
+        with self._lock:
+            # Le osservazioni arrivate durante il salvataggio restano in sospeso e si sommano al disco
+            for (group, selector), observations in self._pending.items():
+                self._apply(merged, group, selector, observations)
+            self.groups = merged
+
+    def _apply(self, groups: Dict, group: str, selector: str, observations: List[int]):
+        stats = groups.setdefault(group, {}).setdefault(selector, {"hits": 0, "misses": 0, "recent": []})
+        stats["hits"] += sum(observations)
+        stats["misses"] += len(observations) - sum(observations)
+        stats["recent"] = (stats["recent"] + observations)[-self.window:]
+
+    def record(self, group: str, selector: str, hit: bool):
+        """Registra l'esito di un find_elements"""
+        with self._lock:
+            self._apply(self.groups, group, selector, [1 if hit else 0])
+            self._pending.setdefault((group, selector), []).append(1 if hit else 0)
+
+    def is_demoted(self, group: str, selector: str) -> bool:
+        with self._lock:
+            recent = self.groups.get(group, {}).get(selector, {}).get("recent", [])
+        return len(recent) >= self.window and not any(recent)
+
+    def sample_due(self, group: str) -> bool:
+        """True una volta ogni sample_every chiamate per il gruppo: riscoperta a campione"""
+        with self._lock:
+            self._skipped[group] = self._skipped.get(group, 0) + 1
+            if self._skipped[group] < self.sample_every:
+                return False
+            self._skipped[group] = 0
+            return True
+
+    def split(self, group: str, selectors: List[str]) -> Tuple[List[str], List[str]]:
+        """Divide i selettori in attivi e declassati, mantenendo l'ordine originale"""
+        fast, slow = [], []
+        for selector in selectors:
+            (slow if self.is_demoted(group, selector) else fast).append(selector)
+        return fast, slow
+
+    def get_summary(self) -> Dict[str, Dict[str, int]]:
+        """Selettori attivi/declassati per gruppo"""
+        summary = {}
+        with self._lock:
+            groups = {group: list(selectors) for group, selectors in self.groups.items()}
+        for group, selectors in groups.items():
+            demoted = sum(1 for selector in selectors if self.is_demoted(group, selector))
+            summary[group] = {"active": len(selectors) - demoted, "demoted": demoted}
+        return summary
@@ -0,0 +1,148 @@
+"""
+Shard Runs
+Esecuzioni divise su più macchine o job: ogni shard (--shard i/N) elabora un
+sottoinsieme deterministico dei profili del registro e scrive un file di risultati
+parziali; merge-shards li riunisce per un solo aggiornamento di Google Sheets.
+"""
+
+import os
+import json
+import time
+import zlib
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from config import SHARD_CONFIG
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """'i/N' -> (i, N) con 1 <= i <= N"""
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Shard non valido '{spec}': atteso i/N (es. 2/4)")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Shard non valido '{spec}': i deve essere tra 1 e N")
+    return index, count
+
+
+def shard_of(shard_key: str, count: int) -> int:
+    """Shard (1..count) di una chiave: CRC32, stabile tra processi e macchine"""
+    return zlib.crc32(shard_key.encode("utf-8")) % count + 1
+
+
+def select_shard(registry, index: int, count: int) -> Dict[str, str]:
+    """Profili abilitati del registro assegnati allo shard index di count"""
+    return {entry.name: entry.profile_id for entry in registry.enabled()
+            if shard_of(entry.shard_key, count) == index}
+
+
+def get_shard_dir(directory: str = None) -> str:
+    directory = directory or SHARD_CONFIG["directory"]
+    return directory if os.path.isabs(directory) else os.path.join(PROJECT_ROOT, directory)
+
+
+def partial_path(kind: str, run_date: str, index: int, count: int, directory: str = None) -> str:
+    """File parziale di uno shard: <kind>_<YYYY-MM-DD>_<i>of<N>.json"""
+    return os.path.join(get_shard_dir(directory), f"{kind}_{run_date}_{index}of{count}.json")
+
+
+def write_partial(kind: str, index: int, count: int, profiles: Dict[str, str], results: List[Dict],
+                  run_date: datetime = None, directory: str = None) -> Optional[str]:
+    """
+    Scrive i risultati di uno shard (scrittura atomica) e restituisce il percorso.
+    Il file riporta anche i profili assegnati, per riconoscere uno shard incompleto.
+    """
+    run_date = run_date or datetime.now()
+    path = partial_path(kind, run_date.strftime("%Y-%m-%d"), index, count, directory)
+    data = {
+        "kind": kind,
+        "shard": index,
+        "shards": count,
+        "run_date": run_date.isoformat(timespec="seconds"),
+        "written_at": datetime.now().isoformat(timespec="seconds"),
+        "profiles": list(profiles),
+        "results": results,
+    }
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, default=str)
+        os.replace(path + ".tmp", path)
+        logger.info(f"🧩 Shard {index}/{count}: {len(results)} risultati scritti in {path}")
+        _cleanup(os.path.dirname(path))
+        return path
+    except Exception as e:
+        logger.error(f"❌ Impossibile scrivere i risultati dello shard {index}/{count}: {e}")
+        return None
+
+
+def _cleanup(directory: str):
+    """Elimina i file parziali più vecchi di retention_days"""
+    cutoff = time.time() - SHARD_CONFIG["retention_days"] * 86400
+    for filename in os.listdir(directory):
+        path = os.path.join(directory, filename)
+        if filename.endswith(".json") and os.path.getmtime(path) < cutoff:
+            os.remove(path)
+
+
+def load_partials(kind: str, run_date: str = None, directory: str = None) -> Dict:
+    """
+    Riunisce i file parziali di una data (default: la più recente presente).
+    Restituisce results (senza duplicati), run_date, shards, found, missing e
+    missing_profiles (profili assegnati a uno shard ma senza risultato).
+    """
+    directory = get_shard_dir(directory)
+    prefix = f"{kind}_"
+    files = sorted(filename for filename in os.listdir(directory)
+                   if filename.startswith(prefix) and filename.endswith(".json")) if os.path.isdir(directory) else []
+    if run_date is None and files:
+        run_date = files[-1][len(prefix):len(prefix) + 10]
+    files = [filename for filename in files if filename.startswith(f"{prefix}{run_date}_")]
+
+    partials = []
+    for filename in files:
+        with open(os.path.join(directory, filename), "r", encoding="utf-8") as f:
+            partials.append(json.load(f))
+    counts = {partial["shards"] for partial in partials}
+    if len(counts) > 1:
+        raise ValueError(f"File parziali del {run_date} con numero di shard diverso: {sorted(counts)}")
+    count = counts.pop() if counts else 0
+
+    results: Dict[str, Dict] = {}
+    assigned = []
+    found = []
+    for partial in sorted(partials, key=lambda partial: partial["shard"]):
+        found.append(partial["shard"])
+        assigned.extend(partial["profiles"])
+        for result in partial["results"]:
+            results[result.get("name", "Unknown")] = result
+
+    return {
+        "run_date": partials[0]["run_date"] if partials else None,
+        "shards": count,
+        "found": found,
+        "missing": [index for index in range(1, count + 1) if index not in found],
+        "missing_profiles": [name for name in assigned if name not in results],
+        "results": list(results.values()),
+    }
+
+
+def merge_report(merged: Dict, kind: str) -> bool:
+    """Log del merge; False se mancano shard o non ci sono risultati"""
+    if not merged["found"]:
+        logger.error(f"❌ Nessun file parziale '{kind}' in {get_shard_dir()}")
+        return False
+    logger.info(f"🧩 Merge {kind} del {merged['run_date'][:10]}: shard {merged['found']} di {merged['shards']}, "
+                f"{len(merged['results'])} profili")
+    if merged["missing_profiles"]:
+        logger.warning(f"⚠️ Profili senza risultato: {', '.join(merged['missing_profiles'])}")
+    if merged["missing"]:
+        logger.error(f"❌ Shard mancanti: {merged['missing']}")
+        return False
+    return True
@@ -0,0 +1,92 @@
+"""
+Snapshot Parser
+Stage di parsing degli snapshot su ProcessPoolExecutor, separato dal controllo del browser
+"""
+
+import os
+import time
+import logging
+import concurrent.futures
+from typing import Dict, Optional
+
+from config import OPTIMIZATION_CONFIG
+from page_snapshot import PageSnapshot, extract_sold_count, extract_sale_prices, extract_profile_counts
+
+logger = logging.getLogger(__name__)
+
+
+def parse_revenue_snapshot(snapshot: PageSnapshot) -> Dict:
+    """Vendite reali e prezzi finali di un profilo dallo snapshot della sezione venduti"""
+    start = time.perf_counter()
+    sold = extract_sold_count(snapshot)
+    prices = extract_sale_prices(snapshot)
+    return {"sold_count": sold["count"], "sold_source": sold["source"], "prices": prices,
+            "parse_time": time.perf_counter() - start}
+
+
+def parse_profile_snapshot(snapshot: PageSnapshot) -> Dict:
+    """Articoli e vendite dalla pagina profilo"""
+    start = time.perf_counter()
+    counts = extract_profile_counts(snapshot)
+    counts["parse_time"] = time.perf_counter() - start
+    return counts
+
+
+PARSERS = {
+    "revenue": parse_revenue_snapshot,
+    "profile": parse_profile_snapshot,
+}
+
+
+def _run_parser(kind: str, snapshot_data: Dict) -> Dict:
+    # Eseguita nel processo worker: riceve un dict per non serializzare l'albero lxml
+    return PARSERS[kind](PageSnapshot.from_dict(snapshot_data))
+
+
+class SnapshotParser:
+    """
+    Riceve snapshot dai worker browser e ne restituisce il parsing come Future.
+    Con parse_workers = 0 (o se i processi non sono disponibili) il parsing
+    avviene nel thread chiamante e il Future è già completato.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        if max_workers is None:
+            max_workers = OPTIMIZATION_CONFIG.get("parse_workers")
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        self.max_workers = max_workers
+        self._executor = None
+        if max_workers > 0:
+            try:
+                self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+            except (OSError, NotImplementedError) as e:
+                logger.warning(f"⚠️ Pool di processi non disponibile, parsing nel thread corrente: {e}")
+
+    def submit(self, kind: str, snapshot: PageSnapshot) -> concurrent.futures.Future:
+        """Accoda il parsing di uno snapshot ("revenue" o "profile")"""
+        if self._executor is not None:
+            try:
+                return self._executor.submit(_run_parser, kind, snapshot.to_dict())
+            except RuntimeError as e:
+                # Pool rotto (es. worker terminato): si prosegue in linea
+                logger.warning(f"⚠️ Pool di parsing non disponibile: {e}")
+                self._executor = None
+
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(PARSERS[kind](snapshot))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
@@ -15,7 +15,8 @@ DEBUG_CONFIG = {
     'validate_data_quality': True,
     'compare_with_previous': True,
     'log_network_requests': True,
-    'track_memory_usage': False,
+    'track_memory_usage': True,  # RSS di Chrome per il riciclo dei driver (config.py driver_recycling)
+    'deep_diagnostics': False,   # Analisi della struttura delle pagine fallite a fine esecuzione (o env DEEP_DIAGNOSTICS=true)
     'enable_profiling': False
 }
 
@@ -27,7 +28,10 @@ LOG_CONFIG = {
     'backup_count': 5,
     'console_output': True,
     'file_output': True,
-    'github_actions_output': True
+    'github_actions_output': True,
+    # Campionamento dei messaggi dei cicli interni (extra=sampled("chiave") in log_setup.py):
+    # per chiave i primi 'burst' record ogni 'window' secondi, poi uno ogni 'every'
+    'sampling': {'burst': 5, 'every': 50, 'window': 60}
 }
 
 # Soglie di performance per alerting
@@ -39,6 +43,14 @@ PERFORMANCE_THRESHOLDS = {
     'network_timeout': 30.0    # secondi
 }
 
+# Storico performance tra esecuzioni (percorsi relativi alla root del progetto)
+PERFORMANCE_HISTORY = {
+    'history_file': 'performance_history.jsonl',  # una riga JSON per esecuzione
+    'max_runs': 500,           # esecuzioni conservate nello storico
+    'baseline_runs': 30,       # esecuzioni usate per p50/p95
+    'regression_factor': 1.5   # avviso se l'ultima esecuzione supera p95 storico di questo fattore
+}
+
 # Configurazione per validazione dati
 DATA_VALIDATION = {
     'min_articles_per_profile': 0,
@@ -60,6 +72,25 @@ DEBUG_PATHS = {
     'validation_dir': 'logs/validation'
 }
 
+# Archivio dei dati di debug dello scraping (debug_store.py): JSONL compresso per mese con indice
+DEBUG_STORE = {
+    'directory': DEBUG_PATHS['debug_data_dir'],  # relativa alla root del progetto
+    'retention_months': 6,          # partizioni mensili più vecchie eliminate
+    'max_total_mb': 100,            # oltre questo spazio vengono eliminate le partizioni più vecchie
+    'compress_level': 6,
+    'index_fields': ['articles', 'sales', 'success'],  # valori per profilo leggibili dal solo indice
+}
+
+# Artefatti dei profili falliti (screenshot e HTML), scritti in background da failure_artifacts.py
+FAILURE_ARTIFACTS = {
+    'directory': 'logs/artifacts',  # relativa alla root del progetto, caricata con i logs del workflow
+    'max_total_mb': 50,             # oltre questo spazio vengono eliminati gli artefatti più vecchi
+    'max_files': 200,
+    'screenshot_max_width': 800,    # pixel (ridimensionamento solo con Pillow installato)
+    'html_compress_level': 6,       # gzip
+    'queue_size': 32                # artefatti in attesa; oltre vengono scartati invece di bloccare
+}
+
 def get_debug_filename(prefix: str, extension: str = 'log') -> str:
     """Genera un nome file di debug con timestamp"""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -87,6 +118,10 @@ def should_save_debug_data() -> bool:
         os.environ.get('SAVE_DEBUG_DATA', 'true').lower() == 'true'
     )
 
+def deep_diagnostics_enabled() -> bool:
+    """Modalità diagnostica: analisi offline degli snapshot dei profili falliti a fine esecuzione"""
+    return DEBUG_CONFIG['deep_diagnostics'] or os.environ.get('DEEP_DIAGNOSTICS', 'false').lower() == 'true'
+
 # Messaggi di debug formattati
 DEBUG_MESSAGES = {
     'start': "🚀 AVVIO VESTIAIRE MONITOR",
@@ -6,11 +6,12 @@ Aggiornato con debugging avanzato e sistema di performance monitoring
 
 import sys
 import os
+import atexit
 import logging
 import time
 from datetime import datetime
 import traceback
-from typing import List, Dict
+from typing import List, Dict, Tuple
 import json
 
 # Aggiungi il percorso corrente al PYTHONPATH
@@ -19,65 +20,30 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from scraper import VestiaireScraper
 from sheets_updater import GoogleSheetsUpdater
 from credentials_test import CredentialsTest
+from perf_history import build_run_record, append_run, load_history, check_regressions, format_history_report
 
 # Import configurazione dalla root directory
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import VESTIAIRE_PROFILES as PROFILES, PERFORMANCE_CONFIG
+from config import PERFORMANCE_CONFIG, SCHEDULER_CONFIG
+from profile_registry import load_registry
+from shard_runs import parse_shard, select_shard, write_partial, load_partials, merge_report
+from durable_queue import DurableWorkQueue, run_worker, coordinate, spawn_local_workers, stop_local_workers
+from work_queue import ProfileDurations
+from scrape_scheduler import ScrapeScheduler, load_change_rates
+from perf_tracing import SHEETS_API_TRACER
+from log_setup import configure_logging
+from debug_store import DebugStore
+from debug_config import should_save_debug_data
 
-# Configurazione logging migliorata
+# Configurazione logging: coda non bloccante, console e file JSON a rotazione in logs/
 def setup_logging():
-    """Configura il logging con file e console"""
-    # Crea le directory logs se non esistono
-    os.makedirs('logs', exist_ok=True)
-    os.makedirs('../logs', exist_ok=True)  # Per GitHub Actions
-    
-    # Nome file con timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_filename = f'logs/vestiaire_monitor_{timestamp}.log'
-    
-    # Configurazione logger
-    logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
-    
-    # Rimuovi handler esistenti
-    for handler in logger.handlers[:]:
-        logger.removeHandler(handler)
-    
-    # Formatter dettagliato
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    
-    # Handler per file in src/logs/
-    file_handler = logging.FileHandler(log_filename, encoding='utf-8')
-    file_handler.setLevel(logging.INFO)
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
-    
-    # Handler per console
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-    
-    # Log nella root directory per GitHub Actions
-    try:
-        root_log = '../vestiaire_monitor.log'
-        root_handler = logging.FileHandler(root_log, encoding='utf-8')
-        root_handler.setLevel(logging.INFO)
-        root_handler.setFormatter(formatter)
-        logger.addHandler(root_handler)
-    except:
-        # Se fallisce, prova nella directory corrente
-        root_log = 'vestiaire_monitor.log'
-        root_handler = logging.FileHandler(root_log, encoding='utf-8')
-        root_handler.setLevel(logging.INFO)
-        root_handler.setFormatter(formatter)
-        logger.addHandler(root_handler)
-    
-    return logger
+    """Configura il logging con file e console (scritti dal thread del QueueListener)"""
+    configure_logging("vestiaire_monitor")
+    return logging.getLogger(__name__)
 
-logger = setup_logging()
+# Handler configurati solo all'avvio da riga di comando: importare il modulo (es. nei test)
+# non crea file in logs/ e non sostituisce gli handler di chi lo importa
+logger = logging.getLogger(__name__)
 
 def load_credentials() -> Dict:
     """Carica le credenziali Google Sheets automaticamente"""
@@ -117,31 +83,86 @@ def load_credentials() -> Dict:
         logger.error(f"❌ Errore nel caricamento delle credenziali: {e}")
         return {}
 
-def save_debug_data(data: Dict, filename: str):
-    """Salva dati di debug in formato JSON"""
+def save_debug_data(scraped_data: List[Dict], total_profiles: int):
+    """Aggiunge i dati dell'esecuzione all'archivio di debug (JSONL compresso per mese con indice)"""
+    if not should_save_debug_data():
+        return
+    DebugStore().append_run(scraped_data or [], meta={
+        'total_profiles': total_profiles,
+        'scraped_profiles': len(scraped_data) if scraped_data else 0,
+    })
+
+def debug_history(profile: str, last_n: int = 60) -> bool:
+    """Articoli e vendite di un profilo nelle ultime esecuzioni, dall'indice dell'archivio di debug"""
+    history = DebugStore().profile_history(profile, last_n)
+    if not history:
+        logger.warning(f"⚠️ Nessuna esecuzione di {profile} nell'archivio di debug")
+        return False
+    logger.info(f"📜 {profile}: ultime {len(history)} esecuzioni")
+    for row in history:
+        status = "✅" if row.get('success', True) else "❌"
+        logger.info(f"   {status} {row['run']}: {row.get('articles', '-')} articoli, {row.get('sales', '-')} vendite")
+    return True
+
+def report_sheets_api_usage(command: str):
+    """Report di fine esecuzione delle chiamate Google Sheets API (quota per comando e funzione)"""
+    if not SHEETS_API_TRACER.records:
+        return
+    SHEETS_API_TRACER.log_summary()
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    SHEETS_API_TRACER.save_json(f'logs/sheets_api_{command}_{timestamp}.json')
+
+def perf_report(gate: bool = False) -> bool:
+    """Mostra i trend p50/p95 dallo storico performance; con gate fallisce se l'ultima esecuzione regredisce"""
+    runs = load_history()
+    if not runs:
+        logger.warning("⚠️ Nessuna esecuzione nello storico performance")
+        return not gate
+
+    logger.info("📈 TREND PERFORMANCE (p50/p95)")
+    for line in format_history_report(runs):
+        logger.info(f"   {line}")
+
+    result = check_regressions(runs)
+    for warning in result["warnings"]:
+        logger.warning(f"⚠️ {warning}")
+    for failure in result["failures"]:
+        logger.error(f"❌ {failure}")
+
+    if gate and result["failures"]:
+        logger.error("❌ Ultima esecuzione oltre le soglie PERFORMANCE_THRESHOLDS")
+        return False
+    return True
+
+def connect_sheets():
+    """Updater Google Sheets con le credenziali dell'ambiente, o None se non disponibile"""
+    # Verifica credenziali
+    credentials_json = os.environ.get('GOOGLE_SHEETS_CREDENTIALS')
+    if not credentials_json:
+        logger.error("❌ Credenziali Google Sheets non trovate")
+        return None
+    
+    logger.info("✅ Credenziali Google Sheets trovate")
+    
+    # Test connessione Google Sheets
+    logger.info("🔍 Test connessione Google Sheets...")
     try:
-        os.makedirs('logs', exist_ok=True)
-        os.makedirs('../logs', exist_ok=True)  # Per GitHub Actions
-        
-        # Salva in src/logs/
-        filepath = f'logs/{filename}'
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        
-        # Salva anche nella root per GitHub Actions
-        try:
-            root_filepath = f'../{filename}'
-            with open(root_filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            logger.info(f"📝 Dati di debug salvati in {filepath} e {root_filepath}")
-        except:
-            logger.info(f"📝 Dati di debug salvati in {filepath}")
-            
+        updater = GoogleSheetsUpdater(credentials_json)
+        if not updater.service:
+            logger.error("❌ Impossibile configurare il servizio Google Sheets")
+            return None
+        logger.info("✅ Connessione Google Sheets OK")
+        return updater
     except Exception as e:
-        logger.error(f"❌ Errore nel salvataggio debug: {e}")
+        logger.error(f"❌ Errore nella connessione Google Sheets: {e}")
+        return None
 
-def main():
-    """Funzione principale per esecuzione normale del monitoraggio"""
+def main(shard: Tuple[int, int] = None):
+    """
+    Funzione principale per esecuzione normale del monitoraggio.
+    Con shard=(i, N) elabora solo i profili dello shard e scrive i risultati parziali
+    senza aggiornare Google Sheets (vedi merge_shards).
+    """
     try:
         logger.info("🚀 AVVIO VESTIAIRE MONITOR")
         logger.info("=" * 50)
@@ -149,44 +170,38 @@ def main():
         # Esecuzione normale
         logger.info("🔧 Controllo configurazione ambiente...")
         
-        # Verifica credenziali
-        credentials_json = os.environ.get('GOOGLE_SHEETS_CREDENTIALS')
-        if not credentials_json:
-            logger.error("❌ Credenziali Google Sheets non trovate")
-            return False
-        
-        logger.info("✅ Credenziali Google Sheets trovate")
-        
-        # Test connessione Google Sheets
-        logger.info("🔍 Test connessione Google Sheets...")
-        try:
-            updater = GoogleSheetsUpdater(credentials_json)
-            if not updater.service:
-                logger.error("❌ Impossibile configurare il servizio Google Sheets")
+        # Gli shard non aggiornano il foglio: le credenziali servono solo al merge
+        updater = None
+        if shard is None:
+            updater = connect_sheets()
+            if updater is None:
                 return False
-            logger.info("✅ Connessione Google Sheets OK")
-        except Exception as e:
-            logger.error(f"❌ Errore nella connessione Google Sheets: {e}")
-            return False
         
         # Inizializza scraper con la configurazione corretta
         logger.info("🔍 Inizializzazione scraper...")
-        scraper = VestiaireScraper(profiles=PROFILES)
+        registry = load_registry()
+        profiles = registry.profiles() if shard is None else select_shard(registry, *shard)
+        run_date = datetime.now()
+        if shard is not None:
+            logger.info(f"🧩 Shard {shard[0]}/{shard[1]}: {len(profiles)} profili su {len(registry.enabled())}")
+            if not profiles:
+                # Shard vuoto: il file parziale serve comunque al merge
+                return write_partial("daily", *shard, profiles, [], run_date) is not None
+        scraper = VestiaireScraper(profiles=profiles)
         
         # Scraping dei dati
         logger.info("📡 Avvio scraping dei profili...")
-        logger.info(f"📋 Profili da processare: {len(PROFILES)}")
+        logger.info(f"📋 Profili da processare: {len(profiles)} (registro: {registry.source})")
         
         scraped_data = scraper.scrape_all_profiles()
         
         # Salva dati di debug
-        debug_data = {
-            'timestamp': datetime.now().isoformat(),
-            'total_profiles': len(PROFILES),
-            'scraped_profiles': len(scraped_data) if scraped_data else 0,
-            'scraped_data': scraped_data if scraped_data else []
-        }
-        save_debug_data(debug_data, f'scraping_debug_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json')
+        save_debug_data(scraped_data, len(profiles))
+        
+        if shard is not None:
+            append_run(build_run_record(scraper.get_performance_stats(), scraped_data or [],
+                                        command=f"shard {shard[0]}/{shard[1]}"))
+            return write_partial("daily", *shard, profiles, scraped_data or [], run_date) is not None
         
         if not scraped_data:
             logger.error("❌ Nessun dato recuperato dallo scraping")
@@ -214,10 +229,15 @@ def main():
         # Riutilizza la stessa istanza testata prima
         
         # Aggiorna il foglio mensile
-        now = datetime.now()
+        now = run_date
         logger.info(f"📅 Aggiornamento per: {now.day}/{now.month}/{now.year}")
         
+        sheets_start = time.time()
         success = updater.update_monthly_sheet(scraped_data, now.year, now.month, now.day)
+        sheets_time = time.time() - sheets_start
+        
+        # Storico performance: setup driver, tempi per profilo e fase Sheets
+        append_run(build_run_record(scraper.get_performance_stats(), scraped_data, sheets_time))
         
         if success:
             logger.info("✅ Aggiornamento Google Sheets completato")
@@ -232,6 +252,188 @@ def main():
         logger.error(f"📍 Traceback: {traceback.format_exc()}")
         return False
 
+def merge_shards(run_date: str = None, allow_partial: bool = False) -> bool:
+    """Riunisce i risultati parziali degli shard e aggiorna Google Sheets una sola volta"""
+    try:
+        merged = load_partials("daily", run_date)
+        if not merge_report(merged, "daily") and not (allow_partial and merged["results"]):
+            return False
+        
+        updater = connect_sheets()
+        if updater is None:
+            return False
+        
+        # Il foglio si aggiorna alla data dell'esecuzione degli shard, non a quella del merge
+        when = datetime.fromisoformat(merged["run_date"])
+        logger.info(f"📅 Aggiornamento per: {when.day}/{when.month}/{when.year}")
+        sheets_start = time.time()
+        success = updater.update_monthly_sheet(merged["results"], when.year, when.month, when.day)
+        logger.info(f"⏱️ Aggiornamento Google Sheets: {time.time() - sheets_start:.2f}s")
+        return bool(success)
+    except Exception as e:
+        logger.error(f"❌ Errore nel merge degli shard: {e}")
+        return False
+
+def worker(idle_exit: bool = False) -> bool:
+    """
+    Worker della coda durevole: elabora i profili accodati dal coordinator.
+    Un solo scraper per processo: il Chrome resta aperto tra un batch e l'altro
+    e il report performance viene mostrato una volta, all'uscita del worker.
+    """
+    scraper = VestiaireScraper(profiles={})
+    scraper.keep_driver_open = True
+    scraper.log_report = False
+    
+    def scrape_batch(profiles: Dict[str, str]) -> List[Dict]:
+        # Scraping di un batch preso in lease (breaker, retry e durate inclusi)
+        scraper.profiles = profiles
+        return scraper.scrape_all_profiles() or []
+    
+    try:
+        run_worker(DurableWorkQueue(), "daily", scrape_batch, idle_exit=idle_exit)
+        return True
+    except KeyboardInterrupt:
+        # I lease non completati scadono e i profili tornano in coda
+        logger.info("🛑 Worker interrotto")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Errore nel worker: {e}")
+        return False
+    finally:
+        scraper.close()
+        if scraper.performance_stats["profile_times"]:
+            scraper.log_performance_summary()
+
+def coordinator(spawn: int = 0, timeout: float = None, allow_partial: bool = False) -> bool:
+    """
+    Accoda i profili abilitati nella coda durevole, attende che i worker li completino
+    e aggiorna Google Sheets una sola volta. Con spawn > 0 avvia anche worker locali.
+    """
+    try:
+        updater = connect_sheets()
+        if updater is None:
+            return False
+        
+        registry = load_registry()
+        profiles = registry.profiles()
+        queue = DurableWorkQueue()
+        processes = []
+        
+        def start_workers(run_id: str):
+            if spawn:
+                processes.extend(spawn_local_workers(
+                    [sys.executable, os.path.abspath(__file__), "worker", "--idle-exit"], spawn))
+        
+        logger.info(f"📋 Profili da accodare: {len(profiles)} (registro: {registry.source}, coda: {queue.path})")
+        try:
+            outcome = coordinate(queue, "daily", profiles, ProfileDurations().estimates("daily"),
+                                 timeout, allow_partial, on_enqueued=start_workers)
+        finally:
+            stop_local_workers(processes)
+        if outcome is None or not outcome["results"]:
+            logger.error("❌ Nessun dato recuperato dai worker")
+            return False
+        
+        scraped_data = outcome["results"]
+        save_debug_data(scraped_data, len(profiles))
+        when = outcome["run_date"]
+        logger.info(f"📅 Aggiornamento per: {when.day}/{when.month}/{when.year}")
+        sheets_start = time.time()
+        success = updater.update_monthly_sheet(scraped_data, when.year, when.month, when.day)
+        logger.info(f"⏱️ Aggiornamento Google Sheets: {time.time() - sheets_start:.2f}s")
+        return bool(success)
+    except Exception as e:
+        logger.error(f"❌ Errore nel coordinator: {e}")
+        return False
+
+def _write_monitor_data(updater, pending: Dict[str, Dict], day, full_refresh: bool) -> bool:
+    """Scrive nella colonna del giorno i risultati accumulati dal monitor"""
+    logger.info(f"📝 Aggiornamento Google Sheets: {len(pending)} profili del {day.day}/{day.month}/{day.year}"
+                f"{' (con formattazione e Overview)' if full_refresh else ''}")
+    return bool(updater.update_monthly_sheet(list(pending.values()), day.year, day.month, day.day,
+                                             full_refresh=full_refresh))
+
+def monitor(once: bool = False) -> bool:
+    """
+    Modalità monitor (processo sempre attivo al posto del cron): a ogni ciclo scrapa i
+    profili dovuti secondo il loro ritmo di cambiamento, entro il budget giornaliero.
+    I risultati si accumulano e vengono scritti nella colonna del giorno ogni
+    sheet_flush_cycles cicli; formattazione e Overview solo dopo gli orari di sheet_refresh_times.
+    Un errore in un ciclo (es. HttpError di Sheets) viene registrato e il monitor continua.
+    Il driver Chrome resta aperto tra i cicli.
+    """
+    updater = connect_sheets()
+    if updater is None:
+        return False
+    
+    scraper = VestiaireScraper(profiles={})
+    scraper.keep_driver_open = True
+    # Ultimo risultato di ogni profilo non ancora scritto nel foglio e giorno a cui appartiene
+    pending: Dict[str, Dict] = {}
+    pending_day = None
+    cycles = 0
+    logger.info("👁️ Modalità monitor avviata")
+    try:
+        while True:
+            scheduler = None
+            try:
+                # Registro e storico riletti a ogni ciclo: profili aggiunti e ritmi aggiornati
+                registry = load_registry()
+                scheduler = ScrapeScheduler(registry, load_change_rates(registry))
+                now = datetime.now()
+                if pending and pending_day != now.date():
+                    # Colonna del giorno precedente completata prima di iniziare quella nuova: se la
+                    # scrittura fallisce i dati restano solo nell'archivio di debug
+                    try:
+                        if not _write_monitor_data(updater, pending, pending_day, full_refresh=True):
+                            logger.error(f"❌ Dati del {pending_day} non scritti nel foglio")
+                    except Exception as e:
+                        logger.error(f"❌ Dati del {pending_day} non scritti nel foglio: {e}")
+                    pending.clear()
+                    cycles = 0
+                
+                due = scheduler.due(limit=SCHEDULER_CONFIG["max_profiles_per_cycle"])
+                if due:
+                    logger.info(f"📡 Profili dovuti: {', '.join(due)}")
+                    scraper.profiles = {name: registry.get(name).profile_id for name in due}
+                    scraped_data = scraper.scrape_all_profiles() or []
+                    scheduler.record(due)
+                    scheduler.save()
+                    save_debug_data(scraped_data, len(due))
+                    pending.update((result["name"], result) for result in scraped_data)
+                    pending_day = now.date()
+                cycles += 1
+                
+                full_refresh = scheduler.refresh_due()
+                if pending and (once or full_refresh or cycles >= SCHEDULER_CONFIG["sheet_flush_cycles"]):
+                    if _write_monitor_data(updater, pending, pending_day, full_refresh):
+                        pending.clear()
+                        cycles = 0
+                        if full_refresh:
+                            scheduler.sheet_refreshed_at = time.time()
+                            scheduler.save()
+                    else:
+                        logger.error("❌ Errore nell'aggiornamento Google Sheets, riprovo al prossimo ciclo")
+            except Exception as e:
+                # I risultati non scritti restano in pending per il ciclo successivo
+                logger.error(f"❌ Errore nel ciclo del monitor: {e}")
+                logger.error(f"📍 Traceback: {traceback.format_exc()}")
+                if once:
+                    return False
+            if once:
+                return True
+            
+            wait = scheduler.next_due_in() if scheduler else 0
+            wait = min(max(wait, SCHEDULER_CONFIG["min_sleep_seconds"]), SCHEDULER_CONFIG["max_sleep_seconds"])
+            logger.info(f"💤 Prossimo controllo tra {wait / 60:.0f} minuti"
+                        + (f" (budget residuo: {scheduler.remaining_budget()})" if scheduler else ""))
+            time.sleep(wait)
+    except KeyboardInterrupt:
+        logger.info("🛑 Monitor interrotto")
+        return True
+    finally:
+        scraper.close()
+
 def test_scraping():
     """Funzione di test per lo scraping"""
     logger.info("=== TEST SCRAPING ===")
@@ -1276,6 +1478,8 @@ def force_update_overview():
 
 
 if __name__ == "__main__":
+    setup_logging()
+    
     # Controlla gli argomenti della riga di comando
     if len(sys.argv) < 2:
         print("Uso: python main.py <comando> [parametri]")
@@ -1289,11 +1493,45 @@ if __name__ == "__main__":
         print("  update-overview - Aggiorna la tab Overview con tutti i mesi")
         print("  force-update-overview - Forza l'aggiornamento Overview con retry")
         print("  test-overview - Testa la lettura dei dati per Overview")
+        print("  perf-report [--gate] - Trend p50/p95 dallo storico performance (--gate: fallisce se oltre soglia)")
+        print("  debug-history <profilo> [--last N] - Articoli e vendite del profilo nelle ultime N esecuzioni (default 60)")
+        print("  <mese> <anno> --shard i/N - Scrapa solo lo shard i di N e scrive i risultati parziali in shards/")
+        print("  merge-shards [--date AAAA-MM-GG] [--allow-partial] - Riunisce gli shard e aggiorna Google Sheets")
+        print("  worker [--idle-exit] - Elabora i profili della coda durevole (--idle-exit: termina senza lavoro)")
+        print("  coordinator [--spawn N] [--timeout S] [--allow-partial] - Accoda i profili, attende i worker e aggiorna Google Sheets")
+        print("  monitor [--once] - Processo continuo: scrapa i profili secondo il loro ritmo di cambiamento (--once: un solo ciclo)")
         sys.exit(1)
     
     command = sys.argv[1].lower()
+    # Il report quota viene emesso anche quando il comando termina con sys.exit
+    atexit.register(report_sheets_api_usage, command)
     
-    if command == "force-update-overview":
+    if command == "perf-report":
+        success = perf_report(gate="--gate" in sys.argv[2:])
+        sys.exit(0 if success else 1)
+    elif command == "debug-history":
+        if len(sys.argv) < 3:
+            print("Uso: python main.py debug-history <profilo> [--last N]")
+            sys.exit(1)
+        last_n = int(sys.argv[sys.argv.index("--last") + 1]) if "--last" in sys.argv else 60
+        success = debug_history(sys.argv[2], last_n)
+        sys.exit(0 if success else 1)
+    elif command == "merge-shards":
+        run_date = sys.argv[sys.argv.index("--date") + 1] if "--date" in sys.argv else None
+        success = merge_shards(run_date, allow_partial="--allow-partial" in sys.argv)
+        sys.exit(0 if success else 1)
+    elif command == "worker":
+        success = worker(idle_exit="--idle-exit" in sys.argv)
+        sys.exit(0 if success else 1)
+    elif command == "coordinator":
+        spawn = int(sys.argv[sys.argv.index("--spawn") + 1]) if "--spawn" in sys.argv else 0
+        timeout = float(sys.argv[sys.argv.index("--timeout") + 1]) if "--timeout" in sys.argv else None
+        success = coordinator(spawn, timeout, allow_partial="--allow-partial" in sys.argv)
+        sys.exit(0 if success else 1)
+    elif command == "monitor":
+        success = monitor(once="--once" in sys.argv)
+        sys.exit(0 if success else 1)
+    elif command == "force-update-overview":
         success = force_update_overview()
         sys.exit(0 if success else 1)
     elif command == "test-overview":
@@ -1336,6 +1574,7 @@ if __name__ == "__main__":
         
         month_name = sys.argv[1].lower()
         year = int(sys.argv[2])
+        shard = parse_shard(sys.argv[sys.argv.index("--shard") + 1]) if "--shard" in sys.argv else None
         
-        success = main()
+        success = main(shard)
         sys.exit(0 if success else 1) 
\ No newline at end of file
@@ -0,0 +1,191 @@
+"""
+Performance History
+Storico persistente dei tempi di esecuzione, trend p50/p95 e gate di regressione
+"""
+
+import os
+import sys
+import json
+import logging
+from datetime import datetime
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from debug_config import PERFORMANCE_THRESHOLDS, PERFORMANCE_HISTORY
+
+# Import configurazione dalla root directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+from config import TEST_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+def _project_path(path: str) -> str:
+    return path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
+
+
+def get_history_path() -> str:
+    return _project_path(PERFORMANCE_HISTORY['history_file'])
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentile con interpolazione lineare (pct tra 0 e 100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def build_run_record(performance_stats: Dict, results: List[Dict], sheets_time: float = None,
+                     command: str = "monthly") -> Dict:
+    """Costruisce il record di un'esecuzione da performance_stats e risultati dello scraper"""
+    profile_times = performance_stats.get("profile_times", {})
+    profiles = {}
+    for result in results:
+        name = result.get("name", "Unknown")
+        timing = profile_times.get(name, {})
+        performance = result.get("performance", {})
+        profiles[name] = {
+            "success": bool(result.get("success")),
+            "total_time": timing.get("total_time", performance.get("total_time", 0.0)),
+            "page_load_time": timing.get("page_load_time", performance.get("page_load_time", 0.0)),
+            "parse_time": timing.get("parse_time", performance.get("parse_time", 0.0)),
+        }
+
+    successes = sum(1 for data in profiles.values() if data["success"])
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "command": command,
+        "driver_setup_time": performance_stats.get("driver_setup_time", 0.0),
+        "total_scraping_time": performance_stats.get("total_scraping_time", 0.0),
+        "sheets_time": sheets_time,
+        "success_rate": successes / len(profiles) if profiles else 0.0,
+        "profiles": profiles,
+    }
+
+
+def append_run(record: Dict, path: str = None) -> bool:
+    """Aggiunge un'esecuzione allo storico (JSONL) e scrive l'ultimo report in performance_report_file"""
+    path = path or get_history_path()
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        _trim_history(path, PERFORMANCE_HISTORY['max_runs'])
+
+        report_path = _project_path(TEST_CONFIG.get("performance_report_file", "performance_report.json"))
+        report = {"last_run": record, "summary": summarize_history(load_history(path))}
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        logger.info(f"📈 Performance salvate nello storico {path}")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Errore nel salvataggio storico performance: {e}")
+        return False
+
+
+def _trim_history(path: str, max_runs: int):
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    if len(lines) > max_runs:
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(lines[-max_runs:])
+
+
+def load_history(path: str = None, limit: int = None) -> List[Dict]:
+    """Legge lo storico, dalla più vecchia alla più recente (righe corrotte ignorate)"""
+    path = path or get_history_path()
+    if not os.path.exists(path):
+        return []
+    runs = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                runs.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning("⚠️ Riga non valida nello storico performance ignorata")
+    return runs[-limit:] if limit else runs
+
+
+def _stats(values: List[float]) -> Dict:
+    return {
+        "runs": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "last": values[-1] if values else 0.0,
+    }
+
+
+def summarize_history(runs: List[Dict]) -> Dict:
+    """p50/p95 per fase dell'esecuzione e per profilo (total/load/parse)"""
+    summary = {"runs": len(runs), "phases": {}, "profiles": {}}
+    for phase in ("driver_setup_time", "total_scraping_time", "sheets_time"):
+        values = [run[phase] for run in runs if run.get(phase) is not None]
+        summary["phases"][phase] = _stats(values)
+
+    per_profile: Dict[str, Dict[str, List[float]]] = {}
+    for run in runs:
+        for name, data in run.get("profiles", {}).items():
+            if not data.get("success"):
+                continue
+            bucket = per_profile.setdefault(name, {"total_time": [], "page_load_time": [], "parse_time": []})
+            for metric in bucket:
+                bucket[metric].append(data.get(metric, 0.0))
+    for name, metrics in per_profile.items():
+        summary["profiles"][name] = {metric: _stats(values) for metric, values in metrics.items()}
+    return summary
+
+
+def check_regressions(runs: List[Dict], thresholds: Dict = None) -> Dict:
+    """
+    Valuta l'ultima esecuzione: le soglie di PERFORMANCE_THRESHOLDS producono errori,
+    il superamento del p95 storico (× regression_factor) produce avvisi
+    """
+    thresholds = thresholds or PERFORMANCE_THRESHOLDS
+    failures, warnings = [], []
+    if not runs:
+        return {"failures": failures, "warnings": warnings}
+
+    last = runs[-1]
+    if last.get("total_scraping_time", 0.0) > thresholds['max_total_time']:
+        failures.append(f"Tempo totale {last['total_scraping_time']:.1f}s > {thresholds['max_total_time']:.0f}s")
+    success_rate = last.get("success_rate", 0.0)
+    if success_rate < thresholds['min_success_rate']:
+        failures.append(f"Success rate {success_rate:.0%} < {thresholds['min_success_rate']:.0%}")
+    if 1 - success_rate > thresholds['max_error_rate']:
+        failures.append(f"Error rate {1 - success_rate:.0%} > {thresholds['max_error_rate']:.0%}")
+
+    baseline = summarize_history(runs[:-1][-PERFORMANCE_HISTORY['baseline_runs']:])
+    factor = PERFORMANCE_HISTORY['regression_factor']
+    for name, data in last.get("profiles", {}).items():
+        if not data.get("success"):
+            continue
+        if data["total_time"] > thresholds['max_profile_time']:
+            failures.append(f"{name}: {data['total_time']:.1f}s > {thresholds['max_profile_time']:.0f}s")
+        history = baseline["profiles"].get(name)
+        if history and history["total_time"]["runs"] >= 5:
+            p95 = history["total_time"]["p95"]
+            if data["total_time"] > p95 * factor:
+                warnings.append(f"{name}: {data['total_time']:.1f}s oltre {factor}× p95 storico ({p95:.1f}s)")
+    return {"failures": failures, "warnings": warnings}
+
+
+def format_history_report(runs: List[Dict]) -> List[str]:
+    """Righe di testo con trend p50/p95 per fase e per profilo"""
+    summary = summarize_history(runs)
+    lines = [f"Esecuzioni nello storico: {summary['runs']}"]
+    for phase, stats in summary["phases"].items():
+        if stats["runs"]:
+            lines.append(f"{phase:22} p50 {stats['p50']:7.2f}s | p95 {stats['p95']:7.2f}s | ultimo {stats['last']:7.2f}s")
+    lines.append(f"{'Profilo':20} | {'total p50/p95':>15} | {'load p50/p95':>15} | {'parse p50/p95':>15} | ultimo")
+    for name, metrics in sorted(summary["profiles"].items(), key=lambda item: -item[1]["total_time"]["p95"]):
+        total, load, parse = metrics["total_time"], metrics["page_load_time"], metrics["parse_time"]
+        lines.append(f"{name:20} | {total['p50']:6.2f}/{total['p95']:6.2f}s | {load['p50']:6.2f}/{load['p95']:6.2f}s | "
+                     f"{parse['p50']:6.2f}/{parse['p95']:6.2f}s | {total['last']:.2f}s")
+    return lines
@@ -3,39 +3,54 @@ Vestiaire Collective Scraper
 Modulo per estrarre dati dai profili Vendors
 """
 
+import sys
+import os
 import time
 import logging
 import platform
 from typing import Dict, List, Tuple
 from datetime import datetime
 from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.chrome.service import Service
 import re
 
+# Import moduli condivisi dalla root directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import LOGGING_CONFIG, PERFORMANCE_CONFIG, OPTIMIZATION_CONFIG
+from browser_process import DeadlineWatchdog, DriverRecycler, WorkerDriversMixin, kill_driver, recycle_driver
+from work_queue import ProfileDurations, ProfileWorkQueue, WorkItem, run_workers
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from debug_config import DEBUG_CONFIG, deep_diagnostics_enabled
+from perf_tracing import WebDriverTracer, format_webdriver_report, collect_page_timing, evaluate_page_timing
+from page_snapshot import PageSnapshot, capture_snapshot, extract_profile_counts
+from clearance_session import get_clearance_store
+from profile_health import ProfileCircuitBreaker
+from profile_registry import load_registry
+from failure_artifacts import get_failure_artifacts
+
 # Configurazione logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class VestiaireScraper:
+class VestiaireScraper(WorkerDriversMixin):
     """Classe per lo scraping dei profili Vestiaire Collective"""
     
     def __init__(self, profiles=None):
-        self.driver = None
+        # Un driver per thread: con parallel_scraping ogni worker ha il proprio Chrome
+        self._init_worker_drivers()
         # Usa la configurazione esterna se fornita, altrimenti usa quella di default
         if profiles:
             self.profiles = profiles
         else:
-            # Importa la configurazione da config.py
-            import sys
-            import os
-            sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-            from config import VESTIAIRE_PROFILES
-            self.profiles = VESTIAIRE_PROFILES
+            # Profili abilitati del registro (profiles.csv, o config.py se manca)
+            self.profiles = load_registry().profiles()
+        # Modalità monitor: il driver del thread chiamante resta aperto tra un'esecuzione e l'altra
+        self.keep_driver_open = False
+        # Report performance a fine scrape_all_profiles: il worker della coda durevole lo
+        # disattiva e mostra una sola volta il report cumulativo dei batch
+        self.log_report = True
         # Statistiche performance
         self.performance_stats = {
             "driver_setup_time": 0,
@@ -43,8 +58,29 @@ class VestiaireScraper:
             "profile_times": {},
             "average_profile_time": 0,
             "fastest_profile": {"name": "", "time": float('inf')},
-            "slowest_profile": {"name": "", "time": 0}
+            "slowest_profile": {"name": "", "time": 0},
+            "webdriver_commands": {}
         }
+        # Tracer dei round trip WebDriver (per profilo e per metodo chiamante)
+        self.command_tracer = WebDriverTracer() if LOGGING_CONFIG.get("trace_webdriver_commands") else None
+        # Scadenza per profilo e tentativi dopo un timeout
+        self.retry_config = PERFORMANCE_CONFIG.get("retry_config", {})
+        # Clearance Cloudflare condivisa tra i worker e percorso HTTP veloce
+        self.clearance = get_clearance_store()
+        self.http_fast_path = OPTIMIZATION_CONFIG.get("http_fast_path", False)
+        # Durata storica per profilo: ordine della coda condivisa
+        self.profile_durations = ProfileDurations()
+        # Circuit breaker: i profili che falliscono di continuo escono dalla coda principale
+        self.profile_health = ProfileCircuitBreaker()
+        # Screenshot dei profili falliti scritti in background (compressi, directory a rotazione)
+        self.artifacts = get_failure_artifacts()
+        # Riavvio del driver dopo N pagine o oltre la soglia di memoria
+        recycling = PERFORMANCE_CONFIG.get("driver_recycling", {})
+        self.driver_recycler = DriverRecycler(
+            max_pages=recycling.get("max_pages", 0),
+            max_rss_mb=recycling.get("max_rss_mb", 0),
+            track_memory=DEBUG_CONFIG.get("track_memory_usage", False)
+        )
     
     def setup_driver(self):
         """Configura il driver Chrome per lo scraping"""
@@ -87,6 +123,11 @@ class VestiaireScraper:
             
             service = Service(driver_path)
             self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            self._register_driver(self.driver)
+            if self.command_tracer:
+                self.command_tracer.attach(self.driver)
+            # Clearance Cloudflare già ottenuta (da un altro worker o esecuzione)
+            self.clearance.inject(self.driver)
             
             setup_time = time.time() - start_time
             self.performance_stats["driver_setup_time"] = setup_time
@@ -119,20 +160,38 @@ class VestiaireScraper:
         profile_start_time = time.time()
         articles = 0
         sales = 0
+        if self.command_tracer:
+            self.command_tracer.begin_profile(profile_name)
         
         try:
             logger.info(f"🔍 Scraping profilo: {profile_name} ({profile_id})")
             
-            # Misurazione tempo di caricamento pagina
+            # Percorso HTTP veloce: HTML senza browser se contiene già i conteggi
             page_load_start = time.time()
-            self.driver.get(url)
-            
-            # Attendi il caricamento della pagina
-            time.sleep(5)
+            snapshot = self._fetch_profile_http(url, profile_name)
             page_load_time = time.time() - page_load_start
+            fast_path = snapshot is not None
+            page_timing = {}
+            
+            if snapshot is None:
+                # Misurazione tempo di caricamento pagina (driver.get attende l'evento load)
+                page_load_start = time.time()
+                self.driver.get(url)
+                page_load_time = time.time() - page_load_start
+                
+                # Verifica Cloudflare: superata una volta e condivisa con gli altri worker
+                if not self.clearance.pass_challenge(self.driver, profile_name):
+                    raise Exception("Verifica Cloudflare non superata")
+                
+                # Attendi il rendering dei contenuti dinamici
+                time.sleep(5)
+                page_timing = collect_page_timing(self.driver)
+                
+                # Snapshot unico del DOM: il parsing avviene offline, senza round trip per elemento
+                snapshot = capture_snapshot(self.driver, profile_name)
             
             # Verifica se la pagina è caricata correttamente
-            page_title = self.driver.title
+            page_title = snapshot.title
             if "403" in page_title or "404" in page_title or "error" in page_title.lower():
                 logger.error(f"❌ Pagina di errore rilevata per {profile_name}: {page_title}")
                 raise Exception(f"Pagina di errore: {page_title}")
@@ -140,62 +199,30 @@ class VestiaireScraper:
             # Misurazione tempo di parsing
             parse_start = time.time()
             
-            # DEBUG: stampa tutti i testi di <span> e <div> per il primo profilo
-            if profile_name == "Rediscover":
-                print("\n--- DEBUG: Tutti gli span ---")
-                spans = self.driver.find_elements(By.TAG_NAME, "span")
-                for s in spans:
-                    try:
-                        txt = s.text.strip()
-                        if txt:
-                            print(f"[span] {txt}")
-                    except Exception:
-                        pass
-                print("\n--- DEBUG: Tutti i div ---")
-                divs = self.driver.find_elements(By.TAG_NAME, "div")
-                for d in divs:
-                    try:
-                        txt = d.text.strip()
-                        if txt:
-                            print(f"[div] {txt}")
-                    except Exception:
-                        pass
-            
-            # Nuovo algoritmo: estrai i dati direttamente dagli span
-            spans = self.driver.find_elements(By.TAG_NAME, "span")
-            articles_found = False
-            sales_found = False
+            # Testi di tutti gli <span> e <div> del profilo (modalità diagnostica con log DEBUG)
+            if deep_diagnostics_enabled() and logger.isEnabledFor(logging.DEBUG):
+                for tag in ("span", "div"):
+                    texts = [txt for txt in snapshot.element_texts(f"//{tag}") if txt]
+                    logger.debug(f"🔍 {profile_name}: testi <{tag}> ({len(texts)})\n"
+                                 + "\n".join(f"[{tag}] {txt}" for txt in texts))
             
-            for s in spans:
-                txt = s.text.strip()
-                if txt.endswith("items for sale") or txt.endswith("item for sale"):
-                    try:
-                        articles = int(txt.split()[0].replace(',', '').replace('.', ''))
-                        articles_found = True
-                        logger.debug(f"  📦 {profile_name}: Trovati {articles} articoli")
-                    except Exception as e:
-                        logger.warning(f"  ⚠️  {profile_name}: Errore parsing articoli da '{txt}': {e}")
-                        pass
-                if txt.endswith("sold") and not txt.endswith("items sold"):  # Evita confusione con altre frasi
-                    try:
-                        sales = int(txt.split()[0].replace(',', '').replace('.', ''))
-                        sales_found = True
-                        logger.debug(f"  💰 {profile_name}: Trovate {sales} vendite")
-                    except Exception as e:
-                        logger.warning(f"  ⚠️  {profile_name}: Errore parsing vendite da '{txt}': {e}")
-                        pass
+            # Estrai i dati dagli span dello snapshot
+            counts = extract_profile_counts(snapshot)
+            articles, sales = counts["articles"], counts["sales"]
+            articles_found, sales_found = counts["articles_found"], counts["sales_found"]
+            for error in counts["errors"]:
+                logger.warning(f"  ⚠️  {profile_name}: Errore parsing {error}")
+            if articles_found:
+                logger.debug(f"  📦 {profile_name}: Trovati {articles} articoli")
+            if sales_found:
+                logger.debug(f"  💰 {profile_name}: Trovate {sales} vendite")
             
             # Verifica se i dati sono stati trovati
             if not articles_found and not sales_found:
                 logger.error(f"❌ {profile_name}: Nessun dato trovato nella pagina!")
-                # Salva screenshot per debug se necessario
-                if hasattr(self.driver, 'save_screenshot'):
-                    try:
-                        screenshot_path = f"debug_{profile_name}_{int(time.time())}.png"
-                        self.driver.save_screenshot(screenshot_path)
-                        logger.info(f"  📸 Screenshot salvato: {screenshot_path}")
-                    except:
-                        pass
+                # Salva screenshot per debug solo al primo fallimento del profilo
+                if not fast_path and self.profile_health.needs_diagnostics("daily", profile_name):
+                    self.artifacts.save_screenshot(self.driver, profile_name, "no_data")
                 
                 raise Exception("Nessun dato trovato nella pagina")
             elif not articles_found:
@@ -205,6 +232,11 @@ class VestiaireScraper:
             
             parse_time = time.time() - parse_start
             total_profile_time = time.time() - profile_start_time
+            command_stats = self._end_command_trace()
+            timing_check = evaluate_page_timing(page_timing, total_profile_time)
+            if timing_check["slow_connection"]:
+                logger.warning(f"🐌 {profile_name}: caricamento browser lento "
+                               f"({timing_check['browser_load_time']:.2f}s)")
             
             # Salva statistiche profilo
             self.performance_stats["profile_times"][profile_name] = {
@@ -213,7 +245,13 @@ class VestiaireScraper:
                 "parse_time": parse_time,
                 "articles": articles,
                 "sales": sales,
-                "data_found": articles_found or sales_found
+                "data_found": articles_found or sales_found,
+                "webdriver_commands": command_stats["commands"],
+                "webdriver_time": command_stats["time"],
+                "page_timing": page_timing,
+                "fast_path": fast_path,
+                "rating": timing_check["rating"],
+                "slow_connection": timing_check["slow_connection"]
             }
             
             # Aggiorna fastest/slowest
@@ -245,11 +283,13 @@ class VestiaireScraper:
                 "performance": {
                     "total_time": total_profile_time,
                     "page_load_time": page_load_time,
-                    "parse_time": parse_time
+                    "parse_time": parse_time,
+                    "page_timing": page_timing
                 }
             }
         except Exception as e:
             total_profile_time = time.time() - profile_start_time
+            self._end_command_trace()
             logger.error(f"❌ Errore nello scraping del profilo {profile_name}: {e}")
             return {
                 "name": profile_name,
@@ -267,11 +307,124 @@ class VestiaireScraper:
                 }
             }
     
-    def scrape_all_profiles(self) -> List[Dict]:
-        """Scrapa tutti i profili configurati"""
+    def _scrape_profile_with_deadline(self, profile_name: str, profile_id: str) -> Tuple[Dict, bool]:
+        """
+        scrape_profile entro il budget profile_deadline: alla scadenza Chrome viene
+        terminato (sbloccando driver.get/find_elements) e sostituito da un nuovo driver
+        """
+        deadline = self.retry_config.get("profile_deadline", 0)
+        driver = self.driver
+        with DeadlineWatchdog(deadline, lambda: kill_driver(driver), label=profile_name) as watchdog:
+            result = self.scrape_profile(profile_name, profile_id)
+        
+        if watchdog.expired:
+            result["success"] = False
+            result["error"] = f"Scadenza di {deadline}s superata"
+            self._replace_driver(driver, "deadline", profile_name)
+        else:
+            reason = self.driver_recycler.check(driver)
+            if reason:
+                self._replace_driver(driver, reason, profile_name)
+        return result, watchdog.expired
+    
+    def _replace_driver(self, driver, reason: str, profile_name: str):
+        """Chiude (o ha già terminato) il driver corrente e ne avvia uno nuovo"""
+        self.driver_recycler.record(driver, reason, profile_name)
+        self._forget_driver(driver)
+        if reason != "deadline" and driver is not None:
+            recycle_driver(driver)
+        logger.info("🔄 Avvio driver Chrome sostitutivo...")
+        self.driver = None
+        self.setup_driver()
+    
+    def _scrape_work_item(self, item: WorkItem, queue: ProfileWorkQueue):
+        """Scraping di un profilo della coda: (risultato, fallito, ritentabile)"""
+        if item.attempts > 1:
+            time.sleep(self.retry_config.get("retry_delay", 2))
         if not self.driver:
-            self.setup_driver()
+            try:
+                self.setup_driver()
+            except Exception as e:
+                # Errore di infrastruttura: il circuit breaker non lo attribuisce al profilo
+                return {"name": item.name, "profile_id": item.profile_id, "success": False,
+                        "error": f"Errore avvio driver: {e}"}, True, False
+        
+        result, timed_out = self._scrape_profile_with_deadline(item.name, item.profile_id)
+        failed = not result.get("success", False)
+        if not failed:
+            self.profile_durations.record("daily", item.name, result["performance"]["total_time"])
         
+        # Pausa tra le richieste dello stesso worker per evitare rate limiting
+        if queue.order():  # Non aspettare dopo l'ultimo profilo
+            logger.info("⏳ Pausa 3 secondi...")
+            time.sleep(3)
+        return result, failed, not timed_out or self.retry_config.get("timeout_retry", True)
+    
+    def _record_health(self, result: Dict) -> Dict:
+        """
+        Aggiorna il circuit breaker con l'esito del profilo; un profilo fallito riporta
+        gli ultimi valori letti, marcati come non aggiornati
+        """
+        name = result["name"]
+        if result.get("success"):
+            self.profile_health.record_success("daily", name, {"articles": result.get("articles", 0), "sales": result.get("sales", 0)})
+            return result
+        self.profile_health.record_failure("daily", name, result.get("error", "Scraping non riuscito"))
+        return self._stale_result(name, result["profile_id"], result.get("error", "Scraping non riuscito"))
+    
+    def _stale_result(self, profile_name: str, profile_id: str, error: str) -> Dict:
+        """Risultato con gli ultimi valori noti del profilo (stale) al posto di 0"""
+        last_good = self.profile_health.last_good("daily", profile_name) or {}
+        return {
+            "name": profile_name,
+            "profile_id": profile_id,
+            "url": f"https://it.vestiairecollective.com/profile/{profile_id}/",
+            "articles": last_good.get("articles", 0),
+            "sales": last_good.get("sales", 0),
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "success": False,
+            "stale": True,
+            "stale_since": last_good.get("timestamp"),
+            "error": error,
+            "performance": {"total_time": 0}
+        }
+    
+    def _fetch_profile_http(self, url: str, profile_name: str):
+        """
+        Snapshot dall'HTML scaricato via requests, solo se contiene sia articoli sia vendite:
+        un conteggio mancante (es. pagina parziale) verrebbe scritto come 0 e salvato
+        come ultimo valore buono, quindi in quel caso si passa al browser
+        """
+        if not self.http_fast_path:
+            return None
+        html = self.clearance.fetch_html(url)
+        if not html:
+            return None
+        snapshot = PageSnapshot.from_html(url, html, profile_name)
+        counts = extract_profile_counts(snapshot)
+        if not (counts["articles_found"] and counts["sales_found"]):
+            missing = [label for label, found in (("articoli", counts["articles_found"]),
+                                                  ("vendite", counts["sales_found"])) if not found]
+            logger.info(f"  ↪️ {profile_name}: HTML senza {' e '.join(missing)}, uso il browser")
+            return None
+        logger.info(f"  ⚡ {profile_name}: pagina letta via HTTP senza browser")
+        return snapshot
+    
+    def close(self):
+        """Chiude il driver Chrome del thread corrente"""
+        if self.driver:
+            self.driver.quit()
+            self.driver = None
+            logger.info("🔄 Driver Chrome chiuso")
+    
+    def _end_command_trace(self) -> Dict:
+        """Chiude il tracciamento WebDriver del profilo corrente"""
+        if not self.command_tracer:
+            return {"commands": 0, "time": 0.0, "by_method": {}}
+        return self.command_tracer.end_profile()
+    
+    def scrape_all_profiles(self) -> List[Dict]:
+        """Scrapa tutti i profili configurati"""
         results = []
         scraping_start_time = time.time()
         
@@ -279,38 +432,68 @@ class VestiaireScraper:
             total_profiles = len(self.profiles)
             logger.info(f"🚀 Avvio scraping di {total_profiles} profili...")
             
-            for i, (profile_name, profile_id) in enumerate(self.profiles.items(), 1):
-                logger.info(f"📊 Progresso: {i}/{total_profiles}")
-                
-                result = self.scrape_profile(profile_name, profile_id)
-                results.append(result)
-                
-                # Pausa tra le richieste per evitare rate limiting
-                if i < total_profiles:  # Non aspettare dopo l'ultimo profilo
-                    logger.info("⏳ Pausa 3 secondi...")
-                    time.sleep(3)
+            # Profili in quarantena fuori dalla coda principale: solo quelli con la sonda
+            # dovuta vengono provati, una volta e a fine esecuzione
+            active, probes, skipped = self.profile_health.partition("daily", self.profiles)
+            for name, profile_id in skipped.items():
+                results.append(self._stale_result(name, profile_id, "Profilo in quarantena"))
+            
+            # Coda condivisa: profili più lenti per primi, quelli falliti riaccodati
+            # (su un altro worker se lo scraping parallelo è attivo)
+            queue = ProfileWorkQueue(active, self.profile_durations.estimates("daily"),
+                                     max_attempts=self.retry_config.get("max_retries", 3) + 1)
+            workers = OPTIMIZATION_CONFIG.get("max_parallel_workers", 3) if OPTIMIZATION_CONFIG.get("parallel_scraping") else 1
+            
+            def on_result(item: WorkItem, result: Dict):
+                results.append(self._record_health(result or {
+                    "name": item.name, "profile_id": item.profile_id, "success": False,
+                    "error": "Scraping non riuscito"}))
+                logger.info(f"📊 Progresso: {len(results)}/{total_profiles}")
+            
+            run_workers(queue, workers, lambda item, worker_id: self._scrape_work_item(item, queue), on_result)
+            if queue.stats["requeued"]:
+                logger.info(f"🔁 Profili riaccodati: {queue.stats['requeued']}")
+            
+            if probes:
+                logger.info(f"🩺 Sonda dei profili in quarantena: {', '.join(probes)}")
+                probe_queue = ProfileWorkQueue(probes, max_attempts=1)
+                run_workers(probe_queue, 1, lambda item, worker_id: self._scrape_work_item(item, probe_queue), on_result)
+            
+            # Ordine dei profili configurati, indipendente dalla coda e dai tentativi
+            order = {name: i for i, name in enumerate(self.profiles)}
+            results.sort(key=lambda result: order.get(result["name"], len(order)))
                 
         except Exception as e:
             logger.error(f"Errore generale nello scraping: {e}")
         finally:
-            if self.driver:
-                self.driver.quit()
-                logger.info("🔄 Driver Chrome chiuso")
+            self.close_worker_drivers()
+            if not self.keep_driver_open:
+                self.close()
+            self.profile_durations.save()
+            self.profile_health.save()
+            self.artifacts.flush()
         
         # Calcola statistiche finali
         total_scraping_time = time.time() - scraping_start_time
-        self.performance_stats["total_scraping_time"] = total_scraping_time
+        self.performance_stats["total_scraping_time"] += total_scraping_time
         
         valid_times = [stats["total_time"] for stats in self.performance_stats["profile_times"].values()]
         if valid_times:
             self.performance_stats["average_profile_time"] = sum(valid_times) / len(valid_times)
+        if self.command_tracer:
+            self.performance_stats["webdriver_commands"] = self.command_tracer.get_report()
+        self.performance_stats["clearance"] = self.clearance.get_summary()
+        self.performance_stats["driver_recycling"] = self.driver_recycler.get_summary()
+        self.performance_stats["profile_health"] = self.profile_health.get_summary("daily")
+        self.performance_stats["failure_artifacts"] = self.artifacts.get_summary()
         
-        self._log_performance_summary()
+        if self.log_report:
+            self.log_performance_summary()
         
         return results
     
-    def _log_performance_summary(self):
-        """Mostra un riassunto delle performance"""
+    def log_performance_summary(self):
+        """Mostra un riassunto delle performance (cumulativo se lo scraper è riusato)"""
         stats = self.performance_stats
         
         print("\n" + "="*60)
@@ -327,9 +510,15 @@ class VestiaireScraper:
         print("-" * 60)
         for name, data in stats["profile_times"].items():
             print(f"{name:20} | {data['total_time']:6.2f}s | Load: {data['page_load_time']:5.2f}s | Parse: {data['parse_time']:5.2f}s")
+            page_timing = data.get("page_timing")
+            if page_timing:
+                print(f"{'':20}   ↳ TTFB {page_timing['ttfb']:.2f}s | DOMContentLoaded {page_timing['dom_content_loaded']:.2f}s | "
+                      f"Load {page_timing['load_event']:.2f}s | {page_timing['resource_count']} risorse, "
+                      f"{page_timing['resource_bytes'] / 1024:.0f} KB | {data['rating']}"
+                      f"{' | connessione lenta' if data['slow_connection'] else ''}")
         
         # Calcolo efficienza
-        total_wait_time = (len(self.profiles) - 1) * 3  # 3 secondi tra profili
+        total_wait_time = max(len(stats['profile_times']) - 1, 0) * 3  # 3 secondi tra profili
         active_work_time = stats['total_scraping_time'] - total_wait_time
         efficiency = (active_work_time / stats['total_scraping_time']) * 100 if stats['total_scraping_time'] > 0 else 0
         
@@ -337,6 +526,32 @@ class VestiaireScraper:
         print(f"   Tempo di lavoro effettivo: {active_work_time:.2f}s")
         print(f"   Tempo di attesa totale: {total_wait_time:.2f}s")
         print(f"   Efficienza: {efficiency:.1f}%")
+        
+        if stats["webdriver_commands"]:
+            print(f"\n🔁 ROUND TRIP WEBDRIVER PER PROFILO:")
+            print("-" * 60)
+            for line in format_webdriver_report(stats["webdriver_commands"]):
+                print(line)
+        
+        clearance = stats.get("clearance", {})
+        if clearance.get("http_fetches") or clearance.get("challenges_solved") or clearance.get("challenges_skipped"):
+            print(f"\n🛡️ CLOUDFLARE E PERCORSO HTTP:")
+            print(f"   Pagine via HTTP: {clearance['http_hits']}/{clearance['http_fetches']}")
+            print(f"   Verifiche superate: {clearance['challenges_solved']}, evitate con clearance condivisa: {clearance['challenges_skipped']}")
+            print(f"   Clearance valida ancora per {clearance['expires_in'] / 60:.0f} min")
+        
+        recycling = stats.get("driver_recycling", {})
+        if recycling.get("recycles") or recycling.get("peak_rss_mb"):
+            print(f"\n♻️ RIAVVII DRIVER: {recycling['recycles']}")
+            for reason, count in recycling["by_reason"].items():
+                print(f"   {reason}: {count}")
+            print(f"   Picco RSS Chrome: {recycling['peak_rss_mb']:.0f} MB")
+        
+        health = stats.get("profile_health", {})
+        if health.get("quarantined") or health.get("failing"):
+            print(f"\n🚧 PROFILI IN QUARANTENA: {', '.join(health['quarantined']) or 'nessuno'}")
+            if health["failing"]:
+                print(f"   Con fallimenti recenti: {', '.join(health['failing'])}")
         print("="*60)
     
     def get_performance_stats(self) -> Dict:
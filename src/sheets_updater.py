@@ -4,6 +4,7 @@ Modulo per aggiornare automaticamente il Google Sheet con i dati Vestiaire
 """
 
 import os
+import sys
 import logging
 import time
 from typing import Dict, List, Any
@@ -14,6 +15,12 @@ from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import calendar
 
+# Import moduli condivisi dalla root directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from perf_tracing import SHEETS_API_TRACER
+from log_setup import sampled
+from profile_registry import load_registry
+
 # Configurazione logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -21,11 +28,12 @@ logger = logging.getLogger(__name__)
 class GoogleSheetsUpdater:
     """Classe per aggiornare Google Sheets con i dati Vestiaire"""
     
-    def __init__(self, credentials_json: str = None):
+    def __init__(self, credentials_json: str = None, service=None):
         self.spreadsheet_id = "1sWmvdbEgzLCyaNk5XRDHOFTA5KY1RGeMBIqouXvPJ34"
-        self.service = None
+        # Un servizio già costruito (es. FakeSheetsService) evita l'autenticazione
+        self.service = SHEETS_API_TRACER.wrap(service)
         
-        if credentials_json:
+        if credentials_json and service is None:
             self.setup_service(credentials_json)
     
     def setup_service(self, credentials_json: str):
@@ -46,7 +54,7 @@ class GoogleSheetsUpdater:
             )
             
             # Crea il servizio
-            self.service = build('sheets', 'v4', credentials=credentials)
+            self.service = SHEETS_API_TRACER.wrap(build('sheets', 'v4', credentials=credentials))
             logger.info("Servizio Google Sheets configurato con successo")
             
         except Exception as e:
@@ -426,7 +434,7 @@ class GoogleSheetsUpdater:
             
             # Per ogni giorno dal 2 in poi, calcola le differenze
             for current_day in range(2, day + 1):
-                logger.info(f"Calcolo differenze per il giorno {current_day}")
+                logger.info(f"Calcolo differenze per il giorno {current_day}", extra=sampled("sheets.previous_diffs_day"))
                 
                 # Calcola colonne per il giorno corrente
                 base_col = 3 + (current_day-1)*4
@@ -488,12 +496,12 @@ class GoogleSheetsUpdater:
                         if current_articoli is not None and prev_articoli is not None:
                             diff_stock = current_articoli - prev_articoli
                             row[diff_stock_col] = diff_stock
-                            logger.info(f"  {row[0]} giorno {current_day}: diff_stock = {current_articoli} - {prev_articoli} = {diff_stock}")
+                            logger.info(f"  {row[0]} giorno {current_day}: diff_stock = {current_articoli} - {prev_articoli} = {diff_stock}", extra=sampled("sheets.previous_diffs"))
                         
                         if current_vendite is not None and prev_vendite is not None:
                             diff_vendite = current_vendite - prev_vendite
                             row[diff_vendite_col] = diff_vendite
-                            logger.info(f"  {row[0]} giorno {current_day}: diff_vendite = {current_vendite} - {prev_vendite} = {diff_vendite}")
+                            logger.info(f"  {row[0]} giorno {current_day}: diff_vendite = {current_vendite} - {prev_vendite} = {diff_vendite}", extra=sampled("sheets.previous_diffs"))
             
             # Scrivi i dati aggiornati
             self.service.spreadsheets().values().update(
@@ -762,12 +770,12 @@ class GoogleSheetsUpdater:
                         if current_articoli is not None and prev_articoli is not None:
                             diff_stock = current_articoli - prev_articoli
                             row[diff_stock_col] = diff_stock
-                            logger.info(f"  {profile_name} giorno {current_day}: diff_stock = {current_articoli} - {prev_articoli} = {diff_stock}")
+                            logger.info(f"  {profile_name} giorno {current_day}: diff_stock = {current_articoli} - {prev_articoli} = {diff_stock}", extra=sampled("sheets.previous_diffs"))
                         
                         if current_vendite is not None and prev_vendite is not None:
                             diff_vendite = current_vendite - prev_vendite
                             row[diff_vendite_col] = diff_vendite
-                            logger.info(f"  {profile_name} giorno {current_day}: diff_vendite = {current_vendite} - {prev_vendite} = {diff_vendite}")
+                            logger.info(f"  {profile_name} giorno {current_day}: diff_vendite = {current_vendite} - {prev_vendite} = {diff_vendite}", extra=sampled("sheets.previous_diffs"))
             
             # Scrivi i dati aggiornati
             self.service.spreadsheets().values().update(
@@ -787,8 +795,12 @@ class GoogleSheetsUpdater:
             logger.error(f"Errore nel ricalcolo delle differenze per {month_name}: {e}")
             return False
 
-    def update_monthly_sheet(self, scraped_data: list, year: int, month: int, day: int):
-        """Aggiorna la tab mensile con i dati del giorno, calcolando le differenze."""
+    def update_monthly_sheet(self, scraped_data: list, year: int, month: int, day: int, full_refresh: bool = True):
+        """
+        Aggiorna la tab mensile con i dati del giorno, calcolando le differenze.
+        Con full_refresh=False salta la formattazione della tab e la ricostruzione dell'Overview
+        (aggiornamenti intermedi della modalità monitor).
+        """
         import copy
         month_name = calendar.month_name[month].lower()
         self.create_monthly_tab(month_name, year)
@@ -816,24 +828,19 @@ class GoogleSheetsUpdater:
         # Mappa profilo->riga
         profilo_to_row = {row[0]: i for i, row in enumerate(values[1:], start=2) if row and row[0]}
         
-        # Rimuovi profili che non sono più nella configurazione
-        profili_configurati = {profilo['name'] for profilo in scraped_data}
-        logger.info(f"Profili configurati: {profili_configurati}")
-        
-        righe_da_rimuovere = []
-        for i, row in enumerate(values[1:], start=1):
-            if row and row[0] and row[0] not in profili_configurati and row[0] != "Totali":
-                righe_da_rimuovere.append(i)
-                logger.info(f"Trovato profilo da rimuovere: {row[0]} (riga {i})")
-        
-        logger.info(f"Righe da rimuovere: {righe_da_rimuovere}")
+        # Rimuovi profili che non sono più nella configurazione: restano quelli scrapati
+        # e quelli del registro, anche disabilitati (disattivare un profilo non ne cancella lo storico)
+        profili_configurati = ({profilo['name'] for profilo in scraped_data}
+                               | set(load_registry().names(enabled_only=False)))
+        logger.info(f"Profili configurati: {len(profili_configurati)}")
         
-        # Rimuovi le righe in ordine inverso per non alterare gli indici
-        for i in sorted(righe_da_rimuovere, reverse=True):
-            if i < len(values):
-                profilo_rimosso = values[i][0] if i < len(values) else 'Unknown'
-                del values[i]
-                logger.info(f"Rimosso profilo obsoleto: {profilo_rimosso}")
+        # Una sola ricostruzione della lista (i del ripetuti costano O(n) ciascuno)
+        profili_rimossi = {row[0] for row in values[1:]
+                           if row and row[0] and row[0] not in profili_configurati and row[0] != "Totali"}
+        if profili_rimossi:
+            values = values[:1] + [row for row in values[1:]
+                                   if not (row and row[0] and row[0] in profili_rimossi)]
+            logger.info(f"Rimossi profili obsoleti: {profili_rimossi}")
         
         # Ricostruisci la mappa profilo->riga dopo la rimozione
         profilo_to_row = {row[0]: i for i, row in enumerate(values[1:], start=2) if row and row[0]}
@@ -849,8 +856,15 @@ class GoogleSheetsUpdater:
         
         logger.info(f"Giorno {day}: colonne calcolate - articoli={articoli_col}, vendite={vendite_col}, diff_stock={diff_stock_col}, diff_vendite={diff_vendite_col}")
         
+        # Primo giorno del mese: i dati del mese precedente si leggono una volta per tutti i profili
+        previous_month_data = {}
+        if day == 1:
+            logger.info(f"Primo giorno del mese {month}, recupero dati del mese precedente")
+            previous_month_data = self.get_previous_month_last_day_data(year, month)
+        
         # Prepara update
         updates = []
+        stale_notes = {}
         for profilo in scraped_data:
             name = profilo['name']
             url = profilo['url']
@@ -879,14 +893,12 @@ class GoogleSheetsUpdater:
             prev_vendite = None
             
             if day == 1:  # Primo giorno del mese - usa dati del mese precedente
-                logger.info(f"Primo giorno del mese {month}, recupero dati del mese precedente")
-                previous_month_data = self.get_previous_month_last_day_data(year, month)
                 if name in previous_month_data:
                     prev_articoli = previous_month_data[name].get('articles')
                     prev_vendite = previous_month_data[name].get('sales')
-                    logger.info(f"  Dati mese precedente per {name}: articoli={prev_articoli}, vendite={prev_vendite}")
+                    logger.info(f"  Dati mese precedente per {name}: articoli={prev_articoli}, vendite={prev_vendite}", extra=sampled("sheets.profile_row"))
                 else:
-                    logger.info(f"  Nessun dato del mese precedente trovato per {name}")
+                    logger.info(f"  Nessun dato del mese precedente trovato per {name}", extra=sampled("sheets.profile_row"))
             
             elif day > 1:  # Giorni successivi - usa dati del giorno precedente
                 prev_articoli_col = 3 + (day-2)*4  # Giorno precedente
@@ -897,10 +909,10 @@ class GoogleSheetsUpdater:
                         if row[prev_articoli_col]:
                             clean_val = str(row[prev_articoli_col]).replace("'", "").replace(" ", "").strip()
                             prev_articoli = int(clean_val) if clean_val else None
-                            logger.info(f"  Dati giorno precedente: articoli={row[prev_articoli_col]} -> {prev_articoli}")
+                            logger.info(f"  Dati giorno precedente: articoli={row[prev_articoli_col]} -> {prev_articoli}", extra=sampled("sheets.profile_row"))
                         else:
                             prev_articoli = None
-                            logger.info(f"  Dati giorno precedente: articoli vuoto")
+                            logger.info(f"  Dati giorno precedente: articoli vuoto", extra=sampled("sheets.profile_row"))
                     except (ValueError, TypeError) as e:
                         prev_articoli = None
                         logger.warning(f"  Errore nel parsing articoli precedenti '{row[prev_articoli_col]}': {e}")
@@ -910,10 +922,10 @@ class GoogleSheetsUpdater:
                         if row[prev_vendite_col]:
                             clean_val = str(row[prev_vendite_col]).replace("'", "").replace(" ", "").strip()
                             prev_vendite = int(clean_val) if clean_val else None
-                            logger.info(f"  Dati giorno precedente: vendite={row[prev_vendite_col]} -> {prev_vendite}")
+                            logger.info(f"  Dati giorno precedente: vendite={row[prev_vendite_col]} -> {prev_vendite}", extra=sampled("sheets.profile_row"))
                         else:
                             prev_vendite = None
-                            logger.info(f"  Dati giorno precedente: vendite vuoto")
+                            logger.info(f"  Dati giorno precedente: vendite vuoto", extra=sampled("sheets.profile_row"))
                     except (ValueError, TypeError) as e:
                         prev_vendite = None
                         logger.warning(f"  Errore nel parsing vendite precedenti '{row[prev_vendite_col]}': {e}")
@@ -922,10 +934,29 @@ class GoogleSheetsUpdater:
             diff_stock = articoli - prev_articoli if prev_articoli is not None else ""
             diff_vendite = vendite - prev_vendite if prev_vendite is not None else ""
             
+            # Profilo non aggiornato (fallito o in quarantena): si riportano gli ultimi valori
+            # noti, con una nota sulle celle del giorno. Priorità: valori già scritti oggi
+            # (es. esecuzione delle 11:30 riuscita, diff comprese), poi l'ultima lettura
+            # riuscita portata dallo scraper, infine il giorno precedente senza differenze
+            if profilo.get('stale'):
+                today = [row[col] if col < len(row) else "" for col in
+                         (articoli_col, vendite_col, diff_stock_col, diff_vendite_col)]
+                if today[0] != "" and today[1] != "":
+                    articoli, vendite, diff_stock, diff_vendite = today
+                elif profilo.get('stale_since') is not None:
+                    diff_stock = diff_vendite = ""
+                else:
+                    articoli = prev_articoli if prev_articoli is not None else ""
+                    vendite = prev_vendite if prev_vendite is not None else ""
+                    diff_stock = diff_vendite = ""
+                stale_notes[name] = (f"⏸ Dato non aggiornato ({profilo.get('error', 'profilo in quarantena')}). "
+                                     f"Ultima lettura riuscita: {profilo.get('stale_since') or 'mai'}")
+                logger.warning(f"Profilo {name} non aggiornato: riportati articoli={articoli}, vendite={vendite}")
+            
             # Log per debug
-            logger.info(f"Profilo {name}: articoli={articoli}, vendite={vendite}, prev_articoli={prev_articoli}, prev_vendite={prev_vendite}")
-            logger.info(f"  Calcoli: diff_stock={diff_stock}, diff_vendite={diff_vendite}")
-            logger.info(f"  Colonne: articoli_col={articoli_col}, vendite_col={vendite_col}, diff_stock_col={diff_stock_col}, diff_vendite_col={diff_vendite_col}")
+            logger.info(f"Profilo {name}: articoli={articoli}, vendite={vendite}, prev_articoli={prev_articoli}, prev_vendite={prev_vendite}", extra=sampled("sheets.profile_row"))
+            logger.info(f"  Calcoli: diff_stock={diff_stock}, diff_vendite={diff_vendite}", extra=sampled("sheets.profile_row"))
+            logger.info(f"  Colonne: articoli_col={articoli_col}, vendite_col={vendite_col}, diff_stock_col={diff_stock_col}, diff_vendite_col={diff_vendite_col}", extra=sampled("sheets.profile_row"))
             
             # Allunga la riga se serve
             while len(row) < diff_vendite_col+1:
@@ -937,8 +968,8 @@ class GoogleSheetsUpdater:
             row[diff_vendite_col] = diff_vendite if diff_vendite != "" else ""
             
             # Log per verificare che i dati siano stati assegnati correttamente
-            logger.info(f"  Dati assegnati: row[{articoli_col}]={row[articoli_col]}, row[{vendite_col}]={row[vendite_col]}")
-            logger.info(f"  Diff assegnati: row[{diff_stock_col}]={row[diff_stock_col]}, row[{diff_vendite_col}]={row[diff_vendite_col]}")
+            logger.info(f"  Dati assegnati: row[{articoli_col}]={row[articoli_col]}, row[{vendite_col}]={row[vendite_col]}", extra=sampled("sheets.profile_row"))
+            logger.info(f"  Diff assegnati: row[{diff_stock_col}]={row[diff_stock_col]}, row[{diff_vendite_col}]={row[diff_vendite_col]}", extra=sampled("sheets.profile_row"))
             
             # Aggiorna la riga in values
             values[row_idx-1] = row
@@ -1018,6 +1049,26 @@ class GoogleSheetsUpdater:
                 }
             }]
             
+            
+            # Note di dato non aggiornato sulle celle del giorno (vuote per i profili aggiornati,
+            # così una nota della mattina sparisce se la sera la lettura riesce)
+            notes = [{"values": [{"note": stale_notes.get(row[0] if row else "", "")}] * 2}
+                     for row in values[2:-1]]
+            if notes:
+                requests.append({
+                    "updateCells": {
+                        "range": {
+                            "sheetId": sheet_id,
+                            "startRowIndex": 2,
+                            "endRowIndex": 2 + len(notes),
+                            "startColumnIndex": articoli_col,
+                            "endColumnIndex": vendite_col + 1
+                        },
+                        "rows": notes,
+                        "fields": "note"
+                    }
+                })
+            
             self.service.spreadsheets().batchUpdate(
                 spreadsheetId=self.spreadsheet_id,
                 body={"requests": requests}
@@ -1032,6 +1083,10 @@ class GoogleSheetsUpdater:
         # Aggiorna i totali mensili delle diff vendite nella seconda colonna
         self.update_monthly_diff_vendite_totals(month_name, year)
         
+        if not full_refresh:
+            logger.info("⏭️ Formattazione e Overview rimandate al prossimo aggiornamento completo")
+            return True
+        
         self.format_monthly_sheet(month_name, year)
         
         # Aggiorna la tab Overview dopo aver aggiornato la tab mensile
@@ -1233,9 +1288,8 @@ class GoogleSheetsUpdater:
             header = ["Profilo"] + [month.capitalize() for month in all_months] + ["Totale"]
             overview_data.append(header)
             
-            # Ottieni la lista dei profili dalla configurazione
-            from config import VESTIAIRE_PROFILES
-            profiles = list(VESTIAIRE_PROFILES.keys())
+            # Profili abilitati del registro
+            profiles = load_registry().names()
             
             # Leggi tutti i dati delle tab mensili in una volta sola per ridurre le chiamate API
             monthly_data = {}
@@ -1247,7 +1301,8 @@ class GoogleSheetsUpdater:
                         range=f"{month}!A:ZZ"
                     ).execute()
                     values = result.get('values', [])
-                    monthly_data[month] = values
+                    # Indice profilo -> riga: una ricerca per profilo invece di una scansione della tab
+                    monthly_data[month] = {row[0]: row for row in values[2:] if row and row[0]}
                     logger.info(f"Dati {month} caricati: {len(values)} righe")
                     
                     # Delay per evitare rate limit
@@ -1255,7 +1310,7 @@ class GoogleSheetsUpdater:
                     
                 except Exception as e:
                     logger.error(f"Errore nel caricamento dati {month}: {e}")
-                    monthly_data[month] = []
+                    monthly_data[month] = {}
             
             # Per ogni profilo, calcola i totali mensili
             for profile in profiles:
@@ -1264,18 +1319,8 @@ class GoogleSheetsUpdater:
                 
                 for month in all_months:
                     try:
-                        values = monthly_data.get(month, [])
-                        
-                        if not values or len(values) < 2:
-                            row.append(0)
-                            continue
-                        
                         # Trova la riga del profilo
-                        profile_row = None
-                        for row_idx, data_row in enumerate(values):
-                            if data_row and data_row[0] == profile:
-                                profile_row = data_row
-                                break
+                        profile_row = monthly_data.get(month, {}).get(profile)
                         
                         if not profile_row or len(profile_row) < 2:
                             row.append(0)
@@ -1287,7 +1332,7 @@ class GoogleSheetsUpdater:
                                 total = int(str(profile_row[1]).replace("'", "").replace(" ", "").strip())
                                 row.append(total)
                                 profile_total += total
-                                logger.info(f"  {profile} in {month}: totale = {total} (colonna B)")
+                                logger.info(f"  {profile} in {month}: totale = {total} (colonna B)", extra=sampled("sheets.overview_row"))
                             except (ValueError, TypeError):
                                 logger.warning(f"  {profile} in {month}: valore non numerico in colonna B: {profile_row[1]}")
                                 row.append(0)
@@ -1371,8 +1416,7 @@ class GoogleSheetsUpdater:
             })
             
             # Colori alternati per le righe dati (dinamico basato sul numero di profili)
-            from config import VESTIAIRE_PROFILES
-            num_profiles = len(VESTIAIRE_PROFILES)
+            num_profiles = len(load_registry().names())
             for row_idx in range(1, num_profiles + 1):  # Profili da 1 a num_profiles
                 color = {"red": 0.89, "green": 0.94, "blue": 0.99} if row_idx % 2 == 0 else {"red": 1, "green": 1, "blue": 1}
                 requests.append({
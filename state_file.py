@@ -0,0 +1,65 @@
+"""
+State File
+Scrittura dei file di stato JSON condivisi tra processi (worker locali della coda durevole):
+sotto un lock esclusivo sul file <path>.lock si rilegge lo stato su disco, lo si fonde con
+le modifiche del processo e lo si riscrive in modo atomico (file temporaneo + os.replace),
+così una scrittura interrotta non tronca il file e gli aggiornamenti degli altri non si perdono.
+"""
+
+import os
+import json
+import logging
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+try:
+    import fcntl
+except ImportError:  # Windows: niente lock tra processi, resta la scrittura atomica
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def file_lock(path: str):
+    """Lock esclusivo tra processi su path + ".lock" (bloccante)"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + ".lock", "a") as lock:
+        if fcntl:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+def read_json(path: str) -> Dict:
+    """Contenuto del file JSON, {} se manca o non è leggibile"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"⚠️ {os.path.basename(path)} non leggibile, ignorato: {e}")
+        return {}
+
+
+def write_json_atomic(path: str, data: Dict):
+    """Scrive su un file temporaneo del processo e lo sostituisce al file finale"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def update_json(path: str, merge: Callable[[Dict], Dict]) -> Dict:
+    """
+    Sotto lock: legge lo stato su disco, merge(stato su disco) restituisce lo stato da
+    scrivere, che viene scritto in modo atomico e restituito
+    """
+    with file_lock(path):
+        data = merge(read_json(path))
+        write_json_atomic(path, data)
+    return data
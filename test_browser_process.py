@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Test della scadenza per profilo e della terminazione dei processi del browser
+Usa processi reali al posto di Chrome, senza rete
+"""
+
+import sys
+import os
+import time
+import tempfile
+import subprocess
+import logging
+
+# Aggiungi il percorso del progetto
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Stato (circuit breaker, durate, memo di navigazione) in una directory temporanea, non in state/
+os.environ.setdefault("VESTIAIRE_STATE_DIR", tempfile.mkdtemp(prefix="vestiaire_state_"))
+
+from browser_process import DeadlineWatchdog, DriverRecycler, kill_driver, process_tree, driver_rss_mb
+from work_queue import ProfileDurations
+from profile_health import ProfileCircuitBreaker
+
+# Configura logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class _FakeService:
+    def __init__(self, process):
+        self.process = process
+
+
+class _FakeDriver:
+    """Solo ciò che kill_driver usa di un webdriver.Chrome: service.process"""
+
+    def __init__(self, process=None):
+        self.service = _FakeService(process)
+        self.closed = False
+
+    def quit(self):
+        self.closed = True
+
+
+def test_kill_driver_terminates_process_tree():
+    """chromedriver e i processi figli (Chrome) vengono terminati insieme"""
+    process = subprocess.Popen(["sh", "-c", "sleep 30 & sleep 30 & wait"])
+    time.sleep(0.3)
+    assert len(process_tree(process.pid)) == 3
+
+    killed = kill_driver(_FakeDriver(process))
+    assert killed == 3
+    assert process.poll() is not None
+
+
+def test_deadline_watchdog():
+    """Il callback parte solo se il budget viene superato"""
+    calls = []
+    with DeadlineWatchdog(0.1, lambda: calls.append("kill"), label="lento") as watchdog:
+        time.sleep(0.3)
+    assert watchdog.expired and calls == ["kill"]
+
+    with DeadlineWatchdog(5, lambda: calls.append("kill"), label="veloce") as watchdog:
+        pass
+    assert not watchdog.expired and calls == ["kill"]
+
+
+def test_driver_recycler_thresholds():
+    """Riciclo per numero di pagine e per RSS misurato dei processi"""
+    process = subprocess.Popen(["sh", "-c", "sleep 30 & wait"])
+    time.sleep(0.3)
+    try:
+        driver = _FakeDriver(process)
+        assert driver_rss_mb(driver) > 0
+
+        by_pages = DriverRecycler(max_pages=2)
+        assert by_pages.check(driver) is None
+        assert by_pages.check(driver) == "pages"
+
+        by_memory = DriverRecycler(max_rss_mb=0.001, track_memory=True)
+        assert by_memory.check(driver) == "memory"
+        by_memory.record(driver, "memory", "Profilo")
+        summary = by_memory.get_summary()
+        assert summary["recycles"] == 1 and summary["by_reason"] == {"memory": 1}
+        assert summary["events"][0]["pages"] == 1 and summary["peak_rss_mb"] > 0
+    finally:
+        kill_driver(_FakeDriver(process))
+
+
+def test_scraper_recycles_driver_after_max_pages():
+    """Il driver viene chiuso e sostituito ogni max_pages profili"""
+    from src.scraper import VestiaireScraper
+
+    scraper = VestiaireScraper(profiles={"A": "1", "B": "2", "C": "3"})
+    scraper.profile_durations = ProfileDurations(path=os.path.join(tempfile.mkdtemp(), "durations.json"))
+    scraper.profile_health = ProfileCircuitBreaker(path=os.path.join(tempfile.mkdtemp(), "health.json"))
+    scraper.driver_recycler = DriverRecycler(max_pages=2)
+    drivers = []
+
+    def fake_setup_driver():
+        scraper.driver = _FakeDriver()
+        drivers.append(scraper.driver)
+
+    scraper.setup_driver = fake_setup_driver
+    scraper.scrape_profile = lambda name, id: {"name": name, "profile_id": id, "success": True,
+                                               "performance": {"total_time": 0.1}}
+    scraper.scrape_all_profiles()
+
+    assert len(drivers) == 2 and all(driver.closed for driver in drivers)
+    recycling = scraper.performance_stats["driver_recycling"]
+    assert recycling["by_reason"] == {"pages": 1} and recycling["events"][0]["label"] == "B"
+
+
+def test_scraper_requeues_timed_out_profile():
+    """Un profilo bloccato viene riaccodato in fondo e non ferma gli altri"""
+    from src.scraper import VestiaireScraper
+
+    scraper = VestiaireScraper(profiles={"Lento": "1", "Veloce": "2"})
+    scraper.profile_durations = ProfileDurations(path=os.path.join(tempfile.mkdtemp(), "durations.json"))
+    scraper.profile_health = ProfileCircuitBreaker(path=os.path.join(tempfile.mkdtemp(), "health.json"))
+    scraper.retry_config = {"profile_deadline": 0.2, "max_retries": 1, "retry_delay": 0, "timeout_retry": True}
+    drivers_started = []
+
+    def fake_setup_driver():
+        scraper.driver = _FakeDriver()
+        drivers_started.append(scraper.driver)
+
+    scraper.setup_driver = fake_setup_driver
+    attempts = []
+
+    def fake_scrape_profile(profile_name, profile_id):
+        attempts.append(profile_name)
+        if profile_name == "Lento" and attempts.count("Lento") == 1:
+            time.sleep(0.5)
+        return {"name": profile_name, "profile_id": profile_id, "success": True,
+                "performance": {"total_time": 0.1}}
+
+    scraper.scrape_profile = fake_scrape_profile
+    results = scraper.scrape_all_profiles()
+
+    assert attempts == ["Lento", "Veloce", "Lento"]
+    assert [result["name"] for result in results] == ["Lento", "Veloce"]
+    assert all(result["success"] for result in results)
+    assert scraper.performance_stats["driver_recycling"]["by_reason"] == {"deadline": 1}
+    # Driver iniziale + driver sostitutivo dopo la scadenza
+    assert len(drivers_started) == 2
+
+
+def test_revenue_price_fallback_closes_its_driver():
+    """Il fallback live dei prezzi (snapshot senza prezzi) non lascia Chrome aperti a fine esecuzione"""
+    from revenue_scraper import RevenueScraper
+    from page_snapshot import PageSnapshot
+
+    scraper = RevenueScraper(profiles={"A": "1", "B": "2"})
+    scraper.profile_durations = ProfileDurations(path=os.path.join(tempfile.mkdtemp(), "durations.json"))
+    scraper.profile_health = ProfileCircuitBreaker(path=os.path.join(tempfile.mkdtemp(), "health.json"))
+    drivers = []
+
+    def fake_setup_driver():
+        scraper.driver = _FakeDriver()
+        scraper.driver.get = lambda url: None
+        scraper._register_driver(scraper.driver)
+        drivers.append(scraper.driver)
+
+    def fake_capture(profile_name, profile_id):
+        html = "<html><body><span>3 venduti</span></body></html>"
+        return {"name": profile_name, "profile_id": profile_id, "page_timing": {}, "error": None,
+                "snapshot": PageSnapshot.from_html("url", html, profile_name), "capture_time": 0.1}
+
+    scraper.setup_driver = fake_setup_driver
+    scraper._capture_profile_revenue = fake_capture
+    scraper._handle_cloudflare_challenge = lambda profile_name: True
+    scraper._handle_cookie_banner = lambda: None
+    scraper._extract_final_sale_prices = lambda profile_name, profile_id: [120.0]
+    results = scraper.scrape_all_profiles_revenue()
+
+    assert [list(result.prices) for result in results] == [[120.0], [120.0]]
+    assert drivers and all(driver.closed for driver in drivers)
+    assert scraper.driver is None
+
+
+def test_revenue_price_fallback_respects_deadline():
+    """Una pagina bloccata nel fallback live dei prezzi viene interrotta entro profile_deadline"""
+    from revenue_scraper import RevenueScraper
+    from page_snapshot import PageSnapshot
+
+    scraper = RevenueScraper(profiles={"Bloccato": "1", "Veloce": "2"})
+    scraper.profile_durations = ProfileDurations(path=os.path.join(tempfile.mkdtemp(), "durations.json"))
+    scraper.profile_health = ProfileCircuitBreaker(path=os.path.join(tempfile.mkdtemp(), "health.json"))
+    scraper.retry_config = dict(scraper.retry_config, profile_deadline=0.2)
+
+    def fake_setup_driver():
+        scraper.driver = _FakeDriver()
+        scraper.driver.get = lambda url: None
+        scraper._register_driver(scraper.driver)
+
+    def fake_capture(profile_name, profile_id):
+        html = "<html><body><span>3 venduti</span></body></html>"
+        return {"name": profile_name, "profile_id": profile_id, "page_timing": {}, "error": None,
+                "snapshot": PageSnapshot.from_html("url", html, profile_name), "capture_time": 0.1}
+
+    def fake_extract(profile_name, profile_id):
+        if profile_name == "Bloccato":
+            time.sleep(0.5)
+        return [120.0]
+
+    scraper.setup_driver = fake_setup_driver
+    scraper._capture_profile_revenue = fake_capture
+    scraper._open_profile_page = lambda profile_name, profile_id: True
+    scraper._extract_final_sale_prices = fake_extract
+    results = {result.name: result for result in scraper.scrape_all_profiles_revenue()}
+
+    assert list(results["Bloccato"].prices) == [] and list(results["Veloce"].prices) == [120.0]
+    recycling = scraper.driver_recycler.get_summary()
+    assert recycling["by_reason"] == {"deadline": 1} and recycling["events"][0]["label"] == "Bloccato"
+    assert scraper.driver is None
+
+
+if __name__ == "__main__":
+    logger.info("=== TEST SCADENZA E PROCESSI BROWSER ===")
+    test_kill_driver_terminates_process_tree()
+    test_deadline_watchdog()
+    test_driver_recycler_thresholds()
+    test_scraper_recycles_driver_after_max_pages()
+    test_scraper_requeues_timed_out_profile()
+    test_revenue_price_fallback_closes_its_driver()
+    test_revenue_price_fallback_respects_deadline()
+    logger.info("✅ Tutti i test superati")
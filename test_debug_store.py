@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test dell'archivio dei dati di debug
+(partizioni mensili in gzip, indice per esecuzione e profilo, retention)
+"""
+
+import sys
+import os
+import gzip
+import json
+import tempfile
+import logging
+from datetime import datetime
+
+# Aggiungi il percorso del progetto
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from debug_store import DebugStore, INDEX_FILE, partition_name
+
+# Configura logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _results(run: int) -> list:
+    return [
+        {"name": "Hugo", "articles": 100 + run, "sales": 50 + run, "success": True, "performance": {"total_time": 1.5}},
+        {"name": "Mark", "articles": 20, "sales": 7, "success": run % 2 == 0, "error": None},
+    ]
+
+
+def test_runs_appended_to_monthly_partition_and_indexed():
+    """Un membro gzip per esecuzione, rileggibile da solo o con la partizione intera"""
+    directory = tempfile.mkdtemp()
+    store = DebugStore(directory)
+    for run in range(3):
+        store.append_run(_results(run), timestamp=datetime(2026, 10, 1 + run, 8, 0), meta={"total_profiles": 2})
+
+    assert sorted(os.listdir(directory)) == [partition_name(datetime(2026, 10, 1)), INDEX_FILE]
+    with gzip.open(os.path.join(directory, partition_name(datetime(2026, 10, 1))), "rt", encoding="utf-8") as f:
+        assert len([json.loads(line) for line in f]) == 6
+
+    # Indice riletto da disco da una nuova istanza
+    store = DebugStore(directory)
+    runs = store.runs()
+    assert [entry["run"] for entry in runs] == ["2026-10-01T08:00:00", "2026-10-02T08:00:00", "2026-10-03T08:00:00"]
+    assert runs[0]["total_profiles"] == 2
+    records = store.read_run(runs[1])
+    assert [record["name"] for record in records] == ["Hugo", "Mark"]
+    assert records[0]["performance"] == {"total_time": 1.5} and records[0]["run"] == "2026-10-02T08:00:00"
+
+
+def test_profile_history_from_index():
+    """Storico delle ultime N esecuzioni di un profilo senza decomprimere le partizioni"""
+    directory = tempfile.mkdtemp()
+    store = DebugStore(directory)
+    days = [(9, 28), (9, 29), (9, 30), (10, 1), (10, 2)]
+    for run, (month, day) in enumerate(days):
+        store.append_run(_results(run), timestamp=datetime(2026, month, day, 8, 0))
+
+    history = store.profile_history("Hugo", last_n=3)
+    assert [row["sales"] for row in history] == [52, 53, 54]
+    assert history[-1]["run"] == "2026-10-02T08:00:00" and "performance" not in history[-1]
+    assert [row["success"] for row in store.profile_history("Mark")] == [True, False, True, False, True]
+    assert [record["articles"] for record in store.profile_records("Hugo", last_n=2)] == [103, 104]
+    assert store.profile_history("Sconosciuto") == []
+
+
+def test_retention_drops_old_partitions_and_index_entries():
+    """Partizioni oltre retention_months eliminate insieme alle loro voci nell'indice"""
+    directory = tempfile.mkdtemp()
+    store = DebugStore(directory, retention_months=2)
+    for month in (6, 7, 8, 9, 10):
+        store.append_run(_results(month), timestamp=datetime(2026, month, 1, 8, 0))
+
+    assert store.get_summary()["partitions"] == [partition_name(datetime(2026, month, 1)) for month in (9, 10)]
+    assert [entry["run"][:7] for entry in DebugStore(directory).runs()] == ["2026-09", "2026-10"]
+
+    # Limite di spazio: restano solo le partizioni che ci stanno, mai quella corrente
+    store = DebugStore(directory, retention_months=12, max_bytes=1)
+    store.append_run(_results(11), timestamp=datetime(2026, 10, 2, 8, 0))
+    assert store.get_summary()["partitions"] == [partition_name(datetime(2026, 10, 1))]
+    assert len(store.runs()) == 2
+
+
+if __name__ == "__main__":
+    logger.info("=== TEST ARCHIVIO DATI DI DEBUG ===")
+    test_runs_appended_to_monthly_partition_and_indexed()
+    test_profile_history_from_index()
+    test_retention_drops_old_partitions_and_index_entries()
+    logger.info("✅ Tutti i test superati")
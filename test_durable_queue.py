@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Test della coda di lavoro durevole
+(lease con timeout di visibilità, riassegnazione dopo un crash, worker concorrenti, coordinator)
+"""
+
+import sys
+import os
+import time
+import tempfile
+import threading
+import logging
+from unittest import mock
+
+# Aggiungi il percorso del progetto
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import durable_queue
+from durable_queue import DurableWorkQueue, run_worker, coordinate
+from profile_health import ProfileCircuitBreaker
+from selector_stats import SelectorStats
+from work_queue import ProfileDurations
+
+# Configura logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+PROFILES = {f"Profilo {i:02d}": str(7000 + i) for i in range(30)}
+FAST_POLL = {"queue_poll_seconds": 0.05, "queue_batch_size": 4}
+
+
+def _queue(**kwargs) -> DurableWorkQueue:
+    return DurableWorkQueue(os.path.join(tempfile.mkdtemp(), "queue.sqlite"), **kwargs)
+
+
+def test_expired_lease_is_redispatched():
+    """Il lease di un worker caduto scade: il profilo passa a un altro worker, poi fallisce dopo max_attempts"""
+    queue = _queue(visibility_timeout=0.2, max_attempts=2)
+    run_id = queue.enqueue_run("daily", {"Hugo": "1", "Mark": "2"}, {"Mark": 30.0})
+
+    # Il profilo più lento viene assegnato per primo
+    crashed = queue.lease("worker-a", "daily")
+    assert [task["name"] for task in crashed] == ["Mark"]
+    assert queue.lease("worker-b", "daily")[0]["name"] == "Hugo"
+    assert queue.run_status(run_id)["leased"] == 2
+
+    time.sleep(0.3)
+    queue.heartbeat("worker-b")
+    retried = queue.lease("worker-c", "daily")
+    assert [task["name"] for task in retried] == ["Mark"] and retried[0]["attempts"] == 2
+    # Il worker caduto non può più completare, quello attivo sì
+    assert not queue.complete(crashed[0], "worker-a", {"name": "Mark"})
+    assert queue.complete(retried[0], "worker-c", {"name": "Mark", "articles": 5})
+
+    # Hugo: lease scaduto due volte -> fallito
+    time.sleep(0.3)
+    assert queue.lease("worker-c", "daily")[0]["name"] == "Hugo"
+    time.sleep(0.3)
+    assert queue.lease("worker-c", "daily") == []
+    assert queue.run_status(run_id) == {"pending": 0, "leased": 0, "done": 1, "failed": 1, "cancelled": 0}
+    assert queue.results(run_id) == [{"name": "Mark", "articles": 5}]
+
+
+def test_concurrent_workers_claim_disjoint_profiles():
+    """Più worker sulla stessa coda: ogni profilo elaborato una volta, i batch senza risultato tornano in coda"""
+    queue = _queue()
+    run_id = queue.enqueue_run("daily", PROFILES)
+    queue.enqueue_run("revenue", {"Altro": "9"})
+    processed = []
+    lock = threading.Lock()
+    failures = {"count": 0}
+
+    def process_batch(profiles):
+        with lock:
+            # Primo batch: il worker perde un profilo (nessun risultato) -> riaccodato
+            if failures["count"] == 0:
+                failures["count"] += 1
+                profiles = dict(list(profiles.items())[1:])
+            processed.extend(profiles)
+        time.sleep(0.01)
+        return [{"name": name, "profile_id": profile_id} for name, profile_id in profiles.items()]
+
+    with mock.patch.dict(durable_queue.STATE_CONFIG, FAST_POLL):
+        threads = [threading.Thread(target=run_worker, args=(DurableWorkQueue(queue.path), "daily", process_batch),
+                                    kwargs={"worker_id": f"worker-{i}", "idle_exit": True}) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+
+    assert sorted(processed) == sorted(PROFILES)
+    assert queue.run_status(run_id)["done"] == len(PROFILES)
+    assert [result["name"] for result in queue.results(run_id)] == list(PROFILES)
+    # La coda revenue non è toccata dai worker daily
+    assert queue.has_work("revenue") and not queue.has_work("daily")
+
+
+def test_coordinator_waits_for_workers_and_times_out():
+    """Il coordinator restituisce i risultati completati dai worker; senza worker annulla al timeout"""
+    queue = _queue()
+    stop = threading.Event()
+    with mock.patch.dict(durable_queue.STATE_CONFIG, FAST_POLL):
+        thread = threading.Thread(target=run_worker, args=(queue, "daily", lambda profiles: [
+            {"name": name, "articles": 1} for name in profiles]), kwargs={"stop": stop})
+        thread.start()
+        try:
+            outcome = coordinate(queue, "daily", PROFILES, timeout=30)
+        finally:
+            stop.set()
+            thread.join()
+        assert outcome["status"]["done"] == len(PROFILES)
+        assert len(outcome["results"]) == len(PROFILES)
+
+        assert coordinate(queue, "daily", {"Hugo": "1"}, timeout=0.1) is None
+    assert not queue.has_work("daily")
+
+
+def test_worker_state_files_merge_instead_of_overwriting():
+    """Due worker sugli stessi file di stato: ognuno salva i propri profili senza cancellare quelli dell'altro"""
+    state_dir = tempfile.mkdtemp()
+    health_path = os.path.join(state_dir, "health.json")
+    durations_path = os.path.join(state_dir, "durations.json")
+    stats_path = os.path.join(state_dir, "stats.json")
+
+    # Entrambi caricano lo stato prima che l'altro salvi, come due processi worker paralleli
+    health = [ProfileCircuitBreaker(path=health_path, threshold=1) for _ in range(2)]
+    durations = [ProfileDurations(path=durations_path) for _ in range(2)]
+    stats = [SelectorStats(path=stats_path, window=3) for _ in range(2)]
+    health[0].record_failure("daily", "Hugo", "Pagina di errore: 404")
+    health[1].record_success("daily", "Mark", {"articles": 3, "sales": 9})
+    durations[0].record("daily", "Hugo", 10.0)
+    durations[1].record("daily", "Mark", 20.0)
+    stats[0].record("prezzi", "//span", False)
+    stats[1].record("prezzi", "//span", False)
+    stats[1].record("prezzi", "//span", False)
+    for shared in health + durations + stats:
+        shared.save()
+
+    reloaded = ProfileCircuitBreaker(path=health_path)
+    assert reloaded.get_summary("daily")["quarantined"] == ["Hugo"]
+    assert reloaded.last_good("daily", "Mark")["sales"] == 9
+    assert ProfileDurations(path=durations_path).estimates("daily") == {"Hugo": 10.0, "Mark": 20.0}
+    # Le osservazioni si sommano: tre miss in totale declassano il selettore
+    assert SelectorStats(path=stats_path, window=3).is_demoted("prezzi", "//span")
+    assert stats[0].groups["prezzi"]["//span"]["misses"] == 1 and stats[1].is_demoted("prezzi", "//span")
+    assert not [name for name in os.listdir(state_dir) if name.endswith(".tmp")]
+
+
+def test_revenue_worker_reuses_one_scraper_across_batches():
+    """Il worker revenue crea un solo scraper (un Chrome) per processo, lo chiude e riporta una volta all'uscita"""
+    import revenue_main
+    queue = _queue()
+    run_id = queue.enqueue_run("revenue", {name: PROFILES[name] for name in list(PROFILES)[:10]})
+    instances = []
+
+    class FakeRevenueScraper:
+        def __init__(self, profiles=None):
+            self.profiles = profiles
+            self.batches = []
+            self.closed = self.reports = 0
+            instances.append(self)
+
+        def scrape_all_profiles_revenue(self):
+            assert self.keep_driver_open and not self.log_report
+            self.batches.append(dict(self.profiles))
+            return [mock.Mock(to_dict=lambda name=name: {"name": name, "success": True}) for name in self.profiles]
+
+        def close(self):
+            self.closed += 1
+
+        def log_performance_summary(self):
+            self.reports += 1
+
+    with mock.patch.dict(durable_queue.STATE_CONFIG, FAST_POLL), \
+            mock.patch.object(revenue_main, "RevenueScraper", FakeRevenueScraper), \
+            mock.patch.object(revenue_main, "DurableWorkQueue", lambda: DurableWorkQueue(queue.path)):
+        assert revenue_main.worker(idle_exit=True)
+
+    assert len(instances) == 1
+    scraper = instances[0]
+    assert len(scraper.batches) == 3 and sum(len(batch) for batch in scraper.batches) == 10
+    assert scraper.closed == 1 and scraper.reports == 1
+    assert queue.run_status(run_id)["done"] == 10
+
+
+if __name__ == "__main__":
+    logger.info("=== TEST CODA DUREVOLE ===")
+    test_expired_lease_is_redispatched()
+    test_concurrent_workers_claim_disjoint_profiles()
+    test_coordinator_waits_for_workers_and_times_out()
+    test_worker_state_files_merge_instead_of_overwriting()
+    test_revenue_worker_reuses_one_scraper_across_batches()
+    logger.info("✅ Tutti i test superati")
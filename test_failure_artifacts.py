@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test della scrittura in background degli artefatti di debug
+(HTML compresso, rotazione per spazio e numero di file, manifest)
+"""
+
+import sys
+import os
+import gzip
+import json
+import tempfile
+import threading
+import logging
+
+# Aggiungi il percorso del progetto
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from failure_artifacts import FailureArtifacts, MANIFEST_FILE
+from page_snapshot import PageSnapshot
+from page_diagnostics import diagnose_snapshots
+
+# Configura logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class _FakeDriver:
+    page_source = "<html><body>" + "<div class='price'>120 €</div>" * 500 + "</body></html>"
+
+    def get_screenshot_as_png(self):
+        return b"\x89PNG\r\n\x1a\n" + b"\x00" * 2048
+
+
+def _manifest(directory: str) -> list:
+    with open(os.path.join(directory, MANIFEST_FILE), encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_page_artifacts_written_in_background_and_indexed():
+    """Screenshot e HTML compresso scritti dal thread dedicato e indicizzati nel manifest"""
+    directory = tempfile.mkdtemp()
+    artifacts = FailureArtifacts(directory=directory, max_bytes=10 * 1024 * 1024, max_files=50)
+    names = artifacts.save_page(_FakeDriver(), "Vintage & Modern", "prices")
+    assert len(names) == 2
+    assert artifacts.flush(timeout=5)
+
+    entries = _manifest(directory)
+    assert [entry["kind"] for entry in entries] == ["prices", "prices"]
+    html_entry = next(entry for entry in entries if entry["file"].endswith(".html.gz"))
+    assert html_entry["bytes"] < html_entry["original_bytes"] / 10
+    with gzip.open(os.path.join(directory, html_entry["file"]), "rt", encoding="utf-8") as f:
+        assert f.read() == _FakeDriver.page_source
+    assert "Vintage___Modern" in html_entry["file"]
+    assert artifacts.get_summary()["written"] == 2
+
+
+def test_rotation_keeps_directory_within_limits():
+    """Oltre max_files gli artefatti più vecchi vengono eliminati e tolti dal manifest"""
+    directory = tempfile.mkdtemp()
+    artifacts = FailureArtifacts(directory=directory, max_bytes=10 * 1024 * 1024, max_files=3)
+    for i in range(5):
+        artifacts.save_html(f"Profilo{i}", f"<html>{i}</html>")
+        assert artifacts.flush(timeout=5)
+
+    entries = _manifest(directory)
+    assert [entry["profile"] for entry in entries] == ["Profilo2", "Profilo3", "Profilo4"]
+    files = sorted(name for name in os.listdir(directory) if name != MANIFEST_FILE)
+    assert files == sorted(entry["file"] for entry in entries)
+    assert artifacts.get_summary()["rotated"] == 2
+
+
+def test_full_queue_drops_instead_of_blocking():
+    """Con la coda piena l'artefatto viene scartato: il worker non attende il disco"""
+    artifacts = FailureArtifacts(directory=tempfile.mkdtemp(), queue_size=1)
+    gate = threading.Event()
+    original_write = artifacts._write
+    artifacts._write = lambda item: gate.wait(5) and original_write(item)
+
+    results = [artifacts.save_html("A", "<html>1</html>") for _ in range(4)]
+    gate.set()
+    assert artifacts.flush(timeout=5)
+    assert results[0] is not None and None in results
+    assert artifacts.get_summary()["dropped"] >= 1
+
+
+def test_offline_diagnostics_on_saved_snapshot():
+    """Lo snapshot salvato in produzione viene analizzato offline, senza driver"""
+    directory = tempfile.mkdtemp()
+    artifacts = FailureArtifacts(directory=directory)
+    snapshot = PageSnapshot(
+        url="https://it.vestiairecollective.com/profile/1/", title="Hugo",
+        html="<html><body><div class='card'><span>120 €</span><span>Venduto</span></div>"
+             "<p>37 venduti</p><script>var x = '99 €';</script></body></html>",
+        text="120 €\nVenduto\n37 venduti", profile_name="Hugo")
+    ref = artifacts.save_snapshot(snapshot, "no_prices")
+    artifacts.save_snapshot(PageSnapshot(url="", html="<html></html>", profile_name="Mark"), "no_prices")
+    assert artifacts.flush(timeout=5)
+
+    reports = diagnose_snapshots(directory, refs=[ref])
+    assert len(reports) == 1
+    report = reports[0]
+    assert report["profile"] == "Hugo"
+    # Il contenuto degli script non conta come elemento con €
+    assert report["euro_elements"] == 1 and report["euro_sample"][0]["tag"] == "span"
+    assert report["sold_elements"] == 1 and report["number_elements"] == 2
+    assert report["text_patterns"][r'(\d+)\s+venduti']["sample"] == ["37"]
+    assert [r["profile"] for r in diagnose_snapshots(directory, profile="Mark")] == ["Mark"]
+
+
+if __name__ == "__main__":
+    logger.info("=== TEST ARTEFATTI DI DEBUG ===")
+    test_page_artifacts_written_in_background_and_indexed()
+    test_rotation_keeps_directory_within_limits()
+    test_full_queue_drops_instead_of_blocking()
+    test_offline_diagnostics_on_saved_snapshot()
+    logger.info("✅ Tutti i test superati")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test del logging non bloccante: record JSON scritti dal QueueListener e campionamento per chiave
+"""
+
+import sys
+import os
+import json
+import tempfile
+import threading
+import logging
+
+# Aggiungi il percorso del progetto
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from log_setup import SamplingFilter, configure_logging, sampled, stop_logging
+
+# Configura logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _record(message: str, key: str = None, level: int = logging.INFO) -> logging.LogRecord:
+    record = logging.LogRecord("test", level, __file__, 0, message, (), None)
+    if key:
+        record.log_key = key
+    return record
+
+
+def test_sampling_filter_per_key():
+    """Per chiave passano i primi burst record, poi uno ogni every con il conteggio dei soppressi"""
+    sampler = SamplingFilter(burst=2, every=5, window=60)
+    records = [_record(f"diff {i}", "sheets.diffs") for i in range(12)]
+    passed = [sampler.filter(record) for record in records]
+    assert passed == [True, True, False, False, False, False, True, False, False, False, False, True]
+    assert records[6].suppressed == 4 and "(+4 simili non registrati)" in records[6].getMessage()
+
+    # Chiavi indipendenti, messaggi senza chiave e warning sempre registrati
+    assert sampler.filter(_record("altro", "revenue.price_found"))
+    assert all(sampler.filter(_record("senza chiave")) for _ in range(20))
+    assert sampler.filter(_record("attenzione", "sheets.diffs", logging.WARNING))
+
+
+def test_queue_listener_writes_json_lines():
+    """I record di più thread arrivano nel file JSON, quelli campionati ridotti"""
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    log_dir = tempfile.mkdtemp()
+    try:
+        configure_logging("test_run", log_dir=log_dir)
+        test_logger = logging.getLogger("vestiaire.test")
+
+        def worker(n: int):
+            for i in range(100):
+                test_logger.info(f"prezzo {n}-{i}", extra=sampled("revenue.price_found"))
+            test_logger.info(f"worker {n} completato")
+
+        threads = [threading.Thread(target=worker, args=(n,), name=f"browser-{n}") for n in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stop_logging()
+
+        with open(os.path.join(log_dir, "test_run.jsonl"), encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+    finally:
+        stop_logging()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        for handler in saved_handlers:
+            root.addHandler(handler)
+        root.setLevel(saved_level)
+
+    completed = [r for r in records if r["message"].endswith("completato")]
+    prices = [r for r in records if r.get("log_key") == "revenue.price_found"]
+    assert len(completed) == 3
+    assert {r["thread"] for r in completed} == {"browser-0", "browser-1", "browser-2"}
+    # 300 record: 5 iniziali + uno ogni 50 dei successivi
+    assert len(prices) == 5 + (300 - 5) // 50
+    assert all(r["level"] == "INFO" and r["logger"] == "vestiaire.test" for r in prices)
+    assert sum(r.get("suppressed", 0) for r in prices) == (300 - 5) // 50 * 49
+
+
+def test_debug_config_loaded_once():
+    """Moduli della root e di src/ condividono lo stesso modulo debug_config"""
+    import debug_store
+    import failure_artifacts
+    import log_setup
+    from src import scraper
+
+    assert "src.debug_config" not in sys.modules
+    assert log_setup.LOG_CONFIG is sys.modules["debug_config"].LOG_CONFIG
+    assert debug_store.DEBUG_STORE is sys.modules["debug_config"].DEBUG_STORE
+    assert failure_artifacts.FAILURE_ARTIFACTS is sys.modules["debug_config"].FAILURE_ARTIFACTS
+    assert scraper.DEBUG_CONFIG is sys.modules["debug_config"].DEBUG_CONFIG
+
+
+if __name__ == "__main__":
+    logger.info("=== TEST LOGGING NON BLOCCANTE ===")
+    test_sampling_filter_per_key()
+    test_queue_listener_writes_json_lines()
+    test_debug_config_loaded_once()
+    logger.info("✅ Tutti i test superati")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Test del memo di navigazione
+(strategia vincente per prima, strategie fallite saltate e riprovate dopo reprobe_hours)
+"""
+
+import sys
+import os
+import time
+import tempfile
+import logging
+
+# Aggiungi il percorso del progetto
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from navigation_memo import NavigationMemo
+
+# Configura logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ["sold_section", "sold_items_url", "items_section", "sold_toggle"]
+
+
+def test_failed_strategy_is_skipped_then_reprobed():
+    """Dopo max_failures fallimenti la strategia esce dall'ordine e rientra dopo reprobe_hours"""
+    path = os.path.join(tempfile.mkdtemp(), "memo.json")
+    memo = NavigationMemo(path=path, max_failures=2, reprobe_hours=24)
+    for _ in range(2):
+        memo.record("Hugo", "sold_section", False, 1.0)
+    memo.record("Hugo", "items_section", True, 0.5, "https://example.com/items")
+
+    now = time.time()
+    assert memo.order_strategies("Hugo", STRATEGIES, now) == ["items_section", "sold_items_url", "sold_toggle"]
+    memo.save()
+
+    reloaded = NavigationMemo(path=path, max_failures=2, reprobe_hours=24)
+    later = now + 25 * 3600
+    assert reloaded.order_strategies("Hugo", STRATEGIES, later) == ["items_section", "sold_section",
+                                                                    "sold_items_url", "sold_toggle"]
+    # La sonda fallisce ancora: saltata per altre reprobe_hours
+    reloaded.record("Hugo", "sold_section", False, 1.0)
+    assert "sold_section" not in reloaded.order_strategies("Hugo", STRATEGIES)
+    # Riesce: torna vincente e i fallimenti consecutivi si azzerano
+    reloaded.record("Hugo", "sold_section", True, 0.8, "https://example.com/sold")
+    assert reloaded.order_strategies("Hugo", STRATEGIES)[0] == "sold_section"
+    assert reloaded.get_winning_url("Hugo", "sold_section") == "https://example.com/sold"
+
+
+if __name__ == "__main__":
+    logger.info("=== TEST MEMO DI NAVIGAZIONE ===")
+    test_failed_strategy_is_skipped_then_reprobed()
+    logger.info("✅ Tutti i test superati")
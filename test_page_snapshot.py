@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test degli estrattori offline su snapshot di pagina
+Verifica conteggi e prezzi senza browser, partendo da HTML statico
+"""
+
+import sys
+import os
+import pickle
+import logging
+
+import numpy as np
+
+# Aggiungi il percorso del progetto
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from page_snapshot import PageSnapshot, extract_sold_count, extract_sale_prices, extract_profile_counts
+from snapshot_parser import SnapshotParser
+from pattern_bank import parse_amount, find_prices, find_sold_count
+from price_normalizer import normalize_prices, unique_valid_prices
+
+# Configura logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+PROFILE_HTML = """
+<html><head><title>Rediscover - Vestiaire Collective</title>
+<script type="application/json">{"user": {"items_sold": 42}}</script></head>
+<body>
+  <div class="profile-header"><span>1,234 items for sale</span><span>7306 sold</span></div>
+  <div class="product-card"><span class="price">120 €</span></div>
+  <div class="product-card"><span class="strike"><span>300 €</span></span><span>95 €</span></div>
+  <div class="product-card"><span>5 €</span></div>
+</body></html>
+"""
+
+
+def _snapshot(html: str = PROFILE_HTML, text: str = "", scripts: list = None) -> PageSnapshot:
+    return PageSnapshot(url="https://it.vestiairecollective.com/profile/1/", html=html, text=text,
+                        scripts=scripts or [], title="Rediscover", profile_name="Rediscover")
+
+
+def test_profile_counts_from_spans():
+    """Articoli e vendite vengono letti dagli span come in scrape_profile"""
+    counts = extract_profile_counts(_snapshot())
+    assert counts["articles"] == 1234 and counts["articles_found"]
+    assert counts["sales"] == 7306 and counts["sales_found"]
+
+
+def test_sold_count_prefers_tabs_then_json():
+    """7306 è fuori range per un tab, quindi il conteggio arriva dal JSON negli script"""
+    snapshot = _snapshot(scripts=['{"user": {"items_sold": 42}}'])
+    result = extract_sold_count(snapshot)
+    assert result == {"count": 42, "source": "json", "match": "items_sold"}
+
+    tab_html = "<html><body><div class='tab'><span>venduti (12)</span></div></body></html>"
+    assert extract_sold_count(_snapshot(tab_html))["count"] == 12
+
+
+def test_sale_prices_skip_strikethrough_and_out_of_range():
+    """Prezzi barrati e fuori dall'intervallo 10-10000 € vengono scartati"""
+    prices = extract_sale_prices(_snapshot())
+    assert prices == [120.0, 95.0]
+
+    # Fallback sul testo visibile quando le card non contengono prezzi
+    assert extract_sale_prices(_snapshot("<html><body></body></html>", text="Venduto a 80 €")) == [80.0]
+
+
+def test_pattern_bank_italian_and_english_amounts():
+    """Importi in formato italiano e inglese, valuta prima o dopo"""
+    assert parse_amount("1.234,56") == 1234.56
+    assert parse_amount("1,234.56") == 1234.56
+    assert parse_amount("95,50") == 95.5
+    assert parse_amount("12.500") == 12500.0
+    assert find_prices("Venduto a 1.234,56 € (prima € 1.500)") == [1234.56, 1500.0]
+    # Lo spazio semplice non è un separatore: taglia e prezzo restano distinti
+    assert find_prices("Taglia 42 120 €") == [120.0]
+    assert find_sold_count("Profilo - 7 articoli venduti - venduti: 3") == (7, "it_items")
+
+    card_html = "<html><body><div class='product-card'><span>1.234,56 €</span></div></body></html>"
+    assert extract_sale_prices(_snapshot(card_html)) == [1234.56]
+
+
+def test_bulk_price_normalizer():
+    """Array di prezzi e maschera di validità coerenti con parse_amount"""
+    texts = ["1.234,00 €", "306,50 €", "€ 95", "1,234.56 EUR", "12.500 €", "5 €", "nessun prezzo", "306,50 €"]
+    prices, valid = normalize_prices(texts)
+    assert prices.dtype.kind == "f" and valid.dtype == bool
+    assert prices[:5].tolist() == [1234.0, 306.5, 95.0, 1234.56, 12500.0]
+    assert valid.tolist() == [True, True, True, True, False, False, False, True]
+    assert unique_valid_prices(prices, valid) == [1234.0, 306.5, 95.0, 1234.56]
+
+    # Separatori misti malformati: NaN solo per il frammento, non per tutta la lista
+    mixed_prices, mixed_valid = normalize_prices(["1,234,56 €", "12 €", "1.234.56 €", "€ 45,00"])
+    assert parse_amount("1,234,56") is None and parse_amount("1.234.56") is None
+    assert mixed_valid.tolist() == [False, True, False, True]
+    assert np.isnan(mixed_prices[[0, 2]]).all() and mixed_prices[1] == 12.0 and mixed_prices[3] == 45.0
+
+    empty_prices, empty_valid = normalize_prices([])
+    assert empty_prices.size == 0 and unique_valid_prices(empty_prices, empty_valid) == []
+
+
+def test_snapshot_is_picklable():
+    """Lo snapshot si serializza senza l'albero lxml (per passarlo ad altri processi)"""
+    snapshot = _snapshot()
+    extract_sale_prices(snapshot)
+    restored = pickle.loads(pickle.dumps(snapshot))
+    assert restored.html == snapshot.html
+    assert extract_sale_prices(restored) == [120.0, 95.0]
+
+
+def test_snapshot_parser_process_pool():
+    """Il pool di processi restituisce gli stessi risultati del parsing in linea"""
+    snapshots = [_snapshot(scripts=['{"items_sold": %d}' % (i + 1)]) for i in range(4)]
+    with SnapshotParser(max_workers=2) as pool, SnapshotParser(max_workers=0) as inline:
+        pooled = [pool.submit("revenue", snapshot) for snapshot in snapshots]
+        direct = [inline.submit("revenue", snapshot) for snapshot in snapshots]
+        for pooled_future, direct_future in zip(pooled, direct):
+            pooled_result, direct_result = pooled_future.result(), direct_future.result()
+            assert pooled_result["prices"] == direct_result["prices"] == [120.0, 95.0]
+            assert pooled_result["sold_count"] == direct_result["sold_count"]
+        assert [future.result()["sold_count"] for future in pooled] == [1, 2, 3, 4]
+
+
+if __name__ == "__main__":
+    logger.info("=== TEST ESTRATTORI SNAPSHOT ===")
+    test_profile_counts_from_spans()
+    test_sold_count_prefers_tabs_then_json()
+    test_sale_prices_skip_strikethrough_and_out_of_range()
+    test_pattern_bank_italian_and_english_amounts()
+    test_bulk_price_normalizer()
+    test_snapshot_is_picklable()
+    test_snapshot_parser_process_pool()
+    logger.info("✅ Tutti i test superati")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test dello storico performance
+(percentili p50/p95, gate di regressione con soglie e p95 storico, report del trend)
+"""
+
+import sys
+import os
+import logging
+
+# Aggiungi il percorso del progetto e di src/
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from perf_history import percentile, check_regressions, format_history_report
+
+# Configura logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+THRESHOLDS = {"max_profile_time": 15.0, "max_total_time": 300.0, "min_success_rate": 0.8, "max_error_rate": 0.2}
+
+
+def _run(total_time: float, scraping_time: float = 60.0, success_rate: float = 1.0, lento: float = 8.0) -> dict:
+    return {
+        "timestamp": "2025-08-01T11:30:00",
+        "driver_setup_time": 3.0,
+        "total_scraping_time": scraping_time,
+        "sheets_time": 4.0,
+        "success_rate": success_rate,
+        "profiles": {
+            "Veloce": {"success": True, "total_time": total_time, "page_load_time": 1.0, "parse_time": 0.1},
+            "Lento": {"success": True, "total_time": lento, "page_load_time": 5.0, "parse_time": 0.5},
+            "Fallito": {"success": False, "total_time": 99.0, "page_load_time": 0.0, "parse_time": 0.0},
+        },
+    }
+
+
+def test_percentile_interpolates_linearly():
+    """p50 e p95 con interpolazione lineare tra i valori ordinati"""
+    assert percentile([], 95) == 0.0
+    assert percentile([7.0], 95) == 7.0
+    assert percentile([4.0, 1.0, 3.0, 2.0], 50) == 2.5
+    assert abs(percentile(list(range(1, 11)), 95) - 9.55) < 1e-9
+    assert percentile([1.0, 2.0, 3.0], 100) == 3.0
+
+
+def test_regression_gate_thresholds_and_historical_p95():
+    """Le soglie fissano gli errori, il superamento di regression_factor × p95 storico gli avvisi"""
+    history = [_run(2.0 + i * 0.1) for i in range(6)]
+    assert check_regressions(history + [_run(2.5)], THRESHOLDS) == {"failures": [], "warnings": []}
+
+    # p95 storico di Veloce: 2.475s, oltre 1.5× solo la seconda esecuzione
+    slow = check_regressions(history + [_run(4.0)], THRESHOLDS)
+    assert slow["failures"] == [] and len(slow["warnings"]) == 1 and slow["warnings"][0].startswith("Veloce")
+    # Con meno di 5 esecuzioni di storico nessun avviso
+    assert check_regressions(history[:4] + [_run(4.0)], THRESHOLDS)["warnings"] == []
+
+    broken = check_regressions(history + [_run(2.0, scraping_time=400.0, success_rate=0.5, lento=20.0)], THRESHOLDS)
+    assert len(broken["failures"]) == 4
+    assert any(failure.startswith("Tempo totale") for failure in broken["failures"])
+    assert any(failure.startswith("Lento: 20.0s") for failure in broken["failures"])
+    assert check_regressions([], THRESHOLDS) == {"failures": [], "warnings": []}
+
+
+def test_history_report_sorted_by_p95():
+    """Fasi con p50/p95 e profili riusciti ordinati dal p95 più alto"""
+    lines = format_history_report([_run(2.0), _run(4.0)])
+    assert lines[0] == "Esecuzioni nello storico: 2"
+    assert any(line.startswith("total_scraping_time") and "p50   60.00s" in line for line in lines)
+    profile_lines = [line for line in lines if line.split("|")[0].strip() in ("Veloce", "Lento", "Fallito")]
+    assert [line.split()[0] for line in profile_lines] == ["Lento", "Veloce"]
+    assert "3.00/  3.90s" in profile_lines[1]
+
+
+if __name__ == "__main__":
+    logger.info("=== TEST STORICO PERFORMANCE ===")
+    test_percentile_interpolates_linearly()
+    test_regression_gate_thresholds_and_historical_p95()
+    test_history_report_sorted_by_p95()
+    logger.info("✅ Tutti i test superati")
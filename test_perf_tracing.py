@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Test della strumentazione WebDriver
+(round trip per profilo e per thread, metodo chiamante oltre lo stack di Selenium,
+tempi Navigation Timing della pagina e valutazione rispetto alle soglie)
+"""
+
+import sys
+import os
+import threading
+import logging
+from unittest import mock
+
+# Aggiungi il percorso del progetto
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import perf_tracing
+from perf_tracing import (WebDriverTracer, find_caller, format_webdriver_report,
+                          collect_page_timing, evaluate_page_timing)
+
+# Configura logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Stesso percorso di un modulo di Selenium: i suoi frame non devono comparire come chiamante
+SELENIUM_FILE = os.path.join(os.sep, "venv", "site-packages", "selenium", "webdriver", "remote", "webelement.py")
+_selenium_namespace = {}
+exec(compile(
+    "def find_elements(driver, value):\n"
+    "    return driver.execute('findElements', {'value': value})\n"
+    "def element_text(driver):\n"
+    "    return [driver.execute('getElementText') for _ in range(1)][0]\n"
+    "def call_from_selenium(callback):\n"
+    "    return callback()\n",
+    SELENIUM_FILE, "exec"), _selenium_namespace)
+
+
+class StubDriver:
+    """Driver senza browser: execute() registra i comandi ricevuti"""
+
+    def __init__(self):
+        self.commands = []
+
+    def execute(self, driver_command, params=None):
+        self.commands.append(driver_command)
+        return {"value": driver_command}
+
+
+def read_counts(driver):
+    _selenium_namespace["find_elements"](driver, "//span")
+    return _selenium_namespace["element_text"](driver)
+
+
+def open_page(driver):
+    return driver.execute("get", {"url": "https://it.vestiairecollective.com/profile/1/"})
+
+
+def test_find_caller_skips_selenium_frames_and_comprehensions():
+    """Il chiamante è la funzione del progetto, non Selenium né una list comprehension"""
+    call_from_selenium = _selenium_namespace["call_from_selenium"]
+
+    def read_price():
+        return [call_from_selenium(find_caller) for _ in range(1)][0]
+
+    assert read_price() == "read_price"
+    assert call_from_selenium(find_caller) == "test_find_caller_skips_selenium_frames_and_comprehensions"
+
+
+def test_tracer_counts_commands_per_profile_and_method():
+    """attach() strumenta execute (una sola volta) e attribuisce i comandi al profilo e al metodo"""
+    tracer = WebDriverTracer()
+    driver = StubDriver()
+    assert tracer.attach(tracer.attach(driver)) is driver
+
+    open_page(driver)
+    tracer.begin_profile("Hugo")
+    open_page(driver)
+    read_counts(driver)
+    read_counts(driver)
+    hugo = tracer.end_profile()
+    open_page(driver)
+
+    assert driver.commands.count("get") == 3
+    assert hugo["commands"] == 5
+    assert hugo["by_method"]["open_page"]["by_command"] == {"get": 1}
+    assert hugo["by_method"]["read_counts"]["by_command"] == {"findElements": 2, "getElementText": 2}
+    assert tracer.get_report()[WebDriverTracer.NO_PROFILE]["commands"] == 2
+    assert tracer.end_profile() == {"commands": 0, "time": 0.0, "by_method": {}}
+
+    lines = format_webdriver_report(tracer.get_report())
+    for line in lines:
+        logger.info(f"   {line}")
+    assert lines[0].startswith("Hugo") and "read_counts: 4 comandi" in lines[1]
+
+
+def test_tracer_attributes_commands_per_thread():
+    """Con lo scraping parallelo ogni worker conta i comandi del proprio profilo"""
+    tracer = WebDriverTracer()
+    barrier = threading.Barrier(2)
+
+    def worker(profile_name: str, pages: int):
+        driver = tracer.attach(StubDriver())
+        tracer.begin_profile(profile_name)
+        # Entrambi i profili sono aperti contemporaneamente
+        barrier.wait()
+        for _ in range(pages):
+            open_page(driver)
+        barrier.wait()
+        tracer.end_profile()
+
+    threads = [threading.Thread(target=worker, args=args) for args in (("Hugo", 3), ("Mark", 5))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    report = tracer.get_report()
+    assert set(report) == {"Hugo", "Mark"}
+    assert report["Hugo"]["commands"] == 3 and report["Mark"]["commands"] == 5
+    assert report["Mark"]["by_method"]["open_page"]["commands"] == 5
+
+
+class TimingDriver:
+    """Driver senza browser: execute_script() restituisce i tempi grezzi (ms) del browser"""
+
+    def __init__(self, raw=None, error: Exception = None):
+        self.raw = raw
+        self.error = error
+        self.scripts = []
+
+    def execute_script(self, script):
+        self.scripts.append(script)
+        if self.error:
+            raise self.error
+        return self.raw
+
+
+def test_collect_page_timing_converts_browser_timing():
+    """I millisecondi diventano secondi, i valori negativi o mancanti 0 e le risorse restano contate"""
+    driver = TimingDriver({
+        "dns": 12, "connect": 30, "ttfb": 850.4, "response": -5, "dom_interactive": 2100,
+        "dom_content_loaded": 3200, "load_event": None, "document_bytes": 48000,
+        "resource_count": 87, "resource_bytes": 2500000, "resources_by_type": {"img": 60, "script": 27},
+        "source": "navigation",
+    })
+    timing = collect_page_timing(driver)
+    assert driver.scripts == [perf_tracing.NAVIGATION_TIMING_SCRIPT]
+    assert timing["ttfb"] == 0.85 and timing["dns"] == 0.012
+    assert timing["response"] == 0.0 and timing["load_event"] == 0.0
+    assert timing["dom_content_loaded"] == 3.2
+    assert timing["resource_count"] == 87 and timing["resources_by_type"] == {"img": 60, "script": 27}
+    assert timing["source"] == "navigation"
+
+    # Browser senza Navigation Timing, errore dello script o raccolta disattivata
+    assert collect_page_timing(TimingDriver(None)) == {}
+    assert collect_page_timing(TimingDriver(error=RuntimeError("javascript error"))) == {}
+    with mock.patch.dict(perf_tracing.LOGGING_CONFIG, {"collect_page_timing": False}):
+        disabled = TimingDriver({"ttfb": 100})
+        assert collect_page_timing(disabled) == {} and disabled.scripts == []
+
+
+def test_evaluate_page_timing_ratings_and_load_share():
+    """Rating sulle soglie del tempo profilo e quota del tempo spesa ad aspettare il browser"""
+    thresholds = {"excellent_profile_time": 8, "good_profile_time": 12, "slow_connection_threshold": 7}
+    assert evaluate_page_timing({}, 8.0, thresholds)["rating"] == "excellent"
+    assert evaluate_page_timing({}, 8.1, thresholds)["rating"] == "good"
+    assert evaluate_page_timing({}, 12.0, thresholds)["rating"] == "good"
+    assert evaluate_page_timing({}, 12.5, thresholds)["rating"] == "slow"
+
+    # Load event disponibile: 5s su 10s di profilo
+    result = evaluate_page_timing({"load_event": 5.0, "dom_content_loaded": 3.0}, 10.0, thresholds)
+    assert result == {"rating": "good", "browser_load_time": 5.0, "slow_connection": False, "load_share": 50.0}
+    # Senza load event si usa DOMContentLoaded
+    result = evaluate_page_timing({"load_event": 0.0, "dom_content_loaded": 7.5}, 9.0, thresholds)
+    assert result["browser_load_time"] == 7.5 and result["slow_connection"] and result["load_share"] == 83.3
+    # Nessun tempo del browser o tempo profilo nullo: quota non calcolabile
+    assert evaluate_page_timing({}, 10.0, thresholds)["load_share"] is None
+    assert evaluate_page_timing({"load_event": 2.0}, 0.0, thresholds)["load_share"] is None
+
+
+if __name__ == "__main__":
+    logger.info("=== TEST STRUMENTAZIONE WEBDRIVER ===")
+    test_find_caller_skips_selenium_frames_and_comprehensions()
+    test_tracer_counts_commands_per_profile_and_method()
+    test_tracer_attributes_commands_per_thread()
+    test_collect_page_timing_converts_browser_timing()
+    test_evaluate_page_timing_ratings_and_load_share()
+    logger.info("✅ Tutti i test superati")
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Test del circuit breaker per profilo e del riporto dei valori non aggiornati nel foglio
+"""
+
+import sys
+import os
+import time
+import calendar
+import tempfile
+import logging
+from unittest import mock
+
+# Aggiungi il percorso del progetto e di src/
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+# Stato (circuit breaker, durate, memo di navigazione) in una directory temporanea, non in state/
+os.environ.setdefault("VESTIAIRE_STATE_DIR", tempfile.mkdtemp(prefix="vestiaire_state_"))
+
+from profile_health import ProfileCircuitBreaker
+from fake_sheets_service import FakeSheetsService
+
+# Configura logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _breaker(**kwargs) -> ProfileCircuitBreaker:
+    return ProfileCircuitBreaker(path=os.path.join(tempfile.mkdtemp(), "health.json"),
+                                 threshold=3, probe_hours=10, max_probe_hours=40, **kwargs)
+
+
+def test_quarantine_after_consecutive_failures_and_probe_backoff():
+    """Quarantena dopo 3 fallimenti, sonda con intervallo crescente, uscita al primo successo"""
+    breaker = _breaker()
+    profiles = {"Hugo": "1", "Mark": "2"}
+    breaker.record_success("daily", "Hugo", {"articles": 10, "sales": 100})
+
+    for _ in range(2):
+        breaker.record_failure("daily", "Hugo", "Nessun dato trovato nella pagina")
+    assert breaker.partition("daily", profiles)[0] == profiles
+    assert not breaker.needs_diagnostics("daily", "Hugo")
+    assert breaker.needs_diagnostics("daily", "Mark")
+
+    breaker.record_failure("daily", "Hugo", "Nessun dato trovato nella pagina")
+    active, probes, skipped = breaker.partition("daily", profiles)
+    assert active == {"Mark": "2"} and probes == {} and skipped == {"Hugo": "1"}
+    # Lo stato è separato per scraper
+    assert breaker.partition("revenue", profiles)[0] == profiles
+
+    # Sonda dovuta: un fallimento raddoppia l'intervallo (10h → 20h)
+    breaker.scopes["daily"]["Hugo"]["next_probe_at"] = time.time() - 1
+    assert breaker.partition("daily", profiles)[1] == {"Hugo": "1"}
+    breaker.record_failure("daily", "Hugo", "Pagina di errore: 403")
+    wait_hours = (breaker.scopes["daily"]["Hugo"]["next_probe_at"] - time.time()) / 3600
+    assert 19.9 < wait_hours <= 20
+
+    # Stato e ultimi valori persistiti
+    breaker.save()
+    restored = ProfileCircuitBreaker(path=breaker.path, threshold=3)
+    assert restored.get_summary("daily")["quarantined"] == ["Hugo"]
+    assert restored.last_good("daily", "Hugo")["sales"] == 100
+
+    restored.record_success("daily", "Hugo", {"articles": 12, "sales": 103})
+    assert restored.partition("daily", profiles)[0] == profiles
+    assert restored.get_summary("daily")["events"][0]["event"] == "recovered"
+
+
+def test_infrastructure_errors_do_not_count():
+    """Chrome mancante, Cloudflare o browser caduto: nessun fallimento attribuito al profilo"""
+    breaker = _breaker()
+    profiles = {"Hugo": "1"}
+    for error in ("Errore avvio driver: 'NoneType' object has no attribute 'split'",
+                  "Verifica Cloudflare non superata",
+                  "Message: invalid session id",
+                  "Message: unknown error: session deleted because of page crash from tab crashed"):
+        for _ in range(3):
+            breaker.record_failure("daily", "Hugo", error)
+    assert breaker.partition("daily", profiles)[0] == profiles
+    assert breaker.needs_diagnostics("daily", "Hugo")
+    assert {event["event"] for event in breaker.get_summary("daily")["events"]} == {"infrastructure"}
+
+
+def test_driver_setup_failure_keeps_profiles_closed():
+    """Esecuzioni con il driver che non parte: i profili restano fuori dalla quarantena"""
+    from src.scraper import VestiaireScraper
+
+    scraper = VestiaireScraper(profiles={"Hugo": "1", "Mark": "2"})
+    scraper.profile_health = _breaker()
+
+    def broken_setup():
+        raise AttributeError("'NoneType' object has no attribute 'split'")
+
+    scraper.setup_driver = broken_setup
+    for _ in range(3):
+        results = scraper.scrape_all_profiles()
+        assert [result["name"] for result in results] == ["Hugo", "Mark"]
+    assert scraper.profile_health.get_summary("daily")["quarantined"] == []
+    assert scraper.profile_health.partition("daily", scraper.profiles)[0] == scraper.profiles
+
+
+def test_scraper_skips_quarantined_profile_and_carries_values():
+    """Il profilo in quarantena non viene scrapato e riporta gli ultimi valori letti"""
+    from src.scraper import VestiaireScraper
+    from work_queue import ProfileDurations
+
+    scraper = VestiaireScraper(profiles={"Hugo": "1", "Mark": "2"})
+    scraper.profile_durations = ProfileDurations(path=os.path.join(tempfile.mkdtemp(), "durations.json"))
+    scraper.profile_health = _breaker()
+    scraper.profile_health.record_success("daily", "Hugo", {"articles": 10, "sales": 100})
+    for _ in range(3):
+        scraper.profile_health.record_failure("daily", "Hugo", "Pagina di errore: 403")
+
+    scraped = []
+    scraper.setup_driver = lambda: None
+    scraper.scrape_profile = lambda name, id: scraped.append(name) or {
+        "name": name, "profile_id": id, "success": True, "articles": 5, "sales": 50,
+        "performance": {"total_time": 0.1}}
+    with mock.patch("time.sleep"):
+        results = scraper.scrape_all_profiles()
+
+    assert scraped == ["Mark"]
+    hugo = results[0]
+    assert hugo["name"] == "Hugo" and hugo["stale"] and not hugo["success"]
+    assert (hugo["articles"], hugo["sales"]) == (10, 100)
+    assert scraper.performance_stats["profile_health"]["quarantined"] == ["Hugo"]
+
+
+def test_sheet_carries_forward_stale_profile():
+    """Il foglio mensile riporta l'ultima lettura riuscita con una nota, senza differenze"""
+    import sheets_updater
+    from sheets_updater import GoogleSheetsUpdater
+
+    service = FakeSheetsService()
+    for month in range(1, 13):
+        service.add_sheet(calendar.month_name[month].lower())
+    header1, header2 = ["Profilo", "Diff Vendite July", "URL"], ["", "", ""]
+    for d in range(1, 32):
+        header1 += [f"{d} july", "", "", ""]
+        header2 += ["articoli", "vendite", "diff stock", "diff vendite"]
+    service.add_sheet("july", [header1, header2,
+                               ["Hugo", "", "url-hugo", 10, 100, "", ""],
+                               ["Mark", "", "url-mark", 20, 200, "", ""]])
+    service.add_sheet("Overview")
+
+    scraped = [
+        {"name": "Hugo", "url": "url-hugo", "articles": 10, "sales": 100, "stale": True,
+         "stale_since": "2025-07-01T11:30:00", "error": "Profilo in quarantena"},
+        {"name": "Mark", "url": "url-mark", "articles": 22, "sales": 205},
+    ]
+    updater = GoogleSheetsUpdater(service=service)
+    batches = []
+    original = service.spreadsheets().batchUpdate
+
+    def record_batch(spreadsheetId, body, **kwargs):
+        batches.append(body)
+        return original(spreadsheetId=spreadsheetId, body=body, **kwargs)
+
+    with mock.patch.object(sheets_updater.time, "sleep"), \
+            mock.patch.object(type(service.spreadsheets()), "batchUpdate", side_effect=record_batch):
+        assert updater.update_monthly_sheet(scraped, 2025, 7, 2)
+
+    july = service.sheet_values("july")
+    assert [str(value) for value in july[2][7:11]] == ["10", "100", "", ""]
+    assert [str(value) for value in july[3][7:11]] == ["22", "205", "2", "5"]
+
+    notes = [request["updateCells"] for body in batches for request in body["requests"] if "updateCells" in request]
+    assert len(notes) == 1 and notes[0]["range"]["startColumnIndex"] == 7
+    assert "2025-07-01T11:30:00" in notes[0]["rows"][0]["values"][0]["note"]
+    assert notes[0]["rows"][1]["values"][0]["note"] == ""
+
+
+def test_stale_profile_keeps_same_day_reading():
+    """Esecuzione serale fallita: la lettura riuscita della mattina resta, con le sue differenze"""
+    import sheets_updater
+    from sheets_updater import GoogleSheetsUpdater
+
+    service = FakeSheetsService()
+    for month in range(1, 13):
+        service.add_sheet(calendar.month_name[month].lower())
+    header1, header2 = ["Profilo", "Diff Vendite July", "URL"], ["", "", ""]
+    for d in range(1, 32):
+        header1 += [f"{d} july", "", "", ""]
+        header2 += ["articoli", "vendite", "diff stock", "diff vendite"]
+    service.add_sheet("july", [header1, header2,
+                               ["Hugo", "", "url-hugo", 10, 100, "", "", 11, 110, 1, 10],
+                               ["Mark", "", "url-mark", 20, 200, "", ""]])
+    service.add_sheet("Overview")
+
+    scraped = [
+        {"name": "Hugo", "url": "url-hugo", "articles": 11, "sales": 110, "stale": True,
+         "stale_since": "2025-07-02T11:30:00", "error": "Pagina di errore: 403"},
+        # Mai letto con successo: valori del giorno precedente
+        {"name": "Mark", "url": "url-mark", "articles": 0, "sales": 0, "stale": True,
+         "stale_since": None, "error": "Pagina di errore: 403"},
+    ]
+    updater = GoogleSheetsUpdater(service=service)
+    with mock.patch.object(sheets_updater.time, "sleep"):
+        assert updater.update_monthly_sheet(scraped, 2025, 7, 2)
+
+    july = service.sheet_values("july")
+    assert [str(value) for value in july[2][7:11]] == ["11", "110", "1", "10"]
+    assert [str(value) for value in july[3][7:11]] == ["20", "200", "", ""]
+
+
+if __name__ == "__main__":
+    logger.info("=== TEST CIRCUIT BREAKER PROFILI ===")
+    test_quarantine_after_consecutive_failures_and_probe_backoff()
+    test_infrastructure_errors_do_not_count()
+    test_driver_setup_failure_keeps_profiles_closed()
+    test_scraper_skips_quarantined_profile_and_carries_values()
+    test_sheet_carries_forward_stale_profile()
+    test_stale_profile_keeps_same_day_reading()
+    logger.info("✅ Tutti i test superati")
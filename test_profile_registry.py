@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Test del registro dei profili
+(CSV, JSON e SQLite, priorità, profili disabilitati, tab mensili con molti profili)
+"""
+
+import sys
+import os
+import json
+import calendar
+import tempfile
+import logging
+from unittest import mock
+
+# Aggiungi il percorso del progetto e di src/
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+import sheets_updater
+from sheets_updater import GoogleSheetsUpdater
+from fake_sheets_service import FakeSheetsService
+from profile_registry import ProfileEntry, ProfileRegistry, load_registry
+from config import VESTIAIRE_PROFILES
+
+# Configura logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _registry(count: int) -> ProfileRegistry:
+    return ProfileRegistry([ProfileEntry(f"Profilo {i:04d}", str(1000 + i), priority=i % 3,
+                                         frequency_hours=12 if i % 2 else None, enabled=i % 10 != 9)
+                            for i in range(count)])
+
+
+def test_registry_round_trip_csv_json_sqlite():
+    """Stessi profili e attributi da CSV, JSON e SQLite; ordine per priorità, disabilitati esclusi"""
+    directory = tempfile.mkdtemp()
+    registry = _registry(20)
+    for extension in ("csv", "json", "sqlite"):
+        path = os.path.join(directory, f"profiles.{extension}")
+        registry.save(path)
+        loaded = load_registry(path)
+        assert loaded.source == path
+        assert [entry.to_dict() for entry in loaded.entries] == [entry.to_dict() for entry in registry.entries]
+
+    profiles = registry.profiles()
+    assert len(profiles) == 18 and "Profilo 0009" not in profiles
+    assert len(registry.profiles(enabled_only=False)) == 20
+    priorities = [registry.get(name).priority for name in profiles]
+    assert priorities == sorted(priorities, reverse=True)
+    assert registry.get("Profilo 0001").frequency_hours == 12.0
+    assert registry.get("Profilo 0002").shard_key == "Profilo 0002"
+
+
+def test_registry_json_mapping_and_config_fallback():
+    """JSON nome -> id (o attributi); senza file si usa VESTIAIRE_PROFILES"""
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "profiles.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"Hugo": "21940019", "Mark": {"profile_id": "13442939", "priority": 5, "enabled": "false"}}, f)
+    registry = load_registry(path)
+    assert registry.profiles() == {"Hugo": "21940019"}
+    assert registry.entries[0].name == "Mark"
+
+    fallback = load_registry(os.path.join(directory, "mancante.csv"))
+    assert fallback.profiles() == VESTIAIRE_PROFILES and fallback.source == "config"
+
+
+def test_monthly_sheet_calls_do_not_grow_with_profiles():
+    """Primo giorno del mese con 400 profili: stesse chiamate API di 20 profili"""
+    calls = {}
+    for count in (20, 400):
+        directory = tempfile.mkdtemp()
+        registry = _registry(count)
+        path = os.path.join(directory, "profiles.csv")
+        registry.save(path)
+
+        service = FakeSheetsService()
+        for month in range(1, 13):
+            month_name = calendar.month_name[month].lower()
+            days = calendar.monthrange(2025, month)[1]
+            header1 = ["Profilo", f"Diff Vendite {month_name.capitalize()}", "URL"]
+            header2 = ["", "", ""]
+            for d in range(1, days + 1):
+                header1 += [f"{d} {month_name}", "", "", ""]
+                header2 += ["articoli", "vendite", "diff stock", "diff vendite"]
+            rows = [header1, header2]
+            if month == 7:
+                rows += [[entry.name, "", entry.url] + [""] * (days - 1) * 4 + [100, 1000, "", ""]
+                         for entry in registry.entries]
+            service.add_sheet(month_name, rows)
+        service.add_sheet("Overview")
+
+        scraped = [{"name": entry.name, "url": entry.url, "articles": 101, "sales": 1003}
+                   for entry in registry.enabled()]
+        updater = GoogleSheetsUpdater(service=service)
+        with mock.patch.dict(os.environ, {"PROFILE_REGISTRY_FILE": path}), \
+                mock.patch.object(sheets_updater.time, "sleep"):
+            assert updater.update_monthly_sheet(scraped, 2025, 8, 1)
+        calls[count] = service.get_call_summary()["total_calls"]
+
+        august = {row[0]: row for row in service.sheet_values("august")[2:]}
+        # I profili disabilitati restano fuori, le differenze usano il 31 luglio
+        assert len(august) == len(registry.enabled()) + 1
+        assert [str(value) for value in august["Profilo 0000"][3:7]] == ["101", "1003", "1", "3"]
+        overview = service.sheet_values("Overview")
+        assert len(overview) == len(registry.enabled()) + 2
+
+    logger.info(f"📊 Chiamate update_monthly_sheet: {calls}")
+    assert calls[400] == calls[20]
+
+
+def test_disabled_profiles_keep_their_rows():
+    """Un profilo disabilitato non viene scrapato ma la sua riga resta; quelli fuori dal registro spariscono"""
+    directory = tempfile.mkdtemp()
+    registry = _registry(20)
+    path = os.path.join(directory, "profiles.csv")
+    registry.save(path)
+
+    days = 31
+    header1 = ["Profilo", "Diff Vendite July", "URL"]
+    header2 = ["", "", ""]
+    for d in range(1, days + 1):
+        header1 += [f"{d} july", "", "", ""]
+        header2 += ["articoli", "vendite", "diff stock", "diff vendite"]
+    rows = [[name, "", f"https://example.com/{name}", 100, 1000, "", ""] for name in
+            [entry.name for entry in registry.entries] + ["Obsoleto"]]
+    service = FakeSheetsService()
+    service.add_sheet("july", [header1, header2] + rows)
+    service.add_sheet("Overview")
+
+    scraped = [{"name": entry.name, "url": entry.url, "articles": 101, "sales": 1003}
+               for entry in registry.enabled()]
+    updater = GoogleSheetsUpdater(service=service)
+    with mock.patch.dict(os.environ, {"PROFILE_REGISTRY_FILE": path}), \
+            mock.patch.object(sheets_updater.time, "sleep"):
+        assert updater.update_monthly_sheet(scraped, 2025, 7, 2, full_refresh=False)
+
+    july = {row[0]: row for row in service.sheet_values("july")[2:] if row}
+    assert "Profilo 0009" in july and "Profilo 0019" in july and "Obsoleto" not in july
+    assert len(july) == len(registry.entries) + 1  # + Totali
+
+
+if __name__ == "__main__":
+    logger.info("=== TEST REGISTRO PROFILI ===")
+    test_registry_round_trip_csv_json_sqlite()
+    test_registry_json_mapping_and_config_fallback()
+    test_disabled_profiles_keep_their_rows()
+    test_monthly_sheet_calls_do_not_grow_with_profiles()
+    logger.info("✅ Tutti i test superati")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test del risultato compatto di profilo (ProfileResult)
+Verifica conversione dict, troncamento dei prezzi e serializzazione
+"""
+
+import sys
+import os
+import pickle
+import logging
+
+# Aggiungi il percorso del progetto
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from profile_result import ProfileResult
+
+# Configura logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+LEGACY_RESULT = {
+    "name": "Rediscover",
+    "profile_id": "2039815",
+    "success": True,
+    "sold_items_count": 3,
+    "total_revenue": 415.5,
+    "sold_items_prices": [120.0, 95.5, 200.0],
+    "performance": {"total_time": 4.2},
+}
+
+
+def test_round_trip_with_legacy_dict():
+    """from_dict/to_dict conservano il formato storico"""
+    result = ProfileResult.from_dict(LEGACY_RESULT)
+    assert result.prices.typecode == "d"
+    assert result.to_dict() == LEGACY_RESULT
+
+
+def test_dict_style_access_and_limit():
+    """I chiamanti esistenti leggono result['campo']; limit_prices tronca sul posto"""
+    result = ProfileResult.from_dict(LEGACY_RESULT)
+    assert result["success"] and result["total_revenue"] == 415.5
+    buffer = result.prices
+    result.limit_prices(2)
+    assert result.prices is buffer and list(result["sold_items_prices"]) == [120.0, 95.5]
+    assert result["total_revenue"] == 215.5
+    assert result.get("error") is None and "error" not in result
+
+    failed = ProfileResult.failure("Rediscover", "2039815", "timeout", {"total_time": 30.0})
+    assert failed.to_dict()["error"] == "timeout" and failed["total_revenue"] == 0
+
+
+def test_pickle_uses_price_bytes():
+    """Pickle compatto: i prezzi viaggiano come bytes del buffer"""
+    result = ProfileResult("Profilo", "1", success=True, sold_items_count=1000,
+                           prices=[float(i) for i in range(1000)])
+    restored = pickle.loads(pickle.dumps(result))
+    assert restored.to_dict() == result.to_dict()
+    assert len(pickle.dumps(result)) < len(pickle.dumps(result.to_dict()))
+
+
+if __name__ == "__main__":
+    logger.info("=== TEST PROFILE RESULT ===")
+    test_round_trip_with_legacy_dict()
+    test_dict_style_access_and_limit()
+    test_pickle_uses_price_bytes()
+    logger.info("✅ Tutti i test superati")
@@ -5,12 +5,16 @@ Test script per il Revenue Scraper
 
 import sys
 import os
+import tempfile
 import logging
 from datetime import datetime
 
 # Aggiungi il percorso del progetto
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+# Stato (circuit breaker, durate, memo di navigazione) in una directory temporanea, non in state/
+os.environ.setdefault("VESTIAIRE_STATE_DIR", tempfile.mkdtemp(prefix="vestiaire_state_"))
+
 from revenue_scraper import RevenueScraper
 from config import VESTIAIRE_PROFILES
 
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Test dello scheduler per ritmo di cambiamento
+(stima dallo storico di debug, intervalli entro il budget, profili dovuti e budget delle 24 ore)
+"""
+
+import sys
+import os
+import tempfile
+import logging
+from datetime import datetime, timedelta
+from unittest import mock
+
+# Aggiungi il percorso del progetto e di src/
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+# Stato (scheduler, circuit breaker) in una directory temporanea, non in state/
+os.environ.setdefault("VESTIAIRE_STATE_DIR", tempfile.mkdtemp(prefix="vestiaire_state_"))
+
+from scrape_scheduler import change_rate, load_change_rates, plan_intervals, ScrapeScheduler
+from profile_registry import ProfileEntry, ProfileRegistry
+from debug_store import DebugStore
+from fake_sheets_service import _http_error
+
+# Configura logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+REGISTRY = ProfileRegistry([
+    ProfileEntry("Veloce", "1"),
+    ProfileEntry("Medio", "2"),
+    ProfileEntry("Fermo", "3"),
+    ProfileEntry("Nuovo", "4", frequency_hours=12),
+    ProfileEntry("Spento", "5", enabled=False),
+])
+
+
+def _store_with_history() -> DebugStore:
+    """Due esecuzioni al giorno per 10 giorni: Veloce vende 10 al giorno, Medio 1, Fermo nulla"""
+    store = DebugStore(tempfile.mkdtemp())
+    start = datetime(2025, 7, 1, 11, 30)
+    for run in range(20):
+        timestamp = start + timedelta(hours=12 * run)
+        store.append_run([
+            {"name": "Veloce", "articles": 200 - run * 5, "sales": 1000 + run * 5, "success": True},
+            {"name": "Medio", "articles": 50, "sales": 300 + run // 2, "success": True},
+            {"name": "Fermo", "articles": 80, "sales": 40, "success": True},
+            # Valori stale di un fallimento: esclusi dalla stima
+            {"name": "Nuovo", "articles": 0, "sales": 0, "success": False},
+        ], timestamp)
+    return store
+
+
+def test_change_rates_from_debug_history():
+    """Ritmo di cambiamento da vendite e stock; senza storico riuscito nessuna stima"""
+    rates = load_change_rates(REGISTRY, _store_with_history())
+    assert set(rates) == {"Veloce", "Medio", "Fermo"}
+    assert rates["Veloce"] > rates["Medio"] > rates["Fermo"] == 0
+    # 20 unità al giorno (10 vendite, 10 articoli in meno)
+    assert abs(rates["Veloce"] - 20 / 24) < 1e-9
+
+    history = [{"run": "2025-07-01T11:30:00", "articles": 1, "sales": 1},
+               {"run": "2025-07-01T23:30:00", "articles": 2, "sales": 1}]
+    assert change_rate(history) is None
+
+
+def test_intervals_follow_change_rate_within_budget():
+    """Profili attivi più spesso, fermi al massimo una volta al giorno, senza storico frequency_hours"""
+    rates = {"Veloce": 2.0, "Medio": 0.2, "Fermo": 0.0}
+    intervals = plan_intervals(REGISTRY, rates, daily_budget=16)
+    assert set(intervals) == {"Veloce", "Medio", "Fermo", "Nuovo"}
+    assert intervals["Nuovo"] == 12
+    assert intervals["Veloce"] < intervals["Medio"] < intervals["Fermo"] <= 24
+    assert abs(sum(24 / hours for hours in intervals.values()) - 16) < 1e-6
+
+    # La priorità aumenta la quota a parità di ritmo
+    prioritized = ProfileRegistry([ProfileEntry("A", "1", priority=2), ProfileEntry("B", "2")])
+    intervals = plan_intervals(prioritized, {"A": 1.0, "B": 1.0}, daily_budget=6)
+    assert intervals["A"] < intervals["B"]
+
+
+def test_due_profiles_respect_intervals_and_budget():
+    """Profili dovuti in ordine di ritardo, limitati dal budget delle ultime 24 ore, stato persistito"""
+    path = os.path.join(tempfile.mkdtemp(), "schedule.json")
+    rates = {"Veloce": 2.0, "Medio": 0.2, "Fermo": 0.0}
+    scheduler = ScrapeScheduler(REGISTRY, rates, path, daily_budget=16)
+    now = datetime(2025, 7, 1, 12, 0).timestamp()
+
+    # Mai scrapati: tutti dovuti subito, a parità di ritardo nell'ordine del registro
+    first = scheduler.due(now)
+    assert sorted(first) == ["Fermo", "Medio", "Nuovo", "Veloce"]
+    assert scheduler.next_due_in(now) == 0
+    scheduler.record(first, now)
+    scheduler.save()
+
+    reloaded = ScrapeScheduler(REGISTRY, rates, path, daily_budget=16)
+    assert reloaded.due(now + 60) == []
+    veloce = reloaded.intervals["Veloce"] * 3600
+    assert abs(reloaded.next_due_in(now) - veloce) < 1e-6
+    assert reloaded.due(now + veloce + 1) == ["Veloce"]
+
+    # Budget di 5 richieste al giorno: dopo le prime 4 ne resta una sola
+    limited = ScrapeScheduler(REGISTRY, rates, path, daily_budget=5)
+    later = now + 25 * 3600
+    assert limited.remaining_budget(now + 3600) == 1
+    assert len(limited.due(now + 13 * 3600)) == 1
+    # Dopo 24 ore le richieste escono dalla finestra
+    assert len(limited.due(later)) == 4
+
+
+def test_full_sheet_refresh_only_after_scheduled_times():
+    """Formattazione e Overview una volta dopo ogni orario di sheet_refresh_times"""
+    scheduler = ScrapeScheduler(REGISTRY, {}, os.path.join(tempfile.mkdtemp(), "schedule.json"))
+    morning = datetime(2025, 7, 1, 11, 45).timestamp()
+    assert scheduler.refresh_due(morning)
+    scheduler.sheet_refreshed_at = morning
+    assert not scheduler.refresh_due(datetime(2025, 7, 1, 20, 0).timestamp())
+    assert scheduler.refresh_due(datetime(2025, 7, 1, 23, 31).timestamp())
+    assert scheduler.refresh_due(datetime(2025, 7, 2, 3, 0).timestamp())
+
+
+class _FakeScraper:
+    def __init__(self, profiles):
+        self.profiles = profiles
+        self.keep_driver_open = False
+
+    def scrape_all_profiles(self):
+        return [{"name": name, "url": f"https://example.com/{profile_id}", "articles": 10, "sales": 5}
+                for name, profile_id in self.profiles.items()]
+
+    def close(self):
+        pass
+
+
+class _FlakyUpdater:
+    """Il primo aggiornamento del foglio fallisce con un HttpError, i successivi riescono"""
+
+    def __init__(self):
+        self.calls = []
+
+    def update_monthly_sheet(self, scraped_data, year, month, day, full_refresh=True):
+        self.calls.append((sorted(result["name"] for result in scraped_data), full_refresh))
+        if len(self.calls) == 1:
+            raise _http_error(503, "Backend Error")
+        return True
+
+
+def test_monitor_survives_sheets_errors_and_batches_writes():
+    """Un HttpError non ferma il monitor: i risultati restano in attesa e vengono scritti al ciclo dopo"""
+    import main as daily_main
+
+    updater = _FlakyUpdater()
+    sleeps = []
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 3:
+            raise KeyboardInterrupt
+
+    with mock.patch.object(daily_main, "connect_sheets", return_value=updater), \
+            mock.patch.object(daily_main, "VestiaireScraper", _FakeScraper), \
+            mock.patch.object(daily_main, "load_registry", return_value=REGISTRY), \
+            mock.patch.object(daily_main, "load_change_rates", return_value={}), \
+            mock.patch.object(daily_main, "save_debug_data"), \
+            mock.patch.object(daily_main.time, "sleep", fake_sleep):
+        assert daily_main.monitor()
+
+    everyone = ["Fermo", "Medio", "Nuovo", "Veloce"]
+    # Ciclo 1: scrittura fallita; ciclo 2: riscritti gli stessi risultati con l'aggiornamento
+    # completo; ciclo 3: nessun profilo dovuto e niente da scrivere
+    assert updater.calls == [(everyone, True), (everyone, True)]
+    assert len(sleeps) == 3
+    assert not ScrapeScheduler(REGISTRY, {}).refresh_due()
+
+
+if __name__ == "__main__":
+    logger.info("=== TEST SCHEDULER PER RITMO DI CAMBIAMENTO ===")
+    test_change_rates_from_debug_history()
+    test_intervals_follow_change_rate_within_budget()
+    test_due_profiles_respect_intervals_and_budget()
+    test_full_sheet_refresh_only_after_scheduled_times()
+    test_monitor_survives_sheets_errors_and_batches_writes()
+    logger.info("✅ Tutti i test superati")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test delle statistiche dei selettori XPath
+(declassamento dopo window miss, riscoperta quando i selettori attivi non trovano nulla o a campione)
+"""
+
+import sys
+import os
+import tempfile
+import logging
+
+# Aggiungi il percorso del progetto
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Stato (circuit breaker, durate, memo di navigazione) in una directory temporanea, non in state/
+os.environ.setdefault("VESTIAIRE_STATE_DIR", tempfile.mkdtemp(prefix="vestiaire_state_"))
+
+from selector_stats import SelectorStats
+
+# Configura logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class _FakeDriver:
+    """find_elements restituisce un elemento solo per i selettori in found"""
+
+    def __init__(self, found):
+        self.found = set(found)
+        self.queries = []
+
+    def find_elements(self, by, selector):
+        self.queries.append(selector)
+        return ["elemento"] if selector in self.found else []
+
+
+def test_demoted_selectors_run_only_when_needed_or_sampled():
+    """Con i selettori attivi che trovano elementi i declassati girano solo una volta ogni sample_every"""
+    from revenue_scraper import RevenueScraper
+
+    scraper = RevenueScraper(profiles={})
+    scraper.selector_stats = SelectorStats(path=os.path.join(tempfile.mkdtemp(), "stats.json"),
+                                           window=2, sample_every=3)
+    for _ in range(2):
+        scraper.selector_stats.record("prezzi", "//morto", False)
+    assert scraper.selector_stats.split("prezzi", ["//vivo", "//morto"]) == (["//vivo"], ["//morto"])
+
+    scraper.driver = _FakeDriver(["//vivo"])
+    for _ in range(3):
+        list(scraper._iter_selectors("prezzi", ["//vivo", "//morto"]))
+    assert scraper.driver.queries.count("//morto") == 1
+
+    # I selettori attivi non trovano nulla: riscoperta subito e il selettore ritrovato torna attivo
+    scraper.driver = _FakeDriver(["//morto"])
+    assert [selector for selector, elements in scraper._iter_selectors("prezzi", ["//vivo", "//morto"])
+            if elements] == ["//morto"]
+    assert not scraper.selector_stats.is_demoted("prezzi", "//morto")
+
+    # rediscover() del chiamante ha la precedenza sulla regola di default
+    for _ in range(2):
+        scraper.selector_stats.record("prezzi", "//morto", False)
+    scraper.driver = _FakeDriver([])
+    list(scraper._iter_selectors("prezzi", ["//vivo", "//morto"], rediscover=lambda: False))
+    assert scraper.driver.queries == ["//vivo"]
+
+
+if __name__ == "__main__":
+    logger.info("=== TEST STATISTICHE SELETTORI ===")
+    test_demoted_selectors_run_only_when_needed_or_sampled()
+    logger.info("✅ Tutti i test superati")
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test delle esecuzioni divise in shard
+(assegnazione deterministica dei profili, file parziali, merge con un solo aggiornamento Sheets)
+"""
+
+import sys
+import os
+import tempfile
+import logging
+from datetime import datetime
+from unittest import mock
+
+import pytest
+
+# Aggiungi il percorso del progetto e di src/
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+# Stato (circuit breaker, durate, memo di navigazione) in una directory temporanea, non in state/
+os.environ.setdefault("VESTIAIRE_STATE_DIR", tempfile.mkdtemp(prefix="vestiaire_state_"))
+
+import shard_runs
+from shard_runs import parse_shard, shard_of, select_shard, write_partial, load_partials, merge_report
+from profile_registry import ProfileEntry, ProfileRegistry
+from fake_sheets_service import FakeSheetsService
+
+# Configura logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+REGISTRY = ProfileRegistry([ProfileEntry(f"Profilo {i:03d}", str(5000 + i), enabled=i != 7) for i in range(60)])
+
+
+def _result(name: str) -> dict:
+    entry = REGISTRY.get(name)
+    return {"name": name, "url": entry.url, "articles": 10, "sales": 100, "success": True}
+
+
+def test_shards_partition_enabled_profiles():
+    """Ogni profilo abilitato finisce in uno e un solo shard, sempre lo stesso"""
+    assert parse_shard("2/4") == (2, 4)
+    for spec in ("0/4", "5/4", "2", "a/b"):
+        with pytest.raises(ValueError):
+            parse_shard(spec)
+
+    shards = [select_shard(REGISTRY, index, 4) for index in range(1, 5)]
+    names = [name for shard in shards for name in shard]
+    assert sorted(names) == sorted(REGISTRY.profiles()) and len(names) == len(set(names))
+    assert all(shards), "con 59 profili nessuno shard dovrebbe restare vuoto"
+    assert shard_of("Profilo 001", 4) == shard_of("Profilo 001", 4)
+    # La chiave di shard, non il nome, decide l'assegnazione
+    entry = ProfileEntry("Altro", "1", shard_key="Profilo 001")
+    assert shard_of(entry.shard_key, 4) == shard_of("Profilo 001", 4)
+
+
+def test_partials_merged_and_missing_shards_detected():
+    """Il merge riunisce i parziali della data, segnala shard e profili mancanti"""
+    directory = tempfile.mkdtemp()
+    run_date = datetime(2025, 8, 1, 6, 30)
+    for index in (1, 2, 3):
+        profiles = select_shard(REGISTRY, index, 3)
+        # Lo shard 3 ha perso un profilo
+        results = [_result(name) for name in profiles][:-1 if index == 3 else None]
+        write_partial("daily", index, 3, profiles, results, run_date, directory)
+    write_partial("daily", 1, 2, {}, [], datetime(2025, 7, 31), directory)
+
+    merged = load_partials("daily", directory=directory)
+    assert merged["run_date"] == "2025-08-01T06:30:00" and merged["found"] == [1, 2, 3]
+    assert len(merged["results"]) == len(REGISTRY.profiles()) - 1
+    assert merged["missing_profiles"] == [list(select_shard(REGISTRY, 3, 3))[-1]]
+    assert merge_report(merged, "daily")
+
+    # Data precedente: solo lo shard 1 di 2
+    older = load_partials("daily", "2025-07-31", directory)
+    assert older["missing"] == [2] and not merge_report(older, "daily")
+
+    write_partial("daily", 1, 4, {}, [], run_date, directory)
+    with pytest.raises(ValueError):
+        load_partials("daily", "2025-08-01", directory)
+
+
+def test_merge_shards_updates_sheet_once_at_shard_date():
+    """merge-shards scrive i profili di tutti gli shard nella colonna del giorno degli shard"""
+    handlers = list(logging.getLogger().handlers)
+    import main as daily_main
+    # L'import non configura il logging (niente file in logs/, handler del test intatti)
+    assert logging.getLogger().handlers == handlers
+
+    directory = tempfile.mkdtemp()
+    run_date = datetime(2025, 7, 2, 23, 50)
+    for index in (1, 2):
+        profiles = select_shard(REGISTRY, index, 2)
+        write_partial("daily", index, 2, profiles, [_result(name) for name in profiles], run_date, directory)
+
+    # Le tab mensili vengono create dall'updater
+    service = FakeSheetsService()
+    service.add_sheet("Overview")
+    updater = daily_main.GoogleSheetsUpdater(service=service)
+
+    registry_path = os.path.join(directory, "profiles.csv")
+    REGISTRY.save(registry_path)
+    with mock.patch.dict(shard_runs.SHARD_CONFIG, {"directory": directory}), \
+            mock.patch.dict(os.environ, {"PROFILE_REGISTRY_FILE": registry_path}), \
+            mock.patch.object(daily_main, "connect_sheets", return_value=updater), \
+            mock.patch("sheets_updater.time.sleep"):
+        assert daily_main.merge_shards()
+
+    july = {row[0]: row for row in service.sheet_values("july")[2:] if row}
+    assert len(july) == len(REGISTRY.profiles()) + 1  # + Totali
+    articoli_col = 3 + 1 * 4
+    assert str(july["Profilo 000"][articoli_col]) == "10"
+
+
+if __name__ == "__main__":
+    logger.info("=== TEST ESECUZIONI IN SHARD ===")
+    test_shards_partition_enabled_profiles()
+    test_partials_merged_and_missing_shards_detected()
+    test_merge_shards_updates_sheet_once_at_shard_date()
+    logger.info("✅ Tutti i test superati")
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Benchmark chiamate Google Sheets API
+Verifica che gli updater restino entro un budget di chiamate e byte usando FakeSheetsService
+"""
+
+import sys
+import os
+import calendar
+import logging
+from unittest import mock
+
+import pytest
+
+# Aggiungi il percorso del progetto e di src/
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+import sheets_updater
+from sheets_updater import GoogleSheetsUpdater
+from revenue_system import RevenueSheetsUpdater
+from fake_sheets_service import FakeSheetsService, HttpError, _http_error
+from perf_tracing import SheetsApiTracer
+from config import VESTIAIRE_PROFILES
+
+# Configura logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Budget massimi per una singola esecuzione (abbassarli quando si ottimizza)
+MONTHLY_SHEET_BUDGET = {"max_calls": 29, "max_bytes": 220_000}
+REVENUE_SHEET_BUDGET = {"max_calls": 45, "max_bytes": 18_000}
+
+
+def _monthly_tab_rows(month_name: str, year: int, month: int, days_filled: int) -> list:
+    """Costruisce una tab mensile come la crea create_monthly_tab, con dati fino a days_filled"""
+    days = calendar.monthrange(year, month)[1]
+    header1 = ["Profilo", f"Diff Vendite {month_name.capitalize()}", "URL"]
+    header2 = ["", "", ""]
+    for d in range(1, days + 1):
+        header1 += [f"{d} {month_name}", "", "", ""]
+        header2 += ["articoli", "vendite", "diff stock", "diff vendite"]
+
+    rows = [header1, header2]
+    for i, (name, profile_id) in enumerate(VESTIAIRE_PROFILES.items()):
+        row = [name, "", f"https://it.vestiairecollective.com/profile/{profile_id}/"]
+        for d in range(1, days_filled + 1):
+            row += [100 + i + d, 1000 + i * 3 + d, 1, 3]
+        rows.append(row)
+    return rows
+
+
+def _scraped_data() -> list:
+    return [
+        {
+            "name": name,
+            "url": f"https://it.vestiairecollective.com/profile/{profile_id}/",
+            "articles": 200,
+            "sales": 2000,
+        }
+        for name, profile_id in VESTIAIRE_PROFILES.items()
+    ]
+
+
+def _log_summary(label: str, summary: dict):
+    logger.info(f"📊 {label}: {summary['total_calls']} chiamate "
+                f"({summary['read_requests']} letture, {summary['write_requests']} scritture), "
+                f"{summary['total_bytes']} byte")
+    for method, stats in summary["by_method"].items():
+        logger.info(f"   {method:28} {stats['calls']:3d} chiamate, {stats['bytes']} byte")
+
+
+def test_update_monthly_sheet_day_31_budget():
+    """update_monthly_sheet per il 31 luglio resta entro il budget di chiamate e byte"""
+    service = FakeSheetsService()
+    for month in range(1, 13):
+        month_name = calendar.month_name[month].lower()
+        service.add_sheet(month_name, _monthly_tab_rows(month_name, 2025, month, 30 if month == 7 else 0))
+    service.add_sheet("Overview")
+
+    updater = GoogleSheetsUpdater(service=service)
+    # update_overview_sheet attende 0.5s tra le letture: irrilevante per il conteggio
+    with mock.patch.object(sheets_updater.time, "sleep"):
+        assert updater.update_monthly_sheet(_scraped_data(), 2025, 7, 31)
+
+    summary = service.get_call_summary()
+    _log_summary("update_monthly_sheet giorno 31", summary)
+    assert summary["total_calls"] <= MONTHLY_SHEET_BUDGET["max_calls"]
+    assert summary["total_bytes"] <= MONTHLY_SHEET_BUDGET["max_bytes"]
+
+    # I dati del giorno 31 sono stati scritti nelle colonne attese
+    july = service.sheet_values("july")
+    articoli_col = 3 + 30 * 4
+    assert july[2][0] == "Rediscover"
+    assert str(july[2][articoli_col]) == "200"
+    assert july[-1][0] == "Totali"
+
+
+def test_update_revenue_monthly_sheet_budget():
+    """update_revenue_monthly_sheet con profili già presenti resta entro il budget"""
+    service = FakeSheetsService()
+    updater = RevenueSheetsUpdater(service=service)
+    revenue_data = [
+        {"name": name, "profile_id": profile_id, "sold_items_count": 3, "total_revenue": 300.0}
+        for name, profile_id in VESTIAIRE_PROFILES.items()
+    ]
+
+    # Primo giorno: crea tab e righe; il benchmark misura il giorno successivo
+    updater.update_revenue_monthly_sheet(revenue_data, 2025, 7, 30)
+    service.reset_calls()
+    updater.update_revenue_monthly_sheet(revenue_data, 2025, 7, 31)
+
+    summary = service.get_call_summary()
+    _log_summary("update_revenue_monthly_sheet giorno 31", summary)
+    assert summary["total_calls"] <= REVENUE_SHEET_BUDGET["max_calls"]
+    assert summary["total_bytes"] <= REVENUE_SHEET_BUDGET["max_bytes"]
+
+
+def test_sheets_api_tracer_records_and_retries():
+    """Il tracer registra ogni execute(), attribuisce la funzione chiamante e ritenta i 429"""
+    tracer = SheetsApiTracer(max_retries=2, retry_delay=0)
+    fake = FakeSheetsService()
+    fake.add_sheet("july", [["Profilo", "Diff"]])
+    service = tracer.wrap(fake)
+
+    def read_header():
+        return service.spreadsheets().values().get(spreadsheetId="x", range="july!A1:B1").execute()
+
+    assert read_header()["values"] == [["Profilo", "Diff"]]
+
+    # Il primo tentativo di scrittura riceve un 429, il secondo va a buon fine
+    original_update = fake.spreadsheets().values().update(
+        spreadsheetId="x", range="july!A2", valueInputOption="RAW", body={"values": [["Rediscover"]]})
+    failures = [_http_error(429, "Quota exceeded")]
+
+    def flaky_execute(num_retries=0):
+        if failures:
+            raise failures.pop()
+        return original_update.execute()
+
+    with mock.patch.object(type(fake.spreadsheets().values()), "update",
+                           return_value=mock.Mock(execute=flaky_execute)):
+        service.spreadsheets().values().update(
+            spreadsheetId="x", range="july!A2", valueInputOption="RAW",
+            body={"values": [["Rediscover"]]}).execute()
+
+    summary = tracer.get_summary()
+    for line in tracer.format_summary():
+        logger.info(f"   {line}")
+    assert summary["total"]["calls"] == 2
+    assert summary["total"]["read"] == 1 and summary["total"]["write"] == 1
+    assert summary["by_method"]["values.update"]["retries"] == 1
+    assert summary["by_caller"]["read_header"]["calls"] == 1
+    assert summary["by_caller"]["test_sheets_api_tracer_records_and_retries"]["calls"] == 1
+    assert fake.sheet_values("july")[1][0] == "Rediscover"
+
+
+def test_sheets_api_tracer_skips_non_idempotent_retries_and_caps_records():
+    """values.append con un 503 non viene ritentato (righe duplicate); i record sono limitati, i totali no"""
+    tracer = SheetsApiTracer(max_retries=3, retry_delay=0, max_records=5)
+    fake = FakeSheetsService()
+    fake.add_sheet("july", [["Profilo"]])
+    service = tracer.wrap(fake)
+
+    attempts = []
+
+    def failing_append(num_retries=0):
+        attempts.append(1)
+        raise _http_error(503, "Backend error")
+
+    with mock.patch.object(type(fake.spreadsheets().values()), "append",
+                           return_value=mock.Mock(execute=failing_append)):
+        with pytest.raises(HttpError):
+            service.spreadsheets().values().append(
+                spreadsheetId="x", range="july!A1", valueInputOption="RAW",
+                body={"values": [["Hugo"]]}).execute()
+    assert len(attempts) == 1
+    assert tracer.get_summary()["by_method"]["values.append"]["errors"] == 1
+
+    for _ in range(20):
+        service.spreadsheets().values().get(spreadsheetId="x", range="july!A1").execute()
+    assert len(tracer.records) == 5
+    assert tracer.get_summary()["total"]["calls"] == 21
+
+
+def test_sheets_api_tracer_does_not_retry_by_default():
+    """Senza max_retries il tracer si limita a registrare: il 429 arriva subito al chiamante"""
+    tracer = SheetsApiTracer()
+    fake = FakeSheetsService()
+    fake.add_sheet("july", [["Profilo"]])
+    service = tracer.wrap(fake)
+
+    attempts = []
+
+    def rate_limited_get(num_retries=0):
+        attempts.append(1)
+        raise _http_error(429, "Quota exceeded")
+
+    with mock.patch.object(type(fake.spreadsheets().values()), "get",
+                           return_value=mock.Mock(execute=rate_limited_get)):
+        with pytest.raises(HttpError):
+            service.spreadsheets().values().get(spreadsheetId="x", range="july!A1").execute()
+    assert len(attempts) == 1
+    summary = tracer.get_summary()
+    assert summary["by_method"]["values.get"]["retries"] == 0
+    assert summary["by_method"]["values.get"]["errors"] == 1
+
+
+if __name__ == "__main__":
+    logger.info("=== BENCHMARK GOOGLE SHEETS API ===")
+    test_update_monthly_sheet_day_31_budget()
+    test_update_revenue_monthly_sheet_budget()
+    test_sheets_api_tracer_records_and_retries()
+    test_sheets_api_tracer_skips_non_idempotent_retries_and_caps_records()
+    test_sheets_api_tracer_does_not_retry_by_default()
+    logger.info("✅ Tutti i budget rispettati")
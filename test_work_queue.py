@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test della coda condivisa dei profili (work stealing, ordine LPT, riaccodamento)
+"""
+
+import sys
+import os
+import time
+import tempfile
+import threading
+import logging
+
+# Aggiungi il percorso del progetto
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from work_queue import ProfileDurations, ProfileWorkQueue, run_workers
+
+# Configura logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+PROFILES = {"Rapido": "1", "Lento": "2", "Nuovo": "3", "Medio": "4"}
+
+
+def test_lpt_order_from_durations():
+    """Profili con durata storica più lunga per primi, quelli nuovi alla mediana"""
+    durations = ProfileDurations(path=os.path.join(tempfile.mkdtemp(), "durations.json"), smoothing=0.5)
+    durations.record("revenue", "Rapido", 5.0)
+    durations.record("revenue", "Lento", 40.0)
+    durations.record("revenue", "Medio", 20.0)
+    durations.record("revenue", "Medio", 10.0)
+    durations.save()
+
+    estimates = ProfileDurations(path=durations.path).estimates("revenue")
+    assert estimates == {"Rapido": 5.0, "Lento": 40.0, "Medio": 15.0}
+    assert ProfileWorkQueue(PROFILES, estimates).order() == ["Lento", "Nuovo", "Medio", "Rapido"]
+
+
+def test_failed_profile_goes_to_another_worker():
+    """Un profilo fallito su un worker viene ripreso da un worker diverso"""
+    queue = ProfileWorkQueue({"A": "1"}, max_attempts=2)
+    queue.register("worker-1")
+    queue.register("worker-2")
+
+    item = queue.get("worker-1")
+    assert queue.fail(item, "worker-1")
+    assert queue._take("worker-1") is None
+    retry = queue.get("worker-2")
+    assert retry is item and item.attempts == 2
+    assert not queue.fail(retry, "worker-2")
+    assert queue.get("worker-1") is None
+
+
+def test_run_workers_balances_slow_profiles():
+    """I worker liberi prelevano dalla coda: il profilo lento non blocca gli altri"""
+    estimates = {"Lento": 0.4, "Rapido": 0.05, "Nuovo": 0.05, "Medio": 0.05}
+    queue = ProfileWorkQueue(PROFILES, estimates, max_attempts=2)
+    processed = []
+    results = {}
+    lock = threading.Lock()
+
+    def process(item, worker_id):
+        with lock:
+            processed.append((item.name, worker_id))
+        time.sleep(estimates[item.name])
+        # "Medio" fallisce al primo tentativo
+        failed = item.name == "Medio" and item.attempts == 1
+        return f"{item.name}@{worker_id}", failed, True
+
+    def on_result(item, result):
+        with lock:
+            results[item.name] = result
+
+    start = time.time()
+    run_workers(queue, 2, process, on_result)
+    elapsed = time.time() - start
+
+    assert set(results) == set(PROFILES)
+    assert processed[0][0] == "Lento"
+    medio_workers = [worker for name, worker in processed if name == "Medio"]
+    assert len(medio_workers) == 2 and medio_workers[0] != medio_workers[1]
+    assert queue.stats["requeued"] == 1
+    # Makespan dominato dal profilo lento, non dalla somma dei tempi
+    assert elapsed < 0.4 + 0.3
+
+
+if __name__ == "__main__":
+    logger.info("=== TEST CODA PROFILI ===")
+    test_lpt_order_from_durations()
+    test_failed_profile_goes_to_another_worker()
+    test_run_workers_balances_slow_profiles()
+    logger.info("✅ Tutti i test superati")
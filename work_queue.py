@@ -0,0 +1,213 @@
+"""
+Work Queue
+Coda condivisa dei profili da cui i worker browser prelevano il lavoro (work stealing),
+ordinata per durata storica decrescente (longest processing time first)
+"""
+
+import os
+import json
+import threading
+import logging
+import concurrent.futures
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import STATE_CONFIG, get_state_path
+from state_file import update_json
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileDurations:
+    """
+    Durata tipica di ogni profilo (media mobile esponenziale dei secondi impiegati),
+    separata per scraper ("daily", "revenue") e persistita tra le esecuzioni
+    """
+
+    def __init__(self, path: str = None, smoothing: float = None):
+        self.path = path or get_state_path("profile_durations_file")
+        self.smoothing = smoothing or STATE_CONFIG["duration_smoothing"]
+        self._lock = threading.Lock()
+        self._dirty = set()
+        self.scopes: Dict[str, Dict[str, Dict]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Dict]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ Durate profili non leggibili, riparto da zero: {e}")
+            return {}
+
+    def save(self):
+        """Scrive su disco le durate registrate, fondendole con quelle degli altri worker"""
+        with self._lock:
+            changed = {key: dict(self.scopes[key[0]][key[1]]) for key in self._dirty}
+            self._dirty.clear()
+
+        def merge(disk: Dict) -> Dict:
+            for (scope, profile_name), entry in changed.items():
+                disk.setdefault(scope, {})[profile_name] = entry
+            return disk
+
+        try:
+            update_json(self.path, merge)
+        except Exception as e:
+            logger.warning(f"⚠️ Impossibile salvare le durate dei profili: {e}")
+
+    def record(self, scope: str, profile_name: str, seconds: float):
+        with self._lock:
+            profiles = self.scopes.setdefault(scope, {})
+            entry = profiles.get(profile_name)
+            if entry is None:
+                average = seconds
+            else:
+                average = self.smoothing * seconds + (1 - self.smoothing) * entry["average"]
+            self._dirty.add((scope, profile_name))
+            profiles[profile_name] = {
+                "average": round(average, 3),
+                "last": round(seconds, 3),
+                "runs": (entry or {}).get("runs", 0) + 1,
+                "updated_at": datetime.now().isoformat(timespec="seconds"),
+            }
+
+    def estimates(self, scope: str) -> Dict[str, float]:
+        """Durata attesa per profilo (secondi)"""
+        with self._lock:
+            return {name: entry["average"] for name, entry in self.scopes.get(scope, {}).items()}
+
+
+class WorkItem:
+    """Un profilo in coda con i tentativi fatti e i worker su cui è fallito"""
+
+    __slots__ = ("name", "profile_id", "estimate", "attempts", "failed_on")
+
+    def __init__(self, name: str, profile_id: str, estimate: float):
+        self.name = name
+        self.profile_id = profile_id
+        self.estimate = estimate
+        self.attempts = 0
+        self.failed_on: List[str] = []
+
+
+class ProfileWorkQueue:
+    """
+    Coda condivisa: ogni worker preleva il prossimo profilo appena è libero, così un
+    profilo lento non blocca la coda degli altri. I profili con durata storica più
+    lunga partono per primi (LPT); un profilo fallito torna in coda e viene preso,
+    se possibile, da un worker diverso da quello su cui è fallito.
+    """
+
+    def __init__(self, profiles: Dict[str, str], estimates: Dict[str, float] = None, max_attempts: int = 1):
+        estimates = estimates or {}
+        known = sorted(estimates[name] for name in profiles if name in estimates)
+        # I profili mai visti prendono la mediana di quelli noti
+        default = known[len(known) // 2] if known else 0.0
+        items = [WorkItem(name, profile_id, estimates.get(name, default)) for name, profile_id in profiles.items()]
+        # sorted è stabile: a parità di stima resta l'ordine configurato
+        self._pending: List[WorkItem] = sorted(items, key=lambda item: item.estimate, reverse=True)
+        self.max_attempts = max(1, max_attempts)
+        self._in_flight = 0
+        self._workers = set()
+        self._condition = threading.Condition()
+        self.stats = {"requeued": 0}
+
+    def register(self, worker_id: str):
+        with self._condition:
+            self._workers.add(worker_id)
+
+    def unregister(self, worker_id: str):
+        with self._condition:
+            self._workers.discard(worker_id)
+            self._condition.notify_all()
+
+    def get(self, worker_id: str) -> Optional[WorkItem]:
+        """
+        Prossimo profilo per il worker, o None a coda esaurita. Attende se la coda è
+        vuota ma altri worker hanno profili in corso (potrebbero tornare in coda).
+        """
+        with self._condition:
+            while True:
+                item = self._take(worker_id)
+                if item is not None:
+                    self._in_flight += 1
+                    item.attempts += 1
+                    return item
+                if not self._pending and self._in_flight == 0:
+                    return None
+                self._condition.wait(timeout=1.0)
+
+    def _take(self, worker_id: str) -> Optional[WorkItem]:
+        for index, item in enumerate(self._pending):
+            if worker_id not in item.failed_on:
+                return self._pending.pop(index)
+        # Solo profili già falliti su questo worker: li prende se nessun altro worker può farlo
+        others = self._workers - {worker_id}
+        for index, item in enumerate(self._pending):
+            if not others or others.issubset(item.failed_on):
+                return self._pending.pop(index)
+        return None
+
+    def done(self, item: WorkItem):
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def fail(self, item: WorkItem, worker_id: str, retry: bool = True) -> bool:
+        """Registra il fallimento; riaccoda il profilo se restano tentativi. True se riaccodato"""
+        with self._condition:
+            self._in_flight -= 1
+            item.failed_on.append(worker_id)
+            requeued = retry and item.attempts < self.max_attempts
+            if requeued:
+                self._pending.append(item)
+                self.stats["requeued"] += 1
+            self._condition.notify_all()
+            return requeued
+
+    def order(self) -> List[str]:
+        """Ordine di partenza dei profili ancora in coda"""
+        with self._condition:
+            return [item.name for item in self._pending]
+
+
+def run_workers(queue: ProfileWorkQueue, worker_count: int,
+                process: Callable[[WorkItem, str], Tuple[object, bool, bool]],
+                on_result: Callable[[WorkItem, object], None]):
+    """
+    Esegue worker_count worker che prelevano dalla coda finché non è esaurita.
+    process(item, worker_id) restituisce (risultato, fallito, ritentabile); on_result
+    riceve i risultati definitivi (riusciti o falliti senza altri tentativi).
+    Con un solo worker il lavoro avviene nel thread chiamante.
+    """
+    def worker(worker_id: str):
+        queue.register(worker_id)
+        try:
+            while True:
+                item = queue.get(worker_id)
+                if item is None:
+                    return
+                try:
+                    result, failed, retryable = process(item, worker_id)
+                except Exception as e:
+                    logger.error(f"Errore worker {worker_id} su {item.name}: {e}")
+                    result, failed, retryable = None, True, True
+                if not failed:
+                    queue.done(item)
+                    on_result(item, result)
+                elif queue.fail(item, worker_id, retry=retryable):
+                    logger.warning(f"🔁 {item.name} riaccodato per un altro worker (tentativo {item.attempts + 1})")
+                else:
+                    on_result(item, result)
+        finally:
+            queue.unregister(worker_id)
+
+    if worker_count <= 1:
+        worker("worker-1")
+        return
+    with concurrent.futures.ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix="browser") as executor:
+        futures = [executor.submit(worker, f"worker-{i + 1}") for i in range(worker_count)]
+        for future in futures:
+            future.result()